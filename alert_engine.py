@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Alert Engine for Schwab Streaming Client
+Indexed rule evaluation on streaming quote updates
+"""
+
+import bisect
+import itertools
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fixed_point import PRICE_FIELDS, PRICE_SCALE, float_fields, to_fixed, to_price
+from memory_budget import sampled_sizeof
+from stream_logging import get_logger, kv
+
+logger = get_logger('alert_engine')
+
+
+# Names available to expression rules besides the quote fields themselves
+EXPRESSION_BUILTINS = {'abs': abs, 'min': min, 'max': max, 'round': round}
+
+WILDCARD = '*'
+
+
+class Alert:
+    """A fired alert"""
+
+    __slots__ = ('rule', 'symbol', 'value', 'timestamp')
+
+    def __init__(self, rule: 'AlertRule', symbol: str, value, timestamp: float):
+        self.rule = rule
+        self.symbol = symbol
+        self.value = value
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f"Alert({self.rule.rule_id}, {self.symbol}, {self.rule.describe()}, value={self.value})"
+
+
+class AlertRule:
+    """Base class for compiled alert rules"""
+
+    def __init__(self, rule_id: str, symbol: str, fields: Iterable[str], debounce_seconds: float = 0.0):
+        self.rule_id = rule_id
+        self.symbol = symbol
+        self.fields = tuple(fields)
+        self.debounce_seconds = debounce_seconds
+        # Debounce is tracked per symbol so wildcard rules don't mute each other
+        self.last_fired: Dict[str, float] = {}
+        self.evaluations = 0
+        self.fired = 0
+        self.suppressed = 0
+
+    def describe(self) -> str:
+        """Human readable condition, overridden by the concrete rules"""
+        return f"{self.__class__.__name__} on {', '.join(self.fields)}"
+
+
+class ThresholdRule(AlertRule):
+    """Fires when a field crosses a fixed level in the given direction
+
+    Levels on price fields are given in dollars and kept as scaled
+    integers, so crossings compare exactly against the streamed prices.
+    """
+
+    def __init__(self, rule_id: str, symbol: str, field: str, level: float,
+                 direction: str = 'above', debounce_seconds: float = 0.0):
+        if direction not in ('above', 'below'):
+            raise ValueError(f"Threshold direction must be 'above' or 'below', got {direction!r}")
+        super().__init__(rule_id, symbol, (field,), debounce_seconds)
+        self.field = field
+        self.is_price = field in PRICE_FIELDS
+        self.level = to_fixed(level) if self.is_price else level
+        self.direction = direction
+
+    def describe(self) -> str:
+        level = to_price(self.level) if self.is_price else self.level
+        return f"{self.field} crossed {self.direction} {level}"
+
+
+class ExpressionRule(AlertRule):
+    """Fires when a boolean expression over quote fields turns true
+
+    The expression is compiled once; the fields it references are taken
+    from the compiled code so the rule is only evaluated when one of them
+    changes. Price fields are passed to the expression in dollars.
+    """
+
+    def __init__(self, rule_id: str, symbol: str, expression: str, debounce_seconds: float = 0.0):
+        code = compile(expression, f'<alert {rule_id}>', 'eval')
+        fields = [name for name in code.co_names if name not in EXPRESSION_BUILTINS]
+        if not fields:
+            raise ValueError(f"Expression {expression!r} does not reference any quote field")
+        super().__init__(rule_id, symbol, fields, debounce_seconds)
+        self.expression = expression
+        self.code = code
+        self._scales = tuple((field, field in PRICE_FIELDS) for field in self.fields)
+        # Edge-triggered: remember the last result per symbol (wildcard rules
+        # are shared across symbols)
+        self.active: Set[str] = set()
+
+    def describe(self) -> str:
+        return self.expression
+
+    def evaluate(self, values: Dict[str, float]):
+        """Return the expression result, or None if a referenced field is unknown"""
+        scope = {}
+        for field, is_price in self._scales:
+            value = values.get(field)
+            if value is None:
+                return None
+            scope[field] = value / PRICE_SCALE if is_price else value
+        return bool(eval(self.code, {'__builtins__': EXPRESSION_BUILTINS}, scope))
+
+
+class ThresholdLadder:
+    """Threshold rules for one (symbol, field) kept sorted by level
+
+    Crossings between the previous and the new value are found with two
+    bisections instead of checking every rule.
+    """
+
+    def __init__(self):
+        self.above_levels: List[float] = []
+        self.above_rules: List[ThresholdRule] = []
+        self.below_levels: List[float] = []
+        self.below_rules: List[ThresholdRule] = []
+
+    def add(self, rule: ThresholdRule):
+        if rule.direction == 'above':
+            index = bisect.bisect_right(self.above_levels, rule.level)
+            self.above_levels.insert(index, rule.level)
+            self.above_rules.insert(index, rule)
+        else:
+            index = bisect.bisect_right(self.below_levels, rule.level)
+            self.below_levels.insert(index, rule.level)
+            self.below_rules.insert(index, rule)
+
+    def remove(self, rule: ThresholdRule):
+        levels, rules = ((self.above_levels, self.above_rules) if rule.direction == 'above'
+                         else (self.below_levels, self.below_rules))
+        index = rules.index(rule)
+        del levels[index]
+        del rules[index]
+
+    def __len__(self):
+        return len(self.above_rules) + len(self.below_rules)
+
+    def crossings(self, old: float, new: float) -> List[ThresholdRule]:
+        """Rules whose level lies between the old and the new value"""
+        if new > old:
+            # Upward move: 'above' levels in (old, new]
+            start = bisect.bisect_right(self.above_levels, old)
+            end = bisect.bisect_right(self.above_levels, new)
+            return self.above_rules[start:end]
+        if new < old:
+            # Downward move: 'below' levels in [new, old)
+            start = bisect.bisect_left(self.below_levels, new)
+            end = bisect.bisect_left(self.below_levels, old)
+            return self.below_rules[start:end]
+        return []
+
+
+class AlertEngine:
+    """Evaluates alert rules against streaming quote updates
+
+    Rules are indexed by (symbol, field), so an update only evaluates the
+    rules that reference one of the fields it changed.
+    """
+
+    def __init__(self, on_alert: Optional[Callable[[Alert], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.on_alert = on_alert or self._log_alert
+        self.clock = clock
+        self.rules: Dict[str, AlertRule] = {}
+        self._thresholds: Dict[Tuple[str, str], ThresholdLadder] = {}
+        self._expressions: Dict[Tuple[str, str], List[ExpressionRule]] = {}
+        self._values: Dict[str, Dict[str, float]] = {}
+        self._ids = itertools.count(1)
+
+        # Evaluation cost counters
+        self.updates_processed = 0
+        self.rules_evaluated = 0
+        self.alerts_fired = 0
+        self.alerts_suppressed = 0
+        self.eval_time_ns = 0
+        self.max_eval_time_ns = 0
+
+    @staticmethod
+    def _log_alert(alert: Alert):
+        logger.warning("Alert %s: %s", alert.rule.rule_id, alert.rule.describe(),
+                       extra=kv(symbol=alert.symbol, value=alert.value))
+
+    def _next_id(self, rule_id: Optional[str]) -> str:
+        rule_id = rule_id or f"rule-{next(self._ids)}"
+        if rule_id in self.rules:
+            raise ValueError(f"Duplicate alert rule id: {rule_id}")
+        return rule_id
+
+    def add_threshold(self, symbol: str, field: str, level: float, direction: str = 'above',
+                      debounce_seconds: float = 0.0, rule_id: Optional[str] = None) -> ThresholdRule:
+        """Add a rule that fires when `field` crosses `level`"""
+        rule = ThresholdRule(self._next_id(rule_id), symbol.upper(), field, level, direction, debounce_seconds)
+        self._thresholds.setdefault((rule.symbol, field), ThresholdLadder()).add(rule)
+        self.rules[rule.rule_id] = rule
+        return rule
+
+    def add_expression(self, symbol: str, expression: str, debounce_seconds: float = 0.0,
+                       rule_id: Optional[str] = None) -> ExpressionRule:
+        """Add a rule that fires when `expression` becomes true (use '*' for every symbol)"""
+        rule = ExpressionRule(self._next_id(rule_id), symbol.upper(), expression, debounce_seconds)
+        for field in rule.fields:
+            self._expressions.setdefault((rule.symbol, field), []).append(rule)
+        self.rules[rule.rule_id] = rule
+        return rule
+
+    def remove_rule(self, rule_id: str):
+        """Remove a rule from the engine and its indexes"""
+        rule = self.rules.pop(rule_id)
+        if isinstance(rule, ThresholdRule):
+            key = (rule.symbol, rule.field)
+            ladder = self._thresholds[key]
+            ladder.remove(rule)
+            if not len(ladder):
+                del self._thresholds[key]
+        else:
+            for field in rule.fields:
+                key = (rule.symbol, field)
+                self._expressions[key].remove(rule)
+                if not self._expressions[key]:
+                    del self._expressions[key]
+
+    def load_rules(self, path: str) -> int:
+        """Load rules from a JSON file containing a list of rule definitions
+
+        Each entry is either
+        {"type": "threshold", "symbol": "AAPL", "field": "last", "level": 200, "direction": "above"}
+        or
+        {"type": "expression", "symbol": "*", "expression": "ask - bid > 0.10"}
+        with optional "id" and "debounce_seconds" keys.
+        """
+        with open(path, 'r') as f:
+            definitions = json.load(f)
+
+        for definition in definitions:
+            rule_type = definition.get('type', 'threshold')
+            common = {
+                'debounce_seconds': float(definition.get('debounce_seconds', 0.0)),
+                'rule_id': definition.get('id'),
+            }
+            if rule_type == 'threshold':
+                self.add_threshold(definition['symbol'], definition['field'], float(definition['level']),
+                                   definition.get('direction', 'above'), **common)
+            elif rule_type == 'expression':
+                self.add_expression(definition['symbol'], definition['expression'], **common)
+            else:
+                raise ValueError(f"Unknown alert rule type: {rule_type}")
+
+        return len(definitions)
+
+    def on_quote(self, asset_class: str, symbol: str, fields: Dict[str, float]):
+        """Market state listener for normalized Level One updates"""
+        self.process_update(symbol, fields)
+
+    def fields(self) -> Set[str]:
+        """Normalized quote fields referenced by any rule"""
+        return {field for rule in self.rules.values() for field in rule.fields}
+
+    def forget(self, symbols: List[str]):
+        """Drop per-symbol values and firing state (market state eviction listener)"""
+        for symbol in symbols:
+            self._values.pop(symbol, None)
+        for rule in self.rules.values():
+            for symbol in symbols:
+                rule.last_fired.pop(symbol, None)
+            if isinstance(rule, ExpressionRule):
+                rule.active.difference_update(symbols)
+
+    def memory_bytes(self) -> int:
+        return sampled_sizeof(self._values) + sum(sampled_sizeof(rule.last_fired) for rule in self.rules.values())
+
+    def process_update(self, symbol: str, fields: Dict[str, float]):
+        """Apply changed fields for one symbol and evaluate the affected rules"""
+        start = time.perf_counter_ns()
+        values = self._values.setdefault(symbol, {})
+        previous = {name: values.get(name) for name in fields}
+        values.update(fields)
+
+        candidates: Dict[str, ExpressionRule] = {}
+        for field, value in fields.items():
+            old = previous[field]
+            for owner in (symbol, WILDCARD):
+                key = (owner, field)
+
+                ladder = self._thresholds.get(key)
+                if ladder is not None and old is not None and value is not None:
+                    for rule in ladder.crossings(old, value):
+                        rule.evaluations += 1
+                        self.rules_evaluated += 1
+                        self._fire(rule, symbol, to_price(value) if rule.is_price else value)
+
+                for rule in self._expressions.get(key, ()):
+                    candidates[rule.rule_id] = rule
+
+        for rule in candidates.values():
+            rule.evaluations += 1
+            self.rules_evaluated += 1
+            result = rule.evaluate(values)
+            if result:
+                if symbol not in rule.active:
+                    rule.active.add(symbol)
+                    self._fire(rule, symbol, float_fields({field: values[field] for field in rule.fields}))
+            elif result is not None:
+                rule.active.discard(symbol)
+
+        elapsed = time.perf_counter_ns() - start
+        self.updates_processed += 1
+        self.eval_time_ns += elapsed
+        if elapsed > self.max_eval_time_ns:
+            self.max_eval_time_ns = elapsed
+
+    def _fire(self, rule: AlertRule, symbol: str, value):
+        now = self.clock()
+        if now - rule.last_fired.get(symbol, float('-inf')) < rule.debounce_seconds:
+            rule.suppressed += 1
+            self.alerts_suppressed += 1
+            return
+        rule.last_fired[symbol] = now
+        rule.fired += 1
+        self.alerts_fired += 1
+        self.on_alert(Alert(rule, symbol, value, now))
+
+    def stats(self) -> dict:
+        """Evaluation cost and firing counters"""
+        updates = self.updates_processed or 1
+        return {
+            'rules': len(self.rules),
+            'updates_processed': self.updates_processed,
+            'rules_evaluated': self.rules_evaluated,
+            'rules_per_update': self.rules_evaluated / updates,
+            'alerts_fired': self.alerts_fired,
+            'alerts_suppressed': self.alerts_suppressed,
+            'avg_eval_us': self.eval_time_ns / updates / 1000,
+            'max_eval_us': self.max_eval_time_ns / 1000,
+        }
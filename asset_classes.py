@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Asset Class Tables for Schwab Streaming Client
+Per-asset-class Level One services, field tables and symbol normalization,
+plus decoding of the book and chart services into normalized records
+
+Prices are converted to scaled integers while decoding (see fixed_point.py).
+"""
+
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fixed_point import ONE_DOLLAR, PENNY, PRICE_FIELDS, PRICE_SCALE, PriceLadder, to_fixed
+
+# Fields shared by every Level One service, mapped to normalized names
+COMMON_FIELDS = {
+    'BID_PRICE': 'bid',
+    'ASK_PRICE': 'ask',
+    'LAST_PRICE': 'last',
+    'BID_SIZE': 'bid_size',
+    'ASK_SIZE': 'ask_size',
+    'LAST_SIZE': 'last_size',
+    'TOTAL_VOLUME': 'volume',
+    'OPEN_PRICE': 'open',
+    'HIGH_PRICE': 'high',
+    'LOW_PRICE': 'low',
+    'CLOSE_PRICE': 'close',
+    'NET_CHANGE': 'net_change',
+    'MARK': 'mark',
+    'QUOTE_TIME_MILLIS': 'quote_time',
+    'TRADE_TIME_MILLIS': 'trade_time',
+}
+
+EQUITY_FIELDS = dict(COMMON_FIELDS)
+
+FUTURES_FIELDS = dict(COMMON_FIELDS, **{
+    'OPEN_INTEREST': 'open_interest',
+    'TICK': 'tick',
+    'TICK_AMOUNT': 'tick_amount',
+    'FUTURE_MULTIPLIER': 'multiplier',
+    'FUTURE_SETTLEMENT_PRICE': 'settlement',
+    'FUTURE_ACTIVE_SYMBOL': 'active_contract',
+    'FUTURE_EXPIRATION_DATE': 'expiration',
+})
+
+FOREX_FIELDS = dict(COMMON_FIELDS, **{
+    'TICK': 'tick',
+    'TICK_AMOUNT': 'tick_amount',
+    'DIGITS': 'digits',
+})
+
+# Futures contract symbols: /ES (continuous root) or /ESZ24 (dated contract)
+FUTURES_SYMBOL = re.compile(r'^/?(?P<root>[A-Z0-9]{1,4}?)(?:(?P<month>[FGHJKMNQUVXZ])(?P<year>\d{2}))?$')
+
+FOREX_PAIR = re.compile(r'^([A-Z]{3})/?([A-Z]{3})$')
+
+# Minimum price increments of common futures roots, in dollars
+FUTURES_TICKS = {
+    '/ES': 0.25, '/MES': 0.25, '/NQ': 0.25, '/MNQ': 0.25, '/YM': 1.0, '/MYM': 1.0, '/RTY': 0.1, '/M2K': 0.1,
+    '/CL': 0.01, '/MCL': 0.01, '/NG': 0.001, '/GC': 0.1, '/MGC': 0.1, '/SI': 0.005, '/HG': 0.0005,
+    '/ZB': 0.03125, '/ZN': 0.015625,
+    '/6E': 0.00005, '/6B': 0.0001, '/6A': 0.00005,
+}
+
+
+def normalize_equity_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def normalize_futures_symbol(symbol: str) -> str:
+    """Normalize futures symbols to Schwab's /ROOT[MYY] form ('es' -> '/ES')"""
+    symbol = symbol.strip().upper()
+    return symbol if symbol.startswith('/') else '/' + symbol
+
+
+def futures_root(symbol: str) -> str:
+    """Continuous root of a futures symbol ('/ESZ24' -> '/ES')"""
+    match = FUTURES_SYMBOL.match(normalize_futures_symbol(symbol))
+    if not match:
+        return normalize_futures_symbol(symbol)
+    return '/' + match.group('root')
+
+
+def normalize_forex_symbol(symbol: str) -> str:
+    """Normalize currency pairs to Schwab's BASE/QUOTE form ('eurusd' -> 'EUR/USD')"""
+    symbol = symbol.strip().upper()
+    match = FOREX_PAIR.match(symbol)
+    if not match:
+        return symbol
+    return f"{match.group(1)}/{match.group(2)}"
+
+
+def tick_size(asset_class: str, symbol: str, quote: Optional[Dict[str, object]] = None) -> int:
+    """Minimum price increment of an instrument, in price units
+
+    The streamed `tick` field wins when the service carries one (futures
+    and forex); otherwise the increment comes from the futures root table,
+    the currency pair, or the equity price (sub-penny below $1).
+    """
+    tick = quote.get('tick') if quote else None
+    if tick:
+        return tick
+    if asset_class == 'futures':
+        return to_fixed(FUTURES_TICKS.get(futures_root(symbol), 0.01))
+    if asset_class == 'forex':
+        return to_fixed(0.001 if 'JPY' in symbol else 0.00001)
+    price = (quote.get('last') or quote.get('bid')) if quote else None
+    return PRICE_SCALE // 10000 if price is not None and price < ONE_DOLLAR else PENNY
+
+
+class AssetClass:
+    """Level One service description for one asset class"""
+
+    def __init__(self, name: str, service: str, subs_method: str, add_method: str,
+                 handler_method: str, fields: Dict[str, str], normalize_symbol: Callable[[str], str]):
+        self.name = name
+        self.service = service
+        self.subs_method = subs_method
+        self.add_method = add_method
+        self.handler_method = handler_method
+        self.fields = fields
+        self.normalize_symbol = normalize_symbol
+        # Wire names whose values are converted to scaled integer prices
+        self.price_names = frozenset(name for name, label in fields.items() if label in PRICE_FIELDS)
+
+    def decode(self, message: dict) -> Iterator[Tuple[str, Dict[str, object]]]:
+        """Yield (symbol, normalized fields) for each content item of a message"""
+        fields = self.fields
+        price_names = self.price_names
+        for item in message.get('content', []):
+            key = item.get('key')
+            if key is None:
+                continue
+            normalized = {}
+            for name, value in item.items():
+                label = fields.get(name)
+                if label is not None:
+                    if name in price_names and value is not None:
+                        value = round(value * PRICE_SCALE)
+                    normalized[label] = value
+            if normalized:
+                yield self.normalize_symbol(key), normalized
+
+
+ASSET_CLASSES: Dict[str, AssetClass] = {
+    'equity': AssetClass(
+        'equity', 'LEVELONE_EQUITIES',
+        'level_one_equity_subs', 'level_one_equity_add', 'add_level_one_equity_handler',
+        EQUITY_FIELDS, normalize_equity_symbol,
+    ),
+    'futures': AssetClass(
+        'futures', 'LEVELONE_FUTURES',
+        'level_one_futures_subs', 'level_one_futures_add', 'add_level_one_futures_handler',
+        FUTURES_FIELDS, normalize_futures_symbol,
+    ),
+    'forex': AssetClass(
+        'forex', 'LEVELONE_FOREX',
+        'level_one_forex_subs', 'level_one_forex_add', 'add_level_one_forex_handler',
+        FOREX_FIELDS, normalize_forex_symbol,
+    ),
+}
+
+
+# CHART_EQUITY fields mapped to normalized bar names
+CHART_FIELDS = {
+    'OPEN_PRICE': 'open',
+    'HIGH_PRICE': 'high',
+    'LOW_PRICE': 'low',
+    'CLOSE_PRICE': 'close',
+    'VOLUME': 'volume',
+    'CHART_TIME_MILLIS': 'time',
+    'SEQUENCE': 'sequence',
+}
+
+CHART_PRICES = ('open', 'high', 'low', 'close')
+
+
+def decode_chart(message: dict) -> Iterator[Tuple[str, Dict[str, object]]]:
+    """Yield (symbol, bar) for each content item of a CHART_EQUITY message"""
+    for item in message.get('content', []):
+        key = item.get('key')
+        if key is None:
+            continue
+        bar = {CHART_FIELDS[name]: value for name, value in item.items() if name in CHART_FIELDS}
+        for name in CHART_PRICES:
+            if bar.get(name) is not None:
+                bar[name] = round(bar[name] * PRICE_SCALE)
+        yield key, bar
+
+
+def decode_book_top(message: dict) -> Iterator[Tuple[str, Dict[str, object]]]:
+    """Yield (symbol, top of book) for each content item of a book message
+
+    Book levels arrive best first as {"BID_PRICE", "TOTAL_VOLUME", ...} and
+    {"ASK_PRICE", "TOTAL_VOLUME", ...} entries under "BIDS" and "ASKS".
+    """
+    for item in message.get('content', []):
+        key = item.get('key')
+        if key is None:
+            continue
+        top = {'time': item.get('BOOK_TIME')}
+        bids = item.get('BIDS') or []
+        asks = item.get('ASKS') or []
+        if bids:
+            top['bid'] = to_fixed(bids[0].get('BID_PRICE'))
+            top['bid_size'] = bids[0].get('TOTAL_VOLUME')
+        if asks:
+            top['ask'] = to_fixed(asks[0].get('ASK_PRICE'))
+            top['ask_size'] = asks[0].get('TOTAL_VOLUME')
+        top['depth'] = max(len(bids), len(asks))
+        yield key, top
+
+
+def decode_book_ladders(message: dict) -> Iterator[Tuple[str, object, PriceLadder, PriceLadder]]:
+    """Yield (symbol, book time, bid ladder, ask ladder) with every level of a book message"""
+    for item in message.get('content', []):
+        key = item.get('key')
+        if key is None:
+            continue
+        bids = PriceLadder.from_levels(
+            ((to_fixed(level.get('BID_PRICE')), level.get('TOTAL_VOLUME') or 0)
+             for level in item.get('BIDS') or () if level.get('BID_PRICE') is not None), descending=True)
+        asks = PriceLadder.from_levels(
+            (to_fixed(level.get('ASK_PRICE')), level.get('TOTAL_VOLUME') or 0)
+            for level in item.get('ASKS') or () if level.get('ASK_PRICE') is not None)
+        yield key, item.get('BOOK_TIME'), bids, asks
+
+
+def ladder_top(book_time, bids: PriceLadder, asks: PriceLadder) -> Dict[str, object]:
+    """Top of book record (as decode_book_top builds it) from a pair of ladders"""
+    top = {'time': book_time}
+    best_bid = bids.best()
+    if best_bid is not None:
+        top['bid'], top['bid_size'] = best_bid
+    best_ask = asks.best()
+    if best_ask is not None:
+        top['ask'], top['ask_size'] = best_ask
+    top['depth'] = max(len(bids), len(asks))
+    return top
+
+
+def parse_symbol_list(value: str, asset_class: str) -> List[str]:
+    """Split a comma separated symbol list and normalize it for the asset class"""
+    normalize = ASSET_CLASSES[asset_class].normalize_symbol
+    return [normalize(s) for s in value.split(',') if s.strip()]
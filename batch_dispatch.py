@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Batch Dispatch for Schwab Streaming Client
+Columnar delivery of a frame's content: one call per message with parallel
+arrays of symbol ids and field values, instead of one Python iteration per symbol
+
+    def on_quotes(batch):
+        spread = batch['ask'] - batch['bid']          # whole frame in one NumPy call
+        wide = batch.symbol_ids[spread > 5 * PENNY]
+
+    client.register_batch_handler('LEVELONE_EQUITIES', on_quotes, fields=['bid', 'ask'])
+
+Price columns are int64 scaled integers (fixed_point.py) with NULL_PRICE
+where an item did not carry the field; every other column is float64 with
+NaN. Symbol ids are interned once per dispatcher and stable for the session.
+"""
+
+import math
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from asset_classes import ASSET_CLASSES, CHART_FIELDS
+from binary_records import SymbolTable
+from fixed_point import PRICE_FIELDS, to_fixed_array
+
+NAN = math.nan
+
+# Normalized fields that are not numbers and have no column
+TEXT_FIELDS = frozenset({'active_contract'})
+
+# Book levels are flattened to the top of book, as in decode_book_top
+BOOK_COLUMNS = ('bid', 'ask', 'bid_size', 'ask_size', 'time')
+BOOK_SERVICES = ('NASDAQ_BOOK', 'NYSE_BOOK')
+
+
+def service_columns(service: str) -> Dict[str, str]:
+    """Normalized column name -> schwab-py field name for a service"""
+    for spec in ASSET_CLASSES.values():
+        if spec.service == service:
+            # If several wire names map to one label, the first one wins
+            columns: Dict[str, str] = {}
+            for name, label in spec.fields.items():
+                if label not in TEXT_FIELDS:
+                    columns.setdefault(label, name)
+            return columns
+    if service == 'CHART_EQUITY':
+        return {label: name for name, label in CHART_FIELDS.items()}
+    if service in BOOK_SERVICES:
+        return {column: column for column in BOOK_COLUMNS}
+    raise ValueError(f"No columnar layout for service {service}")
+
+
+class ColumnarBatch:
+    """The content of one message as parallel arrays
+
+    `symbol_ids[i]` is item i's interned symbol (`symbols[i]` its name) and
+    `columns[name][i]` its value. Index with `batch[name]`.
+    """
+
+    __slots__ = ('service', 'timestamp', 'symbols', 'symbol_ids', 'columns', 'table')
+
+    def __init__(self, service: str, timestamp, symbols: List[str], symbol_ids: np.ndarray,
+                 columns: Dict[str, np.ndarray], table: SymbolTable):
+        self.service = service
+        self.timestamp = timestamp
+        self.symbols = symbols
+        self.symbol_ids = symbol_ids
+        self.columns = columns
+        self.table = table
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def _book_rows(content: List[dict]) -> List[dict]:
+    """Top of book per item, keyed by BOOK_COLUMNS"""
+    rows = []
+    for item in content:
+        bids = item.get('BIDS') or ()
+        asks = item.get('ASKS') or ()
+        rows.append({
+            'time': item.get('BOOK_TIME'),
+            'bid': bids[0].get('BID_PRICE') if bids else None,
+            'bid_size': bids[0].get('TOTAL_VOLUME') if bids else None,
+            'ask': asks[0].get('ASK_PRICE') if asks else None,
+            'ask_size': asks[0].get('TOTAL_VOLUME') if asks else None,
+        })
+    return rows
+
+
+class BatchDispatcher:
+    """Decodes each message of one service into a ColumnarBatch for its batch handlers
+
+    The batch is built once per message however many handlers are
+    registered, with only the columns some handler asked for (`None`
+    means every column of the service).
+    """
+
+    def __init__(self, service: str, table: Optional[SymbolTable] = None):
+        self.service = service
+        self.layout = service_columns(service)
+        self.table = table or SymbolTable()
+        self.handlers: List[Callable[[ColumnarBatch], None]] = []
+        self.columns: Optional[List[str]] = []
+        self.is_book = service in BOOK_SERVICES
+        self.normalize = next((spec.normalize_symbol for spec in ASSET_CLASSES.values()
+                               if spec.service == service), None)
+        self.batches = 0
+        self.items = 0
+
+    def add_handler(self, handler: Callable[[ColumnarBatch], None], fields: Optional[Iterable[str]] = None):
+        if fields is None:
+            self.columns = None
+        else:
+            fields = list(fields)
+            unknown = [field for field in fields if field not in self.layout]
+            if unknown:
+                raise ValueError(f"{self.service} has no columns {unknown}")
+            if self.columns is not None:
+                self.columns.extend(field for field in fields if field not in self.columns)
+        self.handlers.append(handler)
+
+    def decode(self, message: dict) -> Optional[ColumnarBatch]:
+        content = [item for item in message.get('content', []) if item.get('key') is not None]
+        if not content:
+            return None
+        normalize = self.normalize
+        symbols = [normalize(item['key']) if normalize else item['key'] for item in content]
+        lookup = self.table.lookup
+        symbol_ids = np.fromiter((lookup(symbol)[0] for symbol in symbols), dtype=np.int32, count=len(symbols))
+
+        rows = _book_rows(content) if self.is_book else content
+        layout = self.layout
+        columns = {}
+        count = len(rows)
+        for column in self.columns if self.columns is not None else layout:
+            name = layout[column]
+            try:
+                # Items only carry the fields that changed; absent ones default to NaN
+                values = np.array([row.get(name, NAN) for row in rows], dtype=np.float64)
+            except TypeError:
+                values = np.fromiter((NAN if value is None else value
+                                      for value in (row.get(name) for row in rows)), dtype=np.float64, count=count)
+            columns[column] = to_fixed_array(values) if column in PRICE_FIELDS else values
+        return ColumnarBatch(self.service, message.get('timestamp'), symbols, symbol_ids, columns, self.table)
+
+    def __call__(self, message: dict):
+        batch = self.decode(message)
+        if batch is None:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for handler in self.handlers:
+            handler(batch)
+
+    def report(self) -> dict:
+        return {'batches': self.batches, 'items': self.items,
+                'avg_batch': round(self.items / self.batches, 1) if self.batches else 0.0}
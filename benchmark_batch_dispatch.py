@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Batch dispatch benchmark for Schwab Streaming Client
+Compares per-symbol handlers (decode, then one Python iteration per item) with
+columnar batch handlers (one ColumnarBatch per message, one NumPy call per
+frame) on Level One frames of growing size
+
+Both consumers compute the bid/ask spread of every item and keep the latest
+one per symbol. The batch handler declares the two columns it reads; the
+per-symbol handler decodes every field, as the built-in handlers do.
+
+Usage:
+    python benchmark_batch_dispatch.py
+    python benchmark_batch_dispatch.py --symbols 20000 --items 200000 --frame-sizes 50,500,5000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from asset_classes import ASSET_CLASSES
+from batch_dispatch import BatchDispatcher
+from fixed_point import NULL_PRICE
+from synthetic_market import SyntheticMarket, generate_symbols
+
+SERVICE = 'LEVELONE_EQUITIES'
+
+
+def frames_of(symbols, items: int, frame_size: int, seed: int):
+    market = SyntheticMarket(symbols, seed=seed)
+    return [message for message in market.messages(rate=50000, items_per_frame=frame_size, book_share=0.0,
+                                                   limit=items, labelled=True)
+            if message['service'] == SERVICE]
+
+
+def per_symbol(frames) -> dict:
+    spec = ASSET_CLASSES['equity']
+    spreads = {}
+
+    def handle(message):
+        for symbol, fields in spec.decode(message):
+            bid = fields.get('bid')
+            ask = fields.get('ask')
+            if bid is not None and ask is not None:
+                spreads[symbol] = ask - bid
+
+    for message in frames:
+        handle(message)
+    return spreads
+
+
+def batched(frames, symbols: int) -> dict:
+    dispatcher = BatchDispatcher(SERVICE)
+    spreads = np.full(symbols, NULL_PRICE, dtype=np.int64)
+
+    def handle(batch):
+        bid, ask = batch['bid'], batch['ask']
+        valid = (bid != NULL_PRICE) & (ask != NULL_PRICE)
+        spreads[batch.symbol_ids[valid]] = (ask - bid)[valid]
+
+    dispatcher.add_handler(handle, ['bid', 'ask'])
+    for message in frames:
+        dispatcher(message)
+    names = dispatcher.table.symbols
+    return {names[i]: int(spreads[i]) for i in np.flatnonzero(spreads != NULL_PRICE)}
+
+
+def best(function, repeat: int):
+    seconds, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - started)
+    return seconds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=100000, help='Level One items per run')
+    parser.add_argument('--frame-sizes', default='10,100,1000,5000', help='items per frame')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    symbols = generate_symbols(args.symbols, args.seed)
+    print(f"⏱️  Per-symbol vs batched dispatch, {args.items:,} items over {args.symbols:,} symbols")
+    print("=" * 50)
+    print(f"  {'items/frame':>11} {'per-symbol ns':>14} {'batched ns':>11} {'speedup':>8}")
+    for frame_size in (int(size) for size in args.frame_sizes.split(',')):
+        frames = frames_of(symbols, args.items, frame_size, args.seed)
+        items = sum(len(message['content']) for message in frames)
+        loop_seconds, expected = best(lambda: per_symbol(frames), args.repeat)
+        batch_seconds, result = best(lambda: batched(frames, args.symbols), args.repeat)
+        assert result == expected, "batched spreads differ from per-symbol spreads"
+        print(f"  {frame_size:11,} {loop_seconds / items * 1e9:14.0f} {batch_seconds / items * 1e9:11.0f} "
+              f"{loop_seconds / batch_seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
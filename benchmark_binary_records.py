@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Binary records benchmark for Schwab Streaming Client
+Compares the fixed-width binary records with JSON lines for the same
+normalized updates: bytes per update, encode CPU, decode CPU, and the
+throughput of the UNIX socket publisher to one local subscriber
+
+Usage:
+    python benchmark_binary_records.py
+    python benchmark_binary_records.py --updates 500000 --symbols 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from asset_classes import ASSET_CLASSES, decode_book_top, decode_chart
+from binary_records import (BAR, BOOK_LEVEL, QUOTE, QUOTE_DTYPE, RecordPublisher, RecordReader, RecordWriter,
+                            subscribe, view)
+from fixed_point import NULL_PRICE, PRICE_SCALE
+from market_state import MarketState
+from synthetic_market import SyntheticMarket, generate_symbols
+
+
+def capture(symbols, updates: int, seed: int):
+    """Apply synthetic messages to a MarketState; returns the state and every
+    applied update as (kind, key, symbol, record) with quotes fully merged"""
+    state = MarketState()
+    captured = []
+
+    def recorder(kind, key, symbol, fields):
+        captured.append((kind, key, symbol, dict(state.quotes[symbol]) if kind == 'quote' else fields))
+
+    state.add_recorder(recorder)
+    equity = ASSET_CLASSES['equity']
+    for message in SyntheticMarket(symbols, seed=seed).messages(rate=1000, items_per_frame=20, labelled=True):
+        service = message['service']
+        if service == 'LEVELONE_EQUITIES':
+            for symbol, fields in equity.decode(message):
+                state.update_quote('equity', symbol, fields)
+        elif service == 'CHART_EQUITY':
+            for symbol, bar in decode_chart(message):
+                state.update_bar(symbol, bar)
+        else:
+            for symbol, top in decode_book_top(message):
+                state.update_book(service.split('_')[0], symbol, top)
+        if len(captured) >= updates:
+            break
+    return state, captured[:updates]
+
+
+def best(function, repeat: int):
+    """(best seconds, last result)"""
+    seconds, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - started)
+    return seconds, result
+
+
+def encode_json(captured) -> bytes:
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    return '\n'.join(dumps({'kind': kind, 'key': key, 'symbol': symbol, 'fields': record})
+                     for kind, key, symbol, record in captured).encode()
+
+
+def decode_json(data: bytes) -> int:
+    """Parse every line and sum the quote bids, so both paths touch a price column"""
+    total = 0
+    for line in data.split(b'\n'):
+        update = json.loads(line)
+        bid = update['fields'].get('bid')
+        if update['kind'] == 'quote' and bid is not None:
+            total += bid
+    return total
+
+
+def encode_binary(captured) -> bytes:
+    writer = RecordWriter(capacity=len(captured) * 2 + 16)
+    quote, book_top, bar = writer.quote, writer.book_top, writer.bar
+    for kind, key, symbol, record in captured:
+        if kind == 'quote':
+            quote(symbol, int(record.get('quote_time') or 0), record)
+        elif kind == 'book':
+            book_top(symbol, key, record)
+        else:
+            bar(symbol, record)
+    return writer.take()
+
+
+def decode_binary(data: bytes) -> int:
+    records = RecordReader().feed(data)
+    bids = records[records['type'] == QUOTE].view(QUOTE_DTYPE)['bid']
+    return int(bids[bids != NULL_PRICE].sum())
+
+
+def decode_binary_tuples(data: bytes) -> float:
+    """Same through RecordReader.iter_quotes, for consumers that want Python values per quote"""
+    reader = RecordReader()
+    return sum(bid for _, _, bid, _, _ in reader.iter_quotes(reader.feed(data)) if bid == bid)
+
+
+async def socket_throughput(state: MarketState, captured, path: str) -> tuple:
+    """(seconds, bytes received) for publishing `captured` through a RecordPublisher"""
+    publisher = RecordPublisher(state, path)
+    await publisher.start()
+    received = []
+
+    async def consume():
+        records = 0
+        async for _, batch in subscribe(path):
+            records += int(np.count_nonzero(batch['type'] >= QUOTE))
+            if records >= expected:
+                break
+        received.append(records)
+
+    expected = sum(2 if kind == 'book' else 1 for kind, _, _, _ in captured)
+    consumer = asyncio.create_task(consume())
+    while not publisher.subscribers:
+        await asyncio.sleep(0.001)
+    started = time.perf_counter()
+    for index, (kind, key, symbol, record) in enumerate(captured):
+        publisher.record(kind, key, symbol, record)
+        if index % 2000 == 0:
+            publisher.flush()
+            await asyncio.sleep(0)
+    publisher.flush()
+    await consumer
+    seconds = time.perf_counter() - started
+    report = publisher.report()
+    await publisher.stop()
+    return seconds, report['bytes_sent'], received[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=200000)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    state, captured = capture(generate_symbols(args.symbols, args.seed), args.updates, args.seed)
+    kinds = {kind: sum(1 for c in captured if c[0] == kind) for kind in ('quote', 'book', 'bar')}
+    print(f"⏱️  {len(captured):,} normalized updates ({', '.join(f'{n:,} {k}' for k, n in kinds.items())})")
+
+    json_encode, json_data = best(lambda: encode_json(captured), args.repeat)
+    json_decode, json_total = best(lambda: decode_json(json_data), args.repeat)
+    binary_encode, binary_data = best(lambda: encode_binary(captured), args.repeat)
+    binary_decode, binary_total = best(lambda: decode_binary(binary_data), args.repeat)
+    tuples_decode, tuples_total = best(lambda: decode_binary_tuples(binary_data), args.repeat)
+    assert abs(tuples_total - binary_total / PRICE_SCALE) < 1e-3 * max(1.0, tuples_total)
+    assert json_total == binary_total, (json_total, binary_total)
+
+    records = view(binary_data)
+    print("=" * 50)
+    print(f"  {'':10} {'bytes/update':>13} {'encode ns':>10} {'decode ns':>10}")
+    for name, data, encode, decode in (('json', json_data, json_encode, json_decode),
+                                       ('binary', binary_data, binary_encode, binary_decode)):
+        print(f"  {name:10} {len(data) / len(captured):13.1f} {encode / len(captured) * 1e9:10.0f} "
+              f"{decode / len(captured) * 1e9:10.0f}")
+    print(f"  {'binary/py':10} {'':13} {'':10} {tuples_decode / len(captured) * 1e9:10.0f}  (per-quote tuples)")
+    print(f"  binary: {len(records):,} records, {np.count_nonzero(records['type'] == BOOK_LEVEL):,} book levels, "
+          f"{np.count_nonzero(records['type'] == BAR):,} bars")
+    print(f"  bytes -{1 - len(binary_data) / len(json_data):.0%}  encode -{1 - binary_encode / json_encode:.0%}  "
+          f"decode -{1 - binary_decode / json_decode:.0%}")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='records_'), 'records.sock')
+    seconds, sent, received = asyncio.run(socket_throughput(state, captured, path))
+    os.rmdir(os.path.dirname(path))
+    print(f"  UNIX socket: {received:,} records, {sent / 1e6:.1f} MB in {seconds * 1000:.0f} ms "
+          f"({len(captured) / seconds:,.0f} updates/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Bootstrap benchmark for Schwab Streaming Client
+Time to first tick of the session start-up graph (bootstrap.py), run
+serially and concurrently, from a cold start (token refresh, empty
+instrument cache) and a warm one (valid token, cached instruments,
+checkpoint to recover)
+
+Remote calls are stand-ins with the latencies given on the command line;
+instrument lookups and the snapshot warm-up go through the real
+InstrumentCache and SnapshotRefiller, and ticks come from the stand-in
+streamer.
+
+Usage:
+    python benchmark_bootstrap.py
+    python benchmark_bootstrap.py --login-ms 800 --token-ms 500
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from asset_classes import ASSET_CLASSES
+from bootstrap import session_bootstrap
+from instrument_cache import InstrumentCache
+from market_state import MarketState
+from sequence_tracker import SnapshotRefiller
+from standin_streamer import StandInStreamClient, StandInStreamer
+from synthetic_market import generate_symbols
+
+
+class Response:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.text = ''
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class StandInHttpClient:
+    """The REST calls the start-up makes, each sleeping for its latency"""
+
+    class Instrument:
+        class Projection:
+            SYMBOL_SEARCH = 'symbol-search'
+
+    def __init__(self, latencies: Dict[str, float]):
+        self.latencies = latencies
+
+    def get_account_numbers(self):
+        time.sleep(self.latencies['accounts'])
+        return Response([{'accountNumber': '12345678', 'hashValue': 'A1B2C3'}])
+
+    def get_instruments(self, symbols, projection):
+        time.sleep(self.latencies['instruments'])
+        return Response({'instruments': [{'symbol': s, 'exchange': 'NASDAQ', 'assetType': 'EQUITY'}
+                                         for s in symbols]})
+
+    def get_quotes(self, symbols):
+        time.sleep(self.latencies['quotes'])
+        return Response({s: {'quote': {'bidPrice': 100.0, 'askPrice': 100.02, 'lastPrice': 100.01}}
+                         for s in symbols})
+
+
+class SlowLoginStreamClient(StandInStreamClient):
+    """Stand-in stream session with login and per-request acknowledgement latency"""
+
+    def __init__(self, streamer: StandInStreamer, login: float, ack: float):
+        super().__init__(streamer)
+        self.login_latency = login
+        self.ack_latency = ack
+
+    async def login(self):
+        await asyncio.sleep(self.login_latency)
+        await super().login()
+
+    async def _service_op(self, symbols, service, command, field_type=None, *, fields=None):
+        await asyncio.sleep(self.ack_latency)
+        await super()._service_op(symbols, service, command, field_type, fields=fields)
+
+
+class StandInSession:
+    """The step methods session_bootstrap expects, as SchwabStreamingClient has them"""
+
+    def __init__(self, streamer: StandInStreamer, latencies: Dict[str, float], cache_path: str, recover: float):
+        self.streamer = streamer
+        self.latencies = latencies
+        self.recover_seconds = recover
+        self.market_state = MarketState()
+        self.instrument_cache = InstrumentCache(cache_path)
+        self.level_one_symbols: Dict[str, List[str]] = {}
+        self.client = None
+        self.stream_client = None
+        self.bootstrap = None
+        self.account_hashes: Dict[str, str] = {}
+
+    def recover_state(self):
+        # Checkpoint load runs on the event loop
+        time.sleep(self.recover_seconds)
+
+    async def start_local_services(self):
+        pass
+
+    def load_instruments(self) -> int:
+        return self.instrument_cache.load()
+
+    def load_client(self):
+        time.sleep(self.latencies['token'])
+        self.client = StandInHttpClient(self.latencies)
+        self.stream_client = SlowLoginStreamClient(self.streamer, self.latencies['login'], self.latencies['ack'])
+
+    def resolve_accounts(self) -> int:
+        response = self.client.get_account_numbers()
+        self.account_hashes = {entry['accountNumber']: entry['hashValue'] for entry in response.json()}
+        return len(self.account_hashes)
+
+    async def login_to_stream(self):
+        await self.stream_client.login()
+
+    def setup_handlers(self):
+        equity = ASSET_CLASSES['equity']
+        state = self.market_state
+
+        def handle_level_one(message):
+            for symbol, fields in equity.decode(message):
+                state.update_quote('equity', symbol, fields)
+
+        self.stream_client.add_level_one_equity_handler(handle_level_one)
+        self.stream_client.add_level_one_equity_handler(self.bootstrap.on_tick)
+
+    async def warm_up(self, symbols: List[str], executor=None) -> int:
+        return await SnapshotRefiller(self.client, self.market_state).warm_up({'equity': symbols}, executor)
+
+    async def subscribe_all(self, symbols: List[str]):
+        await self.instrument_cache.refresh(self.client, symbols)
+        routes, _, _ = self.instrument_cache.route_books(symbols)
+        await self.stream_client.level_one_equity_subs(symbols)
+        for service, book_symbols in routes.items():
+            await self.stream_client._service_op(book_symbols, service, 'SUBS')
+        await self.stream_client.chart_equity_subs(symbols)
+
+
+async def time_start(args, symbols: List[str], concurrent: bool, warm: bool, cache_path: str) -> dict:
+    latencies = {'token': (args.warm_token_ms if warm else args.token_ms) / 1000,
+                 'accounts': args.accounts_ms / 1000, 'instruments': args.instruments_ms / 1000,
+                 'quotes': args.quotes_ms / 1000, 'login': args.login_ms / 1000, 'ack': args.ack_ms / 1000}
+    if not warm and os.path.exists(cache_path):
+        os.remove(cache_path)
+    streamer = StandInStreamer(generate_symbols(args.symbols * 2, args.seed), rate=args.rate, seed=args.seed)
+    streamer.market.symbols[:len(symbols)] = symbols
+    publisher = asyncio.create_task(streamer.run(60.0))
+
+    session = StandInSession(streamer, latencies, cache_path, args.recover_ms / 1000 if warm else 0.0)
+    bootstrap = session.bootstrap = session_bootstrap(session, symbols, concurrent)
+    await bootstrap.run()
+    while bootstrap.first_tick is None:
+        await session.stream_client.handle_message()
+    publisher.cancel()
+    await session.stream_client.logout()
+    return bootstrap.report()
+
+
+async def run(args):
+    symbols = generate_symbols(args.symbols, args.seed)
+    cache_path = os.path.join(tempfile.mkdtemp(prefix='bootstrap_'), 'instrument_cache.json')
+    results = {}
+    for start in ('cold', 'warm'):
+        for mode in ('serial', 'concurrent'):
+            best = None
+            for _ in range(args.repeat):
+                if start == 'warm':
+                    # A previous run left the instrument cache behind
+                    await time_start(args, symbols, False, False, cache_path)
+                report = await time_start(args, symbols, mode == 'concurrent', start == 'warm', cache_path)
+                if best is None or report['first_tick_ms'] < best['first_tick_ms']:
+                    best = report
+            results[(start, mode)] = best
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    os.rmdir(os.path.dirname(cache_path))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--token-ms', type=float, default=350.0, help='token load with a refresh (cold)')
+    parser.add_argument('--warm-token-ms', type=float, default=5.0, help='token load from a valid file')
+    parser.add_argument('--accounts-ms', type=float, default=150.0)
+    parser.add_argument('--instruments-ms', type=float, default=250.0, help='per get_instruments batch')
+    parser.add_argument('--quotes-ms', type=float, default=200.0, help='per get_quotes batch')
+    parser.add_argument('--login-ms', type=float, default=400.0)
+    parser.add_argument('--ack-ms', type=float, default=40.0, help='per subscription request')
+    parser.add_argument('--recover-ms', type=float, default=30.0, help='checkpoint recovery (warm)')
+    parser.add_argument('--rate', type=float, default=5000.0, help='stand-in items per second')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"⏱️  Session start-up, {args.symbols} symbols, best of {args.repeat}")
+    results = asyncio.run(run(args))
+    print("=" * 50)
+    print(f"  {'':16} {'bootstrap ms':>12} {'first tick ms':>14}  critical path")
+    for (start, mode), report in results.items():
+        print(f"  {start + ' ' + mode:16} {report['total_ms']:12.0f} {report['first_tick_ms']:14.0f}  "
+              f"{report['critical_path']}")
+    for start in ('cold', 'warm'):
+        serial, concurrent = results[(start, 'serial')], results[(start, 'concurrent')]
+        print(f"  {start}: time to first tick -{1 - concurrent['first_tick_ms'] / serial['first_tick_ms']:.0%}")
+    print("  steps (cold, concurrent):")
+    for name, step in results[('cold', 'concurrent')]['steps'].items():
+        print(f"    {name:16} start {step['start_ms']:7.1f} ms  took {step['duration_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
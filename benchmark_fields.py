@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Field selection benchmark for Schwab Streaming Client
+Compares full-field and reduced-field LEVELONE_EQUITIES frames: bytes on the
+wire, json.loads time, and relabel + decode time into normalized quotes
+
+The synthetic market emits 15 Level One fields per update; the live
+streamer sends up to 42 for equities, so the real saving is larger than
+the one measured here.
+
+Usage:
+    python benchmark_fields.py
+    python benchmark_fields.py --fields bid,ask,last,volume --items 200000
+"""
+
+import argparse
+import json
+import time
+
+from asset_classes import ASSET_CLASSES
+from dashboard import QUOTE_FIELDS
+from field_selection import KEY_FIELD, labels_for
+from synthetic_market import LEVEL_ONE_EQUITY_WIRE, SyntheticMarket, generate_symbols, relabel
+
+SERVICE = 'LEVELONE_EQUITIES'
+
+
+def build_frames(market: SyntheticMarket, items: int, keep=None):
+    """Level One text frames; `keep` is the set of wire keys to retain (None for all)"""
+    frames = []
+    for entry in market.messages(rate=50000, book_share=0.0, limit=items):
+        if entry['service'] != SERVICE:
+            continue
+        if keep is not None:
+            entry['content'] = [{k: v for k, v in item.items() if k in keep} for item in entry['content']]
+        frames.append(json.dumps({'data': [entry]}, separators=(',', ':')))
+    return frames
+
+
+def measure(frames, spec, repeat: int):
+    """Best-of-`repeat` seconds for json.loads and for relabel + decode"""
+    best_loads = best_decode = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parsed = [json.loads(frame) for frame in frames]
+        best_loads = min(best_loads, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for message in parsed:
+            entry = message['data'][0]
+            entry['content'] = [relabel(SERVICE, item) for item in entry['content']]
+            for _ in spec.decode(entry):
+                pass
+        best_decode = min(best_decode, time.perf_counter() - started)
+    return best_loads, best_decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', default=','.join(QUOTE_FIELDS),
+                        help='normalized fields to keep (default: the dashboard set)')
+    parser.add_argument('--items', type=int, default=100000, help='content items per run')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    labels = set(labels_for(SERVICE, [f.strip() for f in args.fields.split(',') if f.strip()]))
+    wire_numbers = {label: number for number, label in LEVEL_ONE_EQUITY_WIRE.items()}
+    keep = {'key'} | {wire_numbers[label] for label in labels if label in wire_numbers}
+    spec = ASSET_CLASSES['equity']
+    symbols = generate_symbols(args.symbols, args.seed)
+
+    print(f"🔬 {args.items:,} Level One items, keeping {KEY_FIELD} + {sorted(labels)}")
+    results = {}
+    for name, selection in (('full', None), ('reduced', keep)):
+        frames = build_frames(SyntheticMarket(symbols, seed=args.seed), args.items, selection)
+        size = sum(len(frame) for frame in frames)
+        loads, decode = measure(frames, spec, args.repeat)
+        results[name] = (size, loads, decode)
+        print(f"  {name:8} bytes={size:>12,}  json.loads={loads * 1000:8.1f} ms  decode={decode * 1000:8.1f} ms")
+
+    full, reduced = results['full'], results['reduced']
+    print("=" * 50)
+    for index, label in enumerate(('bytes', 'json.loads', 'decode')):
+        print(f"{label:11} -{(1 - reduced[index] / full[index]) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
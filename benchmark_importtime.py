@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for Schwab Streaming Client
+Runs cli.py subcommands under `python -X importtime` and checks the time
+spent importing modules beyond a bare interpreter against a per-command
+budget, so a heavy top-level import in a tooling path shows up as a failure
+
+Usage:
+    python benchmark_importtime.py
+    python benchmark_importtime.py --repeat 10 --scale 2    # slower machine: double the budgets
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(HERE, 'cli.py')
+
+# (name, arguments, import budget in ms or None to only report)
+COMMANDS = [
+    ('--help', [CLI, '--help'], 20.0),
+    ('check', [CLI, 'check'], 20.0),
+    ('fields', [CLI, 'fields'], 30.0),
+    ('import client', ['-c', 'import schwab_streaming'], None),
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Top-level module -> cumulative import microseconds from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level
+        if name.startswith('  '):
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(arguments: List[str]) -> Tuple[float, Dict[str, int]]:
+    """(wall seconds, top-level imports) of one interpreter run"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=HERE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, parse_importtime(result.stderr)
+
+
+def best_of(arguments: List[str], repeat: int,
+            baseline: Optional[Dict[str, int]] = None) -> Tuple[float, float, Dict[str, int]]:
+    """(best wall ms, best import ms beyond `baseline`, imports of that run)"""
+    best = (float('inf'), float('inf'), {})
+    for _ in range(repeat):
+        seconds, modules = measure(arguments)
+        extra = {name: us for name, us in modules.items() if not baseline or name not in baseline}
+        imports_ms = sum(extra.values()) / 1000
+        if imports_ms < best[1]:
+            best = (seconds * 1000, imports_ms, extra)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget (slow machines, CI)')
+    parser.add_argument('--top', type=int, default=3, help='slowest imports to list per command')
+    args = parser.parse_args()
+
+    base_wall, _, baseline = best_of(['-c', 'pass'], args.repeat)
+    print(f"⏱️  Interpreter start {base_wall:.0f} ms ({len(baseline)} modules at startup), best of {args.repeat}")
+    print("=" * 50)
+    print(f"  {'command':16} {'wall ms':>8} {'imports ms':>11} {'budget':>7}")
+    failed = []
+    for name, arguments, budget in COMMANDS:
+        wall, imports_ms, modules = best_of(arguments, args.repeat, baseline)
+        limit = budget * args.scale if budget is not None else None
+        status = '' if limit is None else ('✅' if imports_ms <= limit else '❌')
+        print(f"  {name:16} {wall:8.0f} {imports_ms:11.1f} {'' if limit is None else f'{limit:7.0f}'} {status}")
+        slowest = sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+        print("  " + ' ' * 16 + '  '.join(f"{module} {us / 1000:.1f}" for module, us in slowest))
+        if limit is not None and imports_ms > limit:
+            failed.append(name)
+    if failed:
+        print(f"❌ Over the import budget: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ Every tooling command is within its import budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Portfolio benchmark for Schwab Streaming Client
+Cost per Level One update of the incremental P&L (portfolio.py) against
+revaluing every position on each tick, over synthetic positions spread
+across several accounts
+
+Quotes go through MarketState.update_quote, so the incremental figure
+includes the listener call; the recompute baseline marks every position
+from the state's quotes and sums the totals from scratch. Both must agree
+exactly at the end, including after an account's positions are reloaded
+mid-run as an account activity message would cause.
+
+Usage:
+    python benchmark_portfolio.py
+    python benchmark_portfolio.py --positions 20000 --accounts 8 --ticks 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+from fixed_point import to_fixed
+from market_state import MarketState
+from portfolio import MARK_FIELDS, Portfolio, Position, Totals
+from synthetic_market import generate_symbols
+
+
+def make_positions(rng: random.Random, accounts: List[str], symbols: List[str], count: int) -> List[Position]:
+    positions = []
+    for index in range(count):
+        account = accounts[index % len(accounts)]
+        symbol = rng.choice(symbols)
+        quantity = rng.choice((-1, 1, 1, 1)) * rng.randint(1, 500)
+        positions.append(Position(account, symbol, 'equity', quantity, to_fixed(round(rng.uniform(5, 500), 2))))
+    return positions
+
+
+def recompute(portfolio: Portfolio, state: MarketState) -> Totals:
+    """Every position marked from the state, summed from scratch"""
+    totals = Totals()
+    names = MARK_FIELDS[portfolio.mark_policy]
+    for positions in portfolio.accounts.values():
+        for position in positions:
+            totals.positions += 1
+            totals.unmarked += 1
+            quote = state.get_quote(position.symbol) or {}
+            if any(quote.get(name) is None for name in names):
+                continue
+            mark = quote[names[0]] if len(names) == 1 else (quote['bid'] + quote['ask']) // 2
+            value = round(mark * position.quantity * position.multiplier)
+            totals.apply(None, None, value, value - position.cost)
+    return totals
+
+
+def quote_ticks(rng: random.Random, symbols: List[str], count: int, held_fraction: float, held: List[str]):
+    prices = {symbol: to_fixed(round(rng.uniform(5, 500), 2)) for symbol in symbols}
+    ticks = []
+    for _ in range(count):
+        symbol = rng.choice(held) if rng.random() < held_fraction else rng.choice(symbols)
+        price = prices[symbol] = max(10000, prices[symbol] + rng.randint(-5, 5) * 10000)
+        ticks.append((symbol, {'bid': price - 10000, 'ask': price + 10000, 'last': price, 'mark': price}))
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--positions', type=int, default=5000)
+    parser.add_argument('--accounts', type=int, default=4)
+    parser.add_argument('--symbols', type=int, default=3000, help='streamed symbols (held ones are a subset)')
+    parser.add_argument('--held', type=int, default=1500, help='distinct held symbols')
+    parser.add_argument('--held-fraction', type=float, default=0.5, help='share of ticks on held symbols')
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--baseline-ticks', type=int, default=500, help='ticks timed with a full recompute')
+    parser.add_argument('--mark', default='mark', choices=sorted(MARK_FIELDS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    symbols = generate_symbols(args.symbols, args.seed)
+    held = symbols[:args.held]
+    accounts = [f'{10000000 + index}' for index in range(args.accounts)]
+    positions = make_positions(rng, accounts, held, args.positions)
+    ticks = quote_ticks(rng, symbols, args.ticks, args.held_fraction, held)
+
+    state = MarketState()
+    portfolio = Portfolio(state, args.mark)
+    state.add_listener(portfolio.on_quote)
+    for account in accounts:
+        portfolio.set_positions(account, [p for p in positions if p.account == account])
+
+    print(f"💼 {args.positions} positions in {args.accounts} accounts on {args.held} symbols, "
+          f"{args.ticks} ticks on {args.symbols} symbols ({args.held_fraction:.0%} held), mark={args.mark}")
+
+    # Incremental: the listener revalues only the ticked symbol's positions
+    half = len(ticks) // 2
+    started = time.perf_counter()
+    for symbol, fields in ticks[:half]:
+        state.update_quote('equity', symbol, fields)
+    # Account activity: the first account's positions are reloaded with a smaller book
+    reloaded = [Position(p.account, p.symbol, p.asset_class, p.quantity // 2 or 1, p.average_price)
+                for p in portfolio.positions(accounts[0])[::2]]
+    portfolio.set_positions(accounts[0], reloaded)
+    for symbol, fields in ticks[half:]:
+        state.update_quote('equity', symbol, fields)
+    incremental_us = (time.perf_counter() - started) / len(ticks) * 1e6
+
+    # Quote merge alone, to separate the state's own cost
+    bare = MarketState()
+    started = time.perf_counter()
+    for symbol, fields in ticks:
+        bare.update_quote('equity', symbol, fields)
+    merge_us = (time.perf_counter() - started) / len(ticks) * 1e6
+
+    # Baseline: revalue everything on each tick
+    started = time.perf_counter()
+    for symbol, fields in ticks[:args.baseline_ticks]:
+        bare.update_quote('equity', symbol, fields)
+        recompute(portfolio, bare)
+    recompute_us = (time.perf_counter() - started) / args.baseline_ticks * 1e6
+
+    expected = recompute(portfolio, state).as_dict()
+    actual = portfolio.totals.as_dict()
+    per_account = all(_account_totals(portfolio, state, account) == portfolio.account_totals[account].as_dict()
+                      for account in accounts)
+
+    print("=" * 50)
+    print(f"  quote merge only      {merge_us:9.2f} us/tick")
+    print(f"  incremental P&L       {incremental_us:9.2f} us/tick  (+{incremental_us - merge_us:.2f} over the merge)")
+    print(f"  full recompute        {recompute_us:9.2f} us/tick")
+    print(f"  speed-up              {recompute_us / incremental_us:9.0f}x")
+    print(f"  revaluations/tick     {portfolio.revaluations / len(ticks):9.2f}")
+    for name in ('positions', 'unmarked', 'market_value', 'gross_exposure', 'unrealized'):
+        print(f"  {name:20}  {actual[name]:16,.2f}")
+    if expected != actual or not per_account:
+        print(f"❌ Running totals differ from a full recompute: {expected} != {actual}")
+        sys.exit(1)
+    print("✅ Running totals equal a full recompute (portfolio and per account)")
+
+
+def _account_totals(portfolio: Portfolio, state: MarketState, account: str) -> dict:
+    single = Portfolio(portfolio.state, portfolio.mark_policy)
+    single.accounts = {account: portfolio.accounts[account]}
+    return recompute(single, state).as_dict()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Query API benchmark for Schwab Streaming Client
+Fills a market state from the synthetic market and times the query API
+in-process at the ASGI boundary (routing, handler and response, no sockets),
+with the feed updating symbols between requests so cache misses are included
+
+Usage:
+    python benchmark_query_api.py
+    python benchmark_query_api.py --symbols 5000 --batch 200 --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from asset_classes import ASSET_CLASSES, decode_book_top, decode_chart
+from market_state import MarketState
+from query_api import QueryService
+from synthetic_market import SyntheticMarket, generate_symbols
+
+
+def feed(state: MarketState, messages, count: int):
+    """Apply `count` synthetic messages to the state"""
+    equity = ASSET_CLASSES['equity']
+    for _ in range(count):
+        message = next(messages)
+        service = message['service']
+        if service == 'LEVELONE_EQUITIES':
+            for symbol, fields in equity.decode(message):
+                state.update_quote('equity', symbol, fields)
+        elif service == 'CHART_EQUITY':
+            for symbol, bar in decode_chart(message):
+                state.update_bar(symbol, bar)
+        else:
+            for symbol, top in decode_book_top(message):
+                state.update_book(service.split('_')[0], symbol, top)
+
+
+async def call(app, path: str, query: bytes = b'') -> int:
+    """One GET through the ASGI app; returns the status code"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query,
+        'root_path': '', 'headers': [], 'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(event):
+        if event['type'] == 'http.response.start':
+            status.append(event['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(args):
+    symbols = generate_symbols(args.symbols, args.seed)
+    state = MarketState()
+    messages = SyntheticMarket(symbols, seed=args.seed).messages(rate=50000, items_per_frame=20, labelled=True)
+    feed(state, messages, args.symbols)
+    service = QueryService(state)
+    app = service.app
+    batch = ','.join(symbols[:args.batch]).encode()
+
+    for name, path, query in (('single', None, b''), (f'batch of {args.batch}', '/snapshot', b'symbols=' + batch)):
+        timings = []
+        for index in range(args.requests):
+            if index % args.update_every == 0:
+                feed(state, messages, 1)
+            started = time.perf_counter()
+            status = await call(app, path or f'/snapshot/{symbols[index % len(symbols)]}', query)
+            timings.append((time.perf_counter() - started) * 1e6)
+            assert status == 200, status
+        print(f"  {name:14} p50={percentile(timings, 0.5):7.1f} us  p99={percentile(timings, 0.99):7.1f} us  "
+              f"max={max(timings):8.1f} us")
+    print(f"  cache hits={service.cache.hits:,}  misses={service.cache.misses:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=100, help='symbols per batched request')
+    parser.add_argument('--requests', type=int, default=10000, help='requests per endpoint')
+    parser.add_argument('--update-every', type=int, default=5, help='feed one frame every N requests')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"⏱️  Query API latency over {args.symbols:,} symbols")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
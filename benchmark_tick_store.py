@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tick store benchmark for Schwab Streaming Client
+Builds a multi-day synthetic tick store (quotes, trades, 1-minute bars) and
+times range seeks, resampling and as-of joins against a full-column scan
+
+Usage:
+    python benchmark_tick_store.py                       # 3 days, 500 symbols, 1M quotes/day
+    python benchmark_tick_store.py --days 5 --quotes-per-day 4000000 --root /tmp/ticks
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from fixed_point import NULL_PRICE, to_fixed_array
+from synthetic_market import SyntheticMarket, generate_symbols
+from tick_store import KINDS, PRICE_COLUMNS, TickStore, write_segment
+
+SESSION_SECONDS = 6.5 * 3600
+DAY_MS = 86400000
+
+
+def build(root: str, days: int, symbols: int, quotes_per_day: int, segment_rows: int, seed: int) -> int:
+    """Write the synthetic dataset; returns the number of rows written"""
+    market = SyntheticMarket(generate_symbols(symbols, seed), seed=seed)
+    rng = np.random.default_rng(seed)
+    chunk = 10000
+    chunk_seconds = SESSION_SECONDS * chunk / quotes_per_day
+    written = 0
+
+    for day in range(days):
+        offset = day * DAY_MS
+        pending = {kind: [] for kind in KINDS}
+        pending_rows = 0
+        for _ in range(quotes_per_day // chunk):
+            start_ms = market.now_ms
+            market.advance(chunk_seconds)
+            rows = market.level_one_rows(chunk)
+            (symbol, bid, ask, last, bid_size, ask_size, _, last_size) = list(zip(*rows))[:8]
+            times = offset + start_ms + np.sort(rng.uniform(0, chunk_seconds * 1000, chunk)).astype(np.int64)
+            symbol = np.array(symbol)
+            pending['quotes'].append((symbol, times, {'bid': bid, 'ask': ask, 'bid_size': bid_size,
+                                                      'ask_size': ask_size}))
+            # Roughly one quote update in three is a trade
+            traded = rng.random(chunk) < 0.3
+            pending['trades'].append((symbol[traded], times[traded],
+                                      {'price': np.array(last)[traded], 'size': np.array(last_size)[traded]}))
+            bars = market.roll_bars()
+            if bars:
+                columns = list(zip(*bars))
+                pending['bars'].append((np.array(columns[0]), offset + np.array(columns[7], dtype=np.int64),
+                                        dict(zip(KINDS['bars'], columns[2:7]))))
+            pending_rows += chunk
+            if pending_rows >= segment_rows:
+                written += flush(root, pending)
+                pending_rows = 0
+        written += flush(root, pending)
+        # Overnight: the next session opens a day later
+        market.now_ms += DAY_MS - SESSION_SECONDS * 1000
+    return written
+
+
+def flush(root: str, pending: dict) -> int:
+    rows = 0
+    for kind, parts in pending.items():
+        if not parts:
+            continue
+        symbols = np.concatenate([part[0] for part in parts])
+        times = np.concatenate([part[1] for part in parts])
+        columns = {column: np.concatenate([np.asarray(part[2][column], dtype=np.float64) for part in parts])
+                   for column in KINDS[kind]}
+        for column in PRICE_COLUMNS.intersection(columns):
+            columns[column] = to_fixed_array(columns[column])
+        write_segment(root, kind, symbols, times, columns)
+        rows += len(times)
+        parts.clear()
+    return rows
+
+
+def timed(function, repeat: int):
+    """(p50 microseconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return float(np.median(timings)), result
+
+
+def disk_size(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--quotes-per-day', type=int, default=1000000)
+    parser.add_argument('--segment-rows', type=int, default=250000, help='quote rows per segment')
+    parser.add_argument('--root', default=None, help='store directory (default: a temporary one)')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix='tick_store_')
+    try:
+        print(f"🏗️  Building {args.days} days x {args.quotes_per_day:,} quotes over {args.symbols} symbols in {root}")
+        started = time.perf_counter()
+        rows = build(root, args.days, args.symbols, args.quotes_per_day, args.segment_rows, args.seed)
+        print(f"  {rows:,} rows, {disk_size(root) / 1e6:.0f} MB, {time.perf_counter() - started:.1f}s")
+
+        opened, store = timed(lambda: TickStore(root), 1)
+        segments = sum(len(s) for s in store.segments.values())
+        print(f"  opened {segments} segments in {opened / 1000:.1f} ms")
+
+        rng = np.random.default_rng(args.seed)
+        symbols = store.symbols('trades')
+        first = min(s.start_ms for s in store.segments['trades'])
+        last = max(s.end_ms for s in store.segments['trades'])
+
+        def random_window(minutes: int):
+            start = int(rng.integers(first, last - minutes * 60000))
+            return symbols[int(rng.integers(len(symbols)))], start, start + minutes * 60000
+
+        print("=" * 50)
+        queries = [random_window(30) for _ in range(args.queries)]
+        seek, _ = timed(lambda: [store.window('quotes', *query) for query in queries], 1)
+        print(f"  30-min quote window seek        {seek / len(queries):9.1f} us/query")
+
+        symbol = symbols[0]
+        full, data = timed(lambda: store.window('quotes', symbol, first, last + 1), 5)
+        print(f"  all days, one symbol            {full:9.1f} us ({len(data['time']):,} quotes)")
+
+        resampled, bars = timed(lambda: store.resample(symbol, first, last + 1, 300000), 5)
+        print(f"  5-min OHLCV from trades         {resampled:9.1f} us ({len(bars['time']):,} bars)")
+
+        rebarred, bars = timed(lambda: store.resample(symbol, first, last + 1, 3600000, kind='bars'), 5)
+        print(f"  1-hour bars from 1-min bars     {rebarred:9.1f} us ({len(bars['time']):,} bars)")
+
+        joined, result = timed(lambda: store.asof_join(symbol, first, last + 1), 5)
+        matched = int(np.count_nonzero(result['bid'] != NULL_PRICE))
+        print(f"  as-of join trades to quotes     {joined:9.1f} us ({matched:,}/{len(result['time']):,} matched)")
+
+        # Baseline: load whole columns and filter with masks
+        def scan(query):
+            scan_symbol, start, end = query
+            parts = []
+            for segment in store.segments['quotes']:
+                times = np.load(os.path.join(segment.directory, 'time.npy'))
+                bid = np.load(os.path.join(segment.directory, 'bid.npy'))
+                i = segment.index.get(scan_symbol)
+                owner = np.zeros(len(times), dtype=bool)
+                if i is not None:
+                    owner[segment.offsets[i]:segment.offsets[i + 1]] = True
+                mask = owner & (times >= start) & (times < end)
+                parts.append(bid[mask])
+            return np.concatenate(parts)
+
+        sample = queries[:max(1, len(queries) // 20)]
+        scanned, _ = timed(lambda: [scan(query) for query in sample], 1)
+        print(f"  baseline full-column scan       {scanned / len(sample):9.1f} us/query")
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Binary Records for Schwab Streaming Client
+Versioned fixed-width records for normalized quotes, book levels and bars,
+and a UNIX domain socket publisher that streams them to local subscribers
+
+Every record is RECORD_SIZE (64) bytes, little-endian:
+
+    offset  size  field
+    0       1     format version (FORMAT_VERSION)
+    1       1     record type (HELLO, SYMBOL, QUOTE, BOOK_LEVEL, BAR)
+    2       1     venue (BOOK_LEVEL: VENUES index)
+    3       1     side (BOOK_LEVEL: BID or ASK)
+    4       4     symbol id (u32, announced by a SYMBOL record first)
+    8       8     time (i64 epoch milliseconds)
+    16      48    payload, per type (see *_DTYPE)
+
+Prices are the state's scaled integers (fixed_point.py) as i64; missing prices
+are NULL_PRICE and missing sizes are -1. A stream starts with a HELLO
+record carrying the format version, record size and price scale, then a
+SYMBOL record for every symbol id in use.
+
+Because the width is fixed, a buffer of records can be viewed as a NumPy
+structured array (`view`) without copying, and written with
+`struct.pack_into` straight into a preallocated buffer (`RecordWriter`).
+"""
+
+import asyncio
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from fixed_point import NULL_PRICE, PRICE_SCALE, to_prices
+from stream_logging import get_logger, kv
+
+logger = get_logger('binary_records')
+
+FORMAT_VERSION = 1
+RECORD_SIZE = 64
+NULL_SIZE = -1
+
+HELLO = 0
+SYMBOL = 1
+QUOTE = 2
+BOOK_LEVEL = 3
+BAR = 4
+
+BID = 0
+ASK = 1
+VENUES = ('NASDAQ', 'NYSE')
+VENUE_IDS = {venue: index for index, venue in enumerate(VENUES)}
+
+# Longest symbol a SYMBOL record carries (UTF-8, zero padded)
+MAX_SYMBOL_BYTES = 48
+
+HEADER = '<BBBBIq'
+HELLO_STRUCT = struct.Struct(HEADER + 'HHq36x')
+SYMBOL_STRUCT = struct.Struct(HEADER + f'{MAX_SYMBOL_BYTES}s')
+QUOTE_STRUCT = struct.Struct(HEADER + 'qqqiiiiq')
+BOOK_LEVEL_STRUCT = struct.Struct(HEADER + 'qqiH26x')
+BAR_STRUCT = struct.Struct(HEADER + 'qqqqq8x')
+
+_HEADER_FIELDS = [('version', 'u1'), ('type', 'u1'), ('venue', 'u1'), ('side', 'u1'),
+                  ('symbol_id', '<u4'), ('time', '<i8')]
+RECORD_DTYPE = np.dtype(_HEADER_FIELDS + [('payload', 'V48')])
+QUOTE_DTYPE = np.dtype(_HEADER_FIELDS + [
+    ('bid', '<i8'), ('ask', '<i8'), ('last', '<i8'),
+    ('bid_size', '<i4'), ('ask_size', '<i4'), ('last_size', '<i4'), ('pad', '<i4'), ('volume', '<i8')])
+BOOK_LEVEL_DTYPE = np.dtype(_HEADER_FIELDS + [
+    ('price', '<i8'), ('size', '<i8'), ('orders', '<i4'), ('level', '<u2'), ('pad', 'V26')])
+BAR_DTYPE = np.dtype(_HEADER_FIELDS + [
+    ('open', '<i8'), ('high', '<i8'), ('low', '<i8'), ('close', '<i8'), ('volume', '<i8'), ('pad', 'V8')])
+DTYPES = {QUOTE: QUOTE_DTYPE, BOOK_LEVEL: BOOK_LEVEL_DTYPE, BAR: BAR_DTYPE}
+
+for _struct in (HELLO_STRUCT, SYMBOL_STRUCT, QUOTE_STRUCT, BOOK_LEVEL_STRUCT, BAR_STRUCT):
+    assert _struct.size == RECORD_SIZE, _struct.format
+for _dtype in (RECORD_DTYPE, QUOTE_DTYPE, BOOK_LEVEL_DTYPE, BAR_DTYPE):
+    assert _dtype.itemsize == RECORD_SIZE, _dtype
+
+
+def to_record_price(fixed) -> int:
+    """Scaled integer price -> i64 field (None becomes NULL_PRICE)"""
+    return NULL_PRICE if fixed is None else fixed
+
+
+def to_size(size) -> int:
+    return NULL_SIZE if size is None or size != size else int(size)
+
+
+def view(buffer, record_type: Optional[int] = None) -> np.ndarray:
+    """Records in `buffer` as a structured array (zero-copy without `record_type`)
+
+    With `record_type` only records of that type are returned, as that
+    type's dtype.
+    """
+    records = np.frombuffer(buffer, dtype=RECORD_DTYPE, count=len(buffer) // RECORD_SIZE)
+    if record_type is None:
+        return records
+    return records[records['type'] == record_type].view(DTYPES[record_type])
+
+
+class SymbolTable:
+    """Interned symbol ids; ids are assigned in first-use order and never reused"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.symbols: List[str] = []
+
+    def lookup(self, symbol: str) -> Tuple[int, bool]:
+        """(id, new) for a symbol"""
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is not None:
+            return symbol_id, False
+        symbol_id = self.ids[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        return symbol_id, True
+
+
+class RecordWriter:
+    """Packs records into a preallocated buffer with `struct.pack_into`
+
+    `take()` returns the packed bytes and rewinds; the buffer grows by
+    doubling if it fills up between takes.
+    """
+
+    def __init__(self, symbols: Optional[SymbolTable] = None, capacity: int = 4096):
+        self.symbols = symbols or SymbolTable()
+        self.buffer = bytearray(capacity * RECORD_SIZE)
+        self.offset = 0
+        self.records = 0
+
+    def _reserve(self) -> int:
+        offset = self.offset
+        if offset + RECORD_SIZE > len(self.buffer):
+            self.buffer.extend(bytes(len(self.buffer)))
+        self.offset = offset + RECORD_SIZE
+        self.records += 1
+        return offset
+
+    def _symbol_id(self, symbol: str, time_ms: int) -> int:
+        # Call before reserving the record that uses it, so a new symbol's
+        # SYMBOL record precedes that record in the stream
+        symbol_id, new = self.symbols.lookup(symbol)
+        if new:
+            self.symbol(symbol_id, symbol, time_ms)
+        return symbol_id
+
+    def hello(self, time_ms: int = 0):
+        HELLO_STRUCT.pack_into(self.buffer, self._reserve(), FORMAT_VERSION, HELLO, 0, 0, 0, time_ms,
+                               FORMAT_VERSION, RECORD_SIZE, PRICE_SCALE)
+
+    def symbol(self, symbol_id: int, symbol: str, time_ms: int = 0):
+        SYMBOL_STRUCT.pack_into(self.buffer, self._reserve(), FORMAT_VERSION, SYMBOL, 0, 0, symbol_id, time_ms,
+                                symbol.encode()[:MAX_SYMBOL_BYTES])
+
+    def quote(self, symbol: str, time_ms: int, quote: Dict[str, object]):
+        """A normalized quote (MarketState fields)"""
+        get = quote.get
+        symbol_id = self._symbol_id(symbol, time_ms)
+        QUOTE_STRUCT.pack_into(
+            self.buffer, self._reserve(), FORMAT_VERSION, QUOTE, 0, 0, symbol_id, time_ms,
+            to_record_price(get('bid')), to_record_price(get('ask')), to_record_price(get('last')),
+            to_size(get('bid_size')), to_size(get('ask_size')), to_size(get('last_size')), 0,
+            to_size(get('volume')))
+
+    def book_level(self, symbol: str, time_ms: int, venue: str, side: int, level: int,
+                   price, size, orders: int = 0):
+        symbol_id = self._symbol_id(symbol, time_ms)
+        BOOK_LEVEL_STRUCT.pack_into(
+            self.buffer, self._reserve(), FORMAT_VERSION, BOOK_LEVEL, VENUE_IDS.get(venue, 255), side,
+            symbol_id, time_ms, to_record_price(price), to_size(size), orders, level)
+
+    def book_top(self, symbol: str, venue: str, top: Dict[str, object]):
+        """A normalized top of book as a bid and an ask level"""
+        time_ms = int(top.get('time') or 0)
+        self.book_level(symbol, time_ms, venue, BID, 0, top.get('bid'), top.get('bid_size'))
+        self.book_level(symbol, time_ms, venue, ASK, 0, top.get('ask'), top.get('ask_size'))
+
+    def bar(self, symbol: str, bar: Dict[str, object]):
+        time_ms = int(bar.get('time') or 0)
+        symbol_id = self._symbol_id(symbol, time_ms)
+        BAR_STRUCT.pack_into(
+            self.buffer, self._reserve(), FORMAT_VERSION, BAR, 0, 0, symbol_id, time_ms,
+            to_record_price(bar.get('open')), to_record_price(bar.get('high')), to_record_price(bar.get('low')),
+            to_record_price(bar.get('close')), to_size(bar.get('volume')))
+
+    def take(self) -> bytes:
+        data = bytes(memoryview(self.buffer)[:self.offset])
+        self.offset = 0
+        return data
+
+
+class RecordReader:
+    """Reassembles a byte stream into whole records and tracks the symbol table"""
+
+    def __init__(self):
+        self.symbols: Dict[int, str] = {}
+        self.version: Optional[int] = None
+        self._partial = b''
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Whole records in `data` (plus any partial record carried over), as RECORD_DTYPE"""
+        if self._partial:
+            data = self._partial + data
+        whole = len(data) - len(data) % RECORD_SIZE
+        self._partial = data[whole:]
+        records = view(memoryview(data)[:whole])
+        unsupported = np.flatnonzero(records['version'] != FORMAT_VERSION)
+        if len(unsupported):
+            raise ValueError(f"Unsupported record format version {records['version'][unsupported[0]]}")
+        control = np.flatnonzero(records['type'] <= SYMBOL)
+        for index in control.tolist():
+            record = records[index]
+            if record['type'] == HELLO:
+                self.version = HELLO_STRUCT.unpack_from(data, index * RECORD_SIZE)[6]
+            else:
+                name = SYMBOL_STRUCT.unpack_from(data, index * RECORD_SIZE)[6]
+                self.symbols[int(record['symbol_id'])] = name.rstrip(b'\0').decode()
+        return records
+
+    def iter_quotes(self, records: np.ndarray) -> Iterator[Tuple[str, int, float, float, float]]:
+        """(symbol, time, bid, ask, last) per quote record, for consumers that want Python values"""
+        quotes = records[records['type'] == QUOTE].view(QUOTE_DTYPE)
+        symbols = self.symbols
+        for symbol_id, time_ms, bid, ask, last in zip(
+                quotes['symbol_id'].tolist(), quotes['time'].tolist(), to_prices(quotes['bid']).tolist(),
+                to_prices(quotes['ask']).tolist(), to_prices(quotes['last']).tolist()):
+            yield symbols.get(symbol_id), time_ms, bid, ask, last
+
+
+class RecordPublisher:
+    """Streams MarketState updates as binary records to UNIX socket subscribers
+
+    Updates are packed as they are applied and written to every
+    subscriber every `flush_interval` seconds in one write. A new
+    subscriber first receives HELLO and every known SYMBOL record.
+    Subscribers whose unsent backlog exceeds `max_backlog` bytes are
+    disconnected rather than slowing the client down.
+    """
+
+    def __init__(self, state, path: str, flush_interval: float = 0.005, max_backlog: int = 16 * 1024 * 1024):
+        self.state = state
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.writer = RecordWriter()
+        self.subscribers: List[asyncio.StreamWriter] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self.bytes_sent = 0
+        self.dropped_subscribers = 0
+
+    def record(self, kind: str, key: Optional[str], symbol: str, fields: Dict[str, object]):
+        """MarketState recorder"""
+        if not self.subscribers:
+            return
+        if kind == 'quote':
+            quote = self.state.quotes[symbol]
+            self.writer.quote(symbol, int(quote.get('quote_time') or time.time() * 1000), quote)
+        elif kind == 'book':
+            self.writer.book_top(symbol, key, fields)
+        elif kind == 'bar':
+            self.writer.bar(symbol, fields)
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        greeting = RecordWriter(self.writer.symbols)
+        greeting.hello(int(time.time() * 1000))
+        for symbol_id, symbol in enumerate(self.writer.symbols.symbols):
+            greeting.symbol(symbol_id, symbol)
+        writer.write(greeting.take())
+        self.subscribers.append(writer)
+        logger.info("Record subscriber connected", extra=kv(subscribers=len(self.subscribers)))
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._on_connect, path=self.path)
+        self.state.add_recorder(self.record)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Record publisher listening", extra=kv(path=self.path))
+
+    def flush(self):
+        if not self.writer.offset:
+            return
+        data = self.writer.take()
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.max_backlog:
+                self.subscribers.remove(writer)
+                self.dropped_subscribers += 1
+                writer.close()
+                logger.warning("Dropped slow or closed record subscriber", extra=kv(subscribers=len(self.subscribers)))
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+        for writer in self.subscribers:
+            writer.close()
+        self.subscribers = []
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def report(self) -> dict:
+        return {
+            'records': self.writer.records,
+            'bytes_sent': self.bytes_sent,
+            'symbols': len(self.writer.symbols.symbols),
+            'dropped_subscribers': self.dropped_subscribers,
+        }
+
+
+async def subscribe(path: str, chunk_size: int = 1 << 16):
+    """Async iterator of (RecordReader, records) per read from a RecordPublisher socket"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    records = RecordReader()
+    try:
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                return
+            yield records, records.feed(data)
+    finally:
+        writer.close()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Session Bootstrap for Schwab Streaming Client
+Runs the start-up steps of a session as a dependency graph, each step as
+soon as the steps it needs have finished, with a per-step timing breakdown
+
+Token load, account resolution, instrument metadata and the REST snapshot
+warm-up only need the HTTP client, so they run while the stream logs in;
+subscriptions wait for the login, the handlers and the book routes.
+Every step shares one synchronous schwab-py client, so its REST calls
+(blocking steps, instrument lookups, the warm-up) run one at a time on a
+single worker thread (`rest_executor`); they still overlap with the
+login, which runs on the event loop.
+"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('bootstrap')
+
+
+class BootstrapStep:
+    """One named start-up step and its timing"""
+
+    __slots__ = ('name', 'run', 'after', 'blocking', 'started', 'finished')
+
+    def __init__(self, name: str, run: Callable, after: Iterable[str] = (), blocking: bool = False):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.blocking = blocking
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+class Bootstrap:
+    """Dependency-ordered start-up steps
+
+    Steps are added after the steps they depend on, so the graph has no
+    cycles. `concurrent=False` runs them one at a time in the order they
+    were added, which is the baseline the timing report compares against.
+    """
+
+    def __init__(self, concurrent: bool = True):
+        self.concurrent = concurrent
+        self.steps: Dict[str, BootstrapStep] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.first_tick: Optional[float] = None
+        # One worker for the REST calls of every step while `run` is going
+        self.rest_executor: Optional[ThreadPoolExecutor] = None
+
+    def add(self, name: str, run: Callable, after: Iterable[str] = (), blocking: bool = False):
+        """Add a step; `run` may be a coroutine function, or a plain function (`blocking` ones go to `rest_executor`)"""
+        if name in self.steps:
+            raise ValueError(f"Duplicate bootstrap step {name}")
+        unknown = [dependency for dependency in after if dependency not in self.steps]
+        if unknown:
+            raise ValueError(f"Bootstrap step {name} depends on unknown steps {unknown}")
+        self.steps[name] = BootstrapStep(name, run, after, blocking)
+
+    async def _execute(self, step: BootstrapStep):
+        step.started = time.perf_counter()
+        try:
+            if step.blocking:
+                return await asyncio.get_running_loop().run_in_executor(self.rest_executor, step.run)
+            result = step.run()
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            step.finished = time.perf_counter()
+
+    async def _run_after(self, step: BootstrapStep, tasks: Dict[str, asyncio.Future]):
+        if step.after:
+            await asyncio.gather(*(tasks[name] for name in step.after))
+        return await self._execute(step)
+
+    async def run(self) -> Dict[str, object]:
+        """Run every step; returns each step's result by name
+
+        The first failure cancels the steps still running and is re-raised.
+        """
+        self.started = time.perf_counter()
+        self.rest_executor = ThreadPoolExecutor(1, thread_name_prefix='bootstrap-rest')
+        try:
+            if not self.concurrent:
+                return {name: await self._execute(step) for name, step in self.steps.items()}
+            tasks: Dict[str, asyncio.Future] = {}
+            for name, step in self.steps.items():
+                tasks[name] = asyncio.ensure_future(self._run_after(step, tasks))
+            try:
+                await asyncio.gather(*tasks.values())
+            except BaseException:
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+                raise
+            return {name: task.result() for name, task in tasks.items()}
+        finally:
+            self.finished = time.perf_counter()
+            # A cancelled step's call may still be running: let it finish in the background
+            self.rest_executor.shutdown(wait=False)
+            self.rest_executor = None
+
+    def on_tick(self, message: dict):
+        """Data handler marking the first streamed message (time to first tick)"""
+        if self.first_tick is None and message.get('content'):
+            self.first_tick = time.perf_counter()
+            logger.info("First tick", extra=kv(ms=round((self.first_tick - self.started) * 1000, 1)))
+
+    def critical_path(self) -> List[str]:
+        """Steps that set the total: from the last one to finish back through its slowest dependency"""
+        done = [step for step in self.steps.values() if step.finished is not None]
+        if not done:
+            return []
+        step = max(done, key=lambda s: s.finished)
+        path = [step.name]
+        while step.after:
+            step = max((self.steps[name] for name in step.after), key=lambda s: s.finished or 0.0)
+            path.append(step.name)
+        return path[::-1]
+
+    def report(self) -> dict:
+        origin = self.started or 0.0
+
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        steps = {}
+        for name, step in self.steps.items():
+            if step.started is None:
+                continue
+            steps[name] = {'start_ms': ms(step.started - origin),
+                           'duration_ms': ms((step.finished or step.started) - step.started)}
+        return {
+            'mode': 'concurrent' if self.concurrent else 'serial',
+            'total_ms': ms(self.finished - origin) if self.finished else None,
+            # What the same steps cost one after another
+            'serial_ms': round(sum(step['duration_ms'] for step in steps.values()), 1),
+            'first_tick_ms': ms(self.first_tick - origin) if self.first_tick else None,
+            'critical_path': '>'.join(self.critical_path()) if self.concurrent else 'all steps',
+            'steps': steps,
+        }
+
+    def log_report(self):
+        report = self.report()
+        for name, step in report.pop('steps').items():
+            logger.info("Bootstrap step", extra=kv(step=name, **step))
+        logger.info("Bootstrap complete", extra=kv(**report))
+
+
+def session_bootstrap(session, symbols: List[str], concurrent: bool = True, warm_up: bool = True,
+                      portfolio: bool = False) -> Bootstrap:
+    """The start-up graph of a streaming session
+
+    `session` is a SchwabStreamingClient (or a stand-in with the same
+    step methods, as in benchmark_bootstrap.py); `symbols` are the equity
+    symbols of the session. With `portfolio` the positions of the resolved
+    accounts load alongside the login, and held symbols are added once the
+    session's own subscriptions are in.
+    """
+    bootstrap = Bootstrap(concurrent)
+    # Local: journal recovery, storage and query services, the instrument cache file
+    bootstrap.add('state', session.recover_state)
+    bootstrap.add('services', session.start_local_services)
+    bootstrap.add('instrument_cache', session.load_instruments)
+    # Everything remote needs the HTTP client (token file, refreshed if expired)
+    bootstrap.add('token', session.load_client, blocking=True)
+    bootstrap.add('accounts', session.resolve_accounts, after=['token'], blocking=True)
+    bootstrap.add('login', session.login_to_stream, after=['token'])
+    bootstrap.add('handlers', session.setup_handlers, after=['token'])
+    # The lambdas read rest_executor when the step starts, inside run()
+    bootstrap.add('instruments', lambda: session.instrument_cache.refresh(session.client, symbols,
+                                                                          bootstrap.rest_executor),
+                  after=['token', 'instrument_cache'])
+    if warm_up:
+        # After recovery, so REST snapshots replace checkpointed quotes and not the reverse
+        bootstrap.add('warm_up', lambda: session.warm_up(symbols, bootstrap.rest_executor), after=['token', 'state'])
+    bootstrap.add('subscribe', lambda: session.subscribe_all(symbols), after=['login', 'handlers', 'instruments'])
+    if portfolio:
+        # After the warm-up, so positions are marked from its snapshots
+        bootstrap.add('positions', session.load_positions, after=['accounts'] + (['warm_up'] if warm_up else []),
+                      blocking=True)
+        bootstrap.add('portfolio_subs', session.subscribe_portfolio, after=['positions', 'subscribe'])
+    return bootstrap
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Change Detection for Schwab Streaming Client
+Drops Level One fields that repeat the last value forwarded for their
+symbol, and items left with nothing that changed, before any handler runs
+
+A watched field is forwarded when it differs from the last value forwarded
+for its (service, symbol) by more than the field's tolerance (0 by
+default: any change). Comparing against the last *forwarded* value keeps
+the market state within the tolerance however slowly a field drifts.
+Fields that are not watched (by default the quote and trade times) ride
+along with an item that has a change and are dropped with one that has
+none. Prices are compared as scaled integers, like the decoded records.
+"""
+
+import itertools
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from asset_classes import ASSET_CLASSES
+from fixed_point import PRICE_FIELDS, PRICE_SCALE
+from memory_budget import sampled_sizeof
+from stream_logging import get_logger, kv
+
+logger = get_logger('change_filter')
+
+# Level One service -> wire field name -> normalized name
+SERVICE_FIELDS = {spec.service: spec.fields for spec in ASSET_CLASSES.values()}
+
+# Normalized fields that change on every update without saying anything new
+TIME_FIELDS = frozenset({'quote_time', 'trade_time'})
+
+
+def parse_service_fields(value: str) -> Dict[str, List[str]]:
+    """'LEVELONE_EQUITIES=bid,ask;LEVELONE_FUTURES=last' -> {service: [field, ...]}"""
+    parsed: Dict[str, List[str]] = {}
+    for entry in value.split(';'):
+        if not entry.strip():
+            continue
+        service, _, fields = entry.partition('=')
+        parsed[service.strip().upper()] = [f.strip() for f in fields.split(',') if f.strip()]
+    return parsed
+
+
+def parse_tolerances(value: str) -> Dict[str, Dict[str, float]]:
+    """'LEVELONE_EQUITIES=bid:0.01,volume:100' -> {service: {field: tolerance}}"""
+    return {service: {name: float(tolerance) for name, _, tolerance in (f.partition(':') for f in fields)}
+            for service, fields in parse_service_fields(value).items()}
+
+
+class ChangeStats:
+    """Counters for one service"""
+
+    __slots__ = ('messages', 'messages_dropped', 'items', 'items_dropped', 'fields', 'fields_stripped')
+
+    def __init__(self):
+        self.messages = 0
+        self.messages_dropped = 0
+        self.items = 0
+        self.items_dropped = 0
+        self.fields = 0
+        self.fields_stripped = 0
+
+    def as_dict(self) -> dict:
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats['item_suppression'] = round(self.items_dropped / self.items, 4) if self.items else 0.0
+        stats['field_suppression'] = round(self.fields_stripped / self.fields, 4) if self.fields else 0.0
+        return stats
+
+
+class ChangeFilter:
+    """Strips unchanged watched fields from Level One content items
+
+    `watched` maps a service to the normalized fields whose changes are
+    forwarded; services left out are not filtered, and None filters every
+    Level One service on all fields but TIME_FIELDS. `tolerances` maps a
+    service to {field: largest change still treated as none}, in dollars
+    for prices and in units otherwise.
+    """
+
+    def __init__(self, watched: Optional[Dict[str, Iterable[str]]] = None,
+                 tolerances: Optional[Dict[str, Dict[str, float]]] = None):
+        if watched is None:
+            watched = {service: [label for label in fields.values() if label not in TIME_FIELDS]
+                       for service, fields in SERVICE_FIELDS.items()}
+        tolerances = tolerances or {}
+        unknown = [service for service in list(watched) + list(tolerances) if service not in SERVICE_FIELDS]
+        if unknown:
+            raise ValueError(f"Change detection only applies to Level One services, not {unknown}")
+
+        # service -> wire name -> (normalized name, tolerance, is price) for watched fields
+        self.watched: Dict[str, Dict[str, Tuple[str, float, bool]]] = {}
+        for service, names in watched.items():
+            names = set(names)
+            labels = set(SERVICE_FIELDS[service].values())
+            missing = names - labels
+            if missing:
+                raise ValueError(f"{service} has no fields {sorted(missing)}")
+            service_tolerances = tolerances.get(service, {})
+            self.watched[service] = {
+                wire: (label, self._scale(label, service_tolerances.get(label, 0.0)), label in PRICE_FIELDS)
+                for wire, label in SERVICE_FIELDS[service].items() if label in names
+            }
+        self.fields = SERVICE_FIELDS
+        self.stats: Dict[str, ChangeStats] = {}
+        # (service, symbol) -> wire name -> last forwarded value (prices scaled)
+        self._last: Dict[Tuple[str, str], Dict[str, object]] = {}
+
+    @staticmethod
+    def _scale(label: str, tolerance: float):
+        return round(tolerance * PRICE_SCALE) if label in PRICE_FIELDS else tolerance
+
+    def filter_item(self, service: str, item: dict, stats: ChangeStats) -> Optional[dict]:
+        """The item with unchanged watched fields removed, or None if no watched field changed"""
+        symbol = item.get('key')
+        watched = self.watched[service]
+        fields = self.fields[service]
+        last = self._last.get((service, symbol))
+        if last is None:
+            last = self._last[(service, symbol)] = {}
+
+        kept = {}
+        changed = False
+        carried = 0
+        for name, value in item.items():
+            spec = watched.get(name)
+            if spec is None:
+                # Not watched: symbol, sequence and other wire keys, or a carried field
+                kept[name] = value
+                if name in fields:
+                    carried += 1
+                continue
+            stats.fields += 1
+            _, tolerance, is_price = spec
+            current = round(value * PRICE_SCALE) if is_price and value is not None else value
+            if name in last:
+                previous = last[name]
+                if previous is None or current is None or not tolerance:
+                    same = current == previous
+                else:
+                    same = abs(current - previous) <= tolerance
+                if same:
+                    stats.fields_stripped += 1
+                    continue
+            last[name] = current
+            kept[name] = value
+            changed = True
+
+        stats.fields += carried
+        if not changed:
+            stats.fields_stripped += carried
+            return None
+        return item if len(kept) == len(item) else kept
+
+    def filter_message(self, service: str, message: dict) -> Optional[dict]:
+        """The message with only changed content, or None if nothing changed
+
+        Call it once per received message: it records what it forwards, so
+        the same message filtered again looks unchanged.
+        """
+        stats = self.stats.get(service)
+        if stats is None:
+            stats = self.stats[service] = ChangeStats()
+        stats.messages += 1
+        content = message.get('content', [])
+        kept = []
+        for item in content:
+            if item.get('key') is None:
+                kept.append(item)
+                continue
+            stats.items += 1
+            filtered = self.filter_item(service, item, stats)
+            if filtered is None:
+                stats.items_dropped += 1
+            else:
+                kept.append(filtered)
+
+        if not kept:
+            stats.messages_dropped += 1
+            return None
+        if len(kept) == len(content) and all(new is old for new, old in zip(kept, content)):
+            return message
+        return dict(message, content=kept)
+
+    def gate(self, service: str, handler: Callable) -> Callable:
+        """Wrap a handler so it only sees changes; services that are not watched pass through
+
+        Like SequenceTracker.gate, gate the one handler per service that fans
+        out to the rest, not each handler.
+        """
+        if service not in self.watched:
+            return handler
+        filter_message = self.filter_message
+
+        def change_handler(message):
+            filtered = filter_message(service, message)
+            if filtered is not None:
+                return handler(filtered)
+
+        change_handler.__qualname__ = getattr(handler, '__qualname__', repr(handler))
+        return change_handler
+
+    def forget(self, symbols: List[str]):
+        """Drop last values for evicted symbols, so their next update passes whole"""
+        symbols = set(symbols)
+        for key in [key for key in self._last if key[1] in symbols]:
+            del self._last[key]
+
+    def forget_symbol(self, service: str, symbol: str):
+        """Drop one symbol's last values, e.g. after a sequence gap left the state behind"""
+        self._last.pop((service, symbol), None)
+
+    def memory_bytes(self) -> int:
+        return sampled_sizeof(self._last)
+
+    def trim(self, limit_bytes: int, size_bytes: int) -> int:
+        """Drop the last values first seen longest ago; those symbols' next updates pass whole"""
+        if size_bytes <= limit_bytes or not self._last:
+            return 0
+        count = int((size_bytes - limit_bytes) / (size_bytes / len(self._last))) + 1
+        for key in list(itertools.islice(self._last, count)):
+            del self._last[key]
+        return count
+
+    def report(self) -> Dict[str, dict]:
+        return {service: stats.as_dict() for service, stats in self.stats.items()}
+
+    def log_report(self):
+        for service, stats in self.report().items():
+            logger.info("Change filter summary", extra=kv(service=service, **stats))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Command Line Entry for Schwab Streaming Client
+One entry point for the client and its tools; each subcommand imports
+what it needs only when it runs
+
+    python cli.py stream AAPL,MSFT --dashboard
+    python cli.py check [--deep]
+    python cli.py fields [LEVELONE_FUTURES]
+    python cli.py account-id
+    python cli.py demo --rate=5
+    python cli.py bench tick_store --days 2
+
+Only the standard library is imported up front. schwab-py, python-dotenv,
+NumPy and FastAPI load inside the subcommands that use them, so tooling
+subcommands start in tens of milliseconds; benchmark_importtime.py holds
+them to a budget.
+"""
+
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+from typing import Dict, List, Optional
+
+# Import name -> pip package, checked without importing
+REQUIRED_PACKAGES = {
+    'schwab': 'schwab-py',
+    'dotenv': 'python-dotenv',
+    'websockets': 'websockets',
+    'httpx': 'httpx',
+    'pydantic': 'pydantic',
+    'numpy': 'numpy',
+}
+OPTIONAL_PACKAGES = {
+    'fastapi': 'fastapi (query API)',
+    'uvicorn': 'uvicorn (query API)',
+}
+SCHWAB_MODULES = ('schwab.auth', 'schwab.client', 'schwab.streaming')
+
+REQUIRED_VARIABLES = ('SCHWAB_API_KEY', 'SCHWAB_APP_SECRET', 'SCHWAB_ACCOUNT_ID')
+TOKEN_PATH = 'schwab_token.json'
+
+
+def missing_packages(packages: Dict[str, str]) -> List[str]:
+    """Import names in `packages` that are not installed (found by spec, not imported)"""
+    return [name for name in packages if importlib.util.find_spec(name) is None]
+
+
+def read_env_file(path: str = '.env') -> Dict[str, str]:
+    """KEY=VALUE lines of a .env file, without loading python-dotenv"""
+    values = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    name, _, value = line.partition('=')
+                    values[name.strip()] = value.strip().strip('\'"')
+    except FileNotFoundError:
+        pass
+    return values
+
+
+def command_stream(args) -> int:
+    import schwab_streaming
+    # The client reads its symbols and flags from sys.argv
+    sys.argv = ['schwab_streaming.py'] + ([args.symbols] if args.symbols else []) + \
+        (['--dashboard'] if args.dashboard else [])
+    schwab_streaming.run()
+    return 0
+
+
+def command_check(args) -> int:
+    ok = True
+    print("🔄 Packages")
+    missing = missing_packages(REQUIRED_PACKAGES)
+    for name, package in REQUIRED_PACKAGES.items():
+        print(f"{'❌' if name in missing else '✅'} {package}")
+    ok = ok and not missing
+    for name in OPTIONAL_PACKAGES:
+        if importlib.util.find_spec(name) is None:
+            print(f"⚠️  {OPTIONAL_PACKAGES[name]} not installed")
+
+    if args.deep and 'schwab' not in missing:
+        for module in SCHWAB_MODULES:
+            try:
+                importlib.import_module(module)
+                print(f"✅ {module} imported")
+            except ImportError as e:
+                print(f"❌ {module}: {e}")
+                ok = False
+
+    print("\n🔄 Credentials")
+    values = dict(read_env_file(), **{name: os.environ[name] for name in REQUIRED_VARIABLES if name in os.environ})
+    for name in REQUIRED_VARIABLES:
+        value = values.get(name, '')
+        if not value or value.startswith('your_'):
+            print(f"❌ {name} not set (.env or environment)")
+            ok = False
+        else:
+            print(f"✅ {name}")
+    if os.path.exists(TOKEN_PATH):
+        print(f"✅ {TOKEN_PATH} found")
+    else:
+        print(f"⚠️  {TOKEN_PATH} not found; the first `stream` run opens the OAuth flow")
+
+    print("\n" + ("✅ Ready to stream" if ok else "❌ Fix the items above before streaming"))
+    return 0 if ok else 1
+
+
+def command_fields(args) -> int:
+    from asset_classes import ASSET_CLASSES, CHART_FIELDS
+    from fixed_point import PRICE_FIELDS
+
+    tables = {spec.service: spec.fields for spec in ASSET_CLASSES.values()}
+    tables['CHART_EQUITY'] = CHART_FIELDS
+    services = [args.service.upper()] if args.service else list(tables)
+    for service in services:
+        if service not in tables:
+            print(f"❌ No field table for {service}; known: {', '.join(tables)}")
+            return 1
+        print(f"{service}")
+        for wire, name in tables[service].items():
+            print(f"  {wire:26} {name:16} {'price' if name in PRICE_FIELDS else ''}".rstrip())
+    return 0
+
+
+def command_account_id(args) -> int:
+    import get_account_id
+    get_account_id.main()
+    return 0
+
+
+def command_demo(args) -> int:
+    import asyncio
+    import demo_streaming
+    sys.argv = ['demo_streaming.py'] + args.args
+    try:
+        asyncio.run(demo_streaming.main())
+    except KeyboardInterrupt:
+        print("\n👋 Demo ended!")
+    return 0
+
+
+def benchmarks() -> List[str]:
+    here = os.path.dirname(os.path.abspath(__file__))
+    return sorted(os.path.basename(path)[len('benchmark_'):-len('.py')]
+                  for path in glob.glob(os.path.join(here, 'benchmark_*.py')))
+
+
+def command_bench(args) -> int:
+    import runpy
+    if args.name not in benchmarks():
+        print(f"❌ Unknown benchmark {args.name}; available: {', '.join(benchmarks())}")
+        return 1
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'benchmark_{args.name}.py')
+    sys.argv = [path] + args.args
+    runpy.run_path(path, run_name='__main__')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description="Schwab Streaming Client")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    stream = commands.add_parser('stream', help="stream quotes, books and bars (configured by SCHWAB_* variables)")
+    stream.add_argument('symbols', nargs='?', help="comma-separated equity symbols")
+    stream.add_argument('--dashboard', action='store_true', help="terminal dashboard instead of JSON dumps")
+    stream.set_defaults(run=command_stream)
+
+    check = commands.add_parser('check', help="check packages, credentials and the token file")
+    check.add_argument('--deep', action='store_true', help="also import the schwab-py modules")
+    check.set_defaults(run=command_check)
+
+    fields = commands.add_parser('fields', help="wire field to normalized field tables per service")
+    fields.add_argument('service', nargs='?')
+    fields.set_defaults(run=command_fields)
+
+    account = commands.add_parser('account-id', help="look up the account ID and optionally write it to .env")
+    account.set_defaults(run=command_account_id)
+
+    demo = commands.add_parser('demo', help="stream synthetic data without credentials (--rate=N --symbols=N)",
+                               add_help=False)
+    demo.set_defaults(run=command_demo, passthrough=True)
+
+    bench = commands.add_parser('bench', help="run a benchmark_<name>.py script (other arguments go to it)",
+                                add_help=False)
+    bench.add_argument('name')
+    bench.set_defaults(run=command_bench, passthrough=True)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    # demo and bench hand unknown arguments to their script
+    args, extra = parser.parse_known_args(argv)
+    if extra and not getattr(args, 'passthrough', False):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Terminal Dashboard for Schwab Streaming Client
+Fixed-rate, diff-rendered symbol table drawn from the market state
+"""
+
+import asyncio
+import shutil
+import sys
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from asset_classes import tick_size
+from fixed_point import decimals, format_price
+from market_state import MarketState
+from stream_logging import get_logger, kv
+
+logger = get_logger('dashboard')
+
+# (header, width) per column
+COLUMNS = (
+    ('SYMBOL', 10),
+    ('BID', 11),
+    ('ASK', 11),
+    ('LAST', 11),
+    ('VOLUME', 13),
+    ('SPREAD', 9),
+    ('BOOK BID', 19),
+    ('BOOK ASK', 19),
+    ('BAR O/H/L/C', 36),
+    ('BAR VOL', 10),
+)
+
+HEADER_ROWS = 3
+
+# Normalized fields the table reads, declared for field selection
+QUOTE_FIELDS = ('bid', 'ask', 'last', 'volume')
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+CLEAR_SCREEN = '\x1b[2J'
+HIDE_CURSOR = '\x1b[?25l'
+SHOW_CURSOR = '\x1b[?25h'
+
+
+def _move(row: int, column: int) -> str:
+    """ANSI cursor position (1-based)"""
+    return f'\x1b[{row};{column}H'
+
+
+def _price(value, places: int = 2) -> str:
+    """Scaled integer price (fixed_point.py) as text"""
+    if value is None:
+        return '-'
+    try:
+        return format_price(value, places)
+    except TypeError:
+        return str(value)
+
+
+def _size(value) -> str:
+    if value is None:
+        return '-'
+    try:
+        return f'{int(value):,}'
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class TerminalDashboard:
+    """Renders a fixed table of symbols at a capped frame rate
+
+    Frames are rendered by a task on the event loop, between message
+    handlers, so the market state is never read while it is being
+    updated. Each frame only rewrites the
+    cells whose text changed since the previous frame, so the terminal
+    cost is bounded by the screen size rather than the message rate, and
+    symbols whose state version did not move are skipped entirely.
+    """
+
+    def __init__(self, state: MarketState, symbols: List[str], fps: float = 4.0,
+                 stream: Optional[TextIO] = None, full_redraw_seconds: float = 30.0):
+        self.state = state
+        self.symbols = list(symbols)
+        self.frame_interval = 1.0 / fps
+        self.stream = stream or sys.stdout
+        self.full_redraw_seconds = full_redraw_seconds
+
+        self._offsets = []
+        offset = 1
+        for _, width in COLUMNS:
+            self._offsets.append(offset)
+            offset += width + 1
+
+        self._cells: Dict[Tuple[int, int], str] = {}
+        self._versions: Dict[str, int] = {}
+        self._last_full_redraw = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.frames = 0
+        self.cells_written = 0
+        self.errors = 0
+
+    def start(self):
+        """Start rendering on the running event loop"""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop rendering and restore the cursor below the table"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.stream.write(_move(HEADER_ROWS + len(self.symbols) + 2, 1) + SHOW_CURSOR)
+        self.stream.flush()
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.render_frame()
+            except Exception as e:
+                # A bad frame is skipped; the next one redraws everything
+                self.errors += 1
+                self._last_full_redraw = 0.0
+                logger.warning("Dashboard frame failed: %s", e, extra=kv(frames=self.frames))
+            await asyncio.sleep(max(0.0, self.frame_interval - (time.monotonic() - started)))
+
+    def _row_cells(self, symbol: str) -> List[str]:
+        state = self.state
+        quote = state.get_quote(symbol) or {}
+        book = state.best_book(symbol) or {}
+        bar = state.get_bar(symbol) or {}
+
+        # Enough decimals for the instrument's tick: 2 for stocks, 5 for most currency pairs
+        places = max(2, decimals(tick_size(state.asset_classes.get(symbol, 'equity'), symbol, quote)))
+        bid = quote.get('bid')
+        ask = quote.get('ask')
+        spread = '-'
+        if bid is not None and ask is not None:
+            spread = _price(ask - bid, places)
+
+        book_bid = ('-' if book.get('bid') is None
+                    else f"{_price(book.get('bid'), places)} x {_size(book.get('bid_size'))}")
+        book_ask = ('-' if book.get('ask') is None
+                    else f"{_price(book.get('ask'), places)} x {_size(book.get('ask_size'))}")
+        bar_ohlc = '-' if not bar else '/'.join(_price(bar.get(k), places) for k in ('open', 'high', 'low', 'close'))
+
+        return [
+            # Restored from a checkpoint and not yet confirmed by a live update
+            symbol + '*' if state.is_stale(symbol) else symbol,
+            _price(bid, places),
+            _price(ask, places),
+            _price(quote.get('last'), places),
+            _size(quote.get('volume')),
+            spread,
+            book_bid,
+            book_ask,
+            bar_ohlc,
+            _size(bar.get('volume')),
+        ]
+
+    def render_frame(self):
+        """Write the cells that changed since the previous frame"""
+        now = time.monotonic()
+        out = []
+        if now - self._last_full_redraw >= self.full_redraw_seconds:
+            # Periodic full redraw repairs anything else written to the terminal
+            self._cells.clear()
+            self._versions.clear()
+            self._last_full_redraw = now
+            out.append(HIDE_CURSOR + CLEAR_SCREEN + _move(1, 1))
+            out.append('Schwab Streaming Dashboard')
+            for index, (header, width) in enumerate(COLUMNS):
+                out.append(_move(2, self._offsets[index]) + header.ljust(width))
+
+        visible_rows = shutil.get_terminal_size().lines - HEADER_ROWS
+        for row_index, symbol in enumerate(self.symbols[:max(0, visible_rows)]):
+            version = self.state.versions.get(symbol, 0)
+            if self._versions.get(symbol) == version:
+                continue
+            self._versions[symbol] = version
+
+            row = HEADER_ROWS + row_index
+            for column, text in enumerate(self._row_cells(symbol)):
+                width = COLUMNS[column][1]
+                text = text[:width].ljust(width)
+                if self._cells.get((row, column)) != text:
+                    self._cells[(row, column)] = text
+                    out.append(_move(row, self._offsets[column]) + text)
+                    self.cells_written += 1
+
+        out.append(_move(1, 30) + time.strftime('%H:%M:%S'))
+        self.stream.write(''.join(out))
+        self.stream.flush()
+        self.frames += 1
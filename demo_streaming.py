@@ -5,146 +5,115 @@ This script demonstrates basic usage without requiring actual API credentials
 """
 
 import asyncio
-import json
+import sys
+import time
 from datetime import datetime
-from typing import List
+from typing import Callable, Dict, List
+
+from synthetic_market import SyntheticMarket, generate_symbols
 
 
 class MockStreamingClient:
-    """Mock streaming client for demonstration purposes"""
+    """Mock streaming client for demonstration purposes
+    
+    Market data comes from a seeded SyntheticMarket, so quotes, book
+    ladders and minute bars are consistent with each other and the same
+    seed always replays the same session. Messages are relabeled the way
+    schwab-py hands them to handlers.
+    """
     
-    def __init__(self, symbols: List[str]):
+    def __init__(self, symbols: List[str], rate: float = 2.0, seed: int = 0):
         self.symbols = symbols
+        self.rate = rate
         self.running = False
+        self.market = SyntheticMarket(symbols, seed=seed)
+        self.handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.messages_sent = 0
+    
+    def add_handler(self, service: str, handler: Callable[[dict], None]):
+        """Register a handler for a service (LEVELONE_EQUITIES, NASDAQ_BOOK, NYSE_BOOK, CHART_EQUITY)"""
+        self.handlers.setdefault(service, []).append(handler)
     
-    async def simulate_market_data(self):
-        """Simulate real-time market data"""
+    async def simulate_market_data(self, duration: float = 30.0):
+        """Simulate real-time market data at `self.rate` messages per second"""
         print("🚀 Starting Mock Market Data Stream")
         print("=" * 50)
-        print(f"📊 Streaming data for: {', '.join(self.symbols)}")
-        print("⏱️  Simulating 30 seconds of market data...")
+        print(f"📊 Streaming data for: {', '.join(self.symbols[:10])}"
+              + (f" (+{len(self.symbols) - 10} more)" if len(self.symbols) > 10 else ""))
+        print(f"⏱️  Simulating {duration:.0f} seconds of market data at {self.rate:,.0f} msgs/sec...")
         print("=" * 50)
         
         self.running = True
-        start_time = datetime.now()
+        verbose = self.rate <= 20 and not self.handlers
+        # Roughly 100 frames per second at high rates, one message per frame at low ones
+        items_per_frame = max(1, min(500, int(self.rate / 100)))
+        start = time.monotonic()
+        last_report = start
+        reported = 0
         
-        # Simulate different types of market data
-        data_types = [
-            "Level One Quote",
-            "NASDAQ Order Book",
-            "NYSE Order Book", 
-            "Chart Data (OHLCV)"
-        ]
-        
-        while self.running:
-            elapsed = (datetime.now() - start_time).total_seconds()
+        for entry in self.market.messages(self.rate, items_per_frame, labelled=True):
+            if not self.running:
+                break
+            service = entry['service']
+            self.messages_sent += len(entry['content'])
+            
+            for handler in self.handlers.get(service, ()):
+                handler(entry)
+            if verbose:
+                self._display_data(entry)
             
-            if elapsed >= 30:  # Stop after 30 seconds
+            now = time.monotonic()
+            if now - start >= duration:
                 break
+            if not verbose and now - last_report >= 1.0:
+                print(f"   {self.messages_sent - reported:,} msgs in the last second "
+                      f"({self.messages_sent:,} total)")
+                last_report = now
+                reported = self.messages_sent
             
-            # Simulate different data types
-            for symbol in self.symbols:
-                for data_type in data_types:
-                    if not self.running:
-                        break
-                    
-                    # Create mock data
-                    mock_data = self._create_mock_data(symbol, data_type)
-                    
-                    # Display the data
-                    self._display_data(data_type, mock_data)
-                    
-                    # Small delay to simulate real-time updates
-                    await asyncio.sleep(0.5)
+            # Pace to the requested rate; the generator's clock runs ahead of ours
+            delay = start + self.messages_sent / self.rate - now
+            await asyncio.sleep(max(0.0, delay))
         
         print("\n🏁 Mock streaming session completed")
     
-    def _create_mock_data(self, symbol: str, data_type: str) -> dict:
-        """Create mock market data"""
-        import random
-        
-        base_price = 100 + hash(symbol) % 200  # Consistent base price per symbol
-        variation = random.uniform(-2, 2)
-        current_price = base_price + variation
-        
-        if data_type == "Level One Quote":
-            return {
-                "key": symbol,
-                "1": f"{current_price - 0.1:.2f}",  # Bid
-                "2": f"{current_price + 0.1:.2f}",  # Ask
-                "3": f"{current_price:.2f}",        # Last
-                "4": str(random.randint(1000, 10000)),  # Volume
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-        
-        elif data_type == "NASDAQ Order Book":
-            return {
-                "key": symbol,
-                "book_type": "NASDAQ",
-                "bids": [
-                    {"price": f"{current_price - 0.1:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price - 0.2:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price - 0.3:.2f}", "size": random.randint(100, 1000)}
-                ],
-                "asks": [
-                    {"price": f"{current_price + 0.1:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price + 0.2:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price + 0.3:.2f}", "size": random.randint(100, 1000)}
-                ],
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-        
-        elif data_type == "NYSE Order Book":
-            return {
-                "key": symbol,
-                "book_type": "NYSE",
-                "bids": [
-                    {"price": f"{current_price - 0.05:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price - 0.15:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price - 0.25:.2f}", "size": random.randint(100, 1000)}
-                ],
-                "asks": [
-                    {"price": f"{current_price + 0.05:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price + 0.15:.2f}", "size": random.randint(100, 1000)},
-                    {"price": f"{current_price + 0.25:.2f}", "size": random.randint(100, 1000)}
-                ],
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-        
-        elif data_type == "Chart Data (OHLCV)":
-            return {
-                "key": symbol,
-                "open": f"{current_price - variation:.2f}",
-                "high": f"{current_price + abs(variation):.2f}",
-                "low": f"{current_price - abs(variation):.2f}",
-                "close": f"{current_price:.2f}",
-                "volume": str(random.randint(10000, 100000)),
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-        
-        return {}
-    
-    def _display_data(self, data_type: str, data: dict):
+    def _display_data(self, entry: dict):
         """Display formatted market data"""
         timestamp = datetime.now().strftime('%H:%M:%S')
+        service = entry['service']
         
-        if data_type == "Level One Quote":
-            print(f"\n📈 {data_type} - {timestamp}")
-            print(f"   Symbol: {data['key']}")
-            print(f"   Bid: ${data['1']} | Ask: ${data['2']} | Last: ${data['3']}")
-            print(f"   Volume: {data['4']}")
-        
-        elif "Order Book" in data_type:
-            print(f"\n📊 {data_type} - {timestamp}")
-            print(f"   Symbol: {data['key']}")
-            print(f"   Bids: {data['bids'][:2]}")  # Show top 2 bids
-            print(f"   Asks: {data['asks'][:2]}")  # Show top 2 asks
-        
-        elif "Chart Data" in data_type:
-            print(f"\n📈 {data_type} - {timestamp}")
-            print(f"   Symbol: {data['key']}")
-            print(f"   OHLC: O=${data['open']} H=${data['high']} L=${data['low']} C=${data['close']}")
-            print(f"   Volume: {data['volume']}")
+        for data in entry['content']:
+            if service == 'LEVELONE_EQUITIES':
+                print(f"\n📈 Level One Quote - {timestamp}")
+                print(f"   Symbol: {data['key']}")
+                print(f"   Bid: ${data['BID_PRICE']:.2f} | Ask: ${data['ASK_PRICE']:.2f} | Last: ${data['LAST_PRICE']:.2f}")
+                print(f"   Volume: {data['TOTAL_VOLUME']:,}")
+            
+            elif service.endswith('_BOOK'):
+                venue = service.split('_')[0]
+                print(f"\n📊 {venue} Order Book - {timestamp}")
+                print(f"   Symbol: {data['key']}")
+                print(f"   Bids: {[(level['BID_PRICE'], level['TOTAL_VOLUME']) for level in data['BIDS'][:2]]}")
+                print(f"   Asks: {[(level['ASK_PRICE'], level['TOTAL_VOLUME']) for level in data['ASKS'][:2]]}")
+            
+            elif service == 'CHART_EQUITY':
+                print(f"\n📈 Chart Data (OHLCV) - {timestamp}")
+                print(f"   Symbol: {data['key']}")
+                print(f"   OHLC: O=${data['OPEN_PRICE']:.2f} H=${data['HIGH_PRICE']:.2f} "
+                      f"L=${data['LOW_PRICE']:.2f} C=${data['CLOSE_PRICE']:.2f}")
+                print(f"   Volume: {data['VOLUME']:,}")
+
+
+def benchmark_generator(symbol_count: int = 5000, messages: int = 1000000, seed: int = 0):
+    """Measure how fast the generator produces wire frames and handler messages"""
+    symbols = generate_symbols(symbol_count, seed)
+    for name in ('frames', 'messages'):
+        market = SyntheticMarket(symbols, seed=seed)
+        started = time.perf_counter()
+        for _ in getattr(market, name)(rate=100000, items_per_frame=250, limit=messages):
+            pass
+        elapsed = time.perf_counter() - started
+        print(f"   {name:<8} {messages / elapsed:>12,.0f} msgs/sec ({symbol_count:,} symbols)")
 
 
 async def main():
@@ -155,8 +124,19 @@ async def main():
     print("using mock data. No actual API calls are made.")
     print()
     
+    # Flags: --rate=N msgs/sec, --symbols=N generated symbols, --seed=N, --benchmark
+    flags = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    seed = int(flags.get('seed') or 0)
+    
+    if 'benchmark' in flags:
+        print("⏱️  Benchmarking the synthetic market generator...")
+        benchmark_generator(int(flags.get('symbols') or 5000), seed=seed)
+        return
+    
     # Demo symbols
     symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'SPY']
+    if flags.get('symbols'):
+        symbols = generate_symbols(int(flags['symbols']), seed)
     
     print("📋 DEMO FEATURES:")
     print("• Simulates real-time market data")
@@ -166,7 +146,7 @@ async def main():
     print()
     
     # Create and run mock client
-    mock_client = MockStreamingClient(symbols)
+    mock_client = MockStreamingClient(symbols, rate=float(flags.get('rate') or 2), seed=seed)
     
     try:
         await mock_client.simulate_market_data()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Field Selection for Schwab Streaming Client
+Consumers declare the fields they read; the union per service becomes the
+explicit field list sent with SUBS/ADD, so the streamer stops sending the rest
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from asset_classes import ASSET_CLASSES, CHART_FIELDS
+
+# schwab-py field enum per service (StreamClient.<name>)
+FIELD_ENUMS = {
+    'LEVELONE_EQUITIES': 'LevelOneEquityFields',
+    'LEVELONE_OPTIONS': 'LevelOneOptionFields',
+    'LEVELONE_FUTURES': 'LevelOneFuturesFields',
+    'LEVELONE_FOREX': 'LevelOneForexFields',
+    'CHART_EQUITY': 'ChartEquityFields',
+}
+
+# The key field every subscription needs
+KEY_FIELD = 'SYMBOL'
+
+# Normalized name -> stream labels per service (several labels can feed one name)
+NORMALIZED_LABELS: Dict[str, Dict[str, List[str]]] = {}
+for _spec in ASSET_CLASSES.values():
+    _labels: Dict[str, List[str]] = {}
+    for _label, _name in _spec.fields.items():
+        _labels.setdefault(_name, []).append(_label)
+    NORMALIZED_LABELS[_spec.service] = _labels
+NORMALIZED_LABELS['CHART_EQUITY'] = {name: [label] for label, name in CHART_FIELDS.items()}
+
+# Listener signature: (service, fields or None for the full set)
+FieldsListener = Callable[[str, Optional[List[str]]], None]
+
+
+def labels_for(service: str, normalized: Iterable[str]) -> List[str]:
+    """Stream labels for normalized field names ('bid' -> 'BID_PRICE'); unknown names are ignored"""
+    table = NORMALIZED_LABELS.get(service, {})
+    return [label for name in normalized for label in table.get(name, ())]
+
+
+class FieldRegistry:
+    """Field declarations per (consumer, service) and their union per service
+
+    A consumer declaring None needs every field (the JSON dump handlers
+    do), which turns selection off for that service. A service nobody
+    declared anything for is also subscribed with its full field set.
+    """
+
+    def __init__(self):
+        self.declarations: Dict[str, Dict[str, Optional[Set[str]]]] = {}
+        self.listeners: List[FieldsListener] = []
+
+    def add_listener(self, listener: FieldsListener):
+        """Called with (service, fields) whenever a service's union changes"""
+        self.listeners.append(listener)
+
+    def declare(self, consumer: str, service: str, fields: Optional[Iterable[str]]):
+        """Set the stream labels `consumer` reads from `service` (None for all)"""
+        before = self.union(service)
+        self.declarations.setdefault(service, {})[consumer] = None if fields is None else set(fields)
+        self._notify(service, before)
+
+    def declare_normalized(self, consumer: str, service: str, names: Iterable[str]):
+        """Declare normalized names ('bid', 'last', ...) for a Level One or chart service"""
+        self.declare(consumer, service, labels_for(service, names))
+
+    def withdraw(self, consumer: str, service: Optional[str] = None):
+        """Remove a consumer's declarations (for one service or all)"""
+        services = [service] if service else list(self.declarations)
+        for name in services:
+            declared = self.declarations.get(name, {})
+            if consumer in declared:
+                before = self.union(name)
+                del declared[consumer]
+                self._notify(name, before)
+
+    def union(self, service: str) -> Optional[List[str]]:
+        """Sorted labels to request for `service`, or None for the full field set"""
+        declared = self.declarations.get(service)
+        if not declared:
+            return None
+        fields = {KEY_FIELD}
+        for consumer_fields in declared.values():
+            if consumer_fields is None:
+                return None
+            fields.update(consumer_fields)
+        return sorted(fields)
+
+    def _notify(self, service: str, before: Optional[List[str]]):
+        after = self.union(service)
+        if after != before:
+            for listener in self.listeners:
+                listener(service, after)
+
+
+def stream_fields(stream_client_class, service: str, labels: Optional[List[str]]) -> Optional[list]:
+    """schwab-py field enum members for `labels`
+
+    A label the enum does not know is a typo in a declaration, which
+    would otherwise subscribe without that field and never update it.
+    """
+    if labels is None:
+        return None
+    enum = getattr(stream_client_class, FIELD_ENUMS[service], None)
+    if enum is None:
+        return None
+    unknown = [label for label in labels if label not in enum.__members__]
+    if unknown:
+        raise ValueError(f"Unknown {service} fields: {', '.join(unknown)}")
+    return [enum[label] for label in labels]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Fixed-Point Prices for Schwab Streaming Client
+Scaled integer prices, tick-grid formatting and array-backed price ladders
+
+Every normalized price field (`PRICE_FIELDS`) is converted once, at decode
+time, to an int in units of 1 / PRICE_SCALE: 187.42 becomes 187420000.
+Books, bars, alerts and storage compare and key on those integers, so
+two quotes at the same level are always equal and never differ by float
+noise. Convert back with `to_price` (or `float_fields` for a whole record)
+only where prices are shown or handed to JSON consumers.
+"""
+
+import bisect
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+# Six decimals covers equities (sub-penny), futures ticks and forex pipettes
+PRICE_SCALE = 1000000
+
+# Missing price in integer columns and binary records
+NULL_PRICE = -(1 << 63)
+
+# Normalized fields that hold prices (see asset_classes.py)
+PRICE_FIELDS = frozenset({
+    'bid', 'ask', 'last', 'open', 'high', 'low', 'close', 'net_change', 'mark', 'settlement', 'tick',
+})
+
+ONE_DOLLAR = PRICE_SCALE
+PENNY = PRICE_SCALE // 100
+
+
+def to_fixed(price) -> Optional[int]:
+    """Float price -> scaled int (None stays None)"""
+    if price is None:
+        return None
+    return round(price * PRICE_SCALE)
+
+
+def to_price(fixed) -> Optional[float]:
+    """Scaled int -> float price for display (None and NULL_PRICE become None)"""
+    if fixed is None or fixed == NULL_PRICE:
+        return None
+    return fixed / PRICE_SCALE
+
+
+# NumPy is imported by the two array helpers only, so asset_classes and the
+# scalar conversions load without it (see cli.py)
+
+def to_prices(fixed: 'np.ndarray') -> 'np.ndarray':
+    """Scaled int64 array -> float64 with NaN for NULL_PRICE"""
+    import numpy as np
+    values = fixed.astype(np.float64) / PRICE_SCALE
+    values[fixed == NULL_PRICE] = np.nan
+    return values
+
+
+def to_fixed_array(prices) -> 'np.ndarray':
+    """Float prices -> scaled int64 array with NULL_PRICE for NaN"""
+    import numpy as np
+    prices = np.asarray(prices, dtype=np.float64)
+    fixed = np.round(prices * PRICE_SCALE)
+    missing = np.isnan(fixed)
+    fixed[missing] = 0
+    fixed = fixed.astype(np.int64)
+    fixed[missing] = NULL_PRICE
+    return fixed
+
+
+def fixed_fields(fields: Dict[str, object]) -> Dict[str, object]:
+    """Normalized record with float prices -> the same record with scaled int prices"""
+    return {name: to_fixed(value) if name in PRICE_FIELDS else value for name, value in fields.items()}
+
+
+def float_fields(fields: Optional[Dict[str, object]]) -> Optional[Dict[str, object]]:
+    """Normalized record with scaled int prices -> float prices, for display and JSON"""
+    if fields is None:
+        return None
+    return {name: to_price(value) if name in PRICE_FIELDS else value for name, value in fields.items()}
+
+
+def decimals(tick: int) -> int:
+    """Decimal places needed to print prices on a tick grid (0.25 -> 2, 0.00001 -> 5)"""
+    for places in range(7):
+        if tick % (PRICE_SCALE // 10 ** places) == 0:
+            return places
+    return 6
+
+
+def format_price(fixed, places: int = 2) -> str:
+    price = to_price(fixed)
+    return '-' if price is None else f'{price:.{places}f}'
+
+
+class PriceLadder:
+    """One side of a book as parallel typed arrays of integer prices and sizes
+
+    Prices are kept ascending, so a level is found with one bisection and
+    matched exactly; a level costs 16 bytes instead of a dict entry.
+    `descending` only changes which end is the best level.
+    """
+
+    __slots__ = ('prices', 'sizes', 'descending')
+
+    def __init__(self, descending: bool = False):
+        self.prices = array('q')
+        self.sizes = array('q')
+        self.descending = descending
+
+    @classmethod
+    def from_levels(cls, levels: Iterable[Tuple[int, int]], descending: bool = False) -> 'PriceLadder':
+        ladder = cls(descending)
+        for price, size in sorted(levels):
+            ladder.prices.append(price)
+            ladder.sizes.append(size)
+        return ladder
+
+    def set(self, price: int, size: int):
+        """Set the size at a price level; a size of 0 removes the level"""
+        index = bisect.bisect_left(self.prices, price)
+        present = index < len(self.prices) and self.prices[index] == price
+        if size:
+            if present:
+                self.sizes[index] = size
+            else:
+                self.prices.insert(index, price)
+                self.sizes.insert(index, size)
+        elif present:
+            del self.prices[index]
+            del self.sizes[index]
+
+    def size_at(self, price: int) -> int:
+        index = bisect.bisect_left(self.prices, price)
+        if index < len(self.prices) and self.prices[index] == price:
+            return self.sizes[index]
+        return 0
+
+    def best(self) -> Optional[Tuple[int, int]]:
+        """(price, size) of the best level, None when empty"""
+        if not self.prices:
+            return None
+        index = 0 if not self.descending else len(self.prices) - 1
+        return self.prices[index], self.sizes[index]
+
+    def levels(self, count: Optional[int] = None) -> list:
+        """(price, size) pairs best first"""
+        pairs = list(zip(self.prices, self.sizes))
+        if self.descending:
+            pairs.reverse()
+        return pairs[:count] if count is not None else pairs
+
+    def ticks_from_best(self, price: int, tick: int) -> Optional[int]:
+        """Distance of a price from the best level in ticks"""
+        best = self.best()
+        if best is None:
+            return None
+        return abs(price - best[0]) // tick
+
+    def __len__(self):
+        return len(self.prices)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Handler Execution Policies for Schwab Streaming Client
+Run slow or blocking handlers on a thread or process pool while keeping
+per-symbol ordering and bounding the work in flight
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from memory_budget import deep_sizeof
+from stream_logging import get_logger, kv
+
+logger = get_logger('handler_executor')
+
+INLINE = 'inline'
+THREAD = 'thread'
+PROCESS = 'process'
+
+# What to do with a new message when a handler's in-flight limit is reached
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+CONFLATE = 'conflate'
+
+
+class HandlerPolicy:
+    """How a handler is executed
+
+    mode          inline (on the event loop), thread or process
+    max_in_flight messages queued or running for this handler
+    overflow      drop_newest, drop_oldest or conflate once the limit is hit;
+                  conflate merges the new content into the symbol's pending
+                  message, so the handler sees the latest fields once, and
+                  drops it when the symbol has none queued
+    """
+
+    def __init__(self, mode: str = INLINE, max_in_flight: int = 1000, overflow: str = CONFLATE):
+        if mode not in (INLINE, THREAD, PROCESS):
+            raise ValueError(f"Unknown handler execution mode: {mode}")
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, CONFLATE):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.mode = mode
+        self.max_in_flight = max_in_flight
+        self.overflow = overflow
+
+
+class KeyedExecutor:
+    """Runs one handler on a pool, one message at a time per key
+
+    Messages for the same key (symbol) are queued behind the running one,
+    so a key's messages are handled in order while different keys run in
+    parallel. All bookkeeping happens on the event loop thread; pool
+    completions are handed back with call_soon_threadsafe.
+    """
+
+    def __init__(self, name: str, handler: Callable, pool: concurrent.futures.Executor,
+                 policy: HandlerPolicy):
+        self.name = name
+        self.handler = handler
+        self.pool = pool
+        self.policy = policy
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[Hashable, Deque[dict]] = {}
+        self._running: set = set()
+        self.in_flight = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.max_in_flight_seen = 0
+
+    def submit(self, key: Hashable, message: dict):
+        """Queue a message for `key` (call from the event loop thread)"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self.submitted += 1
+        pending = self._pending.get(key)
+
+        if self.in_flight >= self.policy.max_in_flight:
+            if self.policy.overflow == DROP_OLDEST and pending:
+                pending.popleft()
+                self.in_flight -= 1
+                self.dropped += 1
+            elif self.policy.overflow == CONFLATE and pending:
+                # Fold into the queued message: newer fields win
+                pending[-1] = self._conflate(pending[-1], message)
+                self.conflated += 1
+                return
+            else:
+                # Nothing queued to fold into: a new slot would go over the limit
+                self.dropped += 1
+                return
+
+        self.in_flight += 1
+        self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+        if key in self._running:
+            self._pending.setdefault(key, collections.deque()).append(message)
+        else:
+            self._start(key, message)
+
+    @staticmethod
+    def _conflate(queued: dict, message: dict) -> dict:
+        # Messages can be shared with other handlers, so build a new one
+        merged: Dict[object, dict] = {item.get('key'): item for item in queued.get('content', [])}
+        for item in message.get('content', []):
+            previous = merged.get(item.get('key'))
+            merged[item.get('key')] = {**previous, **item} if previous else item
+        return dict(queued, content=list(merged.values()), **{
+            name: value for name, value in message.items() if name != 'content'})
+
+    def _start(self, key: Hashable, message: dict):
+        self._running.add(key)
+        future = self.pool.submit(self.handler, message)
+        future.add_done_callback(lambda f: self._loop.call_soon_threadsafe(self._done, key, f))
+
+    def _done(self, key: Hashable, future: concurrent.futures.Future):
+        self.in_flight -= 1
+        self.completed += 1
+        error = future.exception()
+        if error is not None:
+            self.errors += 1
+            logger.warning("Handler %s failed: %s", self.name, error, extra=kv(symbol=key))
+
+        pending = self._pending.get(key)
+        if pending:
+            message = pending.popleft()
+            if not pending:
+                del self._pending[key]
+            self._start(key, message)
+        else:
+            self._running.discard(key)
+
+    def shed(self, count: int) -> int:
+        """Drop up to `count` queued messages, oldest keys first; running ones finish"""
+        shed = 0
+        for key in list(self._pending):
+            pending = self._pending[key]
+            while pending and shed < count:
+                pending.popleft()
+                shed += 1
+            if not pending:
+                del self._pending[key]
+            if shed >= count:
+                break
+        self.in_flight -= shed
+        self.dropped += shed
+        return shed
+
+    def queued(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.policy.mode,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight_seen,
+        }
+
+
+def split_by_symbol(message: dict) -> List[Tuple[Hashable, dict]]:
+    """Split a stream message into one message per content key"""
+    content = message.get('content', [])
+    if len(content) <= 1:
+        return [(content[0].get('key') if content else None, message)]
+    groups: Dict[Hashable, list] = {}
+    for item in content:
+        groups.setdefault(item.get('key'), []).append(item)
+    return [(key, dict(message, content=items)) for key, items in groups.items()]
+
+
+class HandlerExecutors:
+    """Shared thread and process pools for offloaded handlers"""
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._threads: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._processes: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.executors: List[KeyedExecutor] = []
+
+    def _pool(self, mode: str) -> concurrent.futures.Executor:
+        if mode == THREAD:
+            if self._threads is None:
+                self._threads = concurrent.futures.ThreadPoolExecutor(
+                    self.thread_workers, thread_name_prefix='handler')
+            return self._threads
+        if self._processes is None:
+            self._processes = concurrent.futures.ProcessPoolExecutor(self.process_workers)
+        return self._processes
+
+    def wrap(self, service: str, handler: Callable, policy: HandlerPolicy) -> Callable:
+        """Return a stream handler that hands each symbol's content to the pool
+
+        Process mode needs a picklable (module level) handler; it receives
+        a copy of the message and its return value is discarded.
+        """
+        name = f"{service}:{getattr(handler, '__qualname__', repr(handler))}"
+        executor = KeyedExecutor(name, handler, self._pool(policy.mode), policy)
+        self.executors.append(executor)
+
+        def offloaded_handler(message):
+            for key, part in split_by_symbol(message):
+                executor.submit(key, part)
+
+        offloaded_handler.__qualname__ = name
+        return offloaded_handler
+
+    def memory_bytes(self) -> int:
+        return deep_sizeof([executor._pending for executor in self.executors])
+
+    def trim(self, limit_bytes: int, size_bytes: int) -> int:
+        """Drop queued messages until the estimated queue size is under `limit_bytes`"""
+        queued = sum(executor.queued() for executor in self.executors)
+        if size_bytes <= limit_bytes or not queued:
+            return 0
+        count = int((size_bytes - limit_bytes) / (size_bytes / queued)) + 1
+        shed = 0
+        for executor in self.executors:
+            shed += executor.shed(count - shed)
+        return shed
+
+    def stats(self) -> Dict[str, dict]:
+        return {executor.name: executor.stats() for executor in self.executors}
+
+    def shutdown(self, wait: bool = True):
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+        self._threads = None
+        self._processes = None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Instrument Metadata Cache for Schwab Streaming Client
+Primary exchange and asset type per symbol, fetched in bulk and persisted
+locally, used to route book subscriptions to the right service
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('instruments')
+
+DEFAULT_CACHE_PATH = 'instrument_cache.json'
+
+# Listing exchange -> book service; instruments listed elsewhere (NYSE Arca,
+# Cboe, OTC, ...) have no Level Two book on the Schwab streamer
+BOOK_SERVICES = {
+    'NASDAQ': 'NASDAQ_BOOK',
+    'NYSE': 'NYSE_BOOK',
+}
+
+BOOK_ASSET_TYPES = {'EQUITY', 'ETF'}
+
+# get_instruments accepts a list of symbols per call
+LOOKUP_BATCH_SIZE = 200
+
+
+class InstrumentCache:
+    """Symbol -> {"exchange", "asset_type", "description", "fetched_at"}
+
+    Entries older than `max_age_days` are fetched again; symbols the
+    lookup does not know are remembered as unknown so they are not looked
+    up on every start.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = 7.0):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.instruments: Dict[str, Dict[str, object]] = {}
+        self.lookups = 0
+        self.lookup_errors = 0
+
+    def load(self) -> int:
+        """Read the persisted cache; returns the number of entries"""
+        try:
+            with open(self.path, 'r') as f:
+                self.instruments = json.load(f)
+        except FileNotFoundError:
+            self.instruments = {}
+        except ValueError as e:
+            logger.warning("Ignoring unreadable instrument cache: %s", e, extra=kv(path=self.path))
+            self.instruments = {}
+        return len(self.instruments)
+
+    def save(self):
+        """Write the cache atomically"""
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.instruments, f, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def missing(self, symbols: List[str]) -> List[str]:
+        """Symbols with no entry or an expired one"""
+        cutoff = time.time() - self.max_age
+        return [s for s in symbols if s not in self.instruments or self.instruments[s].get('fetched_at', 0) < cutoff]
+
+    def _lookup(self, client, symbols: List[str]) -> List[dict]:
+        response = client.get_instruments(symbols, client.Instrument.Projection.SYMBOL_SEARCH)
+        if response.status_code != 200:
+            raise Exception(f"Failed to look up instruments: {response.text}")
+        return response.json().get('instruments', [])
+
+    async def refresh(self, client, symbols: List[str], executor: Optional[Executor] = None) -> int:
+        """Look up missing or expired symbols in concurrent batches and persist the result
+
+        Batches run on `executor` (the loop's default one if None). Returns
+        the number of symbols looked up. Symbols whose batch failed are left
+        without an entry so the caller can fall back for them.
+        """
+        symbols = self.missing(symbols)
+        if not symbols:
+            return 0
+        loop = asyncio.get_running_loop()
+        batches = [symbols[i:i + LOOKUP_BATCH_SIZE] for i in range(0, len(symbols), LOOKUP_BATCH_SIZE)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, self._lookup, client, batch) for batch in batches
+        ), return_exceptions=True)
+
+        now = time.time()
+        for batch, result in zip(batches, results):
+            self.lookups += 1
+            if isinstance(result, Exception):
+                self.lookup_errors += 1
+                logger.warning("Instrument lookup failed: %s", result, extra=kv(symbols=len(batch)))
+                continue
+            found = {}
+            for instrument in result:
+                symbol = instrument.get('symbol')
+                if symbol:
+                    found[symbol] = {
+                        'exchange': instrument.get('exchange'),
+                        'asset_type': instrument.get('assetType'),
+                        'description': instrument.get('description'),
+                        'fetched_at': now,
+                    }
+            for symbol in batch:
+                self.instruments[symbol] = found.get(symbol) or {
+                    'exchange': None, 'asset_type': None, 'description': None, 'fetched_at': now}
+        self.save()
+        return len(symbols)
+
+    def book_service(self, symbol: str) -> Optional[str]:
+        """NASDAQ_BOOK or NYSE_BOOK for the symbol's listing exchange, None if it has no book"""
+        info = self.instruments.get(symbol)
+        if not info or info.get('asset_type') not in BOOK_ASSET_TYPES:
+            return None
+        exchange = (info.get('exchange') or '').upper()
+        return BOOK_SERVICES.get(exchange)
+
+    def route_books(self, symbols: List[str]) -> Tuple[Dict[str, List[str]], List[str], List[str]]:
+        """Split symbols by book service
+
+        Returns ({service: symbols}, skipped, unresolved): skipped symbols
+        are known to have no book, unresolved ones have no cache entry
+        (their lookup failed).
+        """
+        routes: Dict[str, List[str]] = {}
+        skipped = []
+        unresolved = []
+        for symbol in symbols:
+            if symbol not in self.instruments:
+                unresolved.append(symbol)
+                continue
+            service = self.book_service(symbol)
+            if service is None:
+                skipped.append(symbol)
+            else:
+                routes.setdefault(service, []).append(symbol)
+        return routes, skipped, unresolved
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Market State for Schwab Streaming Client
+Latest normalized quote, book and bar state per symbol, shared by every sink
+"""
+
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fixed_point import PriceLadder
+from memory_budget import sampled_sizeof
+
+# Listener signature: (asset_class, symbol, changed_fields)
+QuoteListener = Callable[[str, str, Dict[str, object]], None]
+
+# Eviction listener signature: (evicted_symbols)
+EvictionListener = Callable[[List[str]], None]
+
+# Recorder signature: (kind, asset_class or venue, symbol, record) for every
+# 'quote', 'book' and 'bar' update, in the order they are applied
+Recorder = Callable[[str, Optional[str], str, Dict[str, object]], None]
+
+# Compact record: (interned field names, values)
+Packed = Tuple[Tuple[str, ...], tuple]
+
+# Full depth of one venue's book: (bid ladder, ask ladder)
+Ladders = Tuple[PriceLadder, PriceLadder]
+
+
+class MarketState:
+    """Latest normalized quote fields per symbol
+
+    Every Level One service is decoded into the same field names (see
+    `asset_classes.py`) and merged here; listeners receive only the
+    fields a message carried.
+
+    `updated_at` is kept in least-recently-updated order, so idle symbols
+    can be packed into tuples (`compact_idle`) and the oldest symbols
+    evicted (`evict_lru`, `trim`) without scanning. Packed symbols are
+    unpacked on their next update and read through `get_quote`,
+    `get_bar` and `best_book`.
+
+    Book updates can also carry every level as a pair of PriceLadders
+    (`get_ladders`); ladders are already compact arrays, so they are
+    neither packed nor checkpointed, and the next book message rebuilds
+    them.
+
+    State restored from a checkpoint (`restore`) is marked stale per
+    symbol until the symbol's first live update.
+    """
+
+    def __init__(self):
+        self.quotes: Dict[str, Dict[str, object]] = {}
+        self.books: Dict[str, Dict[str, Dict[str, object]]] = {}
+        self.bars: Dict[str, Dict[str, object]] = {}
+        self.ladders: Dict[str, Dict[str, Ladders]] = {}
+        self.asset_classes: Dict[str, str] = {}
+        self.versions: Dict[str, int] = {}
+        self.updated_at: Dict[str, float] = {}
+        self.listeners: List[QuoteListener] = []
+        self.eviction_listeners: List[EvictionListener] = []
+        self.recorders: List[Recorder] = []
+        # Symbols restored from a checkpoint and not yet confirmed by a live update
+        self.stale: Set[str] = set()
+
+        # symbol -> (quote, {venue: book}, bar) in packed form
+        self.idle: Dict[str, Tuple[Optional[Packed], Dict[str, Packed], Optional[Packed]]] = {}
+        self._layouts: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        # Versions come from one counter so they stay monotonic across eviction
+        self._version_clock = itertools.count(1)
+
+        self.compacted = 0
+        self.evicted = 0
+
+    def add_listener(self, listener: QuoteListener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: QuoteListener):
+        self.listeners.remove(listener)
+
+    def add_eviction_listener(self, listener: EvictionListener):
+        """Called with the symbols removed by evict_lru so dependents can drop their state"""
+        self.eviction_listeners.append(listener)
+
+    def add_recorder(self, recorder: Recorder):
+        """Called with every applied update, e.g. to journal it"""
+        self.recorders.append(recorder)
+
+    def update_quote(self, asset_class: str, symbol: str, fields: Dict[str, object]):
+        """Merge fields into a symbol's quote and notify listeners"""
+        if symbol in self.idle:
+            self._unpack_symbol(symbol)
+        quote = self.quotes.get(symbol)
+        if quote is None:
+            quote = self.quotes[symbol] = {}
+            self.asset_classes[symbol] = asset_class
+        quote.update(fields)
+        self._touch(symbol)
+        for recorder in self.recorders:
+            recorder('quote', asset_class, symbol, fields)
+
+        for listener in self.listeners:
+            listener(asset_class, symbol, fields)
+
+    def update_book(self, venue: str, symbol: str, top: Dict[str, object],
+                    ladders: Optional[Ladders] = None):
+        """Replace a symbol's top of book, and its ladders if given, for one venue (NASDAQ, NYSE)"""
+        if symbol in self.idle:
+            self._unpack_symbol(symbol)
+        self.books.setdefault(symbol, {})[venue] = top
+        if ladders is not None:
+            self.ladders.setdefault(symbol, {})[venue] = ladders
+        self._touch(symbol)
+        for recorder in self.recorders:
+            recorder('book', venue, symbol, top)
+
+    def update_bar(self, symbol: str, bar: Dict[str, object]):
+        """Replace a symbol's latest chart bar; an older bar (a gap refill) is only recorded"""
+        if symbol in self.idle:
+            self._unpack_symbol(symbol)
+        current = self.bars.get(symbol)
+        if current is None or (bar.get('time') or 0) >= (current.get('time') or 0):
+            self.bars[symbol] = bar
+            self._touch(symbol)
+        for recorder in self.recorders:
+            recorder('bar', None, symbol, bar)
+
+    def _touch(self, symbol: str):
+        self.versions[symbol] = next(self._version_clock)
+        # Re-inserting moves the symbol to the most recently updated end
+        self.updated_at.pop(symbol, None)
+        self.updated_at[symbol] = time.time()
+        if self.stale:
+            self.stale.discard(symbol)
+
+    def best_book(self, symbol: str) -> Optional[Dict[str, object]]:
+        """Most recently received top of book across venues"""
+        venues = self.get_books(symbol)
+        if not venues:
+            return None
+        return max(venues.values(), key=lambda top: top.get('time') or 0)
+
+    def get_quote(self, symbol: str) -> Optional[Dict[str, object]]:
+        quote = self.quotes.get(symbol)
+        if quote is None and symbol in self.idle:
+            return self._unpack(self.idle[symbol][0])
+        return quote
+
+    def get_books(self, symbol: str) -> Optional[Dict[str, Dict[str, object]]]:
+        """Top of book per venue"""
+        venues = self.books.get(symbol)
+        if venues is None and symbol in self.idle:
+            venues = {venue: self._unpack(packed) for venue, packed in self.idle[symbol][1].items()}
+        return venues or None
+
+    def get_ladders(self, symbol: str, venue: str) -> Optional[Ladders]:
+        """(bid ladder, ask ladder) of one venue's last book message"""
+        return self.ladders.get(symbol, {}).get(venue)
+
+    def get_bar(self, symbol: str) -> Optional[Dict[str, object]]:
+        bar = self.bars.get(symbol)
+        if bar is None and symbol in self.idle:
+            return self._unpack(self.idle[symbol][2])
+        return bar
+
+    def is_stale(self, symbol: str) -> bool:
+        """True while a restored symbol has not had a live update"""
+        return symbol in self.stale
+
+    def symbols(self, asset_class: Optional[str] = None) -> List[str]:
+        if asset_class is None:
+            return list(self.quotes) + [s for s, packed in self.idle.items() if packed[0] is not None]
+        return [s for s, ac in self.asset_classes.items() if ac == asset_class]
+
+    # Memory management
+
+    def _pack(self, record: Optional[Dict[str, object]]) -> Optional[Packed]:
+        if record is None:
+            return None
+        names = tuple(record)
+        names = self._layouts.setdefault(names, names)
+        return names, tuple(record.values())
+
+    @staticmethod
+    def _unpack(packed: Optional[Packed]) -> Optional[Dict[str, object]]:
+        if packed is None:
+            return None
+        return dict(zip(*packed))
+
+    def _unpack_symbol(self, symbol: str):
+        quote, books, bar = self.idle.pop(symbol)
+        if quote is not None:
+            self.quotes[symbol] = self._unpack(quote)
+        if books:
+            self.books[symbol] = {venue: self._unpack(packed) for venue, packed in books.items()}
+        if bar is not None:
+            self.bars[symbol] = self._unpack(bar)
+
+    def compact_idle(self, idle_seconds: float) -> int:
+        """Pack symbols not updated for `idle_seconds` into tuples with shared field names"""
+        cutoff = time.time() - idle_seconds
+        packed = 0
+        for symbol, updated in self.updated_at.items():
+            if updated >= cutoff:
+                break
+            if symbol in self.idle:
+                continue
+            venues = self.books.pop(symbol, None) or {}
+            self.idle[symbol] = (
+                self._pack(self.quotes.pop(symbol, None)),
+                {venue: self._pack(top) for venue, top in venues.items()},
+                self._pack(self.bars.pop(symbol, None)),
+            )
+            packed += 1
+        self.compacted += packed
+        return packed
+
+    def evict_lru(self, count: int) -> List[str]:
+        """Remove the `count` least recently updated symbols and notify eviction listeners"""
+        evicted = list(itertools.islice(self.updated_at, count))
+        for symbol in evicted:
+            self.quotes.pop(symbol, None)
+            self.books.pop(symbol, None)
+            self.bars.pop(symbol, None)
+            self.ladders.pop(symbol, None)
+            self.idle.pop(symbol, None)
+            self.asset_classes.pop(symbol, None)
+            self.versions.pop(symbol, None)
+            self.stale.discard(symbol)
+            del self.updated_at[symbol]
+        self.evicted += len(evicted)
+        if evicted:
+            for listener in self.eviction_listeners:
+                listener(evicted)
+        return evicted
+
+    def evict_older_than(self, max_age_seconds: float) -> List[str]:
+        """Remove symbols not updated for `max_age_seconds`"""
+        cutoff = time.time() - max_age_seconds
+        count = 0
+        for updated in self.updated_at.values():
+            if updated >= cutoff:
+                break
+            count += 1
+        return self.evict_lru(count)
+
+    def memory_bytes(self) -> int:
+        """Estimated size of everything but the ladders (see `ladder_bytes`), from sampled symbols"""
+        seen: set = set()
+        return sum(sampled_sizeof(table, seen=seen) for table in (
+            self.quotes, self.books, self.bars, self.idle, self.asset_classes, self.versions, self.updated_at))
+
+    def ladder_bytes(self) -> int:
+        return sampled_sizeof(self.ladders)
+
+    def trim(self, limit_bytes: int, idle_seconds: float = 300.0, size_bytes: Optional[int] = None) -> int:
+        """Bring the state under `limit_bytes`: pack idle symbols, then evict the oldest
+
+        The eviction count comes from `size_bytes` (measured once by the
+        caller) and the average symbol; what packing saved shows up at the
+        next measurement. Returns the number of symbols packed or evicted.
+        """
+        if size_bytes is None:
+            size_bytes = self.memory_bytes()
+        changed = self.compact_idle(idle_seconds)
+        if size_bytes > limit_bytes and self.updated_at:
+            per_symbol = size_bytes / len(self.updated_at)
+            changed += len(self.evict_lru(int((size_bytes - limit_bytes) / per_symbol) + 1))
+        return changed
+
+    def trim_ladders(self, limit_bytes: int, size_bytes: Optional[int] = None) -> int:
+        """Drop the book ladders of the least recently updated symbols, keeping their top of book
+
+        A dropped symbol gets its ladders back with its next book message.
+        Returns the number of symbols whose ladders were dropped.
+        """
+        if size_bytes is None:
+            size_bytes = self.ladder_bytes()
+        if size_bytes <= limit_bytes or not self.ladders:
+            return 0
+        count = int((size_bytes - limit_bytes) / (size_bytes / len(self.ladders))) + 1
+        dropped = 0
+        for symbol in self.updated_at:
+            if dropped >= count:
+                break
+            if self.ladders.pop(symbol, None) is not None:
+                dropped += 1
+        return dropped
+
+    # Checkpoints
+
+    def export(self) -> Dict[str, dict]:
+        """Plain dicts of every symbol's state (idle symbols unpacked), oldest first"""
+        quotes, books, bars = {}, {}, {}
+        for symbol in self.updated_at:
+            quote = self.get_quote(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+            venues = self.get_books(symbol)
+            if venues:
+                books[symbol] = venues
+            bar = self.get_bar(symbol)
+            if bar is not None:
+                bars[symbol] = bar
+        return {
+            'quotes': quotes,
+            'books': books,
+            'bars': bars,
+            'asset_classes': dict(self.asset_classes),
+            'updated_at': dict(self.updated_at),
+        }
+
+    def restore(self, data: Dict[str, dict]) -> int:
+        """Load an `export` without notifying listeners; every symbol is marked stale
+
+        Returns the number of symbols restored.
+        """
+        self.quotes = data.get('quotes', {})
+        self.books = data.get('books', {})
+        self.bars = data.get('bars', {})
+        self.asset_classes = data.get('asset_classes', {})
+        self.ladders.clear()
+        self.idle.clear()
+        updated_at = data.get('updated_at', {})
+        self.updated_at = dict(sorted(updated_at.items(), key=lambda item: item[1]))
+        self.versions = {symbol: next(self._version_clock) for symbol in self.updated_at}
+        self.stale = set(self.updated_at)
+        return len(self.updated_at)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Memory Budgets for Schwab Streaming Client
+Per-subsystem memory accounting, budgets and periodic trimming for
+sessions that run through a full trading day
+"""
+
+import asyncio
+import itertools
+import os
+import resource
+import sys
+from typing import Callable, Dict, Optional
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('memory')
+
+MB = 1024 * 1024
+
+# Entries walked per dict by sampled_sizeof
+SAMPLE_ENTRIES = 200
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate retained size of an object graph (containers, strings, numbers)"""
+    if seen is None:
+        seen = set()
+    obj_id = id(obj)
+    if obj_id in seen:
+        return 0
+    seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif hasattr(obj, '__slots__'):
+        for name in obj.__slots__:
+            if hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+def sampled_sizeof(mapping: dict, sample: int = SAMPLE_ENTRIES, seen: Optional[set] = None) -> int:
+    """Estimated deep_sizeof of a dict from `sample` evenly spaced entries
+
+    The cost is bounded by the sample, not the dict, so budgets can be
+    checked on the event loop at any number of symbols. Dicts up to
+    `sample` entries are measured exactly. Share `seen` across the dicts
+    of one structure so keys they have in common are counted once.
+    """
+    if seen is None:
+        seen = set()
+    count = len(mapping)
+    if count <= sample:
+        return deep_sizeof(mapping, seen)
+    entries = 0
+    size = 0
+    for key, value in itertools.islice(mapping.items(), 0, None, count // sample):
+        size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+        entries += 1
+    return sys.getsizeof(mapping) + size * count // entries
+
+
+def parse_budgets(value: str) -> Dict[str, int]:
+    """'book_ladders=64,handler_queues=32' (MB) -> {subsystem: limit in bytes}"""
+    budgets = {}
+    for entry in value.split(','):
+        name, _, megabytes = entry.partition('=')
+        if name.strip():
+            budgets[name.strip()] = int(float(megabytes) * MB)
+    return budgets
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Trim callback: (limit_bytes, measured_bytes) -> entries removed
+TrimCallback = Callable[[int, int], int]
+
+
+class Subsystem:
+    """One accounted structure: how to measure it and how to shrink it"""
+
+    def __init__(self, name: str, measure: Callable[[], int],
+                 trim: Optional[TrimCallback] = None, limit_bytes: Optional[int] = None):
+        self.name = name
+        self.measure = measure
+        self.trim = trim
+        self.limit_bytes = limit_bytes
+        self.last_bytes = 0
+        self.trimmed = 0
+
+
+class MemoryBudget:
+    """Registry of memory budgets checked on a fixed interval
+
+    Each subsystem reports its size with `measure()`, once per check. When
+    it is over its limit, `trim(limit_bytes, measured_bytes)` is asked to
+    release entries, sizing the cut from the measured bytes rather than
+    measuring again, and returns how many it removed; the next check sees
+    the result. Subsystems without a trim callback are only reported.
+    """
+
+    def __init__(self, interval: float = 30.0, report_every: int = 10):
+        self.interval = interval
+        self.report_every = report_every
+        self.subsystems: Dict[str, Subsystem] = {}
+        self.checks = 0
+        self.baseline_rss = current_rss()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, measure: Callable[[], int],
+                 trim: Optional[TrimCallback] = None, limit_bytes: Optional[int] = None):
+        self.subsystems[name] = Subsystem(name, measure, trim, limit_bytes)
+
+    def enforce(self) -> Dict[str, int]:
+        """Measure every subsystem and trim the ones over budget; returns entries trimmed"""
+        trimmed = {}
+        for subsystem in self.subsystems.values():
+            size = subsystem.measure()
+            if subsystem.trim and subsystem.limit_bytes is not None and size > subsystem.limit_bytes:
+                removed = subsystem.trim(subsystem.limit_bytes, size)
+                subsystem.trimmed += removed
+                trimmed[subsystem.name] = removed
+                logger.info("Trimmed %s", subsystem.name, extra=kv(
+                    entries=removed, size_mb=round(size / MB, 2), limit_mb=round(subsystem.limit_bytes / MB, 2)))
+            subsystem.last_bytes = size
+        self.checks += 1
+        return trimmed
+
+    def report(self) -> Dict[str, dict]:
+        """Last measured size, limit and trim count per subsystem, plus process RSS"""
+        report = {
+            name: {
+                # As measured at the last check, before any trim
+                'size_mb': round(subsystem.last_bytes / MB, 3),
+                'limit_mb': None if subsystem.limit_bytes is None else round(subsystem.limit_bytes / MB, 3),
+                'trimmed': subsystem.trimmed,
+            }
+            for name, subsystem in self.subsystems.items()
+        }
+        rss = current_rss()
+        report['process'] = {
+            'rss_mb': round(rss / MB, 2),
+            'growth_mb': round((rss - self.baseline_rss) / MB, 2),
+        }
+        return report
+
+    def log_report(self):
+        for name, fields in self.report().items():
+            logger.info("Memory %s", name, extra=kv(**fields))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.enforce()
+            if self.report_every and self.checks % self.report_every == 0:
+                self.log_report()
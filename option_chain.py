@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Option Chain Streaming for Schwab Streaming Client
+Bulk chain resolution, chunked LEVELONE_OPTIONS subscriptions and
+array-backed contract state indexed by (expiry, strike, put/call)
+"""
+
+import asyncio
+import bisect
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fixed_point import NULL_PRICE, to_fixed
+
+CALL = 0
+PUT = 1
+
+# Contract prices, kept as scaled integers (fixed_point.py)
+CHAIN_PRICE_FIELDS = ('BID_PRICE', 'ASK_PRICE', 'LAST_PRICE', 'MARK')
+
+# Streamed contract fields kept per chain, one array per field
+CHAIN_FIELDS = (
+    'BID_PRICE', 'ASK_PRICE', 'LAST_PRICE', 'MARK',
+    'BID_SIZE', 'ASK_SIZE', 'TOTAL_VOLUME', 'OPEN_INTEREST',
+    'VOLATILITY', 'DELTA', 'GAMMA', 'THETA', 'VEGA', 'RHO',
+)
+
+# Streamed per contract but kept once per chain (it moves the ATM window)
+UNDERLYING_FIELD = 'UNDERLYING_PRICE'
+
+# Every LEVELONE_OPTIONS field a chain reads
+CHAIN_STREAM_FIELDS = CHAIN_FIELDS + (UNDERLYING_FIELD,)
+
+# Option chain REST response keys mapped to the streaming field names
+REST_FIELD_MAP = {
+    'bid': 'BID_PRICE',
+    'ask': 'ASK_PRICE',
+    'last': 'LAST_PRICE',
+    'mark': 'MARK',
+    'bidSize': 'BID_SIZE',
+    'askSize': 'ASK_SIZE',
+    'totalVolume': 'TOTAL_VOLUME',
+    'openInterest': 'OPEN_INTEREST',
+    'volatility': 'VOLATILITY',
+    'delta': 'DELTA',
+    'gamma': 'GAMMA',
+    'theta': 'THETA',
+    'vega': 'VEGA',
+    'rho': 'RHO',
+}
+
+# Schwab accepts a few hundred keys per SUBS/ADD request
+DEFAULT_CHUNK_SIZE = 500
+
+NAN = float('nan')
+
+
+def fixed_or_null(value) -> int:
+    """Price -> scaled int, NULL_PRICE for NaN (the REST chain sends NaN for missing values)"""
+    value = float(value)
+    return NULL_PRICE if math.isnan(value) else to_fixed(value)
+
+
+class OptionChain:
+    """Contract state for one underlying stored in flat arrays
+
+    Every field is an array over a dense (expiry, strike, put/call) grid,
+    so a whole expiry is a contiguous slice and an ATM window is a
+    sub-slice of it. Prices (`CHAIN_PRICE_FIELDS`), strikes and the
+    underlying price are scaled integers in `array('q')` with NULL_PRICE
+    for slots without a listed contract; sizes and greeks are
+    `array('d')` with NaN.
+    """
+
+    def __init__(self, underlying: str, expiries: Iterable[str], strikes: Iterable[int]):
+        self.underlying = underlying
+        self.expiries: List[str] = sorted(set(expiries))
+        self.strikes: List[int] = sorted(set(strikes))
+        self._expiry_index = {expiry: i for i, expiry in enumerate(self.expiries)}
+        self._strike_index = {strike: i for i, strike in enumerate(self.strikes)}
+
+        size = len(self.expiries) * len(self.strikes) * 2
+        self.columns: Dict[str, array] = {
+            field: array('q', [NULL_PRICE]) * size if field in CHAIN_PRICE_FIELDS else array('d', [NAN]) * size
+            for field in CHAIN_FIELDS
+        }
+        self.symbols: List[Optional[str]] = [None] * size
+        self.slots: Dict[str, int] = {}
+        self.underlying_price = NULL_PRICE
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def slot(self, expiry: str, strike: int, put_call: int) -> int:
+        """Flat array index of a contract (`strike` scaled like every price)"""
+        return ((self._expiry_index[expiry] * len(self.strikes)) + self._strike_index[strike]) * 2 + put_call
+
+    def add_contract(self, symbol: str, expiry: str, strike: int, put_call: int) -> int:
+        slot = self.slot(expiry, strike, put_call)
+        self.symbols[slot] = symbol
+        self.slots[symbol] = slot
+        return slot
+
+    @classmethod
+    def from_chain_response(cls, data: dict) -> 'OptionChain':
+        """Build a chain from a `get_option_chain` JSON response"""
+        expiries = set()
+        strikes = set()
+        contracts: List[Tuple[dict, str, int, int]] = []
+
+        for map_name, put_call in (('callExpDateMap', CALL), ('putExpDateMap', PUT)):
+            for expiry_key, strike_map in data.get(map_name, {}).items():
+                # Keys look like "2024-06-21:30" (date:days to expiration)
+                expiry = expiry_key.split(':')[0]
+                expiries.add(expiry)
+                for strike_key, entries in strike_map.items():
+                    strike = to_fixed(float(strike_key))
+                    strikes.add(strike)
+                    for contract in entries:
+                        contracts.append((contract, expiry, strike, put_call))
+
+        chain = cls(data.get('symbol', ''), expiries, strikes)
+        underlying_price = data.get('underlyingPrice')
+        if underlying_price is not None:
+            chain.underlying_price = fixed_or_null(underlying_price)
+        for contract, expiry, strike, put_call in contracts:
+            slot = chain.add_contract(contract['symbol'], expiry, strike, put_call)
+            for rest_key, field in REST_FIELD_MAP.items():
+                value = contract.get(rest_key)
+                if value is not None:
+                    chain._set(field, slot, value)
+        return chain
+
+    def _set(self, field: str, slot: int, value):
+        self.columns[field][slot] = fixed_or_null(value) if field in CHAIN_PRICE_FIELDS else float(value)
+
+    def apply_update(self, item: dict) -> bool:
+        """Apply the fields present in a LEVELONE_OPTIONS content item"""
+        slot = self.slots.get(item.get('key'))
+        if slot is None:
+            return False
+        for field in CHAIN_FIELDS:
+            value = item.get(field)
+            if value is not None:
+                self._set(field, slot, value)
+        underlying_price = item.get(UNDERLYING_FIELD)
+        if underlying_price is not None:
+            self.underlying_price = fixed_or_null(underlying_price)
+        self.updates += 1
+        return True
+
+    def get(self, expiry: str, strike: int, put_call: int, field: str):
+        """One contract field: a scaled int for prices, a float otherwise"""
+        return self.columns[field][self.slot(expiry, strike, put_call)]
+
+    def expiry_slice(self, expiry: str, field: str) -> Tuple[List[int], array, array]:
+        """Strikes plus call and put values of `field` for a whole expiry"""
+        return self._strike_window(expiry, 0, len(self.strikes), field)
+
+    def atm_strike_index(self) -> int:
+        """Index of the strike nearest to the underlying price"""
+        if not self.strikes or self.underlying_price == NULL_PRICE:
+            raise ValueError(f"No underlying price known for {self.underlying}")
+        index = bisect.bisect_left(self.strikes, self.underlying_price)
+        if index == len(self.strikes):
+            return index - 1
+        if index > 0 and self.underlying_price - self.strikes[index - 1] <= self.strikes[index] - self.underlying_price:
+            return index - 1
+        return index
+
+    def atm_slice(self, expiry: str, width: int, field: str) -> Tuple[List[int], array, array]:
+        """Strikes plus call and put values for ATM ± `width` strikes"""
+        atm = self.atm_strike_index()
+        return self._strike_window(expiry, max(0, atm - width), min(len(self.strikes), atm + width + 1), field)
+
+    def _strike_window(self, expiry: str, first: int, last: int, field: str) -> Tuple[List[int], array, array]:
+        base = self._expiry_index[expiry] * len(self.strikes) * 2
+        column = self.columns[field]
+        start, end = base + first * 2, base + last * 2
+        return self.strikes[first:last], column[start:end:2], column[start + 1:end:2]
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the field arrays"""
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+
+def chunked(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class OptionChainStreamer:
+    """Resolves option chains over REST and streams their contracts"""
+
+    def __init__(self, client, stream_client, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.client = client
+        self.stream_client = stream_client
+        self.chunk_size = chunk_size
+        self.chains: Dict[str, OptionChain] = {}
+        self._contract_chains: Dict[str, OptionChain] = {}
+        self._subscribed = False
+        self.unknown_contracts = 0
+
+    def _fetch_chain(self, underlying: str, chain_kwargs: dict) -> OptionChain:
+        response = self.client.get_option_chain(underlying, **chain_kwargs)
+        if response.status_code != 200:
+            raise Exception(f"Failed to get option chain for {underlying}: {response.text}")
+        return OptionChain.from_chain_response(response.json())
+
+    async def resolve_chains(self, underlyings: List[str], **chain_kwargs) -> Dict[str, OptionChain]:
+        """Fetch chains for all underlyings concurrently"""
+        loop = asyncio.get_running_loop()
+        chains = await asyncio.gather(*(
+            loop.run_in_executor(None, self._fetch_chain, underlying, chain_kwargs)
+            for underlying in underlyings
+        ))
+        for underlying, chain in zip(underlyings, chains):
+            previous = self.chains.get(underlying)
+            if previous is not None:
+                # Re-resolved (e.g. after an expiry rolled off): forget contracts no longer listed
+                for symbol in previous.slots:
+                    if symbol not in chain.slots:
+                        self._contract_chains.pop(symbol, None)
+            self.chains[underlying] = chain
+            for symbol in chain.slots:
+                self._contract_chains[symbol] = chain
+        return dict(zip(underlyings, chains))
+
+    async def subscribe(self, underlyings: Optional[List[str]] = None, fields: Optional[list] = None,
+                        replace: bool = False) -> int:
+        """Subscribe to every resolved contract in chunks
+
+        `fields` is passed through as the explicit field list; `replace`
+        starts over with SUBS (used when the field list changes).
+        """
+        chains = [self.chains[u] for u in underlyings] if underlyings else list(self.chains.values())
+        symbols = [symbol for chain in chains for symbol in chain.slots]
+        if replace:
+            self._subscribed = False
+        options = {} if fields is None else {'fields': fields}
+
+        for chunk in chunked(symbols, self.chunk_size):
+            # SUBS replaces the service's subscription set, later chunks must ADD
+            if self._subscribed:
+                await self.stream_client.level_one_option_add(chunk, **options)
+            else:
+                await self.stream_client.level_one_option_subs(chunk, **options)
+                self._subscribed = True
+        return len(symbols)
+
+    def on_level_one_option(self, message: dict):
+        """Stream handler for LEVELONE_OPTIONS messages"""
+        for item in message.get('content', []):
+            chain = self._contract_chains.get(item.get('key'))
+            if chain is None:
+                self.unknown_contracts += 1
+                continue
+            chain.apply_update(item)
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Multi-process Decode Pipeline for Schwab Streaming Client
+The reader only copies raw frames into a shared-memory ring; worker
+processes decode them, route content by symbol partition and run the
+handlers, and their results are merged back in the reader process.
+
+Stages:
+    reader (event loop)   raw frame -> FrameRing slot (seq)
+    decode (worker k)     frames with seq % N == k -> json.loads -> items split by partition
+    handle (worker p)     items of partition p, in frame order -> handler -> results
+    merge (event loop)    results -> on_result callback
+
+Every worker plays both roles. Decode is spread by frame, handling by
+symbol, and each partition re-orders its inbox by frame sequence so a
+symbol's updates are always handled in arrival order.
+"""
+
+import asyncio
+import heapq
+import json
+import multiprocessing
+import queue
+import struct
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asset_classes import ASSET_CLASSES, decode_book_ladders, decode_chart, ladder_top
+from field_selection import FIELD_ENUMS
+from stream_logging import get_logger, kv
+
+logger = get_logger('pipeline')
+
+# Slot header: sequence stamp (written last) and payload length
+SLOT_HEADER = struct.Struct('<qI')
+SLOT_STAMP = struct.Struct('<q')
+SLOT_LENGTH = struct.Struct('<I')
+CURSOR = struct.Struct('<q')
+# Payload length marking a frame too large for a slot; the bytes travel
+# through the decoder's overflow queue instead
+OVERFLOW = 0xFFFFFFFF
+
+DEFAULT_SLOTS = 512
+DEFAULT_SLOT_SIZE = 128 * 1024
+
+# Items and results are shipped between processes in batches
+INBOX_BATCH_FRAMES = 32
+RESULT_BATCH_SIZE = 256
+
+# Reader counters at the start of the shared metrics array
+READER_COUNTERS = ('frames_published', 'bytes_published', 'ring_full_waits', 'overflow_frames')
+FRAMES_PUBLISHED, BYTES_PUBLISHED, RING_FULL_WAITS, OVERFLOW_FRAMES = range(len(READER_COUNTERS))
+# Per-worker counters following them
+WORKER_COUNTERS = (
+    'frames_decoded', 'decode_ns', 'items_routed', 'items_handled', 'handle_ns',
+    'handler_errors', 'results', 'reorder_pending', 'inbox_batches',
+)
+
+# Book enums of schwab-py's StreamClient, applied as its _BookHandler does:
+# the item, then each price level, then each level's per-exchange entries
+# (nested under the same BIDS/ASKS key)
+BOOK_ENUMS = {'NASDAQ_BOOK': 'BookFields', 'NYSE_BOOK': 'BookFields', 'OPTIONS_BOOK': 'BookFields'}
+BOOK_LEVEL_ENUMS = {'BIDS': ('BidFields', 'PerExchangeBidFields'), 'ASKS': ('AskFields', 'PerExchangeAskFields')}
+
+# Handler factory: called once in each worker with its partition index and
+# returns handler(service, item) -> result or None. It must be picklable
+# (a module level function) because workers are spawned.
+HandlerFactory = Callable[[int], Callable[[str, dict], Optional[object]]]
+
+
+def partition_of(symbol: str, partitions: int) -> int:
+    """Stable symbol -> partition mapping (identical in every process)"""
+    return zlib.crc32(symbol.encode()) % partitions
+
+
+class FrameRing:
+    """Single-writer shared-memory ring of fixed-size frame slots
+
+    Slot `seq % slots` carries frame `seq`. Its header sequence stamp is
+    written after the payload, so a reader polling for `seq` never sees a
+    partially written frame. Frame `seq` is read only by decoder
+    `seq % readers`, whose cursor (next sequence it expects) tells the
+    writer when the slot may be reused.
+    """
+
+    def __init__(self, slots: int, slot_size: int, readers: int, name: Optional[str] = None):
+        if slots % readers:
+            raise ValueError("Ring slot count must be a multiple of the worker count")
+        self.slots = slots
+        self.slot_size = slot_size
+        self.readers = readers
+        self.payload_size = slot_size - SLOT_HEADER.size
+        cursors_size = readers * CURSOR.size
+        size = cursors_size + slots * slot_size
+
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.buf = self.shm.buf
+        self._base = cursors_size
+        if self.owner:
+            for reader in range(readers):
+                CURSOR.pack_into(self.buf, reader * CURSOR.size, reader)
+            for slot in range(slots):
+                SLOT_HEADER.pack_into(self.buf, self._base + slot * slot_size, -1, 0)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def cursor(self, reader: int) -> int:
+        return CURSOR.unpack_from(self.buf, reader * CURSOR.size)[0]
+
+    def set_cursor(self, reader: int, value: int):
+        CURSOR.pack_into(self.buf, reader * CURSOR.size, value)
+
+    def writable(self, seq: int) -> bool:
+        """True once the previous occupant of seq's slot has been consumed"""
+        return self.cursor(seq % self.readers) > seq - self.slots
+
+    def write(self, seq: int, frame: bytes) -> bool:
+        """Store a frame; returns False if it did not fit (overflow marker written)"""
+        offset = self._base + (seq % self.slots) * self.slot_size
+        length = len(frame)
+        fits = length <= self.payload_size
+        if fits:
+            start = offset + SLOT_HEADER.size
+            self.buf[start:start + length] = frame
+        # Length before stamp: a reader that sees the stamp sees the whole slot
+        SLOT_LENGTH.pack_into(self.buf, offset + SLOT_STAMP.size, length if fits else OVERFLOW)
+        SLOT_STAMP.pack_into(self.buf, offset, seq)
+        return fits
+
+    def read(self, seq: int) -> Optional[memoryview]:
+        """Payload of frame `seq`, None if not written yet, or b'' for an overflow frame"""
+        offset = self._base + (seq % self.slots) * self.slot_size
+        stamp, length = SLOT_HEADER.unpack_from(self.buf, offset)
+        if stamp != seq:
+            return None
+        if length == OVERFLOW:
+            return memoryview(b'')
+        start = offset + SLOT_HEADER.size
+        return self.buf[start:start + length]
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _enum_labels(enum) -> Dict[str, str]:
+    return {str(member.value): member.name for member in enum}
+
+
+def _load_field_labels() -> Tuple[Dict[str, Dict[str, str]], Dict[str, Tuple[Dict[str, str], Dict[str, str]]]]:
+    """Numeric field id -> field name per service, and per book side for levels and exchanges
+
+    The pipeline reads raw websocket frames, which bypass schwab-py's own
+    relabelling. Without schwab-py the numeric keys are kept.
+    """
+    try:
+        from schwab.streaming import StreamClient
+    except ImportError:
+        return {}, {}
+
+    labels = {}
+    for service, enum_name in list(FIELD_ENUMS.items()) + list(BOOK_ENUMS.items()):
+        enum = getattr(StreamClient, enum_name, None)
+        if enum is not None:
+            labels[service] = _enum_labels(enum)
+    level_labels = {side: (_enum_labels(getattr(StreamClient, level)), _enum_labels(getattr(StreamClient, exchange)))
+                    for side, (level, exchange) in BOOK_LEVEL_ENUMS.items()}
+    return labels, level_labels
+
+
+def relabel_item(item: dict, labels: Dict[str, str],
+                 level_labels: Optional[Dict[str, Tuple[Dict[str, str], Dict[str, str]]]] = None) -> dict:
+    """A raw content item with field names for numeric ids; `level_labels` also relabels book levels"""
+    item = {labels.get(k, k): v for k, v in item.items()}
+    if level_labels:
+        for side, (side_labels, exchange_labels) in level_labels.items():
+            levels = item.get(side)
+            if not levels:
+                continue
+            relabelled = []
+            for level in levels:
+                level = {side_labels.get(k, k): v for k, v in level.items()}
+                exchanges = level.get(side)
+                if exchanges:
+                    level[side] = [{exchange_labels.get(k, k): v for k, v in entry.items()} for entry in exchanges]
+                relabelled.append(level)
+            item[side] = relabelled
+    return item
+
+
+def normalized_update_factory(partition: int) -> Callable[[str, dict], Optional[tuple]]:
+    """Default handler: decode items into the market state's normalized records
+
+    Results are ('quote', asset_class, symbol, fields), ('book', venue,
+    symbol, top, ladders) or ('bar', symbol, bar) tuples for `merge_into_state`.
+    """
+    level_one = {spec.service: spec for spec in ASSET_CLASSES.values()}
+    books = {'NASDAQ_BOOK': 'NASDAQ', 'NYSE_BOOK': 'NYSE'}
+
+    def handle(service: str, item: dict) -> Optional[tuple]:
+        message = {'content': [item]}
+        spec = level_one.get(service)
+        if spec is not None:
+            for symbol, fields in spec.decode(message):
+                return ('quote', spec.name, symbol, fields)
+        elif service in books:
+            for symbol, book_time, bids, asks in decode_book_ladders(message):
+                return ('book', books[service], symbol, ladder_top(book_time, bids, asks), (bids, asks))
+        elif service == 'CHART_EQUITY':
+            for symbol, bar in decode_chart(message):
+                return ('bar', symbol, bar)
+        return None
+
+    return handle
+
+
+def merge_into_state(state, result: tuple):
+    """Apply a `normalized_update_factory` result to a MarketState"""
+    kind = result[0]
+    if kind == 'quote':
+        state.update_quote(result[1], result[2], result[3])
+    elif kind == 'book':
+        state.update_book(result[1], result[2], result[3], result[4] if len(result) > 4 else None)
+    elif kind == 'bar':
+        state.update_bar(result[1], result[2])
+
+
+def _worker_main(index: int, workers: int, ring_name: str, slots: int, slot_size: int,
+                 metrics, inboxes, overflow, results, stop, handler_factory: HandlerFactory):
+    """Worker process: decode owned frames, handle owned partition"""
+    ring = FrameRing(slots, slot_size, workers, name=ring_name)
+    handler = handler_factory(index)
+    labels, level_labels = _load_field_labels()
+    inbox = inboxes[index]
+    base = len(READER_COUNTERS) + index * len(WORKER_COUNTERS)
+    counter = {name: base + i for i, name in enumerate(WORKER_COUNTERS)}
+
+    next_frame = index
+    outgoing: List[List[Tuple[int, list]]] = [[] for _ in range(workers)]
+    pending: List[Tuple[int, list]] = []
+    next_handled = 0
+    result_batch: List[object] = []
+    idle_sleep = 0.0001
+
+    def flush_outgoing():
+        for partition, batch in enumerate(outgoing):
+            if batch:
+                inboxes[partition].put(batch)
+                outgoing[partition] = []
+
+    def flush_results():
+        nonlocal result_batch
+        if result_batch:
+            results.put(result_batch)
+            metrics[counter['results']] += len(result_batch)
+            result_batch = []
+
+    try:
+        while not stop.is_set():
+            busy = False
+
+            # Decode stage: frames owned by this worker
+            payload = ring.read(next_frame)
+            if payload is not None:
+                busy = True
+                started = time.perf_counter_ns()
+                raw = bytes(payload) if len(payload) else overflow[index].get()
+                ring.set_cursor(index, next_frame + workers)
+                routed: List[list] = [[] for _ in range(workers)]
+                try:
+                    frame = json.loads(raw)
+                except ValueError:
+                    frame = {}
+                for entry in frame.get('data', ()):
+                    service = entry.get('service')
+                    service_labels = labels.get(service)
+                    service_levels = level_labels if service in BOOK_ENUMS else None
+                    for item in entry.get('content', ()):
+                        if service_labels:
+                            item = relabel_item(item, service_labels, service_levels)
+                        key = item.get('key')
+                        if key is None:
+                            continue
+                        routed[partition_of(key, workers)].append((service, item))
+                        metrics[counter['items_routed']] += 1
+                # Every partition hears about every frame so it can keep order
+                for partition in range(workers):
+                    outgoing[partition].append((next_frame, routed[partition]))
+                metrics[counter['frames_decoded']] += 1
+                metrics[counter['decode_ns']] += time.perf_counter_ns() - started
+                next_frame += workers
+                if len(outgoing[0]) >= INBOX_BATCH_FRAMES:
+                    flush_outgoing()
+            else:
+                flush_outgoing()
+
+            # Handle stage: this partition's items in frame order
+            try:
+                batch = inbox.get_nowait()
+            except queue.Empty:
+                batch = None
+            if batch is not None:
+                busy = True
+                metrics[counter['inbox_batches']] += 1
+                for entry in batch:
+                    heapq.heappush(pending, entry)
+            started = time.perf_counter_ns()
+            handled = 0
+            while pending and pending[0][0] == next_handled:
+                _, items = heapq.heappop(pending)
+                next_handled += 1
+                for service, item in items:
+                    handled += 1
+                    try:
+                        result = handler(service, item)
+                    except Exception:
+                        metrics[counter['handler_errors']] += 1
+                        continue
+                    if result is not None:
+                        result_batch.append(result)
+                if len(result_batch) >= RESULT_BATCH_SIZE:
+                    flush_results()
+            if handled:
+                metrics[counter['items_handled']] += handled
+                metrics[counter['handle_ns']] += time.perf_counter_ns() - started
+            metrics[counter['reorder_pending']] = len(pending)
+
+            if busy:
+                idle_sleep = 0.0001
+            else:
+                flush_results()
+                time.sleep(idle_sleep)
+                idle_sleep = min(idle_sleep * 2, 0.005)
+    finally:
+        flush_outgoing()
+        flush_results()
+        ring.close()
+
+
+class DecodePipeline:
+    """Reader-side handle of the multi-process pipeline"""
+
+    def __init__(self, workers: int = 0, handler_factory: HandlerFactory = normalized_update_factory,
+                 slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE):
+        self.workers = workers or max(1, multiprocessing.cpu_count() - 1)
+        # Round the slot count so each slot always maps to the same decoder
+        self.slots = max(slots // self.workers, 1) * self.workers
+        self.slot_size = slot_size
+        self.handler_factory = handler_factory
+
+        self._context = multiprocessing.get_context('spawn')
+        self.ring: Optional[FrameRing] = None
+        self.metrics = None
+        self._processes = []
+        self._inboxes = []
+        self._overflow = []
+        self._results = None
+        self._stop = None
+        self._seq = 0
+        self.results_merged = 0
+
+    def start(self):
+        """Create the ring and spawn the workers"""
+        context = self._context
+        self.ring = FrameRing(self.slots, self.slot_size, self.workers)
+        self.metrics = context.Array('q', len(READER_COUNTERS) + self.workers * len(WORKER_COUNTERS), lock=False)
+        self._inboxes = [context.Queue() for _ in range(self.workers)]
+        self._overflow = [context.Queue() for _ in range(self.workers)]
+        self._results = context.Queue()
+        self._stop = context.Event()
+
+        for index in range(self.workers):
+            process = context.Process(
+                target=_worker_main, name=f'pipeline-worker-{index}', daemon=True,
+                args=(index, self.workers, self.ring.name, self.slots, self.slot_size, self.metrics,
+                      self._inboxes, self._overflow, self._results, self._stop, self.handler_factory),
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info("Decode pipeline started", extra=kv(workers=self.workers, slots=self.slots,
+                                                         slot_size=self.slot_size))
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers and release the ring"""
+        if self._stop is None:
+            return
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self.ring.close()
+        self.ring = None
+        self._stop = None
+
+    def publish(self, frame) -> bool:
+        """Copy one raw frame into the ring without blocking; False if the ring is full"""
+        if isinstance(frame, str):
+            frame = frame.encode()
+        seq = self._seq
+        metrics = self.metrics
+        if not self.ring.writable(seq):
+            metrics[RING_FULL_WAITS] += 1
+            return False
+        if not self.ring.write(seq, frame):
+            self._overflow[seq % self.workers].put(frame)
+            metrics[OVERFLOW_FRAMES] += 1
+        self._seq = seq + 1
+        metrics[FRAMES_PUBLISHED] += 1
+        metrics[BYTES_PUBLISHED] += len(frame)
+        return True
+
+    async def put(self, frame):
+        """Publish a frame, yielding to the event loop while the ring is full"""
+        while not self.publish(frame):
+            await asyncio.sleep(0.0005)
+
+    def drain_results(self, on_result: Callable[[object], None], max_batches: int = 64) -> int:
+        """Merge available worker results into `on_result`; returns the count"""
+        merged = 0
+        for _ in range(max_batches):
+            try:
+                batch = self._results.get_nowait()
+            except queue.Empty:
+                break
+            for result in batch:
+                on_result(result)
+            merged += len(batch)
+        self.results_merged += merged
+        return merged
+
+    async def merge_results(self, on_result: Callable[[object], None]):
+        """Event loop task that keeps merging worker results"""
+        while True:
+            if not self.drain_results(on_result):
+                await asyncio.sleep(0.001)
+
+    def stats(self) -> dict:
+        """Per-stage counters and queue depths"""
+        metrics = self.metrics
+        reader = {name: metrics[i] for i, name in enumerate(READER_COUNTERS)}
+        consumed = min(self.ring.cursor(r) for r in range(self.workers)) if self.ring else self._seq
+        reader['ring_depth'] = max(0, self._seq - consumed)
+
+        workers = []
+        for index in range(self.workers):
+            base = len(READER_COUNTERS) + index * len(WORKER_COUNTERS)
+            worker = {name: metrics[base + i] for i, name in enumerate(WORKER_COUNTERS)}
+            try:
+                worker['inbox_depth'] = self._inboxes[index].qsize()
+            except NotImplementedError:
+                # qsize() is unavailable on macOS
+                worker['inbox_depth'] = None
+            workers.append(worker)
+
+        try:
+            results_depth = self._results.qsize()
+        except NotImplementedError:
+            results_depth = None
+        return {
+            'reader': reader,
+            'workers': workers,
+            'merge': {'results_merged': self.results_merged, 'results_depth': results_depth},
+        }
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Portfolio P&L for Schwab Streaming Client
+Positions loaded once per account and marked from the Level One stream:
+an update touches only the positions in its symbol, and account and
+portfolio totals are running sums adjusted by each position's change
+
+Market values and P&L are scaled integers like prices (fixed_point.py),
+in units of 1 / PRICE_SCALE dollars, so the running sums stay equal to a
+full recomputation however many ticks they absorb. Account activity on the
+stream (fills, cancels, transfers) queues the account for a positions
+reload, coalesced like the sequence gap refills.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from asset_classes import ASSET_CLASSES
+from fixed_point import PRICE_SCALE, to_fixed, to_price
+from memory_budget import deep_sizeof
+from stream_logging import get_logger, kv
+
+logger = get_logger('portfolio')
+
+MARK = 'mark'
+LAST = 'last'
+MID = 'mid'
+
+# Normalized fields each mark policy reads
+MARK_FIELDS = {MARK: ('mark',), LAST: ('last',), MID: ('bid', 'ask')}
+
+# Position instrument assetType -> asset class streamed for it; options,
+# mutual funds and fixed income have no Level One quotes here and stay unmarked
+ASSET_TYPES = {
+    'EQUITY': 'equity',
+    'ETF': 'equity',
+    'COLLECTIVE_INVESTMENT': 'equity',
+    'FUTURE': 'futures',
+    'FOREX': 'forex',
+}
+
+# Account activity message types that do not change positions
+QUIET_ACTIVITY = frozenset({'SUBSCRIBED', 'ERROR'})
+
+
+class Position:
+    """One holding in one account
+
+    `cost` is average price x quantity x multiplier, fixed when the
+    position loads, so marking is one multiplication and one subtraction.
+    """
+
+    __slots__ = ('account', 'symbol', 'asset_class', 'quantity', 'average_price', 'multiplier',
+                 'cost', 'mark', 'market_value', 'unrealized')
+
+    def __init__(self, account: str, symbol: str, asset_class: Optional[str], quantity: float,
+                 average_price: int, multiplier: float = 1):
+        self.account = account
+        self.symbol = symbol
+        self.asset_class = asset_class
+        self.quantity = quantity
+        self.average_price = average_price
+        self.multiplier = multiplier
+        self.cost = round(average_price * quantity * multiplier)
+        self.mark: Optional[int] = None
+        self.market_value: Optional[int] = None
+        self.unrealized: Optional[int] = None
+
+    def as_dict(self) -> dict:
+        return {
+            'account': self.account, 'symbol': self.symbol, 'asset_class': self.asset_class,
+            'quantity': self.quantity, 'average_price': to_price(self.average_price),
+            'multiplier': self.multiplier, 'mark': to_price(self.mark),
+            'market_value': to_price(self.market_value), 'unrealized': to_price(self.unrealized),
+        }
+
+
+class Totals:
+    """Running sums over a set of positions (one account, or the whole portfolio)"""
+
+    __slots__ = ('positions', 'unmarked', 'market_value', 'long_exposure', 'short_exposure', 'unrealized')
+
+    def __init__(self):
+        self.positions = 0
+        self.unmarked = 0
+        self.market_value = 0
+        self.long_exposure = 0
+        self.short_exposure = 0
+        self.unrealized = 0
+
+    def apply(self, old_value: Optional[int], old_unrealized: Optional[int],
+              new_value: Optional[int], new_unrealized: Optional[int]):
+        """Move one position's contribution from its old value to its new one"""
+        if old_value is None:
+            self.unmarked -= 1
+        else:
+            self.market_value -= old_value
+            self.unrealized -= old_unrealized
+            if old_value >= 0:
+                self.long_exposure -= old_value
+            else:
+                self.short_exposure += old_value
+        if new_value is None:
+            self.unmarked += 1
+        else:
+            self.market_value += new_value
+            self.unrealized += new_unrealized
+            if new_value >= 0:
+                self.long_exposure += new_value
+            else:
+                self.short_exposure -= new_value
+
+    def as_dict(self) -> dict:
+        """Totals in dollars"""
+        return {
+            'positions': self.positions,
+            'unmarked': self.unmarked,
+            'market_value': self.market_value / PRICE_SCALE,
+            'long_exposure': self.long_exposure / PRICE_SCALE,
+            'short_exposure': self.short_exposure / PRICE_SCALE,
+            'gross_exposure': (self.long_exposure + self.short_exposure) / PRICE_SCALE,
+            'unrealized': self.unrealized / PRICE_SCALE,
+        }
+
+
+def parse_positions(account: dict) -> Tuple[str, List[Position]]:
+    """(account number, positions) from one get_accounts/get_account entry"""
+    securities = account.get('securitiesAccount', account)
+    number = str(securities.get('accountNumber'))
+    positions = []
+    for entry in securities.get('positions') or ():
+        instrument = entry.get('instrument') or {}
+        symbol = instrument.get('symbol')
+        quantity = (entry.get('longQuantity') or 0) - (entry.get('shortQuantity') or 0)
+        if not symbol or not quantity:
+            continue
+        asset_class = ASSET_TYPES.get(instrument.get('assetType'))
+        if asset_class:
+            symbol = ASSET_CLASSES[asset_class].normalize_symbol(symbol)
+        if quantity == int(quantity):
+            quantity = int(quantity)
+        positions.append(Position(number, symbol, asset_class, quantity, to_fixed(entry.get('averagePrice') or 0.0)))
+    return number, positions
+
+
+class Portfolio:
+    """Positions by account, marked incrementally by a MarketState listener
+
+    `mark` picks the price a position is marked at: the Level One `mark`
+    field, the `last` trade, or the `mid` of bid and ask.
+    """
+
+    def __init__(self, state=None, mark: str = MARK):
+        if mark not in MARK_FIELDS:
+            raise ValueError(f"Unknown mark policy: {mark}")
+        self.state = state
+        self.mark_policy = mark
+        self.accounts: Dict[str, List[Position]] = {}
+        self.by_symbol: Dict[str, List[Position]] = {}
+        self.account_totals: Dict[str, Totals] = {}
+        self.totals = Totals()
+        # Last mark and futures multiplier per symbol, kept across position reloads
+        self.marks: Dict[str, int] = {}
+        self.multipliers: Dict[str, float] = {}
+        # Symbol -> [bid, ask] for the mid policy
+        self._sides: Dict[str, List[Optional[int]]] = {}
+
+        self.client = None
+        self.account_hashes: Dict[str, str] = {}
+        self.pending: set = set()
+        self.interval = 1.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.ticks = 0
+        self.revaluations = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def fields(self) -> Tuple[str, ...]:
+        """Normalized Level One fields the marks need (futures also read the multiplier)"""
+        return MARK_FIELDS[self.mark_policy] + ('multiplier',)
+
+    def symbols(self) -> Dict[str, List[str]]:
+        """Held symbols by asset class, for subscriptions"""
+        symbols: Dict[str, List[str]] = {}
+        for symbol, positions in self.by_symbol.items():
+            asset_class = positions[0].asset_class
+            if asset_class:
+                symbols.setdefault(asset_class, []).append(symbol)
+        return symbols
+
+    # Loading
+
+    def set_positions(self, account: str, positions: Iterable[Position]):
+        """Replace an account's positions; totals are adjusted by the difference"""
+        totals = self.account_totals.get(account)
+        if totals is None:
+            totals = self.account_totals[account] = Totals()
+        for position in self.accounts.pop(account, ()):
+            self._remove(position, totals)
+        held = self.accounts[account] = []
+        for position in positions:
+            held.append(position)
+            self.by_symbol.setdefault(position.symbol, []).append(position)
+            totals.positions += 1
+            self.totals.positions += 1
+            totals.unmarked += 1
+            self.totals.unmarked += 1
+            # Quotes that arrived before the symbol was held only reached the state
+            quote = None
+            if self.state is not None and (position.symbol not in self.multipliers
+                                           or position.symbol not in self.marks):
+                quote = self.state.get_quote(position.symbol) or {}
+            multiplier = self.multipliers.get(position.symbol)
+            if multiplier is None and quote:
+                multiplier = quote.get('multiplier')
+                if multiplier:
+                    self.multipliers[position.symbol] = multiplier
+            if multiplier:
+                self._set_multiplier(position, multiplier)
+            mark = self.marks.get(position.symbol)
+            if mark is None and quote is not None:
+                mark = self._mark_from(quote, position.symbol)
+            if mark is not None:
+                self._revalue(position, mark)
+
+    def _remove(self, position: Position, totals: Totals):
+        totals.apply(position.market_value, position.unrealized, None, None)
+        self.totals.apply(position.market_value, position.unrealized, None, None)
+        totals.positions -= 1
+        totals.unmarked -= 1
+        self.totals.positions -= 1
+        self.totals.unmarked -= 1
+        positions = self.by_symbol[position.symbol]
+        positions.remove(position)
+        if not positions:
+            del self.by_symbol[position.symbol]
+
+    def load(self, client, account_hashes: Optional[Dict[str, str]] = None) -> int:
+        """Load every account's positions with one get_accounts call (blocking); returns the position count
+
+        With `account_hashes` (account number -> hash, as resolved by the
+        client) only those accounts are kept, and activity reloads use them.
+        """
+        self.client = client
+        if account_hashes:
+            self.account_hashes = dict(account_hashes)
+        response = client.get_accounts(fields=[client.Account.Fields.POSITIONS])
+        if response.status_code != 200:
+            raise Exception(f"Failed to get accounts: {response.text}")
+        for account in response.json():
+            number, positions = parse_positions(account)
+            if not self.account_hashes or number in self.account_hashes:
+                self.set_positions(number, positions)
+        logger.info("Loaded positions", extra=kv(accounts=len(self.accounts), positions=self.totals.positions))
+        return self.totals.positions
+
+    # Marking
+
+    def _mark_from(self, fields: Dict[str, object], symbol: str) -> Optional[int]:
+        """Mark price from a symbol's changed fields, None if the policy's fields are absent"""
+        if self.mark_policy != MID:
+            return fields.get(self.mark_policy)
+        bid, ask = fields.get('bid'), fields.get('ask')
+        if bid is None and ask is None:
+            return None
+        sides = self._sides.get(symbol)
+        if sides is None:
+            sides = self._sides[symbol] = [None, None]
+        if bid is not None:
+            sides[0] = bid
+        if ask is not None:
+            sides[1] = ask
+        if sides[0] is None or sides[1] is None:
+            return None
+        return (sides[0] + sides[1]) // 2
+
+    def _set_multiplier(self, position: Position, multiplier: float):
+        position.multiplier = multiplier
+        position.cost = round(position.average_price * position.quantity * multiplier)
+
+    def _revalue(self, position: Position, mark: int):
+        old_value, old_unrealized = position.market_value, position.unrealized
+        value = round(mark * position.quantity * position.multiplier)
+        unrealized = value - position.cost
+        position.mark = mark
+        position.market_value = value
+        position.unrealized = unrealized
+        self.account_totals[position.account].apply(old_value, old_unrealized, value, unrealized)
+        self.totals.apply(old_value, old_unrealized, value, unrealized)
+        self.revaluations += 1
+
+    def on_quote(self, asset_class: str, symbol: str, fields: Dict[str, object]):
+        """MarketState listener: re-mark the positions in `symbol` (one dict lookup for other symbols)"""
+        positions = self.by_symbol.get(symbol)
+        if positions is None:
+            return
+        self.ticks += 1
+        multiplier = fields.get('multiplier')
+        if multiplier and multiplier != self.multipliers.get(symbol):
+            self.multipliers[symbol] = multiplier
+            for position in positions:
+                self._set_multiplier(position, multiplier)
+                if position.mark is not None:
+                    self._revalue(position, position.mark)
+        mark = self._mark_from(fields, symbol)
+        if mark is None:
+            return
+        self.marks[symbol] = mark
+        for position in positions:
+            self._revalue(position, mark)
+
+    # Account activity
+
+    def on_account_activity(self, message: dict):
+        """ACCT_ACTIVITY handler: queue the accounts that had activity for a positions reload"""
+        for item in message.get('content', []):
+            if item.get('MESSAGE_TYPE') in QUIET_ACTIVITY:
+                continue
+            account = str(item.get('ACCOUNT'))
+            if account in self.accounts and account in self.account_hashes:
+                self.pending.add(account)
+
+    def start(self, client=None):
+        if client is not None:
+            self.client = client
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _fetch(self, account: str) -> dict:
+        response = self.client.get_account(self.account_hashes[account],
+                                           fields=[self.client.Account.Fields.POSITIONS])
+        if response.status_code != 200:
+            raise Exception(f"Failed to get account: {response.text}")
+        return response.json()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.pending:
+                continue
+            pending, self.pending = sorted(self.pending), set()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(None, self._fetch, account) for account in pending
+            ), return_exceptions=True)
+            for account, result in zip(pending, results):
+                self.reloads += 1
+                if isinstance(result, Exception):
+                    self.reload_errors += 1
+                    logger.warning("Positions reload failed: %s", result, extra=kv(account=account))
+                    continue
+                self.set_positions(account, parse_positions(result)[1])
+
+    # Reporting
+
+    def positions(self, account: Optional[str] = None) -> List[Position]:
+        if account is not None:
+            return list(self.accounts.get(account, ()))
+        return [position for positions in self.accounts.values() for position in positions]
+
+    def report(self) -> dict:
+        return dict(self.totals.as_dict(), accounts=len(self.accounts), ticks=self.ticks,
+                    revaluations=self.revaluations, reloads=self.reloads, reload_errors=self.reload_errors)
+
+    def memory_bytes(self) -> int:
+        return deep_sizeof([self.accounts, self.marks, self.multipliers, self._sides])
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Instrumentation for Schwab Streaming Client
+Opt-in handler timing, decode timing, event loop lag, allocation
+snapshots and an on-demand sampling profiler
+"""
+
+import asyncio
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('profiling')
+
+
+class TimingStats:
+    """Count, total and maximum of a duration in nanoseconds"""
+
+    __slots__ = ('count', 'total_ns', 'max_ns', 'over_budget')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.over_budget = 0
+
+    def add(self, elapsed_ns: int):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def as_dict(self) -> dict:
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'avg_us': round(self.total_ns / count / 1000, 2),
+            'max_us': round(self.max_ns / 1000, 2),
+            'total_ms': round(self.total_ns / 1e6, 2),
+            'over_budget': self.over_budget,
+        }
+
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack from a background thread
+
+    Stacks are aggregated in collapsed form ("file:function;file:function
+    count"), which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = collections.Counter()
+        self.samples = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, output_path: str):
+        self._thread = threading.Thread(target=self._run, args=(duration, output_path),
+                                        name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self, duration: float, output_path: str):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+        with open(output_path, 'w') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        logger.info("Sampling profile written", extra=kv(path=output_path, samples=self.samples))
+
+
+class Instrumentation:
+    """Opt-in profiling surface for SchwabStreamingClient
+
+    Nothing here runs unless the client is given an Instrumentation:
+    handlers are only wrapped when registered through an enabled instance,
+    so a disabled client calls its handlers directly.
+    """
+
+    def __init__(self, handler_budget_ms: float = 5.0, loop_lag_interval: float = 0.1,
+                 loop_lag_budget_ms: float = 50.0, warn_interval: float = 10.0,
+                 snapshot_limit: int = 5, trace_allocations: bool = False):
+        self.handler_budget_ns = int(handler_budget_ms * 1e6)
+        self.loop_lag_interval = loop_lag_interval
+        self.loop_lag_budget = loop_lag_budget_ms / 1000
+        self.warn_interval = warn_interval
+
+        self.handlers: Dict[Tuple[str, str], TimingStats] = {}
+        self.decode = TimingStats()
+        self.loop_lag = TimingStats()
+        self.trace_allocations = trace_allocations
+        self.snapshots: Deque[tracemalloc.Snapshot] = collections.deque(maxlen=snapshot_limit)
+        self._started_tracing = False
+        self.profiler: Optional[SamplingProfiler] = None
+
+        self._last_warning: Dict[object, float] = {}
+        self._suppressed: Dict[object, int] = {}
+        self._received_ns = 0
+        self._loop_thread_id: Optional[int] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def _warn(self, key, message: str, *args, **fields):
+        """Rate-limited warning per key, reporting how many were skipped"""
+        now = time.monotonic()
+        if now - self._last_warning.get(key, float('-inf')) < self.warn_interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last_warning[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            fields['suppressed'] = suppressed
+        logger.warning(message, *args, extra=kv(**fields))
+
+    # Handler and decode timing
+
+    def wrap_handler(self, service: str, handler: Callable) -> Callable:
+        """Return a handler that records its duration under (service, handler name)"""
+        name = getattr(handler, '__qualname__', repr(handler))
+        stats = self.handlers.setdefault((service, name), TimingStats())
+        budget = self.handler_budget_ns
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed_handler(message):
+            started = perf_counter_ns()
+            if self._received_ns:
+                # First handler after a frame arrived: the gap is schwab-py's decode
+                self.decode.add(started - self._received_ns)
+                self._received_ns = 0
+            try:
+                return handler(message)
+            finally:
+                elapsed = perf_counter_ns() - started
+                stats.add(elapsed)
+                if elapsed > budget:
+                    stats.over_budget += 1
+                    self._warn((service, name), "Slow handler %s", name, service=service,
+                               latency_ms=round(elapsed / 1e6, 2), budget_ms=budget / 1e6)
+
+        timed_handler.__qualname__ = name
+        return timed_handler
+
+    def instrument_socket(self, stream_client):
+        """Timestamp frame arrival so decode time can be told apart from handler time"""
+        # schwab-py keeps its websocket on the private _socket attribute
+        socket = stream_client._socket
+        recv = socket.recv
+
+        async def timed_recv(*args, **kwargs):
+            frame = await recv(*args, **kwargs)
+            self._received_ns = time.perf_counter_ns()
+            return frame
+
+        socket.recv = timed_recv
+
+    # Event loop lag
+
+    def start(self):
+        """Start loop lag monitoring and register SIGUSR1 for the sampling profiler"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._lag_task = loop.create_task(self._monitor_loop_lag())
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                loop.add_signal_handler(signal.SIGUSR1, self.trigger_profile)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    async def _monitor_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        interval = self.loop_lag_interval
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - scheduled - interval)
+            self.loop_lag.add(int(lag * 1e9))
+            if lag > self.loop_lag_budget:
+                self.loop_lag.over_budget += 1
+                self._warn('loop_lag', "Event loop lag", latency_ms=round(lag * 1000, 2))
+
+    # Allocation snapshots
+
+    def take_snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        """Record an allocation snapshot; None unless `trace_allocations` is set
+
+        The first snapshot starts tracemalloc, which slows every allocation
+        until `stop_tracing` is called.
+        """
+        if not self.trace_allocations:
+            return None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracing = True
+        snapshot = tracemalloc.take_snapshot()
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def stop_tracing(self):
+        """Stop tracemalloc if take_snapshot started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def allocation_growth(self, limit: int = 10) -> List[str]:
+        """Top allocation sites by growth between the first and last snapshot"""
+        if len(self.snapshots) < 2:
+            return []
+        stats = self.snapshots[-1].compare_to(self.snapshots[0], 'lineno')
+        return [str(stat) for stat in stats[:limit]]
+
+    # Sampling profiler
+
+    def trigger_profile(self, duration: float = 10.0, output_path: Optional[str] = None) -> bool:
+        """Sample the event loop thread for `duration` seconds (SIGUSR1 does this too)"""
+        if self.profiler and self.profiler.running:
+            return False
+        thread_id = self._loop_thread_id or threading.main_thread().ident
+        output_path = output_path or f"profile-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        self.profiler = SamplingProfiler(thread_id)
+        self.profiler.start(duration, output_path)
+        logger.info("Sampling profiler started", extra=kv(duration_s=duration, path=output_path))
+        return True
+
+    def report(self) -> dict:
+        """Handler, decode and loop lag timings"""
+        return {
+            'handlers': {f"{service}:{name}": stats.as_dict()
+                         for (service, name), stats in self.handlers.items()},
+            'decode': self.decode.as_dict(),
+            'loop_lag': self.loop_lag.as_dict(),
+            'allocation_growth': self.allocation_growth(),
+        }
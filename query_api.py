@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Query API for Schwab Streaming Client
+HTTP and WebSocket access to the live market state, served from memory on the
+client's own event loop
+
+    GET  /snapshot/{symbol}          quote, books and bar of one symbol
+    GET  /snapshot?symbols=A,B,C     several symbols in one response
+    POST /snapshot {"symbols": [..]} same, for long lists
+    GET  /symbols                    symbols currently held
+    GET  /stats                      request and cache counters
+    WS   /ws                         {"subscribe": [..]} / {"unsubscribe": [..]}, pushes deltas
+
+Each symbol's record is serialized once and reused until the symbol's
+version changes, so a request is a dictionary lookup and a byte join.
+Prices are served in dollars; the state holds them as scaled integers.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import uvicorn
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+
+from fixed_point import float_fields
+from memory_budget import sampled_sizeof
+from stream_logging import get_logger, kv
+
+logger = get_logger('query_api')
+
+JSON = 'application/json'
+
+# Longest symbol list accepted in one request
+MAX_BATCH_SYMBOLS = 5000
+
+# Seconds a WebSocket subscriber gets to take one push before it is dropped
+PUSH_TIMEOUT = 1.0
+
+
+class SnapshotCache:
+    """Serialized per-symbol records, rebuilt only when the symbol's version changes"""
+
+    def __init__(self, state):
+        self.state = state
+        # symbol -> (version, JSON key, JSON record)
+        self.records: Dict[str, Tuple[int, bytes, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        state.add_eviction_listener(self.forget)
+
+    def get(self, symbol: str) -> Optional[Tuple[bytes, bytes]]:
+        """(JSON key, JSON record) for a symbol, None if the state does not hold it"""
+        state = self.state
+        version = state.versions.get(symbol)
+        if version is None:
+            return None
+        cached = self.records.get(symbol)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1], cached[2]
+        self.misses += 1
+        record = json.dumps({
+            'symbol': symbol,
+            'asset_class': state.asset_classes.get(symbol),
+            'version': version,
+            'stale': state.is_stale(symbol),
+            'quote': float_fields(state.get_quote(symbol)),
+            'books': {venue: float_fields(top) for venue, top in (state.get_books(symbol) or {}).items()} or None,
+            'bar': float_fields(state.get_bar(symbol)),
+        }, separators=(',', ':')).encode()
+        key = json.dumps(symbol).encode()
+        self.records[symbol] = (version, key, record)
+        return key, record
+
+    def batch(self, symbols: List[str]) -> bytes:
+        """{"A": record, "B": record, "UNKNOWN": null} in one byte string"""
+        parts = []
+        for symbol in symbols:
+            cached = self.get(symbol)
+            if cached is None:
+                parts.append(json.dumps(symbol).encode() + b':null')
+            else:
+                parts.append(cached[0] + b':' + cached[1])
+        return b'{' + b','.join(parts) + b'}'
+
+    def forget(self, symbols: List[str]):
+        for symbol in symbols:
+            self.records.pop(symbol, None)
+
+    def memory_bytes(self) -> int:
+        return sampled_sizeof(self.records)
+
+    def trim(self, limit_bytes: int, size_bytes: int) -> int:
+        """Drop the records cached longest ago; they are rebuilt on their next request"""
+        if size_bytes <= limit_bytes or not self.records:
+            return 0
+        count = int((size_bytes - limit_bytes) / (size_bytes / len(self.records))) + 1
+        for symbol in list(itertools.islice(self.records, count)):
+            del self.records[symbol]
+        return count
+
+
+class DeltaHub:
+    """Pushes state changes to WebSocket subscribers
+
+    Updates are conflated per (symbol, kind, asset class or venue) and
+    flushed every `interval` seconds, one message per subscriber:
+    {"deltas": [{"symbol", "kind", "key", "fields"}, ...]}. Subscribers
+    are sent to concurrently; one that has not taken its message within
+    `send_timeout` seconds is unsubscribed, so it cannot hold up the rest.
+    """
+
+    def __init__(self, state, interval: float = 0.05, send_timeout: float = PUSH_TIMEOUT):
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.subscribers: Dict[WebSocket, Set[str]] = {}
+        # symbol -> websockets subscribed to it
+        self.by_symbol: Dict[str, Set[WebSocket]] = {}
+        self.pending: Dict[WebSocket, Dict[tuple, dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.pushed = 0
+        self.dropped = 0
+        state.add_recorder(self.record)
+
+    def subscribe(self, websocket: WebSocket, symbols: List[str]):
+        self.subscribers.setdefault(websocket, set()).update(symbols)
+        for symbol in symbols:
+            self.by_symbol.setdefault(symbol, set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, symbols: Optional[List[str]] = None):
+        subscribed = self.subscribers.get(websocket, set())
+        for symbol in list(subscribed) if symbols is None else symbols:
+            subscribed.discard(symbol)
+            sockets = self.by_symbol.get(symbol)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.by_symbol[symbol]
+        if symbols is None:
+            self.subscribers.pop(websocket, None)
+            self.pending.pop(websocket, None)
+
+    def record(self, kind: str, key: Optional[str], symbol: str, fields: Dict[str, object]):
+        """MarketState recorder"""
+        sockets = self.by_symbol.get(symbol)
+        if not sockets:
+            return
+        shown = float_fields(fields)
+        for websocket in sockets:
+            pending = self.pending.setdefault(websocket, {})
+            delta = pending.get((symbol, kind, key))
+            if delta is None or kind != 'quote':
+                pending[(symbol, kind, key)] = {'symbol': symbol, 'kind': kind, 'key': key, 'fields': dict(shown)}
+            else:
+                delta['fields'].update(shown)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.pending:
+                continue
+            pending, self.pending = self.pending, {}
+            await asyncio.gather(*(self._push(websocket, deltas) for websocket, deltas in pending.items()))
+
+    async def _push(self, websocket: WebSocket, deltas: Dict[tuple, dict]):
+        try:
+            await asyncio.wait_for(
+                websocket.send_text(json.dumps({'deltas': list(deltas.values())}, separators=(',', ':'))),
+                self.send_timeout)
+            self.pushed += len(deltas)
+        except Exception as e:
+            self.dropped += 1
+            logger.warning("Dropping WebSocket subscriber: %s", str(e) or type(e).__name__,
+                           extra=kv(symbols=len(self.subscribers.get(websocket, ()))))
+            self.unsubscribe(websocket)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+def _parse_symbols(value: str) -> List[str]:
+    return [s.strip() for s in value.split(',') if s.strip()][:MAX_BATCH_SYMBOLS]
+
+
+def parse_ws_request(text: str) -> Tuple[List[str], List[str]]:
+    """(subscribe, unsubscribe) symbol lists of a WebSocket frame; ValueError if it is malformed"""
+    try:
+        request = json.loads(text)
+    except ValueError:
+        raise ValueError("frame is not JSON")
+    if not isinstance(request, dict):
+        raise ValueError("frame must be a JSON object")
+    lists = []
+    for name in ('subscribe', 'unsubscribe'):
+        symbols = request.get(name) or []
+        if not isinstance(symbols, list) or not all(isinstance(symbol, str) for symbol in symbols):
+            raise ValueError(f"'{name}' must be a list of symbols")
+        lists.append(symbols[:MAX_BATCH_SYMBOLS])
+    return lists[0], lists[1]
+
+
+def create_app(service: 'QueryService') -> FastAPI:
+    """FastAPI app over a QueryService; responses are pre-encoded bytes, not re-serialized models"""
+    app = FastAPI(title="Schwab Streaming Query API")
+    state, cache, hub, stats = service.state, service.cache, service.hub, service.stats
+
+    def timed(response: Response, started: float) -> Response:
+        stats['requests'] += 1
+        stats['total_us'] += (time.perf_counter() - started) * 1e6
+        return response
+
+    @app.get("/snapshot/{symbol:path}")
+    async def snapshot(symbol: str):
+        started = time.perf_counter()
+        cached = cache.get(symbol)
+        if cached is None:
+            return timed(Response(b'{"detail":"unknown symbol"}', status_code=404, media_type=JSON), started)
+        return timed(Response(cached[1], media_type=JSON), started)
+
+    @app.get("/snapshot")
+    async def snapshots(symbols: str):
+        started = time.perf_counter()
+        return timed(Response(cache.batch(_parse_symbols(symbols)), media_type=JSON), started)
+
+    @app.post("/snapshot")
+    async def snapshots_post(body: Dict[str, List[str]]):
+        started = time.perf_counter()
+        return timed(Response(cache.batch(body.get('symbols', [])[:MAX_BATCH_SYMBOLS]), media_type=JSON), started)
+
+    @app.get("/symbols")
+    async def symbols():
+        return Response(json.dumps(list(state.versions)).encode(), media_type=JSON)
+
+    @app.get("/stats")
+    async def service_stats():
+        return dict(service.report(), cached_symbols=len(cache.records), ws_subscribers=len(hub.subscribers))
+
+    @app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                try:
+                    subscribe, unsubscribe = parse_ws_request(message.get('text') or message.get('bytes') or '')
+                except ValueError as e:
+                    await websocket.send_text(json.dumps({'error': str(e)}))
+                    continue
+                if subscribe:
+                    hub.subscribe(websocket, subscribe)
+                    # Current state first, deltas after
+                    await websocket.send_text(cache.batch(subscribe).decode())
+                if unsubscribe:
+                    hub.unsubscribe(websocket, unsubscribe)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            hub.unsubscribe(websocket)
+
+    return app
+
+
+class _EmbeddedServer(uvicorn.Server):
+    """uvicorn server that leaves signal handling to the host application"""
+
+    def install_signal_handlers(self):
+        pass
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
+
+
+class QueryService:
+    """The query API embedded in the client's event loop"""
+
+    def __init__(self, state, host: str = '127.0.0.1', port: int = 8120, push_interval: float = 0.05):
+        self.state = state
+        self.host = host
+        self.port = port
+        self.cache = SnapshotCache(state)
+        self.hub = DeltaHub(state, push_interval)
+        self.stats = {'requests': 0, 'total_us': 0.0}
+        self.app = create_app(self)
+        self._server: Optional[_EmbeddedServer] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level='warning',
+                                access_log=False, lifespan='off')
+        self._server = _EmbeddedServer(config)
+        self._task = asyncio.get_running_loop().create_task(self._server.serve())
+        self.hub.start()
+        logger.info("Query API listening", extra=kv(host=self.host, port=self.port))
+
+    async def stop(self):
+        self.hub.stop()
+        if self._server:
+            self._server.should_exit = True
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._server = None
+
+    def memory_bytes(self) -> int:
+        return self.cache.memory_bytes()
+
+    def report(self) -> dict:
+        requests = self.stats['requests']
+        return {
+            'requests': requests,
+            'avg_handler_us': round(self.stats['total_us'] / requests, 2) if requests else 0.0,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'ws_deltas_pushed': self.hub.pushed,
+            'ws_subscribers_dropped': self.hub.dropped,
+        }
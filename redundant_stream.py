@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Redundant Streaming for Schwab Streaming Client
+Two stream sessions with identical subscriptions behind one StreamClient-shaped
+proxy; content items are deduplicated and whichever copy arrives first is forwarded
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('redundant')
+
+# Method suffixes fanned out to every leg and replayed when a leg reconnects
+SUBSCRIPTION_SUFFIXES = ('_subs', '_add', '_unsubs', '_view', '_sub')
+
+LATENCY_SAMPLES = 10000
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LegStats:
+    """Counters for one leg"""
+
+    def __init__(self):
+        self.connected = False
+        self.items = 0
+        self.wins = 0
+        self.duplicates = 0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.latency_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.behind_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def as_dict(self) -> dict:
+        latency = list(self.latency_ms)
+        behind = list(self.behind_ms)
+        return {
+            'connected': self.connected,
+            'items': self.items,
+            'wins': self.wins,
+            'win_rate': round(self.wins / self.items, 3) if self.items else 0.0,
+            'duplicates': self.duplicates,
+            'latency_p50_ms': round(_percentile(latency, 0.5), 2),
+            'latency_p99_ms': round(_percentile(latency, 0.99), 2),
+            'behind_p50_ms': round(_percentile(behind, 0.5), 2),
+            'disconnects': self.disconnects,
+            'reconnects': self.reconnects,
+        }
+
+
+def content_identity(item: dict) -> frozenset:
+    """Identity of an item with no sequence number: its scalar fields
+
+    Level One items carry only the fields that changed, with
+    QUOTE_TIME_MILLIS / TRADE_TIME_MILLIS when the quote or trade moved,
+    so both legs' copies of an update are equal even though the frames
+    carrying them have different timestamps. Nested values (book levels)
+    are left out; BOOK_TIME stands in for them.
+    """
+    return frozenset((name, value) for name, value in item.items() if not isinstance(value, (list, dict)))
+
+
+class Arbiter:
+    """First-arrival deduplication of content items across legs
+
+    An item is identified by (service, symbol, sequence), or by its
+    content (`content_identity`) when it carries no sequence number. Each
+    leg's copies of an identity are counted, and a copy is forwarded when
+    its leg has now delivered more of them than any other leg, so repeated
+    updates within one leg still pass while the other leg's copies are
+    dropped. Identities are forgotten after `window` seconds.
+    """
+
+    def __init__(self, legs: int = 2, window: float = 10.0):
+        self.legs = [LegStats() for _ in range(legs)]
+        self.window = window
+        # Two generations, swapped every `window` seconds
+        self._current: Dict[tuple, list] = {}
+        self._previous: Dict[tuple, list] = {}
+        self._rotated_at = time.monotonic()
+
+    def _rotate(self, now: float):
+        if now - self._rotated_at >= self.window:
+            self._previous, self._current = self._current, {}
+            self._rotated_at = now
+
+    def accept(self, leg: int, message: dict, received: Optional[float] = None) -> Optional[dict]:
+        """The message with only first-arrival items, or None if every item was a duplicate"""
+        now = time.monotonic()
+        received = time.time() if received is None else received
+        self._rotate(now)
+        stats = self.legs[leg]
+        service = message.get('service')
+        timestamp = message.get('timestamp')
+        if timestamp is not None:
+            stats.latency_ms.append(received * 1000 - timestamp)
+
+        current = self._current
+        previous = self._previous
+        legs = len(self.legs)
+        content = message.get('content', [])
+        kept = []
+        for item in content:
+            symbol = item.get('key')
+            if symbol is None:
+                kept.append(item)
+                continue
+            stats.items += 1
+            sequence = item.get('SEQUENCE')
+            identity = (service, symbol, sequence if sequence is not None else content_identity(item))
+            counts = current.get(identity)
+            if counts is None:
+                counts = previous.pop(identity, None)
+                if counts is None:
+                    # Per-leg counts, then the first arrival time
+                    counts = [0] * legs + [now]
+                current[identity] = counts
+            counts[leg] += 1
+            if counts[leg] > max(counts[i] for i in range(legs) if i != leg):
+                stats.wins += 1
+                kept.append(item)
+            else:
+                stats.duplicates += 1
+                stats.behind_ms.append((now - counts[legs]) * 1000)
+
+        if len(kept) == len(content):
+            return message
+        if kept:
+            return dict(message, content=kept)
+        return None
+
+    def report(self) -> List[dict]:
+        return [stats.as_dict() for stats in self.legs]
+
+
+class RedundantStreamClient:
+    """StreamClient stand-in that drives several legs (StreamClient instances)
+
+    Subscription calls (`*_subs`, `*_add`, `_service_op`, ...) go to every
+    connected leg and are recorded; handler registrations are shared, and
+    each leg's messages pass through the Arbiter before the handlers run.
+    `handle_message` returns once any leg delivered something. A leg whose
+    connection fails is logged in again with backoff and gets the recorded
+    subscriptions replayed, while the other legs keep the stream going;
+    the session only fails when every leg is down.
+    """
+
+    def __init__(self, legs: List, window: float = 10.0,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.legs = legs
+        self.arbiter = Arbiter(len(legs), window)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.calls: List[Tuple[str, tuple, dict]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._delivered = asyncio.Event()
+        self._last_error: Optional[BaseException] = None
+
+    # StreamClient surface
+
+    async def login(self, *args, **kwargs):
+        """Log in every leg; fails only if none could log in"""
+        results = await asyncio.gather(*(leg.login(*args, **kwargs) for leg in self.legs),
+                                       return_exceptions=True)
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.warning("Leg login failed: %s", result, extra=kv(leg=index))
+                self._last_error = result
+            else:
+                self.arbiter.legs[index].connected = True
+        if not self._connected():
+            raise self._last_error
+
+    async def logout(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for index, leg in enumerate(self.legs):
+            if self.arbiter.legs[index].connected:
+                self.arbiter.legs[index].connected = False
+                try:
+                    await leg.logout()
+                except Exception as e:
+                    logger.debug("Leg logout failed: %s", e, extra=kv(leg=index))
+
+    async def handle_message(self):
+        """Wait until any leg delivered a message (readers start on the first call)"""
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._read(index)) for index in range(len(self.legs))]
+        await self._delivered.wait()
+        self._delivered.clear()
+        if not self._connected():
+            raise ConnectionError(f"All stream legs are down: {self._last_error}")
+
+    def __getattr__(self, name: str):
+        if name.startswith('add_') and name.endswith('_handler'):
+            return lambda handler: self._add_handler(name, handler)
+        if name == '_service_op' or name.endswith(SUBSCRIPTION_SUFFIXES):
+            async def fan_out(*args, **kwargs):
+                self.calls.append((name, args, kwargs))
+                await self._call_connected(name, args, kwargs)
+            return fan_out
+        raise AttributeError(name)
+
+    # Legs
+
+    def _connected(self) -> bool:
+        return any(stats.connected for stats in self.arbiter.legs)
+
+    def _add_handler(self, method: str, handler: Callable[[dict], None]):
+        handlers = self.handlers.get(method)
+        if handlers is None:
+            handlers = self.handlers[method] = []
+            # One arbitrating handler per leg and service, however many handlers share it
+            for index, leg in enumerate(self.legs):
+                getattr(leg, method)(self._leg_handler(index, handlers))
+        handlers.append(handler)
+
+    def _leg_handler(self, index: int, handlers: List[Callable[[dict], None]]) -> Callable[[dict], None]:
+        accept = self.arbiter.accept
+        delivered = self._delivered
+
+        def arbitrated(message):
+            filtered = accept(index, message)
+            if filtered is not None:
+                for handler in handlers:
+                    handler(filtered)
+                delivered.set()
+
+        return arbitrated
+
+    async def _call_connected(self, name: str, args: tuple, kwargs: dict):
+        results = await asyncio.gather(*(
+            getattr(leg, name)(*args, **kwargs)
+            for index, leg in enumerate(self.legs) if self.arbiter.legs[index].connected
+        ), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        for error in errors:
+            logger.warning("Subscription failed on one leg: %s", error, extra=kv(call=name))
+
+    async def _read(self, index: int):
+        leg = self.legs[index]
+        stats = self.arbiter.legs[index]
+        while True:
+            if stats.connected:
+                try:
+                    await leg.handle_message()
+                    continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stats.connected = False
+                    stats.disconnects += 1
+                    self._last_error = e
+                    logger.warning("Stream leg dropped, failing over: %s", e,
+                                   extra=kv(leg=index, legs_up=sum(s.connected for s in self.arbiter.legs)))
+                    # Wake handle_message so a total outage surfaces
+                    self._delivered.set()
+            await self._reconnect(index)
+
+    async def _reconnect(self, index: int):
+        leg = self.legs[index]
+        stats = self.arbiter.legs[index]
+        delay = self.reconnect_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await leg.login()
+                for name, args, kwargs in self.calls:
+                    await getattr(leg, name)(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stream leg reconnect failed: %s", e, extra=kv(leg=index, retry_in=delay))
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            stats.connected = True
+            stats.reconnects += 1
+            logger.info("Stream leg reconnected", extra=kv(leg=index, replayed=len(self.calls)))
+            return
+
+    def report(self) -> List[dict]:
+        """Per-leg item, win, duplicate, latency and connection counts"""
+        return self.arbiter.report()
@@ -5,24 +5,66 @@ Uses schwab-py library to stream ticker information from Schwab API
 """
 
 import asyncio
+import importlib.util
+import inspect
 import json
 import os
 import sys
+import uuid
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
 
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
+# schwab-py and python-dotenv are imported where they are used, so importing
+# this module (or starting cli.py) does not pay for them
+from alert_engine import AlertEngine
+from asset_classes import ASSET_CLASSES, AssetClass, decode_book_ladders, decode_chart, ladder_top, parse_symbol_list
+from bootstrap import Bootstrap, session_bootstrap
+from change_filter import ChangeFilter, parse_service_fields, parse_tolerances
+from dashboard import BAR_FIELDS, QUOTE_FIELDS, TerminalDashboard
+from field_selection import FieldRegistry, stream_fields
+from handler_executor import CONFLATE, INLINE, PROCESS, THREAD, HandlerExecutors, HandlerPolicy
+from instrument_cache import DEFAULT_CACHE_PATH, InstrumentCache
+from market_state import MarketState
+from memory_budget import MB, MemoryBudget, parse_budgets
+from option_chain import CHAIN_STREAM_FIELDS, OptionChainStreamer
+from pipeline import DecodePipeline, merge_into_state
+from portfolio import Portfolio
+from profiling import Instrumentation
+from redundant_stream import RedundantStreamClient
+from sequence_tracker import SequenceTracker, SnapshotRefiller
+from state_journal import StateJournal
+from update_stream import Update, UpdateHub
+from stream_logging import configure_logging, get_logger, kv, set_session_id
 
-try:
-    from schwab.auth import easy_client
-    from schwab.client import Client
-    from schwab.streaming import StreamClient
-except ImportError:
-    print("Error: schwab-py library not found. Please install it using:")
-    print("pip install schwab-py")
-    sys.exit(1)
+logger = get_logger('client')
+
+# StreamClient handler registration method per service
+SERVICE_HANDLER_METHODS = {spec.service: spec.handler_method for spec in ASSET_CLASSES.values()}
+SERVICE_HANDLER_METHODS.update({
+    'LEVELONE_OPTIONS': 'add_level_one_option_handler',
+    'NASDAQ_BOOK': 'add_nasdaq_book_handler',
+    'NYSE_BOOK': 'add_nyse_book_handler',
+    'CHART_EQUITY': 'add_chart_equity_handler',
+    'ACCT_ACTIVITY': 'add_account_activity_handler',
+})
+
+BOOK_SUBS_METHODS = {
+    'NASDAQ_BOOK': 'nasdaq_book_subs',
+    'NYSE_BOOK': 'nyse_book_subs',
+}
+
+
+def load_environment():
+    """Read .env into the environment (once; variables already set win)"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def require_schwab():
+    """Exit with install instructions when schwab-py is missing, before any work starts"""
+    if importlib.util.find_spec('schwab') is None:
+        sys.exit("Error: schwab-py library not found. Please install it using: pip install schwab-py")
 
 
 class SchwabStreamingClient:
@@ -30,6 +72,7 @@ class SchwabStreamingClient:
     
     def __init__(self):
         """Initialize the streaming client with credentials from environment"""
+        load_environment()
         self.api_key = os.getenv('SCHWAB_API_KEY')
         self.app_secret = os.getenv('SCHWAB_APP_SECRET')
         self.redirect_uri = os.getenv('SCHWAB_REDIRECT_URI', 'https://127.0.0.1:8182')
@@ -45,27 +88,112 @@ class SchwabStreamingClient:
         
         # Account ID is required for now (auto-retrieval can be added later)
         if not self.account_id or self.account_id.startswith('your_'):
-            print("⚠️  SCHWAB_ACCOUNT_ID not set or is placeholder")
-            print("💡 Please set your actual account ID in the .env file")
-            print("💡 You can find your account ID in your Schwab account settings")
+            logger.warning("SCHWAB_ACCOUNT_ID not set or is placeholder")
+            logger.info("Set your actual account ID in the .env file; it is shown in your Schwab account "
+                        "settings or by running get_account_id.py")
             raise ValueError("SCHWAB_ACCOUNT_ID is required. Please set it in your .env file.")
         
         # Initialize clients
         self.client = None
         self.stream_client = None
+        # Handlers per service, behind the one schwab-py handler that dispatches to them
+        self.service_handlers: Dict[str, List[Callable]] = {}
+        
+        # Normalized Level One state shared by every sink
+        self.market_state = MarketState()
+        
+        # Async iterators over state updates (updates() / batches())
+        self.update_hub = UpdateHub(self.market_state)
+        
+        # Columnar per-message handlers by service, sharing one symbol id table
+        # (batch_dispatch and binary_records load NumPy, so both are created on first use)
+        self.batch_dispatchers: Dict[str, 'BatchDispatcher'] = {}
+        self.batch_symbols: Optional['SymbolTable'] = None
+        
+        # Futures and forex symbols streamed alongside equities, by asset class
+        self.level_one_symbols: Dict[str, List[str]] = {}
+        
+        # Dashboard mode replaces the JSON dumps with a fixed-rate symbol table
+        self.dashboard_mode = False
+        self.dashboard: Optional[TerminalDashboard] = None
+        
+        # Optional alert engine evaluated on Level One updates
+        self.alert_engine: Optional[AlertEngine] = None
+        
+        # Optional multi-process decode pipeline behind the websocket reader
+        self.pipeline: Optional[DecodePipeline] = None
+        
+        # Hot-redundant mode: two stream sessions, first arrival of each update wins
+        self.redundant = False
+        
+        # Opt-in profiling hooks (handler timing, loop lag, allocations)
+        self.instrumentation: Optional[Instrumentation] = None
+        
+        # Fields each consumer reads; their union per service is requested on SUBS
+        self.field_registry = FieldRegistry()
+        self.field_registry.add_listener(self._on_fields_changed)
+        self.extra_fields: List[str] = []
+        # Symbols per service of the last SUBS, replayed when the field list changes
+        self.subscribed: Dict[str, List[str]] = {}
+        
+        # Listing exchange and asset type per symbol, for book routing
+        self.instrument_cache = InstrumentCache(os.getenv('SCHWAB_INSTRUMENT_CACHE', DEFAULT_CACHE_PATH))
+        
+        # Gap/duplicate/stale detection per service, with REST refill of gapped symbols
+        self.sequence_tracker: Optional[SequenceTracker] = SequenceTracker()
+        self.refiller: Optional[SnapshotRefiller] = None
+        
+        # Start-up graph of the session and its timings (bootstrap.py)
+        self.bootstrap: Optional[Bootstrap] = None
+        self.bootstrap_concurrent = True
+        self.snapshot_warm_up = True
+        # Account number -> hash for the account endpoints, resolved at start-up
+        self.account_hashes: Dict[str, str] = {}
+        
+        # Optional suppression of Level One fields and items that repeat known values
+        self.change_filter: Optional[ChangeFilter] = None
+        
+        # Optional position P&L marked from the Level One stream
+        self.portfolio: Optional[Portfolio] = None
+        
+        # Thread/process pools for handlers registered with a non-inline policy
+        self.handler_executors = HandlerExecutors()
+        self.print_handler_policy: Optional[HandlerPolicy] = None
+        
+        # Optional checkpoint + write-ahead journal of the market state for warm restarts
+        self.state_journal: Optional[StateJournal] = None
+        
+        # Optional columnar recording of quotes, trades and bars (tick_store.TickStore reads it)
+        self.tick_recorder: Optional['TickRecorder'] = None
+        
+        # Optional HTTP/WebSocket query API over the market state (query_api.QueryService)
+        self.query_service = None
+        
+        # Optional binary record stream to local subscribers over a UNIX socket
+        self.record_publisher: Optional['RecordPublisher'] = None
+        
+        # Optional memory budgets checked periodically during the session
+        self.memory_budget: Optional[MemoryBudget] = None
+        self.state_budget_bytes: Optional[int] = None
+        # Budgets of the other trimmable subsystems by name (book_ladders, handler_queues, ...)
+        self.subsystem_budget_bytes: Dict[str, int] = {}
+        self.idle_seconds = 300.0
+        
+        # Underlyings whose full option chains are streamed
+        self.option_underlyings: List[str] = []
+        self.option_streamer: Optional[OptionChainStreamer] = None
+        
+    def load_client(self):
+        """Create the HTTP client from the token file (blocking: it may refresh the token) and the stream client"""
+        from schwab.auth import easy_client
+        from schwab.streaming import StreamClient
         
-    async def setup_clients(self):
-        """Setup HTTP and streaming clients"""
         try:
             # Check if token file exists
             if not os.path.exists(self.token_path):
-                print("🔐 No token file found. Starting OAuth authentication...")
-                print("📋 Please follow these steps:")
-                print("1. The script will open your browser to Schwab OAuth page")
-                print("2. Log in to your Schwab account")
-                print("3. Authorize the application")
-                print("4. The script will automatically capture the authorization code")
-                print()
+                logger.info("No token file found. Starting OAuth authentication...")
+                logger.info("The script will open your browser to the Schwab OAuth page; log in, authorize "
+                            "the application and the authorization code will be captured automatically")
                 
                 # Create HTTP client with interactive=False to avoid input prompts
                 self.client = easy_client(
@@ -76,7 +204,7 @@ class SchwabStreamingClient:
                     interactive=False  # Disable interactive mode
                 )
             else:
-                print("✅ Token file found, using existing authentication")
+                logger.info("Token file found, using existing authentication", extra=kv(token_path=self.token_path))
                 # Create HTTP client with existing token
                 self.client = easy_client(
                     api_key=self.api_key,
@@ -86,19 +214,24 @@ class SchwabStreamingClient:
                 )
             
             # Create streaming client with provided account ID
-            self.stream_client = StreamClient(self.client, account_id=int(self.account_id))
-            print("✅ Clients initialized successfully")
+            if self.redundant:
+                legs = [StreamClient(self.client, account_id=int(self.account_id)) for _ in range(2)]
+                self.stream_client = RedundantStreamClient(legs)
+            else:
+                self.stream_client = StreamClient(self.client, account_id=int(self.account_id))
+            self.service_handlers = {}
+            logger.info("Clients initialized successfully")
             
         except Exception as e:
-            print(f"❌ Error setting up clients: {e}")
-            print("💡 Make sure your API credentials are correct in the .env file")
-            print("💡 If this is your first time, you may need to complete OAuth authentication")
+            logger.error("Error setting up clients: %s", e)
+            logger.info("Make sure your API credentials are correct in the .env file; if this is your "
+                        "first time, you may need to complete OAuth authentication")
             raise
     
     async def get_account_id(self):
         """Retrieve account ID from Schwab API"""
         try:
-            print("🔍 Retrieving account information from Schwab API...")
+            logger.info("Retrieving account information from Schwab API...")
             
             # Get user principals to find account information
             # The easy_client returns a different client type, so we need to use the correct method
@@ -116,54 +249,73 @@ class SchwabStreamingClient:
                 raise Exception("No accounts found in user principals")
             
             # Display available accounts
-            print(f"📋 Found {len(accounts)} account(s):")
+            logger.info("Found %d account(s)", len(accounts))
             for i, account in enumerate(accounts):
                 account_id = account.get('accountId', 'Unknown')
                 account_type = account.get('type', 'Unknown')
-                print(f"   {i+1}. Account ID: {account_id} (Type: {account_type})")
+                logger.info("Account %d", i + 1, extra=kv(account_id=account_id, account_type=account_type))
             
             # If only one account, use it automatically
             if len(accounts) == 1:
                 account_id = accounts[0].get('accountId')
-                print(f"✅ Using single account: {account_id}")
+                logger.info("Using single account", extra=kv(account_id=account_id))
                 return account_id
             
             # If multiple accounts, use the first one (you can modify this logic)
             # For now, we'll use the first account, but you could add user selection
             account_id = accounts[0].get('accountId')
-            print(f"✅ Using first account: {account_id}")
-            print("💡 To use a different account, set SCHWAB_ACCOUNT_ID in your .env file")
+            logger.info("Using first account; set SCHWAB_ACCOUNT_ID in your .env file to use a different one",
+                        extra=kv(account_id=account_id))
             return account_id
             
         except Exception as e:
-            print(f"❌ Error retrieving account ID: {e}")
-            print("💡 You can manually set SCHWAB_ACCOUNT_ID in your .env file")
+            logger.error("Error retrieving account ID: %s", e)
+            logger.info("You can manually set SCHWAB_ACCOUNT_ID in your .env file")
             raise
     
+    def resolve_accounts(self) -> int:
+        """Map the account numbers of the login to their hashes, which the account endpoints take
+        
+        Failures are logged and leave the map empty; streaming does not need it.
+        """
+        try:
+            response = self.client.get_account_numbers()
+            if response.status_code != 200:
+                raise Exception(f"Failed to get account numbers: {response.text}")
+            self.account_hashes = {entry['accountNumber']: entry['hashValue'] for entry in response.json()}
+            logger.info("Resolved %d account(s)", len(self.account_hashes))
+        except Exception as e:
+            logger.warning("Could not resolve account hashes: %s", e)
+        return len(self.account_hashes)
+    
     async def login_to_stream(self):
         """Login to the streaming service"""
         try:
             await self.stream_client.login()
-            print("✅ Successfully logged into streaming service")
+            logger.info("Successfully logged into streaming service")
         except Exception as e:
-            print(f"❌ Error logging into stream: {e}")
+            logger.error("Error logging into stream: %s", e)
             raise
     
     async def logout_from_stream(self):
         """Logout from the streaming service"""
         try:
             await self.stream_client.logout()
-            print("✅ Successfully logged out from streaming service")
+            logger.info("Successfully logged out from streaming service")
         except Exception as e:
-            print(f"❌ Error logging out: {e}")
+            logger.error("Error logging out: %s", e)
     
     def setup_handlers(self):
         """Setup message handlers for different data streams"""
         
-        def print_equity_quote(message):
-            """Handler for equity quotes"""
-            print(f"\n📈 EQUITY QUOTE - {datetime.now().strftime('%H:%M:%S')}")
-            print(json.dumps(message, indent=2))
+        def print_level_one(asset_class: AssetClass):
+            """Handler factory for Level One quotes"""
+            label = asset_class.name.upper()
+            
+            def print_quote(message):
+                print(f"\n📈 {label} QUOTE - {datetime.now().strftime('%H:%M:%S')}")
+                print(json.dumps(message, indent=2))
+            return print_quote
         
         def print_nasdaq_book(message):
             """Handler for NASDAQ order book data"""
@@ -181,105 +333,621 @@ class SchwabStreamingClient:
             print(json.dumps(message, indent=2))
         
         # Register handlers
-        self.stream_client.add_level_one_equity_handler(print_equity_quote)
-        self.stream_client.add_nasdaq_book_handler(print_nasdaq_book)
-        self.stream_client.add_nyse_book_handler(print_nyse_book)
-        self.stream_client.add_chart_equity_handler(print_chart_data)
+        print_policy = self.print_handler_policy
+        for asset_class in ASSET_CLASSES.values():
+            if not self.dashboard_mode:
+                self.register_handler(asset_class.service, print_level_one(asset_class), print_policy)
+            self.register_handler(asset_class.service, self._level_one_handler(asset_class))
+        
+        if not self.dashboard_mode:
+            self.register_handler('NASDAQ_BOOK', print_nasdaq_book, print_policy)
+            self.register_handler('NYSE_BOOK', print_nyse_book, print_policy)
+            self.register_handler('CHART_EQUITY', print_chart_data, print_policy)
+        
+        self.register_handler('NASDAQ_BOOK', self._book_handler('NASDAQ'))
+        self.register_handler('NYSE_BOOK', self._book_handler('NYSE'))
+        self.register_handler('CHART_EQUITY', self._chart_handler())
+        
+        for service, dispatcher in self.batch_dispatchers.items():
+            self.register_handler(service, dispatcher)
+        
+        # Time to first tick, for the bootstrap report
+        if self.bootstrap:
+            for service in [spec.service for spec in ASSET_CLASSES.values()] + ['NASDAQ_BOOK', 'NYSE_BOOK',
+                                                                                'CHART_EQUITY']:
+                self.register_handler(service, self.bootstrap.on_tick)
+        
+        if self.sequence_tracker:
+            self.market_state.add_eviction_listener(self.sequence_tracker.forget)
+        if self.change_filter:
+            self.market_state.add_eviction_listener(self.change_filter.forget)
+        
+        self.declare_fields()
+        
+        if self.alert_engine:
+            self.market_state.add_listener(self.alert_engine.on_quote)
+            self.market_state.add_eviction_listener(self.alert_engine.forget)
+            logger.info("Alert engine registered", extra=kv(rules=len(self.alert_engine.rules)))
+        
+        if self.portfolio:
+            self.market_state.add_listener(self.portfolio.on_quote)
+            self.register_handler('ACCT_ACTIVITY', self.portfolio.on_account_activity)
+        
+        logger.info("Message handlers registered")
+    
+    def register_handler(self, service: str, handler, policy: Optional[HandlerPolicy] = None):
+        """Register a handler for a stream service (e.g. LEVELONE_EQUITIES, NASDAQ_BOOK)
+        
+        With a thread or process `policy` the handler runs on a pool, one
+        message at a time per symbol; the default runs it on the event loop.
+        Handlers that update the market state must stay inline. Duplicate
+        and stale items are filtered out before any handler sees them, and
+        with a change filter so are Level One fields that did not change.
+        """
+        mode = policy.mode if policy else INLINE
+        if mode == PROCESS:
+            # The pool pickles the handler and the timing wrapper is a closure,
+            # so with profiling on only the hand-off to the pool is timed
+            handler = self.handler_executors.wrap(service, handler, policy)
+        if self.instrumentation:
+            handler = self.instrumentation.wrap_handler(service, handler)
+        if mode == THREAD:
+            handler = self.handler_executors.wrap(service, handler, policy)
+        handlers = self.service_handlers.get(service)
+        if handlers is None:
+            handlers = self.service_handlers[service] = []
+            getattr(self.stream_client, SERVICE_HANDLER_METHODS[service])(self._service_dispatcher(service, handlers))
+        handlers.append(handler)
+    
+    def _service_dispatcher(self, service: str, handlers: List[Callable]) -> Callable:
+        """The one schwab-py handler of a service, calling `handlers` in registration order
+        
+        schwab-py gives each of its handlers a deep copy of the message, so
+        checks that must see a message once (sequence tracking, the change
+        filter) run here, before the fan-out, and every handler gets their
+        result.
+        """
+        def dispatch(message):
+            for handler in handlers:
+                result = handler(message)
+                # Async handlers are scheduled, as schwab-py does
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+        
+        dispatch.__qualname__ = f'dispatch_{service}'
+        if self.change_filter:
+            dispatch = self.change_filter.gate(service, dispatch)
+        if self.sequence_tracker:
+            dispatch = self.sequence_tracker.gate(service, dispatch)
+        return dispatch
+    
+    def updates(self, services: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+                max_queue: int = 10000, overflow: str = CONFLATE) -> AsyncIterator[Update]:
+        """Async iterator of normalized updates, optionally filtered by service and symbol
+        
+        Run it alongside `run_streaming_session`; it ends when the session
+        does. A consumer that falls `max_queue` updates behind loses updates
+        per `overflow` (conflate, drop_oldest or drop_newest); the stream
+        itself never waits.
+        """
+        return self.update_hub.updates(services, symbols, max_queue, overflow)
+    
+    def batches(self, max_items: int = 1000, max_wait: float = 0.01, services: Optional[Iterable[str]] = None,
+                symbols: Optional[Iterable[str]] = None, max_queue: int = 10000,
+                overflow: str = CONFLATE) -> AsyncIterator[List[Update]]:
+        """Like `updates`, but yields lists of up to `max_items` collected for at most `max_wait` seconds"""
+        return self.update_hub.batches(max_items, max_wait, services, symbols, max_queue, overflow)
+    
+    def register_batch_handler(self, service: str, handler: Callable[['ColumnarBatch'], None],
+                               fields: Optional[Iterable[str]] = None):
+        """Deliver each message of `service` to `handler` as one ColumnarBatch (call before the session)
+        
+        `fields` are the normalized columns the handler reads (None for all);
+        they are declared like any other consumer's. Every batch handler of
+        a service shares one decode per message.
+        """
+        from batch_dispatch import BatchDispatcher
+        from binary_records import SymbolTable
+        if self.batch_symbols is None:
+            self.batch_symbols = SymbolTable()
+        dispatcher = self.batch_dispatchers.get(service)
+        if dispatcher is None:
+            dispatcher = self.batch_dispatchers[service] = BatchDispatcher(service, self.batch_symbols)
+        dispatcher.add_handler(handler, fields)
+    
+    def declare_fields(self):
+        """Declare the fields read by the built-in consumers"""
+        registry = self.field_registry
+        level_one_services = [spec.service for spec in ASSET_CLASSES.values()]
+        if not self.dashboard_mode:
+            # The JSON dumps print whatever arrives
+            for service in level_one_services + ['CHART_EQUITY']:
+                registry.declare('print', service, None)
+        if self.dashboard_mode:
+            for service in level_one_services:
+                registry.declare_normalized('dashboard', service, QUOTE_FIELDS)
+            registry.declare_normalized('dashboard', 'CHART_EQUITY', BAR_FIELDS + ('time',))
+        if self.alert_engine:
+            for service in level_one_services:
+                registry.declare_normalized('alerts', service, self.alert_engine.fields())
+        if self.portfolio:
+            for service in level_one_services:
+                registry.declare_normalized('portfolio', service, self.portfolio.fields())
+        if self.sequence_tracker:
+            registry.declare('sequence', 'CHART_EQUITY', ['SEQUENCE'])
+        if self.extra_fields:
+            for service in level_one_services:
+                registry.declare_normalized('user', service, self.extra_fields)
+        for service, dispatcher in self.batch_dispatchers.items():
+            if service in level_one_services + ['CHART_EQUITY']:
+                if dispatcher.columns is None:
+                    registry.declare('batch', service, None)
+                else:
+                    registry.declare_normalized('batch', service, dispatcher.columns)
+    
+    def _stream_fields(self, service: str) -> Optional[list]:
+        from schwab.streaming import StreamClient
+        return stream_fields(StreamClient, service, self.field_registry.union(service))
+    
+    def _on_fields_changed(self, service: str, fields: Optional[List[str]]):
+        """Re-issue a live subscription when its declared field set changes"""
+        if service not in self.subscribed:
+            return
+        logger.info("Field set changed, resubscribing", extra=kv(
+            service=service, fields='all' if fields is None else ','.join(fields)))
+        asyncio.get_running_loop().create_task(self.resubscribe(service))
+    
+    async def resubscribe(self, service: str):
+        """Replay the last SUBS of a service with the current field list"""
+        symbols = self.subscribed[service]
+        if service == 'CHART_EQUITY':
+            await self.subscribe_chart(symbols)
+        elif service == 'LEVELONE_OPTIONS':
+            await self.option_streamer.subscribe(symbols, self._stream_fields(service), replace=True)
+        else:
+            asset_class = next(spec.name for spec in ASSET_CLASSES.values() if spec.service == service)
+            await self.subscribe_level_one(asset_class, symbols)
+    
+    def register_memory_budgets(self):
+        """Account each in-memory structure and trim the ones with a budget
+        
+        The market state (quotes, top of book, bars) packs and evicts
+        symbols, which its eviction listeners follow; book ladders, handler
+        queues and the change filter and query caches shed their oldest
+        entries. Portfolio positions, alert rules and option chains are
+        only reported.
+        """
+        budget = self.memory_budget
+        state = self.market_state
+        limits = self.subsystem_budget_bytes
+        budget.register('market_state', state.memory_bytes,
+                        lambda limit, size: state.trim(limit, self.idle_seconds, size), self.state_budget_bytes)
+        budget.register('book_ladders', state.ladder_bytes, state.trim_ladders, limits.get('book_ladders'))
+        budget.register('handler_queues', self.handler_executors.memory_bytes, self.handler_executors.trim,
+                        limits.get('handler_queues'))
+        if self.change_filter:
+            budget.register('change_filter', self.change_filter.memory_bytes, self.change_filter.trim,
+                            limits.get('change_filter'))
+        if self.portfolio:
+            budget.register('portfolio', self.portfolio.memory_bytes)
+        if self.alert_engine:
+            # Follows the market state through its eviction listener
+            budget.register('alert_engine', self.alert_engine.memory_bytes)
+        if self.option_streamer:
+            budget.register('option_chains', lambda: sum(
+                chain.memory_bytes() for chain in self.option_streamer.chains.values()))
+        if self.query_service:
+            budget.register('query_cache', self.query_service.memory_bytes, self.query_service.cache.trim,
+                            limits.get('query_cache'))
+        if self.pipeline and self.pipeline.ring:
+            budget.register('pipeline_ring', lambda: self.pipeline.slots * self.pipeline.slot_size)
+    
+    def _on_sequence_gap(self, service: str, symbol: str):
+        """Refill a gapped symbol; its next streamed fields pass the change filter whole"""
+        if self.change_filter:
+            self.change_filter.forget_symbol(service, symbol)
+        self.refiller.request(service, symbol)
+    
+    def _level_one_handler(self, asset_class: AssetClass):
+        """Decode Level One messages of one asset class into the market state"""
+        update_quote = self.market_state.update_quote
+        name = asset_class.name
+        
+        def handle_level_one(message):
+            for symbol, fields in asset_class.decode(message):
+                update_quote(name, symbol, fields)
+        return handle_level_one
+    
+    def _book_handler(self, venue: str):
+        """Keep every level of one venue's book in the market state, with its top"""
+        update_book = self.market_state.update_book
+        
+        def handle_book(message):
+            for symbol, book_time, bids, asks in decode_book_ladders(message):
+                update_book(venue, symbol, ladder_top(book_time, bids, asks), (bids, asks))
+        return handle_book
+    
+    def _chart_handler(self):
+        """Keep the latest chart bar in the market state"""
+        update_bar = self.market_state.update_bar
         
-        print("✅ Message handlers registered")
+        def handle_chart(message):
+            for symbol, bar in decode_chart(message):
+                update_bar(symbol, bar)
+        return handle_chart
+    
+    async def subscribe_level_one(self, asset_class: str, symbols: List[str]):
+        """Subscribe to Level One quotes for an asset class (equity, futures or forex)"""
+        spec = ASSET_CLASSES[asset_class]
+        symbols = [spec.normalize_symbol(s) for s in symbols]
+        fields = self._stream_fields(spec.service)
+        options = {} if fields is None else {'fields': fields}
+        await getattr(self.stream_client, spec.subs_method)(symbols, **options)
+        self.subscribed[spec.service] = symbols
+        logger.info("Subscribed to %s quotes", asset_class, extra=kv(
+            service=spec.service, symbols=','.join(symbols), fields=len(fields) if fields else 'all'))
+    
+    async def subscribe_chart(self, symbols: List[str]):
+        """Subscribe to CHART_EQUITY bars with the declared field list"""
+        from schwab.streaming import StreamClient
+        
+        fields = self._stream_fields('CHART_EQUITY')
+        if fields is None:
+            await self.stream_client.chart_equity_subs(symbols)
+        else:
+            # chart_equity_subs takes no field list; _service_op is what it calls
+            await self.stream_client._service_op(
+                symbols, 'CHART_EQUITY', 'SUBS', StreamClient.ChartEquityFields, fields=fields)
+        self.subscribed['CHART_EQUITY'] = symbols
+    
+    def recover_state(self):
+        """Reload the last checkpointed state; symbols stay stale until their first live update"""
+        if self.state_journal:
+            self.state_journal.recover()
+            self.state_journal.attach()
+    
+    async def start_local_services(self):
+        """Tick recording, the query API and the record socket, ahead of the first update"""
+        if self.tick_recorder:
+            self.tick_recorder.attach()
+            self.tick_recorder.start()
+        if self.query_service:
+            self.query_service.start()
+        if self.record_publisher:
+            await self.record_publisher.start()
+    
+    def load_instruments(self) -> int:
+        """Load persisted instrument metadata"""
+        cached = self.instrument_cache.load()
+        logger.info("Loaded instrument cache", extra=kv(instruments=cached, path=self.instrument_cache.path))
+        return cached
+    
+    async def warm_up(self, symbols: List[str], executor: Optional[Executor] = None) -> int:
+        """Seed the market state with REST snapshots of every Level One symbol while the stream starts"""
+        if self.refiller is None:
+            self.refiller = SnapshotRefiller(self.client, self.market_state)
+        seeded = await self.refiller.warm_up({'equity': symbols, **self.level_one_symbols}, executor)
+        logger.info("Warmed up %d quotes from snapshots", seeded)
+        return seeded
+    
+    async def subscribe_all(self, symbols: List[str]):
+        """Equity quotes, books and bars, then futures and forex quotes and option chains"""
+        await self.subscribe_to_symbols(symbols)
+        for asset_class, asset_symbols in self.level_one_symbols.items():
+            await self.subscribe_level_one(asset_class, asset_symbols)
+        if self.option_underlyings:
+            await self.stream_option_chains(self.option_underlyings)
+    
+    def load_positions(self) -> int:
+        """Positions of the resolved accounts, marked from quotes already in the state"""
+        return self.portfolio.load(self.client, self.account_hashes)
+    
+    async def subscribe_portfolio(self):
+        """Level One quotes for held symbols not already streamed, and account activity"""
+        for asset_class, held in self.portfolio.symbols().items():
+            spec = ASSET_CLASSES[asset_class]
+            streamed = set(self.subscribed.get(spec.service, ()))
+            missing = [symbol for symbol in held if symbol not in streamed]
+            if not missing:
+                continue
+            if spec.service not in self.subscribed:
+                await self.subscribe_level_one(asset_class, missing)
+                continue
+            fields = self._stream_fields(spec.service)
+            options = {} if fields is None else {'fields': fields}
+            await getattr(self.stream_client, spec.add_method)(missing, **options)
+            # Resubscriptions replay the held symbols too
+            self.subscribed[spec.service] = list(self.subscribed[spec.service]) + missing
+            logger.info("Added held symbols to %s quotes", asset_class,
+                        extra=kv(service=spec.service, symbols=','.join(missing)))
+        await self.stream_client.account_activity_sub()
+        logger.info("Subscribed to account activity", extra=kv(service='ACCT_ACTIVITY'))
     
     async def subscribe_to_symbols(self, symbols: List[str]):
-        """Subscribe to streaming data for given symbols"""
+        """Subscribe to streaming data for given symbols
+        
+        Books are routed from the instrument cache, which the bootstrap's
+        'instruments' step has already refreshed for `symbols`.
+        """
         try:
-            print(f"🔔 Subscribing to symbols: {', '.join(symbols)}")
+            logger.info("Subscribing to symbols", extra=kv(symbols=','.join(symbols)))
             
             # Subscribe to level one equity quotes
-            await self.stream_client.level_one_equity_subs(symbols)
-            print("✅ Subscribed to equity quotes")
+            await self.subscribe_level_one('equity', symbols)
             
-            # Subscribe to order books (try both NYSE and NASDAQ)
-            try:
-                await self.stream_client.nasdaq_book_subs(symbols)
-                print("✅ Subscribed to NASDAQ order book")
-            except Exception as e:
-                print(f"⚠️  Could not subscribe to NASDAQ book: {e}")
+            # Subscribe each symbol to the book of its listing exchange
+            routes, skipped, unresolved = self.instrument_cache.route_books(symbols)
+            if skipped:
+                logger.info("No book for %d symbols", len(skipped), extra=kv(symbols=','.join(skipped)))
+            if unresolved:
+                # Lookup failed: fall back to trying both venues for these only
+                logger.warning("Listing exchange unknown, subscribing both books",
+                               extra=kv(symbols=','.join(unresolved)))
+                for service in BOOK_SUBS_METHODS:
+                    routes.setdefault(service, []).extend(unresolved)
             
-            try:
-                await self.stream_client.nyse_book_subs(symbols)
-                print("✅ Subscribed to NYSE order book")
-            except Exception as e:
-                print(f"⚠️  Could not subscribe to NYSE book: {e}")
+            for service, book_symbols in routes.items():
+                try:
+                    await getattr(self.stream_client, BOOK_SUBS_METHODS[service])(book_symbols)
+                    logger.info("Subscribed to order book", extra=kv(service=service, symbols=','.join(book_symbols)))
+                except Exception as e:
+                    logger.warning("Could not subscribe to order book: %s", e, extra=kv(service=service))
             
             # Subscribe to chart data
             try:
-                await self.stream_client.chart_equity_subs(symbols)
-                print("✅ Subscribed to chart data")
+                await self.subscribe_chart(symbols)
+                logger.info("Subscribed to chart data", extra=kv(service='CHART_EQUITY'))
             except Exception as e:
-                print(f"⚠️  Could not subscribe to chart data: {e}")
+                logger.warning("Could not subscribe to chart data: %s", e, extra=kv(service='CHART_EQUITY'))
                 
         except Exception as e:
-            print(f"❌ Error subscribing to symbols: {e}")
+            logger.error("Error subscribing to symbols: %s", e)
+            raise
+    
+    async def stream_option_chains(self, underlyings: List[str], **chain_kwargs):
+        """Resolve option chains in bulk and stream every contract"""
+        try:
+            logger.info("Resolving option chains", extra=kv(symbols=','.join(underlyings)))
+            if self.option_streamer is None:
+                self.option_streamer = OptionChainStreamer(self.client, self.stream_client)
+                self.register_handler('LEVELONE_OPTIONS', self.option_streamer.on_level_one_option)
+            
+            chains = await self.option_streamer.resolve_chains(underlyings, **chain_kwargs)
+            for underlying, chain in chains.items():
+                logger.info("Option chain resolved", extra=kv(symbol=underlying, contracts=len(chain),
+                                                              expiries=len(chain.expiries), strikes=len(chain.strikes)))
+            
+            self.field_registry.declare('option_chain', 'LEVELONE_OPTIONS', CHAIN_STREAM_FIELDS)
+            count = await self.option_streamer.subscribe(underlyings, self._stream_fields('LEVELONE_OPTIONS'))
+            # Option subscriptions are replayed per underlying
+            self.subscribed['LEVELONE_OPTIONS'] = underlyings
+            logger.info("Subscribed to %d option contracts", count, extra=kv(service='LEVELONE_OPTIONS'))
+        except Exception as e:
+            logger.error("Error streaming option chains: %s", e, extra=kv(service='LEVELONE_OPTIONS'))
             raise
     
     async def stream_data(self, duration_seconds: Optional[int] = None):
         """Stream data for specified duration or indefinitely"""
-        print(f"\n🚀 Starting data stream...")
         if duration_seconds:
-            print(f"⏱️  Will stream for {duration_seconds} seconds")
+            logger.info("Starting data stream for %d seconds", duration_seconds)
         else:
-            print("⏱️  Streaming indefinitely (press Ctrl+C to stop)")
+            logger.info("Starting data stream indefinitely (press Ctrl+C to stop)")
         
         start_time = datetime.now()
+        merge_task = None
+        if self.pipeline:
+            merge_task = asyncio.create_task(
+                self.pipeline.merge_results(lambda result: merge_into_state(self.market_state, result)))
         
         try:
             while True:
                 # Handle incoming messages
-                await self.stream_client.handle_message()
+                if self.pipeline:
+                    await self._receive_frame()
+                else:
+                    await self.stream_client.handle_message()
                 
                 # Check if duration limit reached
                 if duration_seconds:
                     elapsed = (datetime.now() - start_time).total_seconds()
                     if elapsed >= duration_seconds:
-                        print(f"\n⏰ Stream duration of {duration_seconds} seconds completed")
+                        logger.info("Stream duration of %d seconds completed", duration_seconds)
                         break
                         
         except KeyboardInterrupt:
-            print("\n🛑 Stream interrupted by user")
+            logger.info("Stream interrupted by user")
         except Exception as e:
-            print(f"❌ Error during streaming: {e}")
+            logger.error("Error during streaming: %s", e)
             raise
+        finally:
+            if merge_task:
+                merge_task.cancel()
+    
+    async def _receive_frame(self):
+        """Hand one raw websocket frame to the pipeline instead of decoding it here"""
+        # schwab-py keeps its websocket on the private _socket attribute, and
+        # serializes reads with subscription replies under its _lock
+        stream_client = self.stream_client
+        async with stream_client._lock:
+            # Data frames schwab-py read while waiting for login and subscription
+            # replies are parked, decoded, in _overflow_items (oldest on the right)
+            overflow = getattr(stream_client, '_overflow_items', None)
+            if overflow:
+                frame = json.dumps(overflow.pop())
+            else:
+                frame = await stream_client._socket.recv()
+        await self.pipeline.put(frame)
+    
+    def pipeline_conflicts(self) -> List[str]:
+        """Enabled features that need the message handlers, which pipeline mode bypasses
+        
+        The workers only merge quotes, books and bars into the market state;
+        consumers of the state (dashboard, alerts, stores, query API) work.
+        """
+        conflicts = []
+        if not self.dashboard_mode:
+            conflicts.append('JSON dumps (use --dashboard)')
+        if self.sequence_tracker:
+            conflicts.append('sequence check (SCHWAB_SEQUENCE_CHECK)')
+        if self.change_filter:
+            conflicts.append('change filter (SCHWAB_CHANGE_FILTER)')
+        if self.option_underlyings:
+            conflicts.append('option chains (SCHWAB_OPTION_CHAINS)')
+        if self.portfolio:
+            conflicts.append('portfolio account activity (SCHWAB_PORTFOLIO)')
+        if self.batch_dispatchers:
+            conflicts.append('batch handlers')
+        if self.print_handler_policy:
+            conflicts.append('offloaded print handlers (SCHWAB_PRINT_HANDLER_MODE)')
+        return conflicts
     
     async def run_streaming_session(self, symbols: List[str], duration_seconds: Optional[int] = None):
         """Run a complete streaming session"""
+        if self.pipeline:
+            conflicts = self.pipeline_conflicts()
+            if conflicts:
+                raise ValueError("Pipeline mode bypasses the message handlers; turn off "
+                                 f"{', '.join(conflicts)} or unset SCHWAB_PIPELINE_WORKERS")
         try:
-            print("🏁 Starting Schwab Streaming Session")
-            print("=" * 50)
+            set_session_id(uuid.uuid4().hex[:12])
+            logger.info("Starting Schwab Streaming Session")
+            
+            # Clients, login, handlers, instruments, snapshots and subscriptions, overlapped
+            self.bootstrap = session_bootstrap(self, symbols, self.bootstrap_concurrent, self.snapshot_warm_up,
+                                               portfolio=self.portfolio is not None)
+            await self.bootstrap.run()
+            self.bootstrap.log_report()
+            
+            # Start profiling hooks
+            if self.instrumentation:
+                for stream_client in getattr(self.stream_client, 'legs', [self.stream_client]):
+                    self.instrumentation.instrument_socket(stream_client)
+                self.instrumentation.take_snapshot()
+                self.instrumentation.start()
+            
+            # Refill symbols hit by sequence gaps from REST snapshots
+            if self.sequence_tracker:
+                if self.refiller is None:
+                    self.refiller = SnapshotRefiller(self.client, self.market_state)
+                self.sequence_tracker.on_gap = self._on_sequence_gap
+                self.refiller.start()
             
-            # Setup clients
-            await self.setup_clients()
+            # Reload positions of accounts with activity
+            if self.portfolio:
+                self.portfolio.start()
             
-            # Login to stream
-            await self.login_to_stream()
+            # Start periodic checkpoints
+            if self.state_journal:
+                self.state_journal.start()
             
-            # Setup handlers
-            self.setup_handlers()
+            # Start memory accounting
+            if self.memory_budget:
+                self.register_memory_budgets()
+                self.memory_budget.start()
             
-            # Subscribe to symbols
-            await self.subscribe_to_symbols(symbols)
+            # Start the decode workers
+            if self.pipeline:
+                self.pipeline.start()
+            
+            # Start the dashboard
+            if self.dashboard_mode:
+                dashboard_symbols = symbols + [s for syms in self.level_one_symbols.values() for s in syms]
+                self.dashboard = TerminalDashboard(self.market_state, dashboard_symbols)
+                self.dashboard.start()
             
             # Start streaming
             await self.stream_data(duration_seconds)
             
         except Exception as e:
-            print(f"❌ Streaming session failed: {e}")
+            logger.error("Streaming session failed: %s", e)
             raise
         finally:
+            # Let update iterators drain and finish
+            self.update_hub.close()
+            
+            if self.dashboard:
+                self.dashboard.stop()
+                self.dashboard = None
+            
+            if self.instrumentation:
+                self.instrumentation.stop()
+                if self.instrumentation.snapshots:
+                    self.instrumentation.take_snapshot()
+                self.instrumentation.stop_tracing()
+                report = self.instrumentation.report()
+                for name, timing in report['handlers'].items():
+                    logger.info("Handler timing %s", name, extra=kv(**timing))
+                logger.info("Decode timing", extra=kv(**report['decode']))
+                logger.info("Event loop lag", extra=kv(**report['loop_lag']))
+                for line in report['allocation_growth']:
+                    logger.info("Allocation growth: %s", line)
+            
+            if self.refiller:
+                self.refiller.stop()
+                if self.sequence_tracker:
+                    for service, stats in self.sequence_tracker.report().items():
+                        logger.info("Sequence summary", extra=kv(service=service, **stats))
+                logger.info("Snapshot refill summary", extra=kv(**self.refiller.report()))
+            
+            if self.change_filter:
+                self.change_filter.log_report()
+            
+            if self.portfolio:
+                self.portfolio.stop()
+                logger.info("Portfolio summary", extra=kv(**self.portfolio.report()))
+            
+            if self.memory_budget:
+                self.memory_budget.stop()
+                self.memory_budget.enforce()
+                self.memory_budget.log_report()
+            
+            if self.redundant and self.stream_client:
+                for index, stats in enumerate(self.stream_client.report()):
+                    logger.info("Stream leg %d", index, extra=kv(**stats))
+            
+            for service, dispatcher in self.batch_dispatchers.items():
+                logger.info("Batch dispatch summary", extra=kv(service=service, **dispatcher.report()))
+            
+            if self.tick_recorder:
+                self.tick_recorder.stop()
+                logger.info("Tick store summary", extra=kv(**self.tick_recorder.report()))
+            
+            if self.query_service:
+                await self.query_service.stop()
+                logger.info("Query API summary", extra=kv(**self.query_service.report()))
+            
+            if self.record_publisher:
+                await self.record_publisher.stop()
+                logger.info("Record publisher summary", extra=kv(**self.record_publisher.report()))
+            
+            if self.state_journal:
+                self.state_journal.stop()
+                logger.info("State journal summary", extra=kv(**self.state_journal.report()))
+            
+            if self.handler_executors.executors:
+                for name, stats in self.handler_executors.stats().items():
+                    logger.info("Offloaded handler %s", name, extra=kv(**stats))
+                self.handler_executors.shutdown(wait=False)
+            
+            if self.pipeline and self.pipeline.ring:
+                stats = self.pipeline.stats()
+                logger.info("Pipeline summary", extra=kv(**stats['reader'], results_merged=stats['merge']['results_merged']))
+                for index, worker in enumerate(stats['workers']):
+                    logger.info("Pipeline worker %d", index, extra=kv(**worker))
+                self.pipeline.stop()
+            
             # Always try to logout
             try:
                 await self.logout_from_stream()
             except:
                 pass
-            print("🏁 Streaming session ended")
+            if self.alert_engine:
+                stats = self.alert_engine.stats()
+                logger.info("Alert summary", extra=kv(fired=stats['alerts_fired'], debounced=stats['alerts_suppressed'],
+                                                      rules_per_update=round(stats['rules_per_update'], 2),
+                                                      avg_eval_us=round(stats['avg_eval_us'], 1)))
+            logger.info("Streaming session ended")
+            set_session_id(None)
 
 
 async def main():
@@ -287,15 +955,137 @@ async def main():
     # Default symbols to stream (you can modify this list)
     symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'SPY']
     
-    # Parse command line arguments for custom symbols
-    if len(sys.argv) > 1:
-        symbols = sys.argv[1].split(',')
+    # Parse command line arguments for custom symbols and flags
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    if args:
+        symbols = args[0].split(',')
         symbols = [s.strip().upper() for s in symbols]
     
-    print(f"🎯 Target symbols: {', '.join(symbols)}")
+    logger.info("Target symbols", extra=kv(symbols=','.join(symbols)))
     
     # Create and run streaming client
     streaming_client = SchwabStreamingClient()
+    streaming_client.dashboard_mode = '--dashboard' in flags
+    
+    # Load alert rules if configured
+    alert_rules_path = os.getenv('SCHWAB_ALERT_RULES')
+    if alert_rules_path:
+        streaming_client.alert_engine = AlertEngine()
+        count = streaming_client.alert_engine.load_rules(alert_rules_path)
+        logger.info("Loaded %d alert rules", count, extra=kv(path=alert_rules_path))
+    
+    # Futures and forex symbols, e.g. SCHWAB_FUTURES=/ES,/NQ and SCHWAB_FOREX=EUR/USD
+    for asset_class, variable in (('futures', 'SCHWAB_FUTURES'), ('forex', 'SCHWAB_FOREX')):
+        value = os.getenv(variable)
+        if value:
+            streaming_client.level_one_symbols[asset_class] = parse_symbol_list(value, asset_class)
+    
+    # Profiling hooks, e.g. SCHWAB_PROFILE=1 SCHWAB_HANDLER_BUDGET_MS=2; allocation
+    # tracing slows every allocation, so it also needs SCHWAB_PROFILE_ALLOCATIONS=1
+    if os.getenv('SCHWAB_PROFILE'):
+        streaming_client.instrumentation = Instrumentation(
+            handler_budget_ms=float(os.getenv('SCHWAB_HANDLER_BUDGET_MS', '5')),
+            trace_allocations=os.getenv('SCHWAB_PROFILE_ALLOCATIONS') == '1')
+    
+    # Extra normalized fields for your own handlers, e.g. SCHWAB_FIELDS=bid,ask,last,volume
+    extra_fields = os.getenv('SCHWAB_FIELDS')
+    if extra_fields:
+        streaming_client.extra_fields = [f.strip() for f in extra_fields.split(',') if f.strip()]
+    
+    # Sequence gap detection is on by default (off in pipeline mode, which has no
+    # handlers to check); SCHWAB_SEQUENCE_CHECK=0 turns it off
+    if os.getenv('SCHWAB_SEQUENCE_CHECK', '0' if os.getenv('SCHWAB_PIPELINE_WORKERS') else '1') == '0':
+        streaming_client.sequence_tracker = None
+    
+    # Drop Level One updates that repeat known values, e.g. SCHWAB_CHANGE_FILTER=1
+    # SCHWAB_CHANGE_FIELDS=LEVELONE_EQUITIES=bid,ask,last SCHWAB_CHANGE_TOLERANCES=LEVELONE_EQUITIES=volume:100
+    if os.getenv('SCHWAB_CHANGE_FILTER') == '1':
+        change_fields = os.getenv('SCHWAB_CHANGE_FIELDS')
+        streaming_client.change_filter = ChangeFilter(
+            parse_service_fields(change_fields) if change_fields else None,
+            parse_tolerances(os.getenv('SCHWAB_CHANGE_TOLERANCES', '')))
+    
+    # Position P&L marked from the stream, e.g. SCHWAB_PORTFOLIO=1 SCHWAB_PORTFOLIO_MARK=mid
+    if os.getenv('SCHWAB_PORTFOLIO') == '1':
+        streaming_client.portfolio = Portfolio(streaming_client.market_state,
+                                               os.getenv('SCHWAB_PORTFOLIO_MARK', 'mark'))
+    
+    # Start-up steps overlap by default; SCHWAB_BOOTSTRAP=serial runs them one by one for comparison
+    streaming_client.bootstrap_concurrent = os.getenv('SCHWAB_BOOTSTRAP', 'concurrent') != 'serial'
+    streaming_client.snapshot_warm_up = os.getenv('SCHWAB_SNAPSHOT_WARM_UP', '1') != '0'
+    
+    # Run the JSON dump handlers off the event loop, e.g. SCHWAB_PRINT_HANDLER_MODE=thread
+    print_handler_mode = os.getenv('SCHWAB_PRINT_HANDLER_MODE')
+    if print_handler_mode == PROCESS:
+        # The dump handlers are closures and cannot be pickled to a worker process
+        logger.warning("SCHWAB_PRINT_HANDLER_MODE=process is not supported, using thread")
+        print_handler_mode = THREAD
+    if print_handler_mode:
+        streaming_client.print_handler_policy = HandlerPolicy(
+            mode=print_handler_mode,
+            max_in_flight=int(os.getenv('SCHWAB_HANDLER_MAX_IN_FLIGHT', '1000')),
+            overflow=os.getenv('SCHWAB_HANDLER_OVERFLOW', 'conflate'))
+    
+    # Memory budget for the market state, e.g. SCHWAB_MEMORY_BUDGET_MB=256, and for
+    # other subsystems, e.g. SCHWAB_MEMORY_BUDGETS=book_ladders=64,handler_queues=32
+    memory_budget_mb = os.getenv('SCHWAB_MEMORY_BUDGET_MB')
+    subsystem_budgets = os.getenv('SCHWAB_MEMORY_BUDGETS')
+    if memory_budget_mb or subsystem_budgets or os.getenv('SCHWAB_MEMORY_REPORT'):
+        streaming_client.memory_budget = MemoryBudget(
+            interval=float(os.getenv('SCHWAB_MEMORY_CHECK_SECONDS', '30')))
+        if memory_budget_mb:
+            streaming_client.state_budget_bytes = int(float(memory_budget_mb) * MB)
+        if subsystem_budgets:
+            streaming_client.subsystem_budget_bytes = parse_budgets(subsystem_budgets)
+        streaming_client.idle_seconds = float(os.getenv('SCHWAB_IDLE_SECONDS', '300'))
+    
+    # Checkpoint and journal the market state, e.g. SCHWAB_STATE_PATH=state/market
+    state_path = os.getenv('SCHWAB_STATE_PATH')
+    if state_path:
+        streaming_client.state_journal = StateJournal(
+            streaming_client.market_state, state_path,
+            checkpoint_seconds=float(os.getenv('SCHWAB_CHECKPOINT_SECONDS', '60')),
+            fsync=os.getenv('SCHWAB_JOURNAL_FSYNC') == '1')
+    
+    # Record quotes, trades and bars, e.g. SCHWAB_TICK_STORE=ticks
+    tick_store = os.getenv('SCHWAB_TICK_STORE')
+    if tick_store:
+        # NumPy is only needed when recording
+        from tick_store import TickRecorder
+        streaming_client.tick_recorder = TickRecorder(
+            streaming_client.market_state, tick_store,
+            flush_seconds=float(os.getenv('SCHWAB_TICK_FLUSH_SECONDS', '60')))
+    
+    # Query API over the live state, e.g. SCHWAB_QUERY_PORT=8120
+    query_port = os.getenv('SCHWAB_QUERY_PORT')
+    if query_port:
+        # FastAPI and uvicorn are only needed when the API is enabled
+        from query_api import QueryService
+        streaming_client.query_service = QueryService(
+            streaming_client.market_state, host=os.getenv('SCHWAB_QUERY_HOST', '127.0.0.1'), port=int(query_port))
+    
+    # Binary records to local subscribers, e.g. SCHWAB_RECORD_SOCKET=/tmp/schwab_records.sock
+    record_socket = os.getenv('SCHWAB_RECORD_SOCKET')
+    if record_socket:
+        from binary_records import RecordPublisher
+        streaming_client.record_publisher = RecordPublisher(streaming_client.market_state, record_socket)
+    
+    # Two stream sessions with first-arrival arbitration, SCHWAB_REDUNDANT=1
+    streaming_client.redundant = os.getenv('SCHWAB_REDUNDANT') == '1'
+    
+    # Multi-process decode pipeline, e.g. SCHWAB_PIPELINE_WORKERS=4
+    pipeline_workers = os.getenv('SCHWAB_PIPELINE_WORKERS')
+    if pipeline_workers and streaming_client.redundant:
+        # The pipeline reads raw frames from a single websocket
+        logger.warning("SCHWAB_PIPELINE_WORKERS is ignored in redundant mode")
+    elif pipeline_workers:
+        streaming_client.pipeline = DecodePipeline(workers=int(pipeline_workers))
+    
+    # Option chains to stream, e.g. SCHWAB_OPTION_CHAINS=SPY,QQQ
+    option_chains = os.getenv('SCHWAB_OPTION_CHAINS')
+    if option_chains:
+        streaming_client.option_underlyings = [s.strip().upper() for s in option_chains.split(',')]
     
     # Run for 60 seconds by default (set to None for indefinite streaming)
     duration = 60  # seconds
@@ -303,19 +1093,21 @@ async def main():
     await streaming_client.run_streaming_session(symbols, duration)
 
 
-if __name__ == "__main__":
-    print("Schwab Streaming Client")
-    print("=" * 30)
-    print("Make sure you have:")
-    print("1. Valid Schwab API credentials in .env file")
-    print("2. Completed OAuth authentication")
-    print("3. schwab_token.json file with valid tokens")
-    print()
+def run():
+    """Entry point of `python schwab_streaming.py` and `python cli.py stream`"""
+    configure_logging()
+    require_schwab()
+    logger.info("Schwab Streaming Client - requires valid API credentials in .env and a schwab_token.json "
+                "from a completed OAuth authentication")
     
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("\n👋 Goodbye!")
+        logger.info("Goodbye!")
     except Exception as e:
-        print(f"❌ Fatal error: {e}")
+        logger.critical("Fatal error: %s", e)
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Sequence Tracking for Schwab Streaming Client
+Per-service gap, duplicate and stale-frame detection in the message path,
+with REST refill of the symbols a gap touched
+
+Only CHART_EQUITY items carry a sequence number (one per minute bar), so
+that is where gaps are detected; a gap is refilled from minute price
+history. Level One and book items carry none: they are checked against
+the frame timestamp only, and stale ones are dropped. Level One snapshots
+(get_quotes) seed the state at start-up and serve any Level One gap
+reported by other means.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from asset_classes import ASSET_CLASSES
+from fixed_point import fixed_fields, to_fixed
+from stream_logging import get_logger, kv
+
+logger = get_logger('sequence')
+
+OK = 'ok'
+GAP = 'gap'
+DUPLICATE = 'duplicate'
+STALE = 'stale'
+
+# Content keys carrying a per-symbol sequence number (chart field 1 on the
+# wire, SEQUENCE once schwab-py relabels it)
+SEQUENCE_KEYS = ('SEQUENCE',)
+
+# Level One services carry partial field updates, so a missed frame leaves
+# stale fields behind until a snapshot replaces them. Book messages are
+# full replacements and heal on the next message.
+REFILL_SERVICES = {spec.service: spec.name for spec in ASSET_CLASSES.values()}
+
+# A chart gap loses whole minute bars, which price history has
+BAR_REFILL_SERVICE = 'CHART_EQUITY'
+
+# get_price_history candle fields mapped to the normalized bar names
+CANDLE_FIELDS = {
+    'open': 'open',
+    'high': 'high',
+    'low': 'low',
+    'close': 'close',
+    'volume': 'volume',
+    'datetime': 'time',
+}
+
+# get_quotes response fields mapped to the normalized Level One names
+QUOTE_SNAPSHOT_FIELDS = {
+    'bidPrice': 'bid',
+    'askPrice': 'ask',
+    'lastPrice': 'last',
+    'bidSize': 'bid_size',
+    'askSize': 'ask_size',
+    'lastSize': 'last_size',
+    'totalVolume': 'volume',
+    'openPrice': 'open',
+    'highPrice': 'high',
+    'lowPrice': 'low',
+    'closePrice': 'close',
+    'netChange': 'net_change',
+    'mark': 'mark',
+    'quoteTime': 'quote_time',
+    'tradeTime': 'trade_time',
+    'openInterest': 'open_interest',
+    'settlementPrice': 'settlement',
+    'tick': 'tick',
+    'tickAmount': 'tick_amount',
+}
+
+
+class SequenceStats:
+    """Counters for one service"""
+
+    __slots__ = ('items', 'gaps', 'missing', 'duplicates', 'stale')
+
+    def __init__(self):
+        self.items = 0
+        self.gaps = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.stale = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SequenceTracker:
+    """Checks each content item against the last one seen for its (service, symbol)
+
+    Items carrying a sequence number are checked for gaps (accepted, the
+    symbol is reported to `on_gap`), duplicates and regressions (both
+    dropped). Items without one fall back to the entry timestamp: an item
+    older than the last accepted one for that symbol is dropped as stale.
+    """
+
+    def __init__(self, on_gap: Optional[Callable[[str, str], None]] = None):
+        self.on_gap = on_gap
+        self.stats: Dict[str, SequenceStats] = {}
+        self._last_seq: Dict[Tuple[str, str], int] = {}
+        self._last_time: Dict[Tuple[str, str], int] = {}
+
+    def check(self, service: str, symbol: str, seq: Optional[int], timestamp: Optional[int]) -> str:
+        stats = self.stats.get(service)
+        if stats is None:
+            stats = self.stats[service] = SequenceStats()
+        stats.items += 1
+        key = (service, symbol)
+
+        if seq is not None:
+            last = self._last_seq.get(key)
+            if last is not None:
+                if seq == last:
+                    stats.duplicates += 1
+                    return DUPLICATE
+                if seq < last:
+                    stats.stale += 1
+                    return STALE
+            self._last_seq[key] = seq
+            if timestamp is not None:
+                self._last_time[key] = timestamp
+            if last is not None and seq > last + 1:
+                stats.gaps += 1
+                stats.missing += seq - last - 1
+                logger.warning("Sequence gap", extra=kv(service=service, symbol=symbol,
+                                                        expected=last + 1, received=seq))
+                if self.on_gap:
+                    self.on_gap(service, symbol)
+                return GAP
+            return OK
+
+        if timestamp is not None:
+            last_time = self._last_time.get(key)
+            if last_time is not None and timestamp < last_time:
+                stats.stale += 1
+                return STALE
+            self._last_time[key] = timestamp
+        return OK
+
+    def filter_message(self, service: str, message: dict) -> Optional[dict]:
+        """The message without duplicate and stale items, or None if nothing is left
+
+        Call it once per received message: a second call with the same
+        message sees its items as duplicates.
+        """
+        timestamp = message.get('timestamp')
+        content = message.get('content', [])
+        kept = []
+        for item in content:
+            symbol = item.get('key')
+            if symbol is None:
+                kept.append(item)
+                continue
+            seq = None
+            for name in SEQUENCE_KEYS:
+                if name in item:
+                    seq = item[name]
+                    break
+            if self.check(service, symbol, seq, timestamp) in (OK, GAP):
+                kept.append(item)
+
+        if len(kept) == len(content):
+            return message
+        if kept:
+            return dict(message, content=kept)
+        return None
+
+    def gate(self, service: str, handler: Callable) -> Callable:
+        """Wrap a handler so it only sees in-order items
+
+        Gate one handler per service that fans out to the rest: schwab-py
+        copies the message for each of its handlers, so separately gated
+        handlers would each check the same items.
+        """
+        filter_message = self.filter_message
+
+        def sequenced_handler(message):
+            filtered = filter_message(service, message)
+            if filtered is not None:
+                return handler(filtered)
+
+        sequenced_handler.__qualname__ = getattr(handler, '__qualname__', repr(handler))
+        return sequenced_handler
+
+    def forget(self, symbols: List[str]):
+        """Drop tracking state for evicted symbols"""
+        symbols = set(symbols)
+        for table in (self._last_seq, self._last_time):
+            for key in [key for key in table if key[1] in symbols]:
+                del table[key]
+
+    def report(self) -> Dict[str, dict]:
+        return {service: stats.as_dict() for service, stats in self.stats.items()}
+
+
+class SnapshotRefiller:
+    """Refills symbols hit by a gap from REST instead of resubscribing
+
+    Level One quotes are refreshed with get_quotes, collected for
+    `interval` seconds and sent `batch_size` symbols at a time. Chart bars
+    missed since the symbol's last bar are fetched with one minute price
+    history call per symbol and recorded in time order; they never replace
+    a newer bar that has arrived since.
+    """
+
+    def __init__(self, client, state, batch_size: int = 200, interval: float = 0.25):
+        self.client = client
+        self.state = state
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending: Dict[str, Set[str]] = {}
+        # Symbol -> time (ms) of its last bar before a chart gap
+        self.pending_bars: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.requested = 0
+        self.refilled = 0
+        self.batches = 0
+        self.bars_refilled = 0
+        self.errors = 0
+
+    def request(self, service: str, symbol: str):
+        """on_gap callback: queue `symbol` if its service needs a snapshot
+
+        Called from the sequence check, before the item that showed the gap
+        reaches the state, so a chart symbol's bar in the state is the last
+        one before the gap.
+        """
+        if service == BAR_REFILL_SERVICE:
+            bar = self.state.get_bar(symbol)
+            if bar is None or bar.get('time') is None:
+                return
+            if symbol not in self.pending_bars:
+                self.requested += 1
+            self.pending_bars[symbol] = min(bar['time'], self.pending_bars.get(symbol, bar['time']))
+            return
+        asset_class = REFILL_SERVICES.get(service)
+        if asset_class is None:
+            return
+        symbols = self.pending.setdefault(asset_class, set())
+        if symbol not in symbols:
+            symbols.add(symbol)
+            self.requested += 1
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _fetch(self, symbols: List[str]) -> dict:
+        response = self.client.get_quotes(symbols)
+        if response.status_code != 200:
+            raise Exception(f"Failed to get quotes: {response.text}")
+        return response.json()
+
+    def _fetch_bars(self, symbol: str, since: int) -> dict:
+        response = self.client.get_price_history_every_minute(
+            symbol, start_datetime=datetime.fromtimestamp(since / 1000), end_datetime=datetime.now())
+        if response.status_code != 200:
+            raise Exception(f"Failed to get price history: {response.text}")
+        return response.json()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.pending_bars:
+                pending_bars, self.pending_bars = self.pending_bars, {}
+                await self._refill_bars(pending_bars)
+            if not self.pending:
+                continue
+            pending, self.pending = self.pending, {}
+            for asset_class, symbols in pending.items():
+                await self._refill(asset_class, sorted(symbols))
+
+    async def _refill_bars(self, pending: Dict[str, int]):
+        loop = asyncio.get_running_loop()
+        symbols = sorted(pending)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self._fetch_bars, symbol, pending[symbol]) for symbol in symbols
+        ), return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                self.errors += 1
+                logger.warning("Bar refill failed: %s", result, extra=kv(symbol=symbol))
+                continue
+            self.apply_bars(symbol, result, pending[symbol])
+
+    def apply_bars(self, symbol: str, response: dict, since: int):
+        """Record the price history candles between `since` and the symbol's current bar"""
+        latest = (self.state.get_bar(symbol) or {}).get('time')
+        for candle in response.get('candles') or ():
+            bar = {CANDLE_FIELDS[name]: value for name, value in candle.items() if name in CANDLE_FIELDS}
+            time_ms = bar.get('time')
+            if time_ms is None or time_ms <= since or (latest is not None and time_ms >= latest):
+                continue
+            for name in ('open', 'high', 'low', 'close'):
+                bar[name] = to_fixed(bar.get(name))
+            self.state.update_bar(symbol, bar)
+            self.bars_refilled += 1
+
+    async def _refill(self, asset_class: str, symbols: List[str], since: Optional[float] = None,
+                      executor: Optional[Executor] = None):
+        loop = asyncio.get_running_loop()
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, self._fetch, batch) for batch in batches
+        ), return_exceptions=True)
+        for batch, result in zip(batches, results):
+            self.batches += 1
+            if isinstance(result, Exception):
+                self.errors += 1
+                logger.warning("Snapshot refill failed: %s", result, extra=kv(symbols=len(batch)))
+                continue
+            self.apply(asset_class, result, since)
+
+    async def warm_up(self, symbols: Dict[str, List[str]], executor: Optional[Executor] = None) -> int:
+        """Seed the market state with one snapshot of every symbol, by asset class
+
+        Runs while the stream logs in and subscribes; a symbol that gets a
+        live update before its snapshot arrives keeps the live values.
+        Requests run on `executor` (the loop's default one if None).
+        Returns the number of symbols seeded.
+        """
+        refilled = self.refilled
+        since = time.time()
+        await asyncio.gather(*(self._refill(asset_class, sorted(set(asset_symbols)), since, executor)
+                               for asset_class, asset_symbols in symbols.items() if asset_symbols))
+        return self.refilled - refilled
+
+    def apply(self, asset_class: str, response: dict, since: Optional[float] = None):
+        """Merge a get_quotes response into the market state
+
+        With `since`, symbols updated after that time are left alone.
+        """
+        normalize = ASSET_CLASSES[asset_class].normalize_symbol
+        updated_at = self.state.updated_at
+        for symbol, entry in response.items():
+            quote = entry.get('quote') if isinstance(entry, dict) else None
+            if not quote:
+                continue
+            fields = {QUOTE_SNAPSHOT_FIELDS[name]: value for name, value in quote.items()
+                      if name in QUOTE_SNAPSHOT_FIELDS}
+            symbol = normalize(symbol)
+            if since is not None and updated_at.get(symbol, 0.0) > since:
+                continue
+            if fields:
+                self.state.update_quote(asset_class, symbol, fixed_fields(fields))
+                self.refilled += 1
+
+    def report(self) -> dict:
+        return {
+            'requested': self.requested,
+            'refilled': self.refilled,
+            'batches': self.batches,
+            'bars_refilled': self.bars_refilled,
+            'errors': self.errors,
+        }
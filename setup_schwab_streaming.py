@@ -9,20 +9,20 @@ import subprocess
 import sys
 from pathlib import Path
 
+from stream_logging import configure_logging, flush_logging, get_logger, kv
+
+logger = get_logger('setup')
+
 
 def run_command(command, description):
     """Run a command and handle errors"""
-    print(f"🔄 {description}...")
+    logger.info("%s...", description)
     try:
         result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"✅ {description} completed")
+        logger.info("%s completed", description)
         return True
     except subprocess.CalledProcessError as e:
-        print(f"❌ {description} failed: {e}")
-        if e.stdout:
-            print(f"STDOUT: {e.stdout}")
-        if e.stderr:
-            print(f"STDERR: {e.stderr}")
+        logger.error("%s failed: %s", description, e, extra=kv(stdout=e.stdout or '', stderr=e.stderr or ''))
         return False
 
 
@@ -30,9 +30,9 @@ def check_python_version():
     """Check if Python version is compatible"""
     version = sys.version_info
     if version.major < 3 or (version.major == 3 and version.minor < 8):
-        print("❌ Python 3.8 or higher is required")
+        logger.error("Python 3.8 or higher is required")
         return False
-    print(f"✅ Python {version.major}.{version.minor}.{version.micro} is compatible")
+    logger.info("Python %d.%d.%d is compatible", version.major, version.minor, version.micro)
     return True
 
 
@@ -41,7 +41,7 @@ def setup_virtual_environment():
     venv_path = Path("schwab_streaming_env")
     
     if venv_path.exists():
-        print("✅ Virtual environment already exists")
+        logger.info("Virtual environment already exists")
         return True
     
     # Create virtual environment
@@ -94,7 +94,7 @@ echo "Environment activated! You can now run: python schwab_streaming.py"
     if os.name != 'nt':
         os.chmod(script_path, 0o755)
     
-    print(f"✅ Created activation script: {script_path}")
+    logger.info("Created activation script", extra=kv(path=script_path))
     return True
 
 
@@ -103,8 +103,8 @@ def check_env_file():
     env_path = Path(".env")
     
     if not env_path.exists():
-        print("❌ .env file not found")
-        print("Please create a .env file with your Schwab API credentials")
+        logger.error(".env file not found")
+        logger.info("Please create a .env file with your Schwab API credentials")
         return False
     
     # Read and check .env file
@@ -119,16 +119,18 @@ def check_env_file():
             missing_vars.append(var)
     
     if missing_vars:
-        print(f"❌ Missing or incomplete environment variables: {', '.join(missing_vars)}")
-        print("Please update your .env file with actual credentials")
+        logger.error("Missing or incomplete environment variables", extra=kv(variables=','.join(missing_vars)))
+        logger.info("Please update your .env file with actual credentials")
         return False
     
-    print("✅ .env file looks good")
+    logger.info(".env file looks good")
     return True
 
 
 def print_usage_instructions():
     """Print usage instructions"""
+    # Let queued log lines land before the instructions
+    flush_logging()
     print("\n" + "="*60)
     print("🎉 SCHWAB STREAMING CLIENT SETUP COMPLETE!")
     print("="*60)
@@ -162,8 +164,8 @@ def print_usage_instructions():
 
 def main():
     """Main setup function"""
-    print("🚀 SCHWAB STREAMING CLIENT SETUP")
-    print("="*40)
+    configure_logging()
+    logger.info("Schwab streaming client setup")
     
     # Check Python version
     if not check_python_version():
@@ -171,17 +173,17 @@ def main():
     
     # Setup virtual environment
     if not setup_virtual_environment():
-        print("❌ Failed to setup virtual environment")
+        logger.critical("Failed to setup virtual environment")
         sys.exit(1)
     
     # Install dependencies
     if not install_dependencies():
-        print("❌ Failed to install dependencies")
+        logger.critical("Failed to install dependencies")
         sys.exit(1)
     
     # Create activation script
     if not create_activation_script():
-        print("❌ Failed to create activation script")
+        logger.critical("Failed to create activation script")
         sys.exit(1)
     
     # Check environment file
@@ -191,10 +193,10 @@ def main():
     print_usage_instructions()
     
     if not env_ok:
-        print("\n⚠️  Remember to update your .env file with actual credentials!")
+        logger.warning("Remember to update your .env file with actual credentials!")
         sys.exit(1)
     
-    print("\n✅ Setup completed successfully!")
+    logger.info("Setup completed successfully!")
 
 
 if __name__ == "__main__":
@@ -10,10 +10,6 @@ import os
 import sys
 from datetime import datetime
 
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
-
 def test_imports():
     """Test if all required modules can be imported"""
     print("🔄 Testing imports...")
@@ -131,6 +127,10 @@ def show_oauth_instructions():
 
 def main():
     """Main test function"""
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     print("🧪 SCHWAB STREAMING CLIENT - SIMPLE TEST")
     print("="*50)
     
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Memory soak test for Schwab Streaming Client
+Streams a synthetic feed with a churning symbol universe through the market
+state, alert engine and memory budget, and checks that RSS stays flat
+
+Usage:
+    python soak_memory.py                     # 2 minute smoke run
+    python soak_memory.py --hours 6.5         # a full trading day
+    python soak_memory.py --budget-mb 16 --tolerance-mb 24
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from alert_engine import AlertEngine
+from fixed_point import PENNY, PRICE_SCALE
+from memory_budget import MB, MemoryBudget, current_rss
+from market_state import MarketState
+
+
+def synthetic_feed(rng: random.Random, universe: int, active: int, churn_every: int):
+    """Yield (kind, symbol, payload) forever
+
+    Updates go to a window of `active` symbols out of `universe`; the
+    window slides by one symbol every `churn_every` updates, so old
+    symbols go idle and new ones keep appearing all day.
+    """
+    prices = {}
+    start = 0
+    count = 0
+    while True:
+        symbol = f"SYM{(start + rng.randrange(active)) % universe:06d}"
+        price = prices.get(symbol, 100.0) * (1 + rng.gauss(0, 0.0005))
+        prices[symbol] = price
+        kind = rng.random()
+        now = int(time.time() * 1000)
+        # Prices as the decoders deliver them: scaled integers on a penny grid
+        fixed = round(price, 2) * PRICE_SCALE
+        bid, ask, last = round(fixed - PENNY), round(fixed + PENNY), round(fixed)
+        if kind < 0.7:
+            yield 'quote', symbol, {'bid': bid, 'ask': ask, 'last': last, 'volume': count}
+        elif kind < 0.9:
+            yield 'book', symbol, {'time': now, 'bid': bid, 'bid_size': 100,
+                                   'ask': ask, 'ask_size': 200, 'depth': 10}
+        else:
+            yield 'bar', symbol, {'open': last, 'high': last, 'low': last, 'close': last,
+                                  'volume': 1000, 'time': now}
+        count += 1
+        if count % churn_every == 0:
+            # Prices of symbols that left the window are not kept either
+            prices.pop(f"SYM{start % universe:06d}", None)
+            start += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=None, help='run time in hours')
+    parser.add_argument('--seconds', type=float, default=120.0, help='run time in seconds (default: 120)')
+    parser.add_argument('--budget-mb', type=float, default=8.0, help='market state budget')
+    parser.add_argument('--idle-seconds', type=float, default=5.0, help='pack symbols idle this long')
+    parser.add_argument('--check-seconds', type=float, default=2.0, help='budget check interval')
+    parser.add_argument('--tolerance-mb', type=float, default=16.0, help='allowed RSS growth after warm-up')
+    parser.add_argument('--universe', type=int, default=500000)
+    parser.add_argument('--active', type=int, default=3000)
+    parser.add_argument('--churn-every', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    duration = args.hours * 3600 if args.hours is not None else args.seconds
+    warmup = duration * 0.2
+
+    state = MarketState()
+    alerts = AlertEngine(on_alert=lambda alert: None)
+    alerts.add_expression('*', 'ask - bid > 0.015', debounce_seconds=60)
+    alerts.add_threshold('*', 'last', 100.5, 'above', debounce_seconds=60)
+    state.add_listener(alerts.on_quote)
+    state.add_eviction_listener(alerts.forget)
+
+    budget = MemoryBudget(interval=args.check_seconds)
+    budget.register('market_state', state.memory_bytes,
+                    lambda limit, size: state.trim(limit, args.idle_seconds, size), int(args.budget_mb * MB))
+    budget.register('alert_engine', alerts.memory_bytes)
+
+    feed = synthetic_feed(random.Random(args.seed), args.universe, args.active, args.churn_every)
+
+    print(f"🔄 Soaking for {duration:.0f}s (warm-up {warmup:.0f}s, budget {args.budget_mb} MB)")
+    started = time.monotonic()
+    next_check = started + args.check_seconds
+    baseline_rss = None
+    peak_rss = 0
+    updates = 0
+
+    while True:
+        for _ in range(1000):
+            kind, symbol, payload = next(feed)
+            if kind == 'quote':
+                state.update_quote('equity', symbol, payload)
+            elif kind == 'book':
+                state.update_book('NASDAQ', symbol, payload)
+            else:
+                state.update_bar(symbol, payload)
+        updates += 1000
+
+        now = time.monotonic()
+        if now < next_check:
+            continue
+        next_check = now + args.check_seconds
+        budget.enforce()
+
+        elapsed = now - started
+        rss = current_rss()
+        if elapsed >= warmup:
+            if baseline_rss is None:
+                baseline_rss = rss
+            peak_rss = max(peak_rss, rss)
+        report = budget.report()
+        print(f"  {elapsed:7.0f}s  updates={updates:,}  symbols={len(state.updated_at):,}  "
+              f"idle={len(state.idle):,}  evicted={state.evicted:,}  "
+              f"state={report['market_state']['size_mb']} MB (after trim {state.memory_bytes() / MB:.3f} MB)  "
+              f"alerts={report['alert_engine']['size_mb']} MB  "
+              f"rss={rss / MB:.1f} MB")
+        if elapsed >= duration:
+            break
+
+    growth = (peak_rss - baseline_rss) / MB
+    print("=" * 50)
+    print(f"Updates/s: {updates / (time.monotonic() - started):,.0f}")
+    print(f"RSS after warm-up: {baseline_rss / MB:.1f} MB, peak: {peak_rss / MB:.1f} MB, growth: {growth:.1f} MB")
+    if growth > args.tolerance_mb:
+        print(f"❌ RSS grew by more than {args.tolerance_mb} MB")
+        sys.exit(1)
+    print("✅ RSS stayed flat")
+
+
+if __name__ == "__main__":
+    main()
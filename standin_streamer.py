@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Stand-in Streamer for Schwab Streaming Client
+A local replacement for the Schwab streamer: one synthetic market fanned out to
+StreamClient-shaped sessions with injected delay, jitter, frame loss and drops
+
+Run directly to check redundant streaming end to end:
+
+    python standin_streamer.py                 # 10 s, two legs, one dropped mid-run
+    python standin_streamer.py --seconds 30 --rate 5000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Set
+
+from redundant_stream import RedundantStreamClient
+from synthetic_market import SyntheticMarket, generate_symbols
+
+# Service -> StreamClient method prefix (<prefix>_subs, <prefix>_add, ...)
+SERVICE_PREFIXES = {
+    'LEVELONE_EQUITIES': 'level_one_equity',
+    'NASDAQ_BOOK': 'nasdaq_book',
+    'NYSE_BOOK': 'nyse_book',
+    'CHART_EQUITY': 'chart_equity',
+}
+PREFIX_SERVICES = {prefix: service for service, prefix in SERVICE_PREFIXES.items()}
+
+# Queued in place of a frame to make the next handle_message fail
+DISCONNECTED = object()
+
+
+class StandInStreamer:
+    """Publishes synthetic market frames to every logged-in session at `rate` items per second
+
+    Frames are stamped with the wall clock at publish time, so
+    receive time minus `timestamp` is the injected delay.
+    """
+
+    def __init__(self, symbols: List[str], rate: float = 2000.0, seed: int = 0, items_per_frame: int = 20):
+        self.market = SyntheticMarket(symbols, seed=seed)
+        self.rate = rate
+        self.items_per_frame = items_per_frame
+        self.sessions: List['StandInStreamClient'] = []
+        # Items published per service for the audited symbols (what a lossless consumer sees)
+        self.audited: Set[str] = set()
+        self.published: Dict[str, int] = {}
+
+    def connect(self, session: 'StandInStreamClient'):
+        if session not in self.sessions:
+            self.sessions.append(session)
+
+    def disconnect(self, session: 'StandInStreamClient'):
+        if session in self.sessions:
+            self.sessions.remove(session)
+
+    async def run(self, seconds: float):
+        """Publish for `seconds` of wall time"""
+        started = time.monotonic()
+        sent = 0
+        for entry in self.market.messages(self.rate, self.items_per_frame, book_share=0.2, labelled=True):
+            elapsed = time.monotonic() - started
+            if elapsed >= seconds:
+                break
+            due = sent / self.rate - elapsed
+            if due > 0:
+                await asyncio.sleep(due)
+            entry['timestamp'] = int(time.time() * 1000)
+            sent += len(entry['content'])
+            if self.audited:
+                self._audit(entry)
+            for session in list(self.sessions):
+                session.deliver(entry)
+
+    def _audit(self, entry: dict):
+        service = entry['service']
+        items = sum(1 for item in entry['content'] if item['key'] in self.audited)
+        self.published[service] = self.published.get(service, 0) + items
+
+
+class StandInStreamClient:
+    """StreamClient look-alike for one session on a StandInStreamer
+
+    Frames arrive `delay_ms` plus up to `jitter_ms` after publication, in
+    order; `drop_rate` loses whole frames; `drop_connection()` makes the
+    next `handle_message` fail the way a closed websocket does.
+    """
+
+    def __init__(self, streamer: StandInStreamer, delay_ms: float = 0.0, jitter_ms: float = 0.0,
+                 drop_rate: float = 0.0, seed: int = 0):
+        self.streamer = streamer
+        self.delay = delay_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.subscriptions: Dict[str, Set[str]] = {}
+        self.handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.connected = False
+        self._last_due = 0.0
+        self.frames = 0
+        self.dropped_frames = 0
+
+    async def login(self):
+        self.subscriptions.clear()
+        self.inbox = asyncio.Queue()
+        self.connected = True
+        self.streamer.connect(self)
+
+    async def logout(self):
+        self.connected = False
+        self.streamer.disconnect(self)
+
+    def drop_connection(self):
+        """Simulate the connection closing under the session"""
+        self.connected = False
+        self.streamer.disconnect(self)
+        self.inbox.put_nowait((0.0, DISCONNECTED))
+
+    def deliver(self, entry: dict):
+        """Called by the streamer for every published frame"""
+        symbols = self.subscriptions.get(entry['service'])
+        if not symbols:
+            return
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.dropped_frames += 1
+            return
+        content = [dict(item) for item in entry['content'] if item['key'] in symbols]
+        if not content:
+            return
+        # Later frames never overtake earlier ones on the same connection
+        due = max(self._last_due, time.monotonic() + self.delay + self.rng.random() * self.jitter)
+        self._last_due = due
+        self.inbox.put_nowait((due, dict(entry, content=content)))
+
+    async def handle_message(self):
+        due, message = await self.inbox.get()
+        if message is DISCONNECTED:
+            raise ConnectionError("stand-in connection closed")
+        wait = due - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self.frames += 1
+        for handler in self.handlers.get(message['service'], ()):
+            handler(message)
+
+    async def _service_op(self, symbols, service, command, field_type=None, *, fields=None):
+        if not self.connected:
+            raise ConnectionError("stand-in session not logged in")
+        symbols = set(symbols)
+        if command == 'SUBS':
+            self.subscriptions[service] = symbols
+        elif command == 'ADD':
+            self.subscriptions.setdefault(service, set()).update(symbols)
+        elif command == 'UNSUBS':
+            self.subscriptions.get(service, set()).difference_update(symbols)
+
+    def __getattr__(self, name: str):
+        if name.startswith('add_') and name.endswith('_handler'):
+            service = PREFIX_SERVICES.get(name[len('add_'):-len('_handler')])
+            if service:
+                return lambda handler: self.handlers.setdefault(service, []).append(handler)
+        prefix, _, command = name.rpartition('_')
+        service = PREFIX_SERVICES.get(prefix)
+        if service and command in ('subs', 'add', 'unsubs'):
+            async def operation(symbols, fields=None):
+                await self._service_op(symbols, service, command.upper(), fields=fields)
+            return operation
+        raise AttributeError(name)
+
+
+async def check_redundancy(args) -> bool:
+    """Two legs on one stand-in streamer; the lossy leg is dropped mid-run and reconnects"""
+    symbols = generate_symbols(args.symbols, args.seed)
+    subscribed = set(symbols[:args.subscribed])
+    streamer = StandInStreamer(symbols, rate=args.rate, seed=args.seed)
+    lossy = StandInStreamClient(streamer, delay_ms=args.delay_ms[0], jitter_ms=args.jitter_ms[0],
+                                drop_rate=args.drop_rate, seed=1)
+    steady = StandInStreamClient(streamer, delay_ms=args.delay_ms[1], jitter_ms=args.jitter_ms[1], seed=2)
+    client = RedundantStreamClient([lossy, steady], reconnect_delay=0.5)
+
+    forwarded: Dict[str, int] = {}
+
+    def count_forwarded(message):
+        service = message['service']
+        forwarded[service] = forwarded.get(service, 0) + len(message['content'])
+
+    streamer.audited = subscribed
+    await client.login()
+    for service, prefix in SERVICE_PREFIXES.items():
+        getattr(client, f'add_{prefix}_handler')(count_forwarded)
+        await getattr(client, f'{prefix}_subs')(sorted(subscribed))
+
+    async def pump():
+        while True:
+            await client.handle_message()
+
+    async def drop_midway():
+        await asyncio.sleep(args.seconds / 2)
+        print("  ✂️  dropping leg 0")
+        lossy.drop_connection()
+
+    pump_task = asyncio.create_task(pump())
+    drop_task = asyncio.create_task(drop_midway())
+    await streamer.run(args.seconds)
+    # Let in-flight frames land
+    await asyncio.sleep(max(args.delay_ms) / 1000 + max(args.jitter_ms) / 1000 + 0.2)
+    pump_task.cancel()
+    drop_task.cancel()
+    await client.logout()
+
+    ok = True
+    print("=" * 50)
+    for service in SERVICE_PREFIXES:
+        published = streamer.published.get(service, 0)
+        received = forwarded.get(service, 0)
+        status = '✅' if published == received else '❌'
+        ok = ok and published == received
+        print(f"{status} {service:18} published={published:,}  forwarded={received:,}")
+    for index, stats in enumerate(client.report()):
+        print(f"  leg {index}: " + '  '.join(f"{name}={value}" for name, value in stats.items()))
+    print(f"  leg 0 frames lost to injected drops: {lossy.dropped_frames:,}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=2000.0, help='published items per second')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--subscribed', type=int, default=200)
+    parser.add_argument('--delay-ms', type=float, nargs=2, default=[2.0, 5.0], help='base delay per leg')
+    parser.add_argument('--jitter-ms', type=float, nargs=2, default=[10.0, 2.0], help='jitter per leg')
+    parser.add_argument('--drop-rate', type=float, default=0.02, help='frame loss on leg 0')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"🔁 Redundant streaming check: {args.seconds:.0f}s at {args.rate:,.0f} items/s")
+    if not asyncio.run(check_redundancy(args)):
+        print("❌ Forwarded items do not match published items")
+        sys.exit(1)
+    print("✅ Every published item was forwarded exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+State Journal for Schwab Streaming Client
+Periodic memory-mapped checkpoints of the normalized market state plus a
+write-ahead journal of the updates since, for warm restarts
+
+Files, for a state path of `state/market`:
+
+    state/market.snap         header + marshal payload of MarketState.export()
+    state/market.journal.<N>  records applied after checkpoint N was captured
+
+A checkpoint captures the state on the event loop, switches new records
+to journal N+1, then writes and fsyncs the snapshot off the loop and
+replaces the old one atomically. Journals older than the snapshot are
+deleted only after that replace, so a crash at any point leaves a
+snapshot and the journals needed to roll it forward. Journal records are
+buffered and written as length and CRC framed blocks, one marshal payload
+per flush; a torn block at the tail ends the replay.
+"""
+
+import asyncio
+import glob
+import marshal
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from stream_logging import get_logger, kv
+
+logger = get_logger('journal')
+
+# Version 2: prices are scaled integers (fixed_point.py); older files are ignored
+SNAPSHOT_MAGIC = b'SCHWSNP2'
+# magic, generation, payload length
+SNAPSHOT_HEADER = struct.Struct('<8sQQ')
+
+JOURNAL_MAGIC = b'SCHWJNL2'
+JOURNAL_HEADER = struct.Struct('<8sQ')
+# Block payload length, crc32
+BLOCK_HEADER = struct.Struct('<II')
+
+EVICT = 'evict'
+
+# Records buffered before a block is written regardless of the flush timer
+MAX_BLOCK_RECORDS = 10000
+
+
+def read_snapshot(path: str) -> Tuple[int, Optional[dict]]:
+    """(generation, exported state) from a snapshot file, (0, None) if there is none"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < SNAPSHOT_HEADER.size:
+                return 0, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, generation, length = SNAPSHOT_HEADER.unpack_from(mapped)
+                if magic != SNAPSHOT_MAGIC or SNAPSHOT_HEADER.size + length > size:
+                    logger.warning("Ignoring invalid snapshot", extra=kv(path=path))
+                    return 0, None
+                return generation, marshal.loads(mapped[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + length])
+    except FileNotFoundError:
+        return 0, None
+
+
+def read_journal(path: str) -> Tuple[int, List[tuple], bool]:
+    """(generation, records, complete); `complete` is False when the tail was torn"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < JOURNAL_HEADER.size:
+        return 0, [], False
+    magic, generation = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC:
+        return 0, [], False
+    records = []
+    offset = JOURNAL_HEADER.size
+    end = len(data)
+    while offset < end:
+        if offset + BLOCK_HEADER.size > end:
+            return generation, records, False
+        length, crc = BLOCK_HEADER.unpack_from(data, offset)
+        start = offset + BLOCK_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return generation, records, False
+        records.extend(marshal.loads(payload))
+        offset = start + length
+    return generation, records, True
+
+
+def apply_record(data: Dict[str, dict], record: tuple):
+    """Roll an exported state forward by one journal record"""
+    kind, key, symbol, fields, updated = record
+    if kind == EVICT:
+        for evicted in fields:
+            for table in data.values():
+                table.pop(evicted, None)
+        return
+    if kind == 'quote':
+        data['quotes'].setdefault(symbol, {}).update(fields)
+        data['asset_classes'].setdefault(symbol, key)
+    elif kind == 'book':
+        data['books'].setdefault(symbol, {})[key] = fields
+    elif kind == 'bar':
+        # As in MarketState.update_bar, an older bar (a gap refill) is not applied
+        current = data['bars'].get(symbol)
+        if current is not None and (fields.get('time') or 0) < (current.get('time') or 0):
+            return
+        data['bars'][symbol] = fields
+    updated_at = data['updated_at']
+    updated_at.pop(symbol, None)
+    updated_at[symbol] = updated
+
+
+class StateJournal:
+    """Checkpoints and journals a MarketState under `path`
+
+    `recover` rebuilds the state from the snapshot and journals before
+    the session starts; `attach` starts journaling every update and
+    `start` checkpoints every `checkpoint_seconds`. Records are buffered
+    and written as one block every `flush_seconds` (with fsync when
+    `fsync` is set), which bounds what a crash can lose.
+    """
+
+    def __init__(self, state, path: str, checkpoint_seconds: float = 60.0,
+                 flush_seconds: float = 1.0, fsync: bool = False):
+        self.state = state
+        self.path = path
+        self.snapshot_path = path + '.snap'
+        self.checkpoint_seconds = checkpoint_seconds
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.generation = 0
+        self._journal = None
+        self._pending: List[tuple] = []
+        self._task: Optional[asyncio.Task] = None
+        self._checkpointing = False
+
+        self.records = 0
+        self.journal_bytes = 0
+        self.checkpoints = 0
+        self.last_checkpoint_ms = 0.0
+        self.last_snapshot_bytes = 0
+
+    def _journal_path(self, generation: int) -> str:
+        return f"{self.path}.journal.{generation}"
+
+    def _journal_paths(self) -> List[Tuple[int, str]]:
+        paths = []
+        for path in glob.glob(glob.escape(self.path) + '.journal.*'):
+            suffix = path.rsplit('.', 1)[1]
+            if suffix.isdigit():
+                paths.append((int(suffix), path))
+        return sorted(paths)
+
+    # Restart
+
+    def recover(self) -> dict:
+        """Load the snapshot, replay newer journals and restore the state (all symbols stale)"""
+        started = time.perf_counter()
+        generation, data = read_snapshot(self.snapshot_path)
+        if data is None:
+            data = {'quotes': {}, 'books': {}, 'bars': {}, 'asset_classes': {}, 'updated_at': {}}
+        replayed = 0
+        torn = 0
+        for journal_generation, path in self._journal_paths():
+            if journal_generation < generation:
+                continue
+            _, records, complete = read_journal(path)
+            for record in records:
+                apply_record(data, record)
+            replayed += len(records)
+            torn += not complete
+        symbols = self.state.restore(data)
+        self.generation = max([generation] + [g for g, _ in self._journal_paths()])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result = {'symbols': symbols, 'snapshot_generation': generation, 'journal_records': replayed,
+                  'torn_journals': torn, 'elapsed_ms': round(elapsed_ms, 2)}
+        logger.info("Recovered market state", extra=kv(**result))
+        return result
+
+    # Journal
+
+    def attach(self):
+        """Journal every state update from now on"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._open_journal(self.generation + 1)
+        self.state.add_recorder(self.record)
+        self.state.add_eviction_listener(self.record_eviction)
+
+    def _open_journal(self, generation: int):
+        if self._journal:
+            self._journal.close()
+        self.generation = generation
+        self._journal = open(self._journal_path(generation), 'ab')
+        if self._journal.tell() == 0:
+            self._journal.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, generation))
+
+    def record(self, kind: str, key: Optional[str], symbol: str, fields: Dict[str, object]):
+        """MarketState recorder"""
+        pending = self._pending
+        pending.append((kind, key, symbol, fields, self.state.updated_at[symbol]))
+        if len(pending) >= MAX_BLOCK_RECORDS:
+            self.flush()
+
+    def record_eviction(self, symbols: List[str]):
+        """MarketState eviction listener, so evicted symbols are not resurrected"""
+        self._pending.append((EVICT, None, None, list(symbols), 0.0))
+
+    def flush(self):
+        """Write the buffered records as one block"""
+        if not self._journal or not self._pending:
+            return
+        # Recorded dicts are the ones handed to MarketState, which replaces them rather than mutating
+        payload = marshal.dumps(self._pending)
+        self._journal.write(BLOCK_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self.records += len(self._pending)
+        self.journal_bytes += BLOCK_HEADER.size + len(payload)
+        self._pending = []
+
+    # Checkpoints
+
+    def _capture(self) -> Tuple[int, bytes]:
+        """Serialize the state and switch new records to the next journal (on the loop)"""
+        self.flush()
+        payload = marshal.dumps(self.state.export())
+        generation = self.generation
+        self._open_journal(generation + 1)
+        return generation + 1, payload
+
+    def _write_snapshot(self, generation: int, payload: bytes):
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation, len(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        # The snapshot covers every journal before the one it opened
+        for journal_generation, path in self._journal_paths():
+            if journal_generation < generation:
+                os.remove(path)
+
+    def checkpoint(self):
+        """Write a snapshot synchronously (used at shutdown)"""
+        started = time.perf_counter()
+        generation, payload = self._capture()
+        self._write_snapshot(generation, payload)
+        self._checkpointed(started, payload)
+
+    async def checkpoint_async(self):
+        """Capture on the loop, write and fsync the snapshot on a worker thread"""
+        if self._checkpointing:
+            return
+        self._checkpointing = True
+        try:
+            started = time.perf_counter()
+            generation, payload = self._capture()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, generation, payload)
+            self._checkpointed(started, payload)
+        finally:
+            self._checkpointing = False
+
+    def _checkpointed(self, started: float, payload: bytes):
+        self.checkpoints += 1
+        self.last_checkpoint_ms = (time.perf_counter() - started) * 1000
+        self.last_snapshot_bytes = len(payload)
+        self.journal_bytes = 0
+        logger.debug("Checkpoint written", extra=kv(generation=self.generation, bytes=len(payload),
+                                                    ms=round(self.last_checkpoint_ms, 1)))
+
+    async def _run(self):
+        next_checkpoint = time.monotonic() + self.checkpoint_seconds
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            self.flush()
+            if time.monotonic() >= next_checkpoint:
+                next_checkpoint = time.monotonic() + self.checkpoint_seconds
+                try:
+                    await self.checkpoint_async()
+                except OSError as e:
+                    logger.error("Checkpoint failed: %s", e, extra=kv(path=self.snapshot_path))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the timer, write a final checkpoint and close the journal"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._journal:
+            self.checkpoint()
+            self._journal.close()
+            self._journal = None
+
+    def report(self) -> dict:
+        return {
+            'generation': self.generation,
+            'records': self.records,
+            'checkpoints': self.checkpoints,
+            'last_checkpoint_ms': round(self.last_checkpoint_ms, 1),
+            'last_snapshot_bytes': self.last_snapshot_bytes,
+        }
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Logging for Schwab Streaming Client
+Queue-backed, non-blocking structured logging with rate-limited warnings
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, TextIO, Tuple
+
+LOGGER_NAME = 'schwab_streaming'
+
+# Structured keys rendered first, in this order, when present on a record
+STRUCTURED_KEYS = ('session_id', 'service', 'symbol', 'latency_ms')
+
+DEFAULT_QUEUE_SIZE = 10000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_session_id: Optional[str] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger below the client's root logger ('alert_engine' -> 'schwab_streaming.alert_engine')"""
+    if name == LOGGER_NAME or name.startswith(LOGGER_NAME + '.'):
+        return logging.getLogger(name)
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def kv(**fields) -> Dict[str, Dict[str, object]]:
+    """Structured fields for a log call: logger.info('Subscribed', extra=kv(service='CHART_EQUITY'))"""
+    return {'fields': fields}
+
+
+def set_session_id(session_id: Optional[str]):
+    """Attach a session id to every subsequent record"""
+    global _session_id
+    _session_id = session_id
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, object]:
+    fields = dict(getattr(record, 'fields', None) or {})
+    # Queued records carry the id stamped when they were logged
+    session_id = getattr(record, 'session_id', _session_id)
+    if session_id is not None:
+        fields.setdefault('session_id', session_id)
+    ordered = {key: fields.pop(key) for key in STRUCTURED_KEYS if key in fields}
+    ordered.update(fields)
+    return ordered
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Human readable lines: `12:00:01 INFO  alert_engine: Alert fired symbol=AAPL rule=r1`"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-5s %(shortname)s: %(message)s', '%H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        prefix = LOGGER_NAME + '.'
+        record.shortname = record.name[len(prefix):] if record.name.startswith(prefix) else record.name
+        line = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        payload.update(_record_fields(record))
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Suppress repeats of the same warning within an interval
+
+    Records are keyed by logger, level, message template and structured
+    fields (so the same warning for two symbols is not merged), but not
+    by the interpolated arguments. The first record passes, repeats inside `interval` seconds are counted and
+    dropped, and the next record after the interval reports how many were
+    suppressed. Keys idle for longer than the interval are pruned once
+    more than `max_keys` are tracked, so per-symbol warnings stay bounded.
+    """
+
+    def __init__(self, interval: float = 10.0, min_level: int = logging.WARNING, max_keys: int = 10000):
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self.max_keys = max_keys
+        self._seen: Dict[tuple, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+        fields = getattr(record, 'fields', None) or {}
+        key = (record.name, record.levelno, str(record.msg),
+               tuple((name, str(value)) for name, value in fields.items()))
+        now = time.monotonic()
+        with self._lock:
+            last, count = self._seen.get(key, (float('-inf'), 0))
+            if now - last < self.interval:
+                self._seen[key] = (last, count + 1)
+                self.suppressed += 1
+                return False
+            self._seen[key] = (now, 0)
+            if len(self._seen) > self.max_keys:
+                self._prune(now)
+        if count:
+            record.fields = dict(fields, suppressed=count)
+        return True
+
+    def _prune(self, now: float):
+        cutoff = now - self.interval
+        for key in [key for key, (last, _) in self._seen.items() if last < cutoff]:
+            del self._seen[key]
+
+    def tracked_keys(self) -> int:
+        return len(self._seen)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks and defers formatting to the listener
+
+    The stock QueueHandler formats each record in the calling thread;
+    here the record is enqueued as-is so message interpolation and
+    formatting happen on the listener thread. Only the session id is
+    stamped on it here, since it may change before the record is
+    formatted. A full queue drops the record instead of blocking the
+    event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.session_id = _session_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: Optional[str] = None, json_output: Optional[bool] = None,
+                      stream: Optional[TextIO] = None, rate_limit_seconds: float = 10.0,
+                      queue_size: int = DEFAULT_QUEUE_SIZE) -> logging.Logger:
+    """Install the queue-backed handler on the client's root logger
+
+    `level` and `json_output` default to SCHWAB_LOG_LEVEL (INFO) and
+    SCHWAB_LOG_FORMAT (text|json). Calling it again reconfigures.
+    """
+    global _listener, _queue_handler
+
+    level = (level or os.getenv('SCHWAB_LOG_LEVEL', 'INFO')).upper()
+    if json_output is None:
+        json_output = os.getenv('SCHWAB_LOG_FORMAT', 'text').lower() == 'json'
+
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else KeyValueFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RateLimitFilter(rate_limit_seconds))
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger(LOGGER_NAME)
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(level)
+    root.propagate = False
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def flush_logging():
+    """Block until every queued record has been written (e.g. before prompting for input)"""
+    if _listener is not None:
+        _listener.queue.join()
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+atexit.register(shutdown_logging)
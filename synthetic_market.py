@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Synthetic Market for Schwab Streaming Client
+Seeded, vectorized market simulation that emits Schwab-shaped stream frames
+(numeric field keys, as they arrive on the websocket) at high rates
+
+Prices follow a one-factor model with sector factors and idiosyncratic
+noise, so symbols move together the way real tapes do. Quotes, book
+ladders and minute bars are all derived from the same price path, and
+the simulated clock is driven by the requested message rate, so a given
+seed always produces byte-identical output.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Wire field numbers emitted per service and the labels schwab-py gives them
+LEVEL_ONE_EQUITY_WIRE = {
+    '1': 'BID_PRICE',
+    '2': 'ASK_PRICE',
+    '3': 'LAST_PRICE',
+    '4': 'BID_SIZE',
+    '5': 'ASK_SIZE',
+    '8': 'TOTAL_VOLUME',
+    '9': 'LAST_SIZE',
+    '10': 'HIGH_PRICE',
+    '11': 'LOW_PRICE',
+    '12': 'CLOSE_PRICE',
+    '17': 'OPEN_PRICE',
+    '18': 'NET_CHANGE',
+    '33': 'MARK',
+    '34': 'QUOTE_TIME_MILLIS',
+    '35': 'TRADE_TIME_MILLIS',
+}
+
+CHART_EQUITY_WIRE = {
+    '1': 'SEQUENCE',
+    '2': 'OPEN_PRICE',
+    '3': 'HIGH_PRICE',
+    '4': 'LOW_PRICE',
+    '5': 'CLOSE_PRICE',
+    '6': 'VOLUME',
+    '7': 'CHART_TIME_MILLIS',
+    '8': 'CHART_DAY',
+}
+
+BOOK_WIRE = {'1': 'BOOK_TIME', '2': 'BIDS', '3': 'ASKS'}
+BOOK_BID_WIRE = {'0': 'BID_PRICE', '1': 'TOTAL_VOLUME', '2': 'NUM_BIDS', '3': 'BIDS'}
+BOOK_ASK_WIRE = {'0': 'ASK_PRICE', '1': 'TOTAL_VOLUME', '2': 'NUM_ASKS', '3': 'ASKS'}
+
+# Row layouts produced by SyntheticMarket and their wire templates
+LEVEL_ONE_KEYS = ('key', '1', '2', '3', '4', '5', '8', '9', '10', '11', '12', '17', '18', '33', '34', '35')
+LEVEL_ONE_TEXT = ('{"key":"%s","1":%.2f,"2":%.2f,"3":%.2f,"4":%d,"5":%d,"8":%d,"9":%d,'
+                  '"10":%.2f,"11":%.2f,"12":%.2f,"17":%.2f,"18":%.2f,"33":%.3f,"34":%d,"35":%d}')
+CHART_KEYS = ('key', '1', '2', '3', '4', '5', '6', '7', '8')
+CHART_TEXT = '{"key":"%s","1":%d,"2":%.2f,"3":%.2f,"4":%.2f,"5":%.2f,"6":%d,"7":%d,"8":%d}'
+BOOK_TEXT = '{"key":"%s","1":%d,"2":[%s],"3":[%s]}'
+BOOK_LEVEL_TEXT = '{"0":%.2f,"1":%d,"2":%d,"3":[]}'
+FRAME_TEXT = '{"data":[{"service":"%s","timestamp":%d,"command":"SUBS","content":[%s]}]}'
+
+# The same layouts with schwab-py's labels
+LEVEL_ONE_LABELS = tuple(LEVEL_ONE_EQUITY_WIRE.get(key, key) for key in LEVEL_ONE_KEYS)
+CHART_LABELS = tuple(CHART_EQUITY_WIRE.get(key, key) for key in CHART_KEYS)
+BOOK_LABELS = ('key', 'BOOK_TIME', 'BIDS', 'ASKS')
+BOOK_BID_LABELS = tuple(BOOK_BID_WIRE.values())
+BOOK_ASK_LABELS = tuple(BOOK_ASK_WIRE.values())
+
+# 2024-01-02 14:30:00 UTC, the default start of the simulated clock
+DEFAULT_START_MS = 1704205800000
+
+TRADING_SECONDS_PER_YEAR = 252 * 6.5 * 3600
+
+
+def relabel(service: str, item: dict) -> dict:
+    """Rename a wire content item's numeric keys the way schwab-py does"""
+    if service == 'LEVELONE_EQUITIES':
+        labels = LEVEL_ONE_EQUITY_WIRE
+    elif service == 'CHART_EQUITY':
+        labels = CHART_EQUITY_WIRE
+    elif service in ('NASDAQ_BOOK', 'NYSE_BOOK'):
+        labelled = {BOOK_WIRE.get(k, k): v for k, v in item.items()}
+        labelled['BIDS'] = [{BOOK_BID_WIRE[k]: v for k, v in level.items()} for level in labelled.get('BIDS', ())]
+        labelled['ASKS'] = [{BOOK_ASK_WIRE[k]: v for k, v in level.items()} for level in labelled.get('ASKS', ())]
+        return labelled
+    else:
+        return item
+    return {labels.get(k, k): v for k, v in item.items()}
+
+
+class SyntheticMarket:
+    """Correlated price paths for many symbols, rendered as stream content
+
+    Annual volatilities are split into market, sector and idiosyncratic
+    parts; `advance(seconds)` moves every symbol at once, in steps of at
+    least `step_seconds` so high message rates do not pay for a full
+    vector update per frame. Row builders pick symbols with the seeded
+    generator; `messages` and `frames` render the rows in wire shape.
+    """
+
+    def __init__(self, symbols: List[str], seed: int = 0, sectors: int = 11,
+                 market_vol: float = 0.15, sector_vol: float = 0.10, idio_vol: float = 0.25,
+                 tick_size: float = 0.01, book_depth: int = 5, bar_seconds: int = 60,
+                 step_seconds: float = 0.01, start_ms: int = DEFAULT_START_MS):
+        self.symbols = list(symbols)
+        self.rng = np.random.default_rng(seed)
+        self.tick_size = tick_size
+        self.book_depth = book_depth
+        self.bar_ms = bar_seconds * 1000
+        self.now_ms = float(start_ms)
+        self.step_seconds = step_seconds
+        self._unsimulated = 0.0
+
+        n = len(self.symbols)
+        rng = self.rng
+        self.sectors = sectors
+        self.sector = rng.integers(0, sectors, n)
+        self.beta = rng.uniform(0.6, 1.6, n)
+        self.market_vol = market_vol
+        self.sector_vol = sector_vol
+        self.idio_vol = idio_vol * rng.uniform(0.5, 1.5, n)
+        self._drift = -0.5 * ((self.beta * market_vol) ** 2 + sector_vol ** 2 + self.idio_vol ** 2)
+
+        # Log-uniform prices between $5 and $800, spreads of 1-4 ticks
+        self.log_price = rng.uniform(np.log(5), np.log(800), n)
+        self.mid = np.exp(self.log_price)
+        self.spread_ticks = rng.integers(1, 5, n)
+        self.open = self.mid.copy()
+        self.close = self.open * np.exp(rng.normal(0, 0.01, n))
+        self.high = self.open.copy()
+        self.low = self.open.copy()
+        self.volume = np.zeros(n, dtype=np.int64)
+
+        self.bar_start_ms = self.now_ms - self.now_ms % self.bar_ms
+        self.bar_open = self.open.copy()
+        self.bar_high = self.open.copy()
+        self.bar_low = self.open.copy()
+        self.bar_volume = np.zeros(n, dtype=np.int64)
+        self.bar_sequence = 0
+
+    def _quantize(self, prices: np.ndarray) -> np.ndarray:
+        return np.round(np.round(prices / self.tick_size) * self.tick_size, 6)
+
+    def advance(self, seconds: float):
+        """Move the clock forward; prices move in steps of at least `step_seconds`"""
+        if seconds <= 0:
+            return
+        self.now_ms += seconds * 1000
+        self._unsimulated += seconds
+        if self._unsimulated < self.step_seconds:
+            return
+        dt = self._unsimulated / TRADING_SECONDS_PER_YEAR
+        self._unsimulated = 0.0
+        rng = self.rng
+        shock = (self.beta * self.market_vol * rng.standard_normal()
+                 + self.sector_vol * rng.standard_normal(self.sectors)[self.sector]
+                 + self.idio_vol * rng.standard_normal(len(self.symbols)))
+        self.log_price += self._drift * dt + shock * np.sqrt(dt)
+
+        mid = self.mid = np.exp(self.log_price)
+        np.maximum(self.high, mid, out=self.high)
+        np.minimum(self.low, mid, out=self.low)
+        np.maximum(self.bar_high, mid, out=self.bar_high)
+        np.minimum(self.bar_low, mid, out=self.bar_low)
+
+    def _pick(self, count: int) -> np.ndarray:
+        return self.rng.integers(0, len(self.symbols), count)
+
+    def _bid_ask(self, index: np.ndarray):
+        tick = self.tick_size
+        spread = self.spread_ticks[index]
+        bid = np.round(self.mid[index] / tick - spread / 2) * tick
+        return self._quantize(bid), self._quantize(bid + spread * tick)
+
+    def level_one_rows(self, count: int) -> List[tuple]:
+        """Quote-and-trade updates for `count` randomly chosen symbols, in LEVEL_ONE_KEYS order"""
+        rng = self.rng
+        index = self._pick(count)
+        bid, ask = self._bid_ask(index)
+        last = np.where(rng.random(count) < 0.5, bid, ask)
+        last_size = rng.integers(1, 10, count) * 100
+        np.add.at(self.volume, index, last_size)
+        np.add.at(self.bar_volume, index, last_size)
+        now = int(self.now_ms)
+        quantize = self._quantize
+        symbols = [self.symbols[i] for i in index.tolist()]
+
+        return list(zip(
+            symbols, bid.tolist(), ask.tolist(), last.tolist(),
+            (rng.integers(1, 20, count) * 100).tolist(), (rng.integers(1, 20, count) * 100).tolist(),
+            self.volume[index].tolist(), last_size.tolist(),
+            quantize(self.high[index]).tolist(), quantize(self.low[index]).tolist(),
+            quantize(self.close[index]).tolist(), quantize(self.open[index]).tolist(),
+            np.round(last - self.close[index], 2).tolist(), np.round((bid + ask) / 2, 3).tolist(),
+            [now] * count, [now] * count,
+        ))
+
+    def book_rows(self, count: int) -> List[tuple]:
+        """(symbol, time, bid levels, ask levels) ladders `book_depth` deep around the quoted spread
+
+        Levels are (price, size, market makers) tuples, best first.
+        """
+        rng = self.rng
+        depth = self.book_depth
+        index = self._pick(count)
+        bid, ask = self._bid_ask(index)
+        steps = np.arange(depth) * self.tick_size
+        # Size tends to grow away from the touch
+        growth = 1 + np.arange(depth)
+        bids = zip(self._quantize(bid[:, None] - steps).tolist(),
+                   (rng.integers(1, 20, (count, depth)) * 100 * growth).tolist(),
+                   rng.integers(1, 6, (count, depth)).tolist())
+        asks = zip(self._quantize(ask[:, None] + steps).tolist(),
+                   (rng.integers(1, 20, (count, depth)) * 100 * growth).tolist(),
+                   rng.integers(1, 6, (count, depth)).tolist())
+        now = int(self.now_ms)
+        return [
+            (self.symbols[i], now, list(zip(*bid_side)), list(zip(*ask_side)))
+            for i, bid_side, ask_side in zip(index.tolist(), bids, asks)
+        ]
+
+    def roll_bars(self) -> List[tuple]:
+        """Completed bars for every symbol once the clock passes a bar boundary, in CHART_KEYS order"""
+        if self.now_ms < self.bar_start_ms + self.bar_ms:
+            return []
+        quantize = self._quantize
+        sequence = self.bar_sequence
+        bar_time = int(self.bar_start_ms)
+        count = len(self.symbols)
+        rows = list(zip(
+            self.symbols, [sequence] * count, quantize(self.bar_open).tolist(),
+            quantize(self.bar_high).tolist(), quantize(self.bar_low).tolist(),
+            quantize(self.mid).tolist(), self.bar_volume.tolist(),
+            [bar_time] * count, [bar_time // 86400000] * count,
+        ))
+        self.bar_sequence += 1
+        self.bar_start_ms += self.bar_ms * ((self.now_ms - self.bar_start_ms) // self.bar_ms)
+        self.bar_open = self.mid.copy()
+        self.bar_high = self.mid.copy()
+        self.bar_low = self.mid.copy()
+        self.bar_volume[:] = 0
+        return rows
+
+    def _entries(self, rate: float, items_per_frame: int, book_share: float,
+                 limit: Optional[int]) -> Iterator[Tuple[str, int, List[tuple]]]:
+        """(service, timestamp, rows) per frame; the clock advances by rows / `rate`"""
+        produced = 0
+        rng = self.rng
+        while limit is None or produced < limit:
+            count = items_per_frame if limit is None else min(items_per_frame, limit - produced)
+            self.advance(count / rate)
+            if rng.random() < book_share:
+                service = 'NASDAQ_BOOK' if rng.random() < 0.5 else 'NYSE_BOOK'
+                rows = self.book_rows(count)
+            else:
+                service = 'LEVELONE_EQUITIES'
+                rows = self.level_one_rows(count)
+            produced += count
+            yield service, int(self.now_ms), rows
+
+            bars = self.roll_bars()
+            for start in range(0, len(bars), items_per_frame):
+                yield 'CHART_EQUITY', int(self.now_ms), bars[start:start + items_per_frame]
+
+    def messages(self, rate: float, items_per_frame: int = 100, book_share: float = 0.2,
+                 limit: Optional[int] = None, labelled: bool = False) -> Iterator[dict]:
+        """Yield stream data entries ({"service", "timestamp", "command", "content"})
+
+        The simulated clock advances by items / `rate` per entry, so `rate`
+        sets the message rate in simulated time; the caller decides how
+        fast to consume them. Stops after `limit` content items if given.
+        With `labelled` the content uses schwab-py's field names instead of
+        wire numbers.
+        """
+        if labelled:
+            level_one_keys, chart_keys = LEVEL_ONE_LABELS, CHART_LABELS
+            book_keys, bid_keys, ask_keys = BOOK_LABELS, BOOK_BID_LABELS, BOOK_ASK_LABELS
+        else:
+            level_one_keys, chart_keys = LEVEL_ONE_KEYS, CHART_KEYS
+            book_keys, bid_keys, ask_keys = ('key', '1', '2', '3'), ('0', '1', '2', '3'), ('0', '1', '2', '3')
+        book_time, bids_key, asks_key = book_keys[1:]
+        for service, timestamp, rows in self._entries(rate, items_per_frame, book_share, limit):
+            if service == 'LEVELONE_EQUITIES':
+                content = [dict(zip(level_one_keys, row)) for row in rows]
+            elif service == 'CHART_EQUITY':
+                content = [dict(zip(chart_keys, row)) for row in rows]
+            else:
+                content = [
+                    {'key': symbol, book_time: updated,
+                     bids_key: [dict(zip(bid_keys, level + ([],))) for level in bids],
+                     asks_key: [dict(zip(ask_keys, level + ([],))) for level in asks]}
+                    for symbol, updated, bids, asks in rows
+                ]
+            yield {'service': service, 'timestamp': timestamp, 'command': 'SUBS', 'content': content}
+
+    def frames(self, rate: float, items_per_frame: int = 100, book_share: float = 0.2,
+               limit: Optional[int] = None) -> Iterator[str]:
+        """Websocket text frames ({"data": [entry]}) as the Schwab streamer sends them
+
+        Same entries as `messages`, rendered with printf templates instead
+        of json.dumps, which is twice as fast for float-heavy content.
+        """
+        level = BOOK_LEVEL_TEXT
+        for service, timestamp, rows in self._entries(rate, items_per_frame, book_share, limit):
+            if service == 'LEVELONE_EQUITIES':
+                content = ','.join([LEVEL_ONE_TEXT % row for row in rows])
+            elif service == 'CHART_EQUITY':
+                content = ','.join([CHART_TEXT % row for row in rows])
+            else:
+                content = ','.join([
+                    BOOK_TEXT % (symbol, book_time, ','.join([level % entry for entry in bids]),
+                                 ','.join([level % entry for entry in asks]))
+                    for symbol, book_time, bids, asks in rows
+                ])
+            yield FRAME_TEXT % (service, timestamp, content)
+
+
+def generate_symbols(count: int, seed: int = 0) -> List[str]:
+    """Deterministic, unique ticker-like symbols"""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    symbols: Dict[str, None] = {}
+    while len(symbols) < count:
+        length = int(rng.integers(2, 5))
+        symbols.setdefault(''.join(rng.choice(letters, length)), None)
+    return list(symbols)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Alert engine tests for Schwab Streaming Client
+Threshold crossings, re-arming and expression rules on quote updates
+"""
+
+import sys
+
+from alert_engine import AlertEngine, AlertRule
+from fixed_point import to_fixed
+
+
+class Clock:
+    """Manually advanced clock for debounce checks"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def engine_with_log(clock=None):
+    fired = []
+    engine = AlertEngine(on_alert=fired.append, clock=clock or Clock())
+    return engine, fired
+
+
+def quote(engine, symbol='AAPL', **prices):
+    engine.process_update(symbol, {field: to_fixed(price) for field, price in prices.items()})
+
+
+def test_threshold_fires_on_crossing_only():
+    """Only levels between the previous and the new value fire, in the move's direction"""
+    engine, fired = engine_with_log()
+    engine.add_threshold('AAPL', 'last', 200.0, 'above', rule_id='up-200')
+    engine.add_threshold('AAPL', 'last', 205.0, 'above', rule_id='up-205')
+    engine.add_threshold('AAPL', 'last', 195.0, 'below', rule_id='down-195')
+
+    quote(engine, last=199.0)
+    assert fired == []  # the first value has nothing to cross from
+    quote(engine, last=201.0)
+    assert [alert.rule.rule_id for alert in fired] == ['up-200']
+    assert fired[0].value == 201.0 and fired[0].symbol == 'AAPL'
+    quote(engine, last=202.0)
+    assert len(fired) == 1  # still above, no new crossing
+    quote(engine, last=190.0)
+    assert [alert.rule.rule_id for alert in fired] == ['up-200', 'down-195']
+    quote(engine, last=210.0)
+    assert [alert.rule.rule_id for alert in fired[2:]] == ['up-200', 'up-205']
+
+
+def test_threshold_level_is_inclusive_on_the_way_up():
+    engine, fired = engine_with_log()
+    engine.add_threshold('AAPL', 'bid', 100.01)
+    quote(engine, bid=100.0)
+    quote(engine, bid=100.01)
+    assert len(fired) == 1
+
+
+def test_threshold_debounce_and_rearm():
+    """Crossing back and forth inside the debounce window is suppressed"""
+    clock = Clock()
+    engine, fired = engine_with_log(clock)
+    rule = engine.add_threshold('AAPL', 'last', 200.0, debounce_seconds=5.0)
+    quote(engine, last=199.0)
+    quote(engine, last=201.0)
+    quote(engine, last=199.0)
+    clock.now = 1.0
+    quote(engine, last=201.0)
+    assert len(fired) == 1 and rule.suppressed == 1
+
+    clock.now = 10.0
+    quote(engine, last=199.0)
+    quote(engine, last=201.0)
+    assert len(fired) == 2 and rule.fired == 2
+
+
+def test_expression_is_edge_triggered():
+    """An expression fires when it turns true and re-arms once it is false again"""
+    engine, fired = engine_with_log()
+    rule = engine.add_expression('AAPL', 'ask - bid > 0.10', rule_id='wide')
+    quote(engine, bid=100.0, ask=100.05)
+    assert fired == []
+    quote(engine, ask=100.20)
+    assert len(fired) == 1 and fired[0].value == {'ask': 100.20, 'bid': 100.0}
+    quote(engine, ask=100.30)
+    assert len(fired) == 1  # still true: no repeat
+    quote(engine, bid=100.25)
+    assert 'AAPL' not in rule.active
+    quote(engine, bid=100.0)
+    assert len(fired) == 2
+
+
+def test_expression_waits_for_every_field():
+    """A rule with an unknown field neither fires nor re-arms"""
+    engine, fired = engine_with_log()
+    rule = engine.add_expression('AAPL', 'last > high')
+    quote(engine, last=10.0)
+    assert fired == [] and rule.evaluations == 1
+    quote(engine, high=9.0)
+    assert len(fired) == 1
+
+
+def test_wildcard_expression_tracks_symbols_separately():
+    engine, fired = engine_with_log()
+    engine.add_expression('*', 'abs(net_change) >= 5')
+    quote(engine, 'AAPL', net_change=6.0)
+    quote(engine, 'MSFT', net_change=-7.0)
+    quote(engine, 'AAPL', net_change=8.0)
+    assert [alert.symbol for alert in fired] == ['AAPL', 'MSFT']
+
+
+def test_only_rules_on_changed_fields_are_evaluated():
+    engine, fired = engine_with_log()
+    engine.add_threshold('AAPL', 'last', 200.0)
+    engine.add_expression('AAPL', 'volume > 1000')
+    quote(engine, bid=1.0)
+    engine.process_update('AAPL', {'volume': 500})
+    engine.process_update('AAPL', {'volume': 1500})
+    assert engine.rules_evaluated == 2 and len(fired) == 1
+
+
+def test_remove_rule_and_describe():
+    engine, fired = engine_with_log()
+    rule = engine.add_threshold('AAPL', 'last', 200.0, 'below')
+    assert rule.describe() == 'last crossed below 200.0'
+    assert AlertRule('base', 'AAPL', ('bid', 'ask')).describe() == 'AlertRule on bid, ask'
+    engine.remove_rule(rule.rule_id)
+    quote(engine, last=201.0)
+    quote(engine, last=199.0)
+    assert fired == [] and not engine._thresholds
+
+
+def main():
+    print("🧪 ALERT ENGINE TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_threshold_fires_on_crossing_only, test_threshold_level_is_inclusive_on_the_way_up,
+                 test_threshold_debounce_and_rearm, test_expression_is_edge_triggered,
+                 test_expression_waits_for_every_field, test_wildcard_expression_tracks_symbols_separately,
+                 test_only_rules_on_changed_fields_are_evaluated, test_remove_rule_and_describe):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
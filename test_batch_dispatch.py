@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Batch dispatch tests for Schwab Streaming Client
+Columnar batch contents, column selection and symbol ids
+"""
+
+import math
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from batch_dispatch import BatchDispatcher
+from binary_records import SymbolTable
+from fixed_point import NULL_PRICE, to_fixed
+
+
+def level_one_message(*items) -> dict:
+    return {'service': 'LEVELONE_EQUITIES', 'timestamp': 1700000000000, 'content': list(items)}
+
+
+def test_quote_columns():
+    """Prices are scaled int64 with NULL_PRICE, other fields float64 with NaN"""
+    batches = []
+    dispatcher = BatchDispatcher('LEVELONE_EQUITIES')
+    dispatcher.add_handler(batches.append)
+    dispatcher(level_one_message(
+        {'key': 'AAPL', 'BID_PRICE': 190.01, 'ASK_PRICE': 190.03, 'BID_SIZE': 300},
+        {'key': 'MSFT', 'LAST_PRICE': 410.5, 'TOTAL_VOLUME': 1200, 'QUOTE_TIME_MILLIS': 1700000000123},
+        {'BID_PRICE': 1.0},
+    ))
+
+    batch, = batches
+    assert len(batch) == 2 and batch.symbols == ['AAPL', 'MSFT'] and batch.timestamp == 1700000000000
+    assert batch['bid'].dtype == np.int64 and batch['bid_size'].dtype == np.float64
+    assert batch['bid'].tolist() == [to_fixed(190.01), NULL_PRICE]
+    assert batch['last'].tolist() == [NULL_PRICE, to_fixed(410.5)]
+    assert batch['bid_size'][0] == 300 and math.isnan(batch['bid_size'][1])
+    assert batch['quote_time'][1] == 1700000000123
+    assert set(batch.columns) == set(dispatcher.layout)
+    assert dispatcher.report() == {'batches': 1, 'items': 2, 'avg_batch': 2.0}
+
+
+def test_selected_columns_and_symbol_ids():
+    """Only requested columns are built; symbol ids are stable across messages and dispatchers"""
+    table = SymbolTable()
+    quotes = BatchDispatcher('LEVELONE_EQUITIES', table)
+    spreads, sizes = [], []
+    quotes.add_handler(lambda batch: spreads.append(batch['ask'] - batch['bid']), fields=['bid', 'ask'])
+    quotes.add_handler(lambda batch: sizes.append(sorted(batch.columns)), fields=['ask', 'bid_size'])
+    quotes(level_one_message({'key': 'MSFT', 'BID_PRICE': 410.0, 'ASK_PRICE': 410.04}))
+    batch = quotes.decode(level_one_message({'key': 'AAPL', 'BID_PRICE': 1.0}, {'key': 'MSFT', 'BID_PRICE': 2.0}))
+
+    assert quotes.columns == ['bid', 'ask', 'bid_size']
+    assert sizes == [['ask', 'bid', 'bid_size']] and spreads[0].tolist() == [to_fixed(0.04)]
+    assert batch.symbol_ids.tolist() == [1, 0]
+
+    bars = BatchDispatcher('CHART_EQUITY', table)
+    bars.add_handler(lambda batch: None, fields=['close'])
+    assert bars.decode({'content': [{'key': 'AAPL', 'CLOSE_PRICE': 190.0}]}).symbol_ids.tolist() == [1]
+
+
+def test_unknown_columns_rejected():
+    dispatcher = BatchDispatcher('LEVELONE_EQUITIES')
+    dispatcher.add_handler(lambda batch: None)
+    with pytest.raises(ValueError, match='open_interest'):
+        dispatcher.add_handler(lambda batch: None, fields=['bid', 'open_interest'])
+    with pytest.raises(ValueError, match='No columnar layout'):
+        BatchDispatcher('LEVELONE_OPTIONS')
+
+
+def test_book_top_columns():
+    dispatcher = BatchDispatcher('NASDAQ_BOOK')
+    dispatcher.add_handler(lambda batch: None)
+    batch = dispatcher.decode({'content': [
+        {'key': 'AAPL', 'BOOK_TIME': 1700000000000,
+         'BIDS': [{'BID_PRICE': 190.0, 'TOTAL_VOLUME': 300}, {'BID_PRICE': 189.99, 'TOTAL_VOLUME': 500}],
+         'ASKS': [{'ASK_PRICE': 190.05, 'TOTAL_VOLUME': 100}]},
+        {'key': 'MSFT', 'BOOK_TIME': 1700000000001, 'BIDS': [], 'ASKS': []},
+    ]})
+    assert batch['bid'].tolist() == [to_fixed(190.0), NULL_PRICE]
+    assert batch['ask'].tolist() == [to_fixed(190.05), NULL_PRICE]
+    assert batch['bid_size'][0] == 300 and math.isnan(batch['ask_size'][1])
+    assert batch['time'].tolist() == [1700000000000, 1700000000001]
+
+
+def test_empty_message_is_not_dispatched():
+    calls = []
+    dispatcher = BatchDispatcher('LEVELONE_EQUITIES')
+    dispatcher.add_handler(calls.append)
+    dispatcher({'content': []})
+    dispatcher({'content': [{'BID_PRICE': 1.0}]})
+    assert calls == [] and dispatcher.batches == 0
+
+
+def main():
+    print("🧪 BATCH DISPATCH TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_quote_columns, test_selected_columns_and_symbol_ids, test_unknown_columns_rejected,
+                 test_book_top_columns, test_empty_message_is_not_dispatched):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
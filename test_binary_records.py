@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Binary record tests for Schwab Streaming Client
+RecordWriter output read back through RecordReader.feed in arbitrary
+chunks, with the symbol table and format version checks
+"""
+
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from binary_records import (
+    ASK, BAR, BAR_DTYPE, BID, BOOK_LEVEL, BOOK_LEVEL_DTYPE, FORMAT_VERSION, HELLO, HELLO_STRUCT, NULL_SIZE, QUOTE,
+    QUOTE_DTYPE, RECORD_SIZE, SYMBOL, RecordReader, RecordWriter, view,
+)
+from fixed_point import NULL_PRICE, PRICE_SCALE, to_fixed
+
+
+def written_stream() -> bytes:
+    writer = RecordWriter(capacity=2)
+    writer.hello(1000)
+    writer.quote('AAPL', 1001, {'bid': to_fixed(190.01), 'ask': to_fixed(190.03), 'bid_size': 300,
+                                'ask_size': 200, 'volume': 12345})
+    writer.quote('MSFT', 1002, {'bid': to_fixed(410.5), 'last': to_fixed(410.52), 'last_size': 5})
+    writer.book_top('AAPL', 'NYSE', {'time': 1003, 'bid': to_fixed(190.0), 'bid_size': 100,
+                                     'ask': to_fixed(190.04), 'ask_size': 400})
+    writer.bar('MSFT', {'time': 60000, 'open': to_fixed(410.0), 'high': to_fixed(411.0),
+                        'low': to_fixed(409.5), 'close': to_fixed(410.5), 'volume': 900})
+    writer.quote('AAPL', 1004, {'bid': to_fixed(190.02)})
+    assert writer.records == 9 and len(writer.buffer) >= 9 * RECORD_SIZE
+    return writer.take()
+
+
+def read_in_chunks(data: bytes, chunk: int):
+    reader = RecordReader()
+    parts = [reader.feed(data[start:start + chunk]) for start in range(0, len(data), chunk)]
+    return reader, np.concatenate(parts)
+
+
+def test_round_trip_across_partial_reads():
+    data = written_stream()
+    for chunk in (len(data), RECORD_SIZE, 7, 100, 1):
+        reader, records = read_in_chunks(data, chunk)
+        assert reader._partial == b''
+        assert records['type'].tolist() == [HELLO, SYMBOL, QUOTE, SYMBOL, QUOTE, BOOK_LEVEL, BOOK_LEVEL, BAR, QUOTE]
+        assert records.tobytes() == data
+        assert reader.version == FORMAT_VERSION
+        assert reader.symbols == {0: 'AAPL', 1: 'MSFT'}
+
+
+def test_typed_views():
+    reader, records = read_in_chunks(written_stream(), 10)
+
+    quotes = records[records['type'] == QUOTE].view(QUOTE_DTYPE)
+    assert quotes['symbol_id'].tolist() == [0, 1, 0]
+    assert quotes['bid'].tolist() == [to_fixed(190.01), to_fixed(410.5), to_fixed(190.02)]
+    assert quotes['ask'].tolist()[1:] == [NULL_PRICE, NULL_PRICE]
+    assert quotes['bid_size'].tolist() == [300, NULL_SIZE, NULL_SIZE]
+    assert quotes['volume'].tolist()[0] == 12345
+
+    levels = records[records['type'] == BOOK_LEVEL].view(BOOK_LEVEL_DTYPE)
+    assert levels['venue'].tolist() == [1, 1] and levels['side'].tolist() == [BID, ASK]
+    assert levels['price'].tolist() == [to_fixed(190.0), to_fixed(190.04)] and levels['size'].tolist() == [100, 400]
+
+    bars = records[records['type'] == BAR].view(BAR_DTYPE)
+    assert bars['time'].tolist() == [60000] and bars['low'].tolist() == [to_fixed(409.5)]
+
+    # Missing prices come back as NaN
+    rows = [tuple(None if value != value else value for value in row) for row in reader.iter_quotes(records)]
+    assert rows == [('AAPL', 1001, 190.01, 190.03, None), ('MSFT', 1002, 410.5, None, 410.52),
+                    ('AAPL', 1004, 190.02, None, None)]
+
+
+def test_symbol_announced_before_use():
+    """A read that ends right after a record can already name its symbol"""
+    data = written_stream()
+    reader = RecordReader()
+    for index in range(len(data) // RECORD_SIZE):
+        record = reader.feed(data[index * RECORD_SIZE:(index + 1) * RECORD_SIZE])[0]
+        if record['type'] > SYMBOL:
+            assert int(record['symbol_id']) in reader.symbols
+
+
+def test_view_filters_by_type():
+    data = written_stream()
+    assert len(view(data)) == 9
+    bars = view(data, BAR)
+    assert bars.dtype == BAR_DTYPE and bars['close'].tolist() == [to_fixed(410.5)]
+
+
+def test_hello_carries_format():
+    fields = HELLO_STRUCT.unpack_from(written_stream(), 0)
+    assert fields[6:] == (FORMAT_VERSION, RECORD_SIZE, PRICE_SCALE)
+
+
+def test_version_check():
+    data = bytearray(written_stream())
+    # A record from another format version anywhere in a read is rejected
+    data[4 * RECORD_SIZE] = FORMAT_VERSION + 1
+    reader = RecordReader()
+    reader.feed(bytes(data[:4 * RECORD_SIZE]))
+    with pytest.raises(ValueError, match='Unsupported record format version 2'):
+        reader.feed(bytes(data[4 * RECORD_SIZE:]))
+
+
+def main():
+    print("🧪 BINARY RECORDS TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_round_trip_across_partial_reads, test_typed_views, test_symbol_announced_before_use,
+                 test_view_filters_by_type,
+                 test_hello_carries_format, test_version_check):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
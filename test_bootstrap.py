@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Bootstrap tests for Schwab Streaming Client
+REST work of the start-up steps never overlaps on the shared client, while
+event loop steps still run alongside it
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+from bootstrap import Bootstrap
+
+
+class CallTracker:
+    """Stand-in for the synchronous client: records overlapping calls"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.threads = set()
+
+    def call(self, seconds: float = 0.02):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(seconds)
+        with self.lock:
+            self.active -= 1
+
+
+def test_rest_calls_run_one_at_a_time():
+    client = CallTracker()
+    bootstrap = Bootstrap()
+    login_overlapped = []
+
+    async def fan_out():
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(bootstrap.rest_executor, client.call) for _ in range(4)))
+
+    async def login():
+        await asyncio.sleep(0.03)
+        login_overlapped.append(client.active > 0)
+
+    bootstrap.add('token', client.call, blocking=True)
+    bootstrap.add('accounts', client.call, after=['token'], blocking=True)
+    bootstrap.add('instruments', fan_out, after=['token'])
+    bootstrap.add('warm_up', fan_out, after=['token'])
+    bootstrap.add('login', login, after=['token'])
+    asyncio.run(bootstrap.run())
+
+    assert client.max_active == 1
+    assert len(client.threads) == 1 and client.threads.pop().startswith('bootstrap-rest')
+    assert login_overlapped == [True]
+    assert bootstrap.rest_executor is None
+
+
+def test_failure_cancels_and_releases_worker():
+    bootstrap = Bootstrap()
+
+    def fail():
+        raise RuntimeError('token refresh failed')
+
+    bootstrap.add('token', fail, blocking=True)
+    bootstrap.add('accounts', lambda: None, after=['token'], blocking=True)
+    try:
+        asyncio.run(bootstrap.run())
+    except RuntimeError as e:
+        assert str(e) == 'token refresh failed'
+    else:
+        assert False, "expected the step's error"
+    assert bootstrap.rest_executor is None and bootstrap.steps['accounts'].started is None
+
+
+def main():
+    print("🧪 BOOTSTRAP TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_rest_calls_run_one_at_a_time, test_failure_cancels_and_releases_worker):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
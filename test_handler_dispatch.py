@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Handler dispatch tests for Schwab Streaming Client
+Frames go through a real schwab-py StreamClient (over a fake socket) to
+several handlers on one service, checking that per-message checks run once
+per message and not once per handler
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('schwab.streaming')
+pytest.importorskip('dotenv')
+
+from schwab.streaming import StreamClient
+
+from asset_classes import ASSET_CLASSES
+from change_filter import ChangeFilter
+from handler_executor import PROCESS, HandlerPolicy
+from profiling import Instrumentation
+from schwab_streaming import SchwabStreamingClient
+from sequence_tracker import SnapshotRefiller
+
+ACCOUNT_ID = '12345678'
+
+
+class FakeSocket:
+    """Hands StreamClient.handle_message one queued frame per recv()"""
+
+    def __init__(self, frames):
+        self.frames = [json.dumps(frame) for frame in frames]
+
+    async def recv(self):
+        return self.frames.pop(0)
+
+
+def data_frame(service: str, timestamp: int, content: list) -> dict:
+    return {'data': [{'service': service, 'timestamp': timestamp, 'command': 'SUBS', 'content': content}]}
+
+
+def chart_item(symbol: str, sequence: int, close: float, minute: int) -> dict:
+    # Wire field numbers of StreamClient.ChartEquityFields
+    return {'key': symbol, '1': sequence, '2': close, '3': close, '4': close, '5': close, '6': 100,
+            '7': 1700000000000 + minute * 60000, '8': 19000}
+
+
+def make_client(frames) -> SchwabStreamingClient:
+    for name, value in (('SCHWAB_API_KEY', 'test'), ('SCHWAB_APP_SECRET', 'test'), ('SCHWAB_ACCOUNT_ID', ACCOUNT_ID)):
+        os.environ.setdefault(name, value)
+    client = SchwabStreamingClient()
+    client.stream_client = StreamClient(None, account_id=int(ACCOUNT_ID))
+    client.stream_client._socket = FakeSocket(frames)
+    return client
+
+
+def pump(client: SchwabStreamingClient, count: int):
+    async def run():
+        for _ in range(count):
+            await client.stream_client.handle_message()
+    asyncio.run(run())
+
+
+def test_chart_reaches_state_with_two_handlers():
+    """A second handler on CHART_EQUITY must not see the first one's items as duplicates"""
+    frames = [data_frame('CHART_EQUITY', 1700000000000 + i, [chart_item('AAPL', i + 1, 190.0 + i, i)])
+              for i in range(3)]
+    client = make_client(frames)
+    seen = []
+    client.register_handler('CHART_EQUITY', seen.append)
+    client.register_handler('CHART_EQUITY', client._chart_handler())
+    pump(client, len(frames))
+
+    assert len(seen) == 3
+    assert client.market_state.bars['AAPL']['sequence'] == 3
+    assert client.market_state.bars['AAPL']['close'] == 192_000_000
+    stats = client.sequence_tracker.report()['CHART_EQUITY']
+    assert stats['items'] == 3
+    assert stats['duplicates'] == 0 and stats['stale'] == 0
+
+
+def test_duplicate_frame_dropped_for_every_handler():
+    """A repeated sequence number is still dropped, once, before the fan-out"""
+    frames = [data_frame('CHART_EQUITY', 1700000000000, [chart_item('AAPL', 1, 190.0, 0)]),
+              data_frame('CHART_EQUITY', 1700000000001, [chart_item('AAPL', 1, 190.0, 0)])]
+    client = make_client(frames)
+    first, second = [], []
+    client.register_handler('CHART_EQUITY', first.append)
+    client.register_handler('CHART_EQUITY', second.append)
+    pump(client, len(frames))
+
+    assert len(first) == len(second) == 1
+    assert client.sequence_tracker.report()['CHART_EQUITY']['duplicates'] == 1
+
+
+def quote_item(symbol: str, bid: float, ask: float, quote_time: int) -> dict:
+    # Wire field numbers of StreamClient.LevelOneEquityFields: bid, ask, quote time
+    return {'key': symbol, '1': bid, '2': ask, '34': quote_time}
+
+
+def test_change_filter_forwards_changes_to_every_handler():
+    """Every handler gets a changed quote, and only repeats count as suppressed"""
+    frames = [data_frame('LEVELONE_EQUITIES', 1700000000000 + i, [quote_item('AAPL', bid, 190.02, i)])
+              for i, bid in enumerate((190.00, 190.00, 190.01))]
+    client = make_client(frames)
+    client.change_filter = ChangeFilter()
+    seen = []
+    client.register_handler('LEVELONE_EQUITIES', seen.append)
+    client.register_handler('LEVELONE_EQUITIES', client._level_one_handler(ASSET_CLASSES['equity']))
+    pump(client, len(frames))
+
+    # The second frame repeats the bid and ask and is dropped before either handler
+    assert len(seen) == 2
+    assert client.market_state.get_quote('AAPL')['bid'] == 190_010_000
+    stats = client.change_filter.report()['LEVELONE_EQUITIES']
+    assert stats['items'] == 3 and stats['items_dropped'] == 1
+
+
+class PriceHistoryClient:
+    """get_price_history_every_minute with one candle per minute from `first` to `last`"""
+
+    def __init__(self, first: int, last: int):
+        self.minutes = range(first, last + 1)
+
+    def get_price_history_every_minute(self, symbol, start_datetime=None, end_datetime=None):
+        candles = [{'open': 190.0 + m, 'high': 190.0 + m, 'low': 190.0 + m, 'close': 190.0 + m,
+                    'volume': 100, 'datetime': 1700000000000 + m * 60000} for m in self.minutes]
+        return type('Response', (), {'status_code': 200, 'text': '', 'json': lambda self: {'candles': candles}})()
+
+
+def test_chart_gap_refilled_from_price_history():
+    """Bars skipped by a CHART_EQUITY sequence gap are recorded from price history, in between"""
+    frames = [data_frame('CHART_EQUITY', 1700000000000, [chart_item('AAPL', 1, 190.0, 0)]),
+              data_frame('CHART_EQUITY', 1700000240000, [chart_item('AAPL', 4, 194.0, 4)])]
+    client = make_client(frames)
+    client.refiller = SnapshotRefiller(PriceHistoryClient(0, 4), client.market_state)
+    client.sequence_tracker.on_gap = client._on_sequence_gap
+    recorded = []
+    client.market_state.add_recorder(lambda kind, key, symbol, fields: recorded.append(fields['time']))
+    client.register_handler('CHART_EQUITY', client._chart_handler())
+    pump(client, len(frames))
+
+    assert client.sequence_tracker.report()['CHART_EQUITY']['gaps'] == 1
+    assert client.refiller.pending_bars == {'AAPL': 1700000000000}
+    asyncio.run(client.refiller._refill_bars(client.refiller.pending_bars))
+
+    # Minutes 1 to 3 were missing; minute 4 stays the latest bar
+    assert client.refiller.bars_refilled == 3
+    assert recorded[2:] == [1700000000000 + m * 60000 for m in (1, 2, 3)]
+    assert client.market_state.bars['AAPL']['time'] == 1700000240000
+
+
+def count_items(message) -> int:
+    # Module level, so a process pool can pickle it
+    return len(message['content'])
+
+
+def test_process_handler_with_profiling():
+    """A process-pool handler still runs when profiling wraps handlers"""
+    frames = [data_frame('LEVELONE_EQUITIES', 1700000000000, [quote_item('AAPL', 190.0, 190.02, 0)])]
+    client = make_client(frames)
+    client.instrumentation = Instrumentation()
+
+    async def run():
+        client.register_handler('LEVELONE_EQUITIES', count_items, HandlerPolicy(PROCESS))
+        await client.stream_client.handle_message()
+        executor = client.handler_executors.executors[0]
+        for _ in range(500):
+            if executor.completed:
+                break
+            await asyncio.sleep(0.01)
+        return executor.stats()
+
+    try:
+        stats = asyncio.run(run())
+    finally:
+        client.handler_executors.shutdown()
+    assert stats['completed'] == 1 and stats['errors'] == 0
+
+
+def main():
+    print("🧪 HANDLER DISPATCH TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_chart_reaches_state_with_two_handlers, test_duplicate_frame_dropped_for_every_handler,
+                 test_change_filter_forwards_changes_to_every_handler, test_chart_gap_refilled_from_price_history,
+                 test_process_handler_with_profiling):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Handler executor tests for Schwab Streaming Client
+Overflow policies apply only once a handler's in-flight limit is reached
+"""
+
+import asyncio
+import concurrent.futures
+import sys
+import threading
+
+from handler_executor import CONFLATE, DROP_NEWEST, HandlerExecutors, HandlerPolicy, KeyedExecutor
+
+
+def run_burst(max_in_flight: int, overflow: str, count: int = 5):
+    """Submit `count` messages for one symbol while the first is blocked; return (handled, stats)"""
+    release = threading.Event()
+    handled = []
+
+    def handler(message):
+        release.wait()
+        handled.append(message['content'][0]['n'])
+
+    async def run():
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            executor = KeyedExecutor('test', handler, pool, HandlerPolicy('thread', max_in_flight, overflow))
+            for n in range(count):
+                executor.submit('AAPL', {'content': [{'key': 'AAPL', 'n': n}]})
+            release.set()
+            while executor.in_flight:
+                await asyncio.sleep(0.01)
+            return executor.stats()
+
+    stats = asyncio.run(run())
+    return handled, stats
+
+
+def test_conflate_queues_below_limit():
+    """Under the limit every message is handled, in order"""
+    handled, stats = run_burst(100, CONFLATE)
+    assert handled == [0, 1, 2, 3, 4]
+    assert stats['conflated'] == 0 and stats['dropped'] == 0
+
+
+def test_conflate_merges_at_limit():
+    """At the limit new messages fold into the symbol's queued one"""
+    handled, stats = run_burst(2, CONFLATE)
+    assert handled == [0, 4]
+    assert stats['conflated'] == 3
+
+
+def test_conflate_never_exceeds_limit():
+    """At the limit a running symbol with nothing queued does not get a new slot"""
+    handled, stats = run_burst(1, CONFLATE)
+    assert handled == [0]
+    assert stats['dropped'] == 4 and stats['max_in_flight'] == 1
+
+
+def test_drop_newest_at_limit():
+    handled, stats = run_burst(2, DROP_NEWEST)
+    assert handled == [0, 1]
+    assert stats['dropped'] == 3
+
+
+def test_trim_sheds_oldest_queued():
+    """A memory trim drops queued messages, never the running one"""
+    release = threading.Event()
+    handled = []
+
+    def handler(message):
+        release.wait()
+        handled.append(message['content'][0]['n'])
+
+    async def run():
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            executors = HandlerExecutors()
+            executors._threads = pool
+            offloaded = executors.wrap('LEVELONE_EQUITIES', handler, HandlerPolicy('thread', 100, DROP_NEWEST))
+            for n in range(5):
+                offloaded({'content': [{'key': 'AAPL', 'n': n}]})
+            shed = executors.trim(0, executors.memory_bytes())
+            release.set()
+            executor = executors.executors[0]
+            while executor.in_flight:
+                await asyncio.sleep(0.01)
+            return shed, executor.stats()
+
+    shed, stats = asyncio.run(run())
+    assert shed == 4 and handled == [0]
+    assert stats['dropped'] == 4 and stats['in_flight'] == 0
+
+
+def main():
+    print("🧪 HANDLER EXECUTOR TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_conflate_queues_below_limit, test_conflate_merges_at_limit, test_conflate_never_exceeds_limit,
+                 test_drop_newest_at_limit, test_trim_sheds_oldest_queued):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
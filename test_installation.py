@@ -7,53 +7,20 @@ import sys
 import os
 from pathlib import Path
 
+from cli import REQUIRED_PACKAGES, missing_packages
+
 def test_imports():
-    """Test if all required modules can be imported"""
+    """Test if all required packages are installed (located, not imported; see cli.py check)"""
     print("🔄 Testing imports...")
     
-    try:
-        import schwab
-        print("✅ schwab-py imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import schwab-py: {e}")
-        return False
-    
-    try:
-        from dotenv import load_dotenv
-        print("✅ python-dotenv imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import python-dotenv: {e}")
-        return False
-    
-    try:
-        import asyncio
-        print("✅ asyncio imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import asyncio: {e}")
-        return False
-    
-    try:
-        import websockets
-        print("✅ websockets imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import websockets: {e}")
-        return False
-    
-    try:
-        import httpx
-        print("✅ httpx imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import httpx: {e}")
-        return False
-    
-    try:
-        import pydantic
-        print("✅ pydantic imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import pydantic: {e}")
-        return False
+    missing = missing_packages(REQUIRED_PACKAGES)
+    for name, package in REQUIRED_PACKAGES.items():
+        if name in missing:
+            print(f"❌ {package} not found")
+        else:
+            print(f"✅ {package} installed")
     
-    return True
+    return not missing
 
 
 def test_schwab_modules():
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Option chain tests for Schwab Streaming Client
+Contracts land in the right (expiry, strike, put/call) slots with
+fixed-point prices, and a re-resolved chain rolls expired contracts off
+"""
+
+import asyncio
+import math
+import sys
+
+import pytest
+
+from fixed_point import NULL_PRICE, to_fixed
+from option_chain import CALL, PUT, OptionChain, OptionChainStreamer
+
+
+def contract(symbol: str, bid: float, ask: float, **extra) -> dict:
+    return dict({'symbol': symbol, 'bid': bid, 'ask': ask, 'delta': 0.5}, **extra)
+
+
+def chain_response(expiries=('2024-06-21:3', '2024-06-28:10'), underlying_price=101.3) -> dict:
+    calls, puts = {}, {}
+    for expiry_key in expiries:
+        expiry = expiry_key.split(':')[0].replace('-', '')[2:]
+        calls[expiry_key] = {f"{strike:.1f}": [contract(f"XYZ {expiry}C{strike}", strike / 100, strike / 100 + 0.05)]
+                             for strike in (95, 100, 105, 110)}
+        # No put is listed at 110
+        puts[expiry_key] = {f"{strike:.1f}": [contract(f"XYZ {expiry}P{strike}", strike / 200, strike / 200 + 0.05)]
+                            for strike in (95, 100, 105)}
+    return {'symbol': 'XYZ', 'underlyingPrice': underlying_price,
+            'callExpDateMap': calls, 'putExpDateMap': puts}
+
+
+def test_grid_placement():
+    chain = OptionChain.from_chain_response(chain_response())
+    assert chain.expiries == ['2024-06-21', '2024-06-28']
+    assert chain.strikes == [to_fixed(strike) for strike in (95, 100, 105, 110)]
+    assert len(chain) == 14
+
+    slot = chain.slot('2024-06-28', to_fixed(105), PUT)
+    assert slot == (1 * 4 + 2) * 2 + 1
+    assert chain.symbols[slot] == 'XYZ 240628P105'
+    assert chain.get('2024-06-28', to_fixed(105), PUT, 'BID_PRICE') == to_fixed(0.525)
+    assert chain.get('2024-06-21', to_fixed(100), CALL, 'ASK_PRICE') == to_fixed(1.05)
+    assert chain.get('2024-06-21', to_fixed(110), PUT, 'BID_PRICE') == NULL_PRICE
+    assert math.isnan(chain.get('2024-06-21', to_fixed(110), PUT, 'DELTA'))
+    assert chain.columns['BID_PRICE'].typecode == 'q' and chain.columns['DELTA'].typecode == 'd'
+
+
+def test_slices():
+    chain = OptionChain.from_chain_response(chain_response())
+    strikes, calls, puts = chain.expiry_slice('2024-06-21', 'BID_PRICE')
+    assert strikes == chain.strikes
+    assert list(calls) == [to_fixed(strike / 100) for strike in (95, 100, 105, 110)]
+    assert list(puts) == [to_fixed(strike / 200) for strike in (95, 100, 105)] + [NULL_PRICE]
+
+    assert chain.atm_strike_index() == 1
+    strikes, calls, _ = chain.atm_slice('2024-06-28', 1, 'ASK_PRICE')
+    assert strikes == [to_fixed(95), to_fixed(100), to_fixed(105)]
+    assert list(calls) == [to_fixed(0.95 + 0.05), to_fixed(1.05), to_fixed(1.10)]
+
+
+def test_apply_update_moves_atm():
+    chain = OptionChain.from_chain_response(chain_response())
+    assert chain.apply_update({'key': 'XYZ 240621C105', 'BID_PRICE': 1.07, 'MARK': float('nan'),
+                               'DELTA': 0.41, 'UNDERLYING_PRICE': 104.0})
+    assert chain.get('2024-06-21', to_fixed(105), CALL, 'BID_PRICE') == to_fixed(1.07)
+    assert chain.get('2024-06-21', to_fixed(105), CALL, 'MARK') == NULL_PRICE
+    assert chain.get('2024-06-21', to_fixed(105), CALL, 'DELTA') == 0.41
+    assert chain.underlying_price == to_fixed(104.0) and chain.atm_strike_index() == 2
+    assert not chain.apply_update({'key': 'XYZ 240621C999', 'BID_PRICE': 1.0})
+
+
+def test_no_underlying_price():
+    chain = OptionChain.from_chain_response(chain_response(underlying_price=float('nan')))
+    with pytest.raises(ValueError):
+        chain.atm_strike_index()
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    def __init__(self):
+        self.responses = []
+
+    def get_option_chain(self, underlying, **kwargs):
+        return FakeResponse(self.responses.pop(0))
+
+
+def test_expiry_roll():
+    """Re-resolving after the front expiry lapses drops its contracts and keeps the rest streaming"""
+    client = FakeClient()
+    client.responses = [chain_response(), chain_response(('2024-06-28:7', '2024-07-05:14'))]
+    streamer = OptionChainStreamer(client, None)
+
+    async def resolve():
+        return await streamer.resolve_chains(['XYZ'])
+
+    asyncio.run(resolve())
+    asyncio.run(resolve())
+    chain = streamer.chains['XYZ']
+    assert chain.expiries == ['2024-06-28', '2024-07-05']
+
+    streamer.on_level_one_option({'content': [
+        {'key': 'XYZ 240621C100', 'BID_PRICE': 9.0},
+        {'key': 'XYZ 240628C100', 'BID_PRICE': 1.5},
+        {'key': 'XYZ 240705P95', 'ASK_PRICE': 0.6},
+    ]})
+    assert streamer.unknown_contracts == 1
+    assert chain.get('2024-06-28', to_fixed(100), CALL, 'BID_PRICE') == to_fixed(1.5)
+    assert chain.get('2024-07-05', to_fixed(95), PUT, 'ASK_PRICE') == to_fixed(0.6)
+    assert chain.updates == 2
+    assert set(streamer._contract_chains) == set(chain.slots)
+
+
+def main():
+    print("🧪 OPTION CHAIN TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_grid_placement, test_slices, test_apply_update_moves_atm, test_no_underlying_price,
+                 test_expiry_roll):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
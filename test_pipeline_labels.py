@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Pipeline relabelling tests for Schwab Streaming Client
+Raw websocket items, as the decode workers see them, must come out with
+the field names schwab-py's own handlers would give them
+"""
+
+import sys
+
+import pytest
+
+pytest.importorskip('schwab.streaming')
+
+from fixed_point import to_fixed
+from market_state import MarketState
+from pipeline import _load_field_labels, merge_into_state, normalized_update_factory, relabel_item
+
+
+def raw_book_item() -> dict:
+    # BookFields / BidFields / AskFields / PerExchange*Fields wire ids
+    return {'key': 'AAPL', '1': 1700000000000,
+            '2': [{'0': 190.0, '1': 300, '2': 2, '3': [{'0': 'NSDQ', '1': 200, '2': 123}]},
+                  {'0': 189.99, '1': 500, '2': 1, '3': [{'0': 'ARCX', '1': 500, '2': 124}]}],
+            '3': [{'0': 190.05, '1': 100, '2': 1, '3': [{'0': 'ARCX', '1': 100, '2': 125}]}]}
+
+
+def test_book_levels_relabelled():
+    labels, level_labels = _load_field_labels()
+    item = relabel_item(raw_book_item(), labels['NASDAQ_BOOK'], level_labels)
+
+    assert item['BOOK_TIME'] == 1700000000000
+    assert item['BIDS'][0]['BID_PRICE'] == 190.0 and item['BIDS'][0]['TOTAL_VOLUME'] == 300
+    assert item['BIDS'][0]['BIDS'][0] == {'EXCHANGE': 'NSDQ', 'BID_VOLUME': 200, 'SEQUENCE': 123}
+    assert item['ASKS'][0]['ASKS'][0]['ASK_VOLUME'] == 100
+
+
+def test_book_decodes_in_worker_handler():
+    labels, level_labels = _load_field_labels()
+    item = relabel_item(raw_book_item(), labels['NYSE_BOOK'], level_labels)
+    kind, venue, symbol, top, (bids, asks) = normalized_update_factory(0)('NYSE_BOOK', item)
+
+    assert (kind, venue, symbol) == ('book', 'NYSE', 'AAPL')
+    assert top == {'time': 1700000000000, 'bid': 190_000_000, 'bid_size': 300,
+                   'ask': 190_050_000, 'ask_size': 100, 'depth': 2}
+    assert bids.levels() == [(190_000_000, 300), (189_990_000, 500)]
+    assert asks.levels() == [(190_050_000, 100)]
+
+
+def test_book_ladders_reach_state():
+    """A merged book result keeps every level, matched exactly on the integer price"""
+    labels, level_labels = _load_field_labels()
+    item = relabel_item(raw_book_item(), labels['NASDAQ_BOOK'], level_labels)
+    state = MarketState()
+    merge_into_state(state, normalized_update_factory(0)('NASDAQ_BOOK', item))
+
+    bids, asks = state.get_ladders('AAPL', 'NASDAQ')
+    assert bids.size_at(to_fixed(189.99)) == 500
+    assert bids.size_at(to_fixed(189.98)) == 0
+    assert asks.best() == (190_050_000, 100)
+    assert state.best_book('AAPL')['bid'] == 190_000_000
+
+    state.evict_lru(1)
+    assert state.get_ladders('AAPL', 'NASDAQ') is None
+
+
+def main():
+    print("🧪 PIPELINE LABEL TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_book_levels_relabelled, test_book_decodes_in_worker_handler, test_book_ladders_reach_state):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Portfolio tests for Schwab Streaming Client
+Running P&L totals must equal a full recomputation from the market state
+through ticks, multiplier changes and position reloads
+"""
+
+import random
+import sys
+
+from fixed_point import to_fixed
+from market_state import MarketState
+from portfolio import LAST, MID, Portfolio, Position, Totals, parse_positions
+
+SYMBOLS = {'AAPL': 'equity', 'MSFT': 'equity', 'SPY': 'equity', '/ES': 'futures'}
+
+
+def recompute(portfolio: Portfolio, state: MarketState, account=None) -> dict:
+    """Totals from scratch: mid of the state's bid/ask, multiplier from the state's quote"""
+    totals = Totals()
+    for position in portfolio.positions(account):
+        totals.positions += 1
+        totals.unmarked += 1
+        quote = state.get_quote(position.symbol) or {}
+        if quote.get('bid') is None or quote.get('ask') is None:
+            continue
+        multiplier = quote.get('multiplier') or 1
+        value = round((quote['bid'] + quote['ask']) // 2 * position.quantity * multiplier)
+        cost = round(position.average_price * position.quantity * multiplier)
+        totals.apply(None, None, value, value - cost)
+    return totals.as_dict()
+
+
+def assert_matches(portfolio: Portfolio, state: MarketState):
+    assert portfolio.totals.as_dict() == recompute(portfolio, state)
+    for account in portfolio.accounts:
+        assert portfolio.account_totals[account].as_dict() == recompute(portfolio, state, account), account
+
+
+def position(account: str, symbol: str, quantity, average: float) -> Position:
+    return Position(account, symbol, SYMBOLS[symbol], quantity, to_fixed(average))
+
+
+def watched_state(portfolio: Portfolio) -> MarketState:
+    state = portfolio.state
+    state.add_listener(portfolio.on_quote)
+    return state
+
+
+def test_mid_policy_matches_full_recompute():
+    rng = random.Random(7)
+    portfolio = Portfolio(MarketState(), mark=MID)
+    state = watched_state(portfolio)
+    state.update_quote('equity', 'AAPL', {'bid': to_fixed(190.00), 'ask': to_fixed(190.03)})
+    portfolio.set_positions('1001', [position('1001', 'AAPL', 100, 180.25), position('1001', 'MSFT', -40, 415.10),
+                                     position('1001', '/ES', 2, 5100.25)])
+    portfolio.set_positions('1002', [position('1002', 'AAPL', -15, 191.0), position('1002', 'SPY', 7, 501.5)])
+    assert portfolio.totals.unmarked == 3
+    assert_matches(portfolio, state)
+
+    for _ in range(500):
+        symbol = rng.choice(list(SYMBOLS))
+        fields = {}
+        if rng.random() < 0.7:
+            fields['bid'] = to_fixed(round(rng.uniform(100, 600), 2))
+        if rng.random() < 0.7:
+            fields['ask'] = to_fixed(round(rng.uniform(100, 600), 2))
+        if symbol == '/ES' and rng.random() < 0.3:
+            fields['multiplier'] = rng.choice((50, 5))
+        if fields:
+            state.update_quote(SYMBOLS[symbol], symbol, fields)
+            assert_matches(portfolio, state)
+    assert portfolio.totals.unmarked == 0
+
+
+def test_multiplier_change_revalues_held_position():
+    portfolio = Portfolio(MarketState(), mark=MID)
+    state = watched_state(portfolio)
+    portfolio.set_positions('1001', [position('1001', '/ES', 2, 5000.0)])
+    state.update_quote('futures', '/ES', {'bid': to_fixed(5010.0), 'ask': to_fixed(5010.5)})
+    assert portfolio.totals.unrealized == to_fixed(2 * 10.25)
+
+    # A multiplier-only update re-marks at the last mark with the new multiplier
+    state.update_quote('futures', '/ES', {'multiplier': 50})
+    held, = portfolio.positions('1001')
+    assert held.multiplier == 50 and held.cost == to_fixed(5000.0) * 2 * 50
+    assert portfolio.totals.market_value == to_fixed(5010.25) * 2 * 50
+    assert portfolio.totals.unrealized == to_fixed(10.25) * 2 * 50
+    assert_matches(portfolio, state)
+
+
+def test_quote_before_position_loads():
+    """Mark and multiplier streamed before the symbol was held are picked up from the state"""
+    portfolio = Portfolio(MarketState(), mark=MID)
+    state = watched_state(portfolio)
+    state.update_quote('futures', '/ES', {'bid': to_fixed(5001.0), 'ask': to_fixed(5001.5), 'multiplier': 50})
+    portfolio.set_positions('1001', [position('1001', '/ES', 1, 5000.0)])
+    held, = portfolio.positions('1001')
+    assert held.multiplier == 50 and portfolio.totals.unrealized == to_fixed(1.25) * 50
+    assert_matches(portfolio, state)
+
+
+def test_set_positions_reload():
+    """A reload replaces the account's positions and keeps marks and multipliers"""
+    portfolio = Portfolio(MarketState(), mark=MID)
+    state = watched_state(portfolio)
+    portfolio.set_positions('1001', [position('1001', 'AAPL', 100, 180.0), position('1001', '/ES', 1, 5000.0)])
+    portfolio.set_positions('1002', [position('1002', 'AAPL', 10, 185.0)])
+    state.update_quote('equity', 'AAPL', {'bid': to_fixed(190.0), 'ask': to_fixed(190.02)})
+    state.update_quote('futures', '/ES', {'bid': to_fixed(5001.0), 'ask': to_fixed(5001.5), 'multiplier': 50})
+    assert_matches(portfolio, state)
+
+    # Fill: AAPL partly sold, /ES closed, MSFT opened (not quoted yet)
+    portfolio.set_positions('1001', [position('1001', 'AAPL', 60, 180.0), position('1001', 'MSFT', 5, 400.0)])
+    assert set(portfolio.by_symbol) == {'AAPL', 'MSFT'} and len(portfolio.by_symbol['AAPL']) == 2
+    assert portfolio.totals.positions == 3 and portfolio.totals.unmarked == 1
+    assert_matches(portfolio, state)
+
+    # Reopened /ES picks up the multiplier and mark seen before the reload
+    portfolio.set_positions('1001', [position('1001', '/ES', -3, 5005.0)])
+    es, = portfolio.positions('1001')
+    assert es.multiplier == 50 and es.mark == (to_fixed(5001.0) + to_fixed(5001.5)) // 2
+    assert_matches(portfolio, state)
+
+    portfolio.set_positions('1001', [])
+    assert portfolio.account_totals['1001'].as_dict() == Totals().as_dict()
+    assert_matches(portfolio, state)
+
+
+def test_last_policy_and_parse_positions():
+    portfolio = Portfolio(MarketState(), mark=LAST)
+    state = watched_state(portfolio)
+    number, positions = parse_positions({'securitiesAccount': {'accountNumber': 1001, 'positions': [
+        {'instrument': {'symbol': 'aapl', 'assetType': 'EQUITY'}, 'longQuantity': 10.0, 'averagePrice': 150.5},
+        {'instrument': {'symbol': 'MSFT', 'assetType': 'EQUITY'}, 'shortQuantity': 3.0, 'averagePrice': 400.0},
+        {'instrument': {'symbol': 'XYZ', 'assetType': 'EQUITY'}, 'longQuantity': 0.0},
+    ]}})
+    assert number == '1001' and [(p.symbol, p.quantity) for p in positions] == [('AAPL', 10), ('MSFT', -3)]
+    portfolio.set_positions(number, positions)
+    state.update_quote('equity', 'AAPL', {'bid': to_fixed(151.0)})
+    assert portfolio.totals.unmarked == 2
+    state.update_quote('equity', 'AAPL', {'last': to_fixed(152.0)})
+    assert portfolio.totals.unrealized == to_fixed(1.5) * 10
+
+
+def main():
+    print("🧪 PORTFOLIO TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_mid_policy_matches_full_recompute, test_multiplier_change_revalues_held_position,
+                 test_quote_before_position_loads, test_set_positions_reload, test_last_policy_and_parse_positions):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
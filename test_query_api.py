@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Query API tests for Schwab Streaming Client
+Cached records follow the symbol's version, malformed WebSocket frames
+are rejected and slow subscribers are dropped without holding up others
+"""
+
+import asyncio
+import json
+import sys
+
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+
+from fastapi.testclient import TestClient
+
+from fixed_point import to_fixed
+from market_state import MarketState
+from query_api import DeltaHub, QueryService, SnapshotCache, parse_ws_request
+
+
+def quoted_state() -> MarketState:
+    state = MarketState()
+    state.update_quote('EQUITY', 'AAPL', {'bid': to_fixed(190.01), 'ask': to_fixed(190.03)})
+    state.update_quote('EQUITY', 'MSFT', {'bid': to_fixed(410.5)})
+    return state
+
+
+def test_cache_follows_version():
+    state = quoted_state()
+    cache = SnapshotCache(state)
+    first = cache.get('AAPL')
+    assert cache.get('AAPL') is not None and (cache.hits, cache.misses) == (1, 1)
+    assert json.loads(first[1])['quote'] == {'bid': 190.01, 'ask': 190.03}
+
+    state.update_quote('EQUITY', 'AAPL', {'bid': to_fixed(190.02)})
+    record = json.loads(cache.get('AAPL')[1])
+    assert cache.misses == 2
+    assert record['quote']['bid'] == 190.02 and record['version'] == state.versions['AAPL']
+
+    # Another symbol's update does not invalidate AAPL
+    state.update_quote('EQUITY', 'MSFT', {'bid': to_fixed(411.0)})
+    cache.get('AAPL')
+    assert cache.hits == 2
+
+
+def test_cache_forgets_evicted_symbols():
+    state = quoted_state()
+    cache = SnapshotCache(state)
+    cache.get('AAPL')
+    state.evict_lru(1)
+    assert 'AAPL' not in cache.records and cache.get('AAPL') is None
+
+
+def test_http_snapshots():
+    service = QueryService(quoted_state())
+    client = TestClient(service.app)
+    response = client.get('/snapshot/AAPL')
+    assert response.status_code == 200 and response.json()['quote']['ask'] == 190.03
+    assert client.get('/snapshot/NOPE').status_code == 404
+
+    batch = client.get('/snapshot', params={'symbols': 'AAPL, NOPE'}).json()
+    assert batch['NOPE'] is None and batch['AAPL']['symbol'] == 'AAPL'
+    batch = client.post('/snapshot', json={'symbols': ['MSFT']}).json()
+    assert list(batch) == ['MSFT']
+    assert service.report()['requests'] == 4
+
+
+def test_parse_ws_request_rejects():
+    for frame, error in (('not json', 'frame is not JSON'),
+                         ('["AAPL"]', 'frame must be a JSON object'),
+                         ('{"subscribe": "AAPL"}', "'subscribe' must be a list of symbols"),
+                         ('{"unsubscribe": [1, 2]}', "'unsubscribe' must be a list of symbols")):
+        with pytest.raises(ValueError, match=error):
+            parse_ws_request(frame)
+
+
+def test_parse_ws_request():
+    assert parse_ws_request('{"subscribe": ["AAPL"]}') == (['AAPL'], [])
+    assert parse_ws_request('{"unsubscribe": ["AAPL"], "subscribe": null}') == ([], ['AAPL'])
+
+
+def test_websocket_rejects_then_subscribes():
+    """A bad frame gets an error reply and the connection stays usable"""
+    service = QueryService(quoted_state())
+    client = TestClient(service.app)
+    with client.websocket_connect('/ws') as websocket:
+        websocket.send_text('{"subscribe": "AAPL"}')
+        assert websocket.receive_json() == {'error': "'subscribe' must be a list of symbols"}
+        websocket.send_text('{"subscribe": ["AAPL"]}')
+        assert websocket.receive_json()['AAPL']['quote']['bid'] == 190.01
+        assert service.hub.by_symbol == {'AAPL': set(service.hub.subscribers)}
+    assert not service.hub.subscribers and not service.hub.by_symbol
+
+
+class FakeWebSocket:
+    """Collects pushed frames; a slow one never finishes sending"""
+
+    def __init__(self, slow: bool = False):
+        self.slow = slow
+        self.sent = []
+
+    async def send_text(self, text: str):
+        if self.slow:
+            await asyncio.sleep(3600)
+        self.sent.append(json.loads(text))
+
+
+def test_hub_drops_slow_subscriber():
+    state = quoted_state()
+    hub = DeltaHub(state, interval=0.01, send_timeout=0.05)
+    fast, slow = FakeWebSocket(), FakeWebSocket(slow=True)
+    hub.subscribe(fast, ['AAPL'])
+    hub.subscribe(slow, ['AAPL', 'MSFT'])
+
+    async def run():
+        hub.start()
+        state.update_quote('EQUITY', 'AAPL', {'bid': to_fixed(190.05)})
+        state.update_quote('EQUITY', 'AAPL', {'ask': to_fixed(190.07)})
+        await asyncio.sleep(0.2)
+        hub.stop()
+
+    asyncio.run(run())
+    # Both quote updates were conflated into one delta
+    assert fast.sent == [{'deltas': [{'symbol': 'AAPL', 'kind': 'quote', 'key': 'EQUITY',
+                                      'fields': {'bid': 190.05, 'ask': 190.07}}]}]
+    assert hub.dropped == 1 and hub.pushed == 1
+    assert slow not in hub.subscribers and hub.by_symbol == {'AAPL': {fast}}
+
+
+def main():
+    print("🧪 QUERY API TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_cache_follows_version, test_cache_forgets_evicted_symbols, test_http_snapshots,
+                 test_parse_ws_request_rejects, test_parse_ws_request, test_websocket_rejects_then_subscribes,
+                 test_hub_drops_slow_subscriber):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
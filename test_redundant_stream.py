@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Redundant stream tests for Schwab Streaming Client
+Each leg's frames carry their own timestamp, so items without a sequence
+number must be deduplicated on their content
+"""
+
+import sys
+
+from redundant_stream import Arbiter
+
+
+def level_one(timestamp: int, **fields) -> dict:
+    return {'service': 'LEVELONE_EQUITIES', 'timestamp': timestamp,
+            'content': [dict({'key': 'AAPL'}, **fields)]}
+
+
+def test_identical_items_under_different_frame_timestamps():
+    """The second leg's copy of the same update is dropped"""
+    arbiter = Arbiter()
+    first = arbiter.accept(0, level_one(1000, BID_PRICE=150.0, QUOTE_TIME_MILLIS=999), received=1.0)
+    second = arbiter.accept(1, level_one(1004, BID_PRICE=150.0, QUOTE_TIME_MILLIS=999), received=1.0)
+    assert first is not None and first['content'][0]['BID_PRICE'] == 150.0
+    assert second is None
+    report = arbiter.report()
+    assert report[0]['wins'] == 1 and report[1]['duplicates'] == 1
+
+
+def test_new_quote_time_passes():
+    """A later update with the same prices but a new quote time is not a duplicate"""
+    arbiter = Arbiter()
+    arbiter.accept(0, level_one(1000, BID_PRICE=150.0, QUOTE_TIME_MILLIS=999), received=1.0)
+    later = arbiter.accept(1, level_one(1004, BID_PRICE=150.0, QUOTE_TIME_MILLIS=1003), received=1.0)
+    assert later is not None
+
+
+def test_changed_fields_differ():
+    """Same quote time, different changed fields: both pass"""
+    arbiter = Arbiter()
+    arbiter.accept(0, level_one(1000, BID_PRICE=150.0, QUOTE_TIME_MILLIS=999), received=1.0)
+    other = arbiter.accept(1, level_one(1000, ASK_PRICE=150.5, QUOTE_TIME_MILLIS=999), received=1.0)
+    assert other is not None
+
+
+def test_repeats_within_one_leg_pass():
+    """Identical updates repeated on one leg are forwarded once per repeat"""
+    arbiter = Arbiter()
+    forwarded = 0
+    for leg, timestamp in ((0, 1000), (0, 1001), (1, 1003), (1, 1005), (1, 1006)):
+        forwarded += arbiter.accept(leg, level_one(timestamp, LAST_SIZE=100), received=1.0) is not None
+    assert forwarded == 3
+
+
+def test_sequence_still_identifies():
+    """Items with a sequence number are identified by it, whatever else they carry"""
+    arbiter = Arbiter()
+    chart = {'service': 'CHART_EQUITY', 'timestamp': 1000,
+             'content': [{'key': 'AAPL', 'SEQUENCE': 7, 'CLOSE_PRICE': 150.0}]}
+    assert arbiter.accept(0, chart, received=1.0) is not None
+    assert arbiter.accept(1, dict(chart, timestamp=1004), received=1.0) is None
+
+
+def main():
+    print("🧪 REDUNDANT STREAM TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_identical_items_under_different_frame_timestamps, test_new_quote_time_passes,
+                 test_changed_fields_differ, test_repeats_within_one_leg_pass, test_sequence_still_identifies):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Sequence tracker tests for Schwab Streaming Client
+Bar refills must see the bar of a symbol packed by compact_idle
+"""
+
+import sys
+
+from market_state import MarketState
+from sequence_tracker import SnapshotRefiller
+
+
+def idle_state() -> MarketState:
+    """A state whose only chart symbol has been packed as idle"""
+    state = MarketState()
+    state.update_bar('AAPL', {'time': 120000, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 10})
+    assert state.compact_idle(-1) == 1 and 'AAPL' not in state.bars
+    return state
+
+
+def candle(time_ms: int) -> dict:
+    return {'datetime': time_ms, 'open': 150.0, 'high': 151.0, 'low': 149.0, 'close': 150.5, 'volume': 100}
+
+
+def test_request_sees_idle_bar():
+    """A gap on an idle symbol queues a refill from its last bar"""
+    refiller = SnapshotRefiller(None, idle_state())
+    refiller.request('CHART_EQUITY', 'AAPL')
+    assert refiller.pending_bars == {'AAPL': 120000}
+    assert refiller.requested == 1
+
+
+def test_apply_bars_stops_at_idle_bar():
+    """Candles at or after an idle symbol's bar do not go through as refills"""
+    state = idle_state()
+    refiller = SnapshotRefiller(None, state)
+    refiller.apply_bars('AAPL', {'candles': [candle(60000), candle(120000), candle(180000)]}, since=0)
+    assert refiller.bars_refilled == 1
+    assert state.get_bar('AAPL')['time'] == 120000
+
+
+def main():
+    print("🧪 SEQUENCE TRACKER TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_request_sees_idle_bar, test_apply_bars_stops_at_idle_bar):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+State journal tests for Schwab Streaming Client
+A crash mid-flush or mid-checkpoint must recover to the state that was
+last written out
+"""
+
+import copy
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from market_state import MarketState
+from state_journal import BLOCK_HEADER, JOURNAL_HEADER, JOURNAL_MAGIC, StateJournal, read_journal
+
+
+def live_journal(directory: str):
+    state = MarketState()
+    journal = StateJournal(state, os.path.join(directory, 'market'))
+    journal.recover()
+    journal.attach()
+    return state, journal
+
+
+def recovered(directory: str):
+    """Recover into a fresh state, as a restarted process would"""
+    state = MarketState()
+    result = StateJournal(state, os.path.join(directory, 'market')).recover()
+    return state, result
+
+
+def kill(journal: StateJournal):
+    """Drop the journal without the final checkpoint stop() would write"""
+    journal._journal.close()
+    journal._journal = None
+
+
+def apply_updates(state: MarketState, start: int, count: int):
+    for n in range(start, start + count):
+        symbol = f"SYM{n % 7}"
+        state.update_quote('EQUITY', symbol, {'bid': n * 1000, 'ask': n * 1000 + 50})
+        if n % 3 == 0:
+            state.update_book('NASDAQ', symbol, {'time': n, 'bid': n * 1000, 'ask': n * 1000 + 10})
+        if n % 5 == 0:
+            state.update_bar(symbol, {'time': n * 60000, 'close': n * 1000})
+
+
+def test_recover_matches_live_state():
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 40)
+        journal.checkpoint()
+        apply_updates(state, 40, 40)
+        journal.flush()
+        kill(journal)
+
+        restored, result = recovered(directory)
+        assert restored.export() == state.export()
+        assert result['snapshot_generation'] == 2 and result['torn_journals'] == 0
+        assert restored.stale == set(state.updated_at)
+
+
+def test_torn_tail_block_ends_replay():
+    """A block cut short by a crash mid-flush is dropped; earlier blocks replay"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 20)
+        journal.flush()
+        flushed = copy.deepcopy(state.export())
+        apply_updates(state, 20, 20)
+        journal.flush()
+        kill(journal)
+
+        path = journal._journal_path(journal.generation)
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as f:
+            f.truncate(size - 7)
+
+        restored, result = recovered(directory)
+        assert result['torn_journals'] == 1
+        assert restored.export() == flushed
+
+
+def test_corrupt_tail_block_ends_replay():
+    """A block whose CRC does not match is treated like a torn one"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 20)
+        journal.flush()
+        flushed = copy.deepcopy(state.export())
+        kill(journal)
+
+        payload = marshal.dumps([('quote', 'EQUITY', 'SYM0', {'bid': 1}, 1.0)])
+        with open(journal._journal_path(journal.generation), 'ab') as f:
+            f.write(BLOCK_HEADER.pack(len(payload), zlib.crc32(payload) ^ 1) + payload)
+
+        restored, result = recovered(directory)
+        assert result['torn_journals'] == 1
+        assert restored.export() == flushed
+
+
+def test_partial_block_header_is_torn():
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 5)
+        journal.flush()
+        kill(journal)
+        path = journal._journal_path(journal.generation)
+        with open(path, 'ab') as f:
+            f.write(struct.pack('<I', 10))
+        generation, records, complete = read_journal(path)
+        assert generation == 1 and len(records) == journal.records and not complete
+
+
+def test_crash_mid_checkpoint_replays_both_journals():
+    """Killed after the capture switched journals but before the snapshot was written"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 30)
+        journal._capture()
+        apply_updates(state, 30, 30)
+        journal.flush()
+        kill(journal)
+
+        restored, result = recovered(directory)
+        assert result['snapshot_generation'] == 0
+        assert restored.export() == state.export()
+
+
+def test_journals_older_than_snapshot_are_skipped():
+    """A journal left behind by a crash before its deletion is not replayed over the snapshot"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 30)
+        journal.checkpoint()
+        snapshotted = journal.records
+        apply_updates(state, 30, 10)
+        journal.flush()
+        kill(journal)
+
+        # Leftover generation 1 journal whose records predate the snapshot
+        stale = journal._journal_path(1)
+        assert not os.path.exists(stale)
+        payload = marshal.dumps([('quote', 'EQUITY', 'SYM0', {'bid': -1}, 0.0)])
+        with open(stale, 'wb') as f:
+            f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, 1))
+            f.write(BLOCK_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+        restored, result = recovered(directory)
+        assert result['snapshot_generation'] == 2 and result['journal_records'] == journal.records - snapshotted
+        assert restored.export() == state.export()
+        assert restored.get_quote('SYM0')['bid'] != -1
+
+
+def test_evictions_replay():
+    """Evicted symbols stay evicted, and come back fresh if updated again"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        apply_updates(state, 0, 14)
+        journal.checkpoint()
+        evicted = state.evict_lru(3)
+        state.update_quote('EQUITY', evicted[0], {'last': 5000})
+        journal.flush()
+        kill(journal)
+
+        restored, _ = recovered(directory)
+        assert restored.export() == state.export()
+        assert restored.get_quote(evicted[0]) == {'last': 5000}
+        assert all(restored.get_quote(symbol) is None for symbol in evicted[1:])
+
+
+def test_older_bar_does_not_replace_newer_on_replay():
+    """A gap-refill bar is journalled but, as live, does not replace the latest bar"""
+    with tempfile.TemporaryDirectory() as directory:
+        state, journal = live_journal(directory)
+        state.update_quote('EQUITY', 'AAPL', {'bid': 1})
+        state.update_bar('AAPL', {'time': 120000, 'close': 2})
+        state.update_quote('EQUITY', 'MSFT', {'bid': 1})
+        state.update_bar('AAPL', {'time': 60000, 'close': 1})
+        journal.flush()
+        kill(journal)
+
+        restored, _ = recovered(directory)
+        assert restored.export() == state.export()
+        assert list(restored.updated_at) == ['AAPL', 'MSFT']
+
+
+def main():
+    print("🧪 STATE JOURNAL TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_recover_matches_live_state, test_torn_tail_block_ends_replay,
+                 test_corrupt_tail_block_ends_replay, test_partial_block_header_is_torn,
+                 test_crash_mid_checkpoint_replays_both_journals, test_journals_older_than_snapshot_are_skipped,
+                 test_evictions_replay, test_older_bar_does_not_replace_newer_on_replay):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
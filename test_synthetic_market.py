@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Synthetic market tests for Schwab Streaming Client
+Synthetic wire frames must decode through schwab-py's own field tables
+into the same bars the labelled messages carry
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('schwab.streaming')
+
+from schwab.streaming import StreamClient
+
+from asset_classes import decode_chart
+from synthetic_market import CHART_EQUITY_WIRE, SyntheticMarket, generate_symbols, relabel
+
+
+class FakeSocket:
+    """Hands StreamClient.handle_message one queued frame per recv()"""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    async def recv(self):
+        return self.frames.pop(0)
+
+
+def chart_frames(count: int = 20000):
+    """Text frames from a market run long enough to roll one minute bar"""
+    market = SyntheticMarket(generate_symbols(5), seed=1)
+    return [frame for frame in market.frames(rate=100, items_per_frame=5, limit=count)
+            if '"CHART_EQUITY"' in frame]
+
+
+def test_chart_wire_ids_match_schwab_py():
+    for wire, label in CHART_EQUITY_WIRE.items():
+        assert StreamClient.ChartEquityFields(int(wire)).name == label
+
+
+def test_chart_frame_relabelled_by_stream_client():
+    """A synthetic chart frame through StreamClient gives the bar the market produced"""
+    frames = chart_frames()
+    assert frames
+    stream_client = StreamClient(None, account_id=12345678)
+    stream_client._socket = FakeSocket(frames[:1])
+    received = []
+    stream_client.add_chart_equity_handler(received.append)
+    asyncio.run(stream_client.handle_message())
+
+    item = received[0]['content'][0]
+    assert item['SEQUENCE'] == 0
+    assert item['LOW_PRICE'] <= min(item['OPEN_PRICE'], item['CLOSE_PRICE'])
+    assert item['HIGH_PRICE'] >= max(item['OPEN_PRICE'], item['CLOSE_PRICE'])
+    assert isinstance(item['VOLUME'], int) and item['VOLUME'] >= 0
+    assert item['CHART_TIME_MILLIS'] % 60000 == 0
+
+    symbol, bar = next(decode_chart(received[0]))
+    assert symbol == item['key']
+    assert bar['sequence'] == 0 and bar['time'] == item['CHART_TIME_MILLIS']
+    assert bar['close'] == round(item['CLOSE_PRICE'] * 1000000)
+
+
+def test_relabel_matches_labelled_messages():
+    """relabel() on wire content equals messages(labelled=True) for the same seed"""
+    symbols = generate_symbols(5)
+    wire = [m for m in SyntheticMarket(symbols, seed=1).messages(100, 5, limit=20000)
+            if m['service'] == 'CHART_EQUITY']
+    labelled = [m for m in SyntheticMarket(symbols, seed=1).messages(100, 5, limit=20000, labelled=True)
+                if m['service'] == 'CHART_EQUITY']
+    assert wire
+    for raw, named in zip(wire, labelled):
+        assert [relabel('CHART_EQUITY', item) for item in raw['content']] == named['content']
+
+
+def main():
+    print("🧪 SYNTHETIC MARKET TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_chart_wire_ids_match_schwab_py, test_chart_frame_relabelled_by_stream_client,
+                 test_relabel_matches_labelled_messages):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tick store tests for Schwab Streaming Client
+Segment layout, range reads across overlapping segments, resampling and
+as-of joins on small hand-made data
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from fixed_point import NULL_PRICE, to_fixed
+from tick_store import TickStore, write_segment
+
+# 2024-01-02 00:00:00 UTC
+T0 = 1704153600000
+
+
+def prices(*values):
+    return np.array([to_fixed(value) for value in values], dtype=np.int64)
+
+
+def write_trades(root, name, rows):
+    """rows: (symbol, offset ms, price, size)"""
+    symbols, offsets, values, sizes = zip(*rows)
+    return write_segment(root, 'trades', np.array(symbols), T0 + np.array(offsets, dtype=np.int64),
+                         {'price': prices(*values), 'size': np.array(sizes, dtype=np.float64)}, name=name)
+
+
+def write_quotes(root, name, rows):
+    """rows: (symbol, offset ms, bid, ask)"""
+    symbols, offsets, bids, asks = zip(*rows)
+    count = len(rows)
+    return write_segment(root, 'quotes', np.array(symbols), T0 + np.array(offsets, dtype=np.int64),
+                         {'bid': prices(*bids), 'ask': prices(*asks),
+                          'bid_size': np.full(count, 100.0), 'ask_size': np.full(count, 200.0)}, name=name)
+
+
+def test_write_segment_sorts_and_offsets():
+    with tempfile.TemporaryDirectory() as root:
+        directory = write_trades(root, 'a', [('MSFT', 30, 410.0, 1), ('AAPL', 20, 190.2, 2),
+                                             ('MSFT', 10, 409.0, 3), ('AAPL', 5, 190.1, 4)])
+        assert directory == os.path.join(root, 'trades', '2024-01-02', 'a')
+        assert not os.path.exists(directory + '.tmp')
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        assert meta['symbols'] == ['AAPL', 'MSFT'] and meta['offsets'] == [0, 2, 4]
+        assert (meta['start_ms'], meta['end_ms'], meta['rows']) == (T0 + 5, T0 + 30, 4)
+
+        times = np.load(os.path.join(directory, 'time.npy')) - T0
+        assert times.tolist() == [5, 20, 10, 30]
+        assert np.load(os.path.join(directory, 'size.npy')).tolist() == [4.0, 2.0, 3.0, 1.0]
+        assert np.load(os.path.join(directory, 'price.npy')).dtype == np.int64
+
+
+def test_empty_segment_is_not_written():
+    with tempfile.TemporaryDirectory() as root:
+        assert write_segment(root, 'trades', np.array([]), np.array([], dtype=np.int64), {}) is None
+        assert not os.listdir(root)
+
+
+def test_window_bounds_and_overlapping_segments():
+    with tempfile.TemporaryDirectory() as root:
+        write_trades(root, 'a', [('AAPL', 0, 1.0, 1), ('AAPL', 20, 3.0, 1), ('AAPL', 40, 5.0, 1)])
+        # Flushed later but overlapping the first segment's time range
+        write_trades(root, 'b', [('AAPL', 10, 2.0, 1), ('AAPL', 30, 4.0, 1), ('MSFT', 15, 9.0, 1)])
+        store = TickStore(root)
+
+        data = store.window('trades', 'AAPL', T0, T0 + 40)
+        assert (data['time'] - T0).tolist() == [0, 10, 20, 30]
+        assert data['price'].tolist() == prices(1, 2, 3, 4).tolist()
+
+        data = store.window('trades', 'AAPL', T0 + 10, T0 + 11, ['price'])
+        assert list(data) == ['time', 'price'] and data['price'].tolist() == [to_fixed(2.0)]
+        assert len(store.window('trades', 'NOPE', T0, T0 + 100)['time']) == 0
+        assert store.symbols('trades') == ['AAPL', 'MSFT']
+
+
+def test_single_segment_window_is_a_view():
+    with tempfile.TemporaryDirectory() as root:
+        write_trades(root, 'a', [('AAPL', 0, 1.0, 1), ('AAPL', 20, 3.0, 1)])
+        data = TickStore(root).window('trades', 'AAPL', T0, T0 + 100)
+        assert isinstance(data['price'], np.memmap)
+
+
+def test_resample_trades():
+    with tempfile.TemporaryDirectory() as root:
+        write_trades(root, 'a', [('AAPL', 0, 10.0, 1), ('AAPL', 400, 12.0, 2), ('AAPL', 900, 9.0, 3),
+                                 ('AAPL', 2100, 11.0, 4), ('AAPL', 2500, 11.5, 5)])
+        bars = TickStore(root).resample('AAPL', T0, T0 + 3000, 1000)
+        # The empty second interval is omitted
+        assert (bars['time'] - T0).tolist() == [0, 2000]
+        assert bars['open'].tolist() == prices(10.0, 11.0).tolist()
+        assert bars['high'].tolist() == prices(12.0, 11.5).tolist()
+        assert bars['low'].tolist() == prices(9.0, 11.0).tolist()
+        assert bars['close'].tolist() == prices(9.0, 11.5).tolist()
+        assert bars['volume'].tolist() == [6.0, 9.0]
+
+
+def test_asof_join_tolerance():
+    with tempfile.TemporaryDirectory() as root:
+        write_quotes(root, 'q', [('AAPL', 0, 1.00, 1.02), ('AAPL', 100, 1.01, 1.03), ('AAPL', 5000, 1.05, 1.07)])
+        write_trades(root, 't', [('AAPL', 50, 1.01, 1), ('AAPL', 100, 1.02, 1), ('AAPL', 1200, 1.03, 1),
+                                 ('AAPL', 5001, 1.06, 1)])
+        joined = TickStore(root).asof_join('AAPL', T0 + 10, T0 + 6000, tolerance_ms=1000)
+
+        assert (joined['time'] - T0).tolist() == [50, 100, 1200, 5001]
+        # The quote at 0 is before the window start but within tolerance of the first trade;
+        # a quote at the trade's own time prevails; 1200 is 1100 ms after the last quote
+        assert (joined['quote_time'][[0, 1, 3]] - T0).tolist() == [0, 100, 5000]
+        assert joined['quote_time'][2] == -1
+        assert joined['bid'].tolist() == [to_fixed(1.00), to_fixed(1.01), NULL_PRICE, to_fixed(1.05)]
+        assert joined['ask'][2] == NULL_PRICE
+
+
+def main():
+    print("🧪 TICK STORE TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_write_segment_sorts_and_offsets, test_empty_segment_is_not_written,
+                 test_window_bounds_and_overlapping_segments, test_single_segment_window_is_a_view,
+                 test_resample_trades, test_asof_join_tolerance):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
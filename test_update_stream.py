@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Update stream tests for Schwab Streaming Client
+Queue overflow policies, batch sizing and iterator lifetime
+"""
+
+import asyncio
+import sys
+import time
+
+from handler_executor import CONFLATE, DROP_NEWEST, DROP_OLDEST
+from market_state import MarketState
+from update_stream import Update, UpdateHub, UpdateQueue
+
+
+def quote(symbol: str, **fields) -> Update:
+    return Update('quote', 'LEVELONE_EQUITIES', symbol, fields, time.time())
+
+
+def drain(queue: UpdateQueue):
+    return asyncio.run(queue.get_batch(1000, 0))
+
+
+def test_drop_newest():
+    queue = UpdateQueue(None, None, max_queue=2, overflow=DROP_NEWEST)
+    for n in range(4):
+        queue.put(quote(f"S{n}", bid=n))
+    assert [update.symbol for update in drain(queue)] == ['S0', 'S1']
+    assert queue.dropped == 2
+
+
+def test_drop_oldest():
+    queue = UpdateQueue(None, None, max_queue=2, overflow=DROP_OLDEST)
+    for n in range(4):
+        queue.put(quote(f"S{n}", bid=n))
+    assert [update.symbol for update in drain(queue)] == ['S2', 'S3']
+    assert queue.dropped == 2
+
+
+def test_conflate_merges_in_place():
+    """A full queue folds updates into the symbol's queued one, keeping its position"""
+    queue = UpdateQueue(None, None, max_queue=2, overflow=CONFLATE)
+    first = quote('AAPL', bid=1, ask=2)
+    queue.put(first)
+    queue.put(quote('MSFT', bid=5))
+    queue.put(quote('AAPL', bid=3))
+    queue.put(quote('AAPL', last=4))
+    queue.put(Update('book', 'NYSE_BOOK', 'MSFT', {'bid': 1}, time.time()))
+
+    assert queue.conflated == 2 and queue.dropped == 1
+    updates = drain(queue)
+    assert [(update.symbol, update.fields) for update in updates] == [
+        ('MSFT', {'bid': 5}), ('MSFT', {'bid': 1})]
+    # AAPL was the oldest when the book update needed a slot: dropped with its conflated fields
+    assert not queue.queued and not queue.conflated_into
+
+
+def test_conflate_delivers_merged_fields():
+    queue = UpdateQueue(None, None, max_queue=1, overflow=CONFLATE)
+    first = quote('AAPL', bid=1, ask=2)
+    queue.put(first)
+    queue.put(quote('AAPL', bid=3))
+    queue.put(quote('AAPL', last=4))
+    update = asyncio.run(queue.get())
+    assert update.fields == {'bid': 3, 'ask': 2, 'last': 4}
+    # The queued update can be shared with other iterators, so it is never modified
+    assert first.fields == {'bid': 1, 'ask': 2}
+    assert not queue.queued and not queue.conflated_into
+
+
+def test_conflate_replaces_books():
+    queue = UpdateQueue(None, None, max_queue=1, overflow=CONFLATE)
+    queue.put(Update('book', 'NYSE_BOOK', 'AAPL', {'bid': 1, 'ask': 2}, time.time()))
+    queue.put(Update('book', 'NYSE_BOOK', 'AAPL', {'bid': 3}, time.time()))
+    assert asyncio.run(queue.get()).fields == {'bid': 3}
+
+
+def test_service_filter():
+    queue = UpdateQueue({'NYSE_BOOK'}, None)
+    queue.put(quote('AAPL', bid=1))
+    queue.put(Update('book', 'NYSE_BOOK', 'AAPL', {'bid': 1}, time.time()))
+    assert [update.service for update in drain(queue)] == ['NYSE_BOOK']
+
+
+def test_batches_fill_then_time_out():
+    """A full batch returns at once; a short one after max_wait"""
+    state = MarketState()
+    hub = UpdateHub(state)
+
+    async def run():
+        batches = hub.batches(max_items=3, max_wait=0.05, symbols=['AAPL', 'MSFT'])
+        first = asyncio.ensure_future(batches.__anext__())
+        await asyncio.sleep(0)
+        for n in range(5):
+            state.update_quote('equity', 'AAPL' if n % 2 else 'MSFT', {'bid': n})
+        state.update_quote('equity', 'IBM', {'bid': 9})
+        started = time.monotonic()
+        full = await first
+        full_wait = time.monotonic() - started
+        started = time.monotonic()
+        short = await batches.__anext__()
+        short_wait = time.monotonic() - started
+        await batches.aclose()
+        return full, full_wait, short, short_wait
+
+    full, full_wait, short, short_wait = asyncio.run(run())
+    assert [update.fields['bid'] for update in full] == [0, 1, 2] and full_wait < 0.04
+    assert [update.fields['bid'] for update in short] == [3, 4] and short_wait >= 0.04
+    assert hub.report() == {'iterators': 0} and not hub.by_symbol
+
+
+def test_batch_wakes_once_full():
+    """Updates arriving during the wait end it as soon as the batch is full"""
+    queue = UpdateQueue(None, None)
+
+    async def run():
+        batch = asyncio.ensure_future(queue.get_batch(3, 5.0))
+        queue.put(quote('AAPL', bid=0))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        queue.put(quote('AAPL', bid=1))
+        queue.put(quote('AAPL', bid=2))
+        queue.put(quote('AAPL', bid=3))
+        result = await batch
+        return result, time.monotonic() - started
+
+    batch, waited = asyncio.run(run())
+    assert [update.fields['bid'] for update in batch] == [0, 1, 2] and waited < 1.0
+    assert len(queue.queue) == 1
+
+
+def test_iterator_ends_after_drain_on_close():
+    state = MarketState()
+    hub = UpdateHub(state)
+
+    async def run():
+        received = []
+
+        async def consume():
+            async for update in hub.updates(services=['LEVELONE_EQUITIES']):
+                received.append(update.fields['bid'])
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        state.update_quote('equity', 'AAPL', {'bid': 1})
+        state.update_quote('equity', 'AAPL', {'bid': 2})
+        hub.close()
+        await asyncio.wait_for(task, 1.0)
+        return received
+
+    assert asyncio.run(run()) == [1, 2]
+    assert hub.all_symbols == []
+
+
+def main():
+    print("🧪 UPDATE STREAM TEST")
+    print("=" * 50)
+    failed = False
+    for test in (test_drop_newest, test_drop_oldest, test_conflate_merges_in_place, test_conflate_delivers_merged_fields,
+                 test_conflate_replaces_books, test_service_filter, test_batches_fill_then_time_out,
+                 test_batch_wakes_once_full, test_iterator_ends_after_drain_on_close):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Tick Store for Schwab Streaming Client
+Columnar on-disk storage of recorded quotes, trades and bars, and a query
+engine that memory-maps the columns for range seeks, resampling and as-of joins
+
+Layout under the store root:
+
+    <kind>/<YYYY-MM-DD>/<segment>/time.npy      int64 epoch milliseconds
+    <kind>/<YYYY-MM-DD>/<segment>/<column>.npy  int64 prices (fixed_point.py), float64 sizes
+    <kind>/<YYYY-MM-DD>/<segment>/meta.json     symbols, row offsets, time range
+
+Rows in a segment are sorted by (symbol, time), and `offsets[i]:offsets[i + 1]`
+is symbol i's slice, so a symbol/time range is a dict lookup plus two
+binary searches on a memory-mapped time column. Results are NumPy arrays.
+"""
+
+import asyncio
+import json
+import os
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fixed_point import NULL_PRICE
+from stream_logging import get_logger, kv
+
+logger = get_logger('tick_store')
+
+KINDS = {
+    'quotes': ('bid', 'ask', 'bid_size', 'ask_size'),
+    'trades': ('price', 'size'),
+    'bars': ('open', 'high', 'low', 'close', 'volume'),
+}
+
+# Columns holding scaled integer prices; missing prices are NULL_PRICE
+PRICE_COLUMNS = frozenset({'bid', 'ask', 'price', 'open', 'high', 'low', 'close'})
+
+NAN = float('nan')
+
+
+def _dtype(column: str):
+    return np.int64 if column in PRICE_COLUMNS or column == 'time' else np.float64
+
+
+def _day(time_ms: int) -> str:
+    return datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def write_segment(root: str, kind: str, symbols: np.ndarray, times: np.ndarray,
+                  columns: Dict[str, np.ndarray], name: Optional[str] = None) -> Optional[str]:
+    """Sort rows by (symbol, time) and write them as one segment; returns its directory
+
+    The segment is written to a temporary directory and renamed into
+    place, so readers never see a partial one.
+    """
+    if len(times) == 0:
+        return None
+    names, symbol_ids = np.unique(symbols, return_inverse=True)
+    order = np.lexsort((times, symbol_ids))
+    symbol_ids = symbol_ids[order]
+    offsets = np.searchsorted(symbol_ids, np.arange(len(names) + 1))
+    times = times[order]
+
+    name = name or f"{int(times.min())}-{os.getpid()}-{time.time_ns() % 1000000:06d}"
+    directory = os.path.join(root, kind, _day(int(times.min())), name)
+    temporary = directory + '.tmp'
+    os.makedirs(temporary, exist_ok=True)
+    np.save(os.path.join(temporary, 'time.npy'), times.astype(np.int64))
+    for column in KINDS[kind]:
+        np.save(os.path.join(temporary, f'{column}.npy'), np.asarray(columns[column], dtype=_dtype(column))[order])
+    meta = {
+        'kind': kind,
+        'rows': int(len(times)),
+        'start_ms': int(times.min()),
+        'end_ms': int(times.max()),
+        'symbols': [str(symbol) for symbol in names],
+        'offsets': offsets.tolist(),
+    }
+    with open(os.path.join(temporary, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    os.replace(temporary, directory)
+    return directory
+
+
+def _buckets(times: np.ndarray, interval_ms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(interval start times, first row, last row) per non-empty interval of sorted `times`"""
+    buckets = times // interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    return buckets[starts] * interval_ms, starts, ends
+
+
+class Segment:
+    """One segment's columns, memory-mapped on first use"""
+
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.start_ms = meta['start_ms']
+        self.end_ms = meta['end_ms']
+        self.rows = meta['rows']
+        self.offsets = meta['offsets']
+        self.index = {symbol: i for i, symbol in enumerate(meta['symbols'])}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        mapped = self._columns.get(name)
+        if mapped is None:
+            mapped = self._columns[name] = np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+        return mapped
+
+    def seek(self, symbol: str, start_ms: int, end_ms: int) -> Optional[Tuple[int, int]]:
+        """Row range of `symbol` with start_ms <= time < end_ms, None if empty"""
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        times = self.column('time')[lo:hi]
+        first = lo + int(np.searchsorted(times, start_ms, side='left'))
+        last = lo + int(np.searchsorted(times, end_ms, side='left'))
+        return (first, last) if last > first else None
+
+
+class TickStore:
+    """Query engine over a tick store root
+
+    Segment metadata is read once (`refresh` picks up new segments);
+    column data stays on disk and is paged in by the OS as slices are read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.segments: Dict[str, List[Segment]] = {}
+        self.refresh()
+
+    def refresh(self):
+        for kind in KINDS:
+            segments = []
+            kind_root = os.path.join(self.root, kind)
+            if os.path.isdir(kind_root):
+                for day in sorted(os.listdir(kind_root)):
+                    day_root = os.path.join(kind_root, day)
+                    for name in sorted(os.listdir(day_root)):
+                        directory = os.path.join(day_root, name)
+                        if name.endswith('.tmp'):
+                            continue
+                        with open(os.path.join(directory, 'meta.json')) as f:
+                            segments.append(Segment(directory, json.load(f)))
+            segments.sort(key=lambda segment: segment.start_ms)
+            self.segments[kind] = segments
+
+    def symbols(self, kind: str = 'quotes') -> List[str]:
+        return sorted({symbol for segment in self.segments[kind] for symbol in segment.index})
+
+    def window(self, kind: str, symbol: str, start_ms: int, end_ms: int,
+               columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Rows of `symbol` with start_ms <= time < end_ms as {"time", column...} arrays in time order
+
+        Slices of a single segment are zero-copy views of the mapped files.
+        """
+        columns = ['time'] + list(columns or KINDS[kind])
+        parts = []
+        for segment in self.segments[kind]:
+            if segment.end_ms < start_ms or segment.start_ms >= end_ms:
+                continue
+            rows = segment.seek(symbol, start_ms, end_ms)
+            if rows:
+                parts.append({name: segment.column(name)[rows[0]:rows[1]] for name in columns})
+        if not parts:
+            return {name: np.empty(0, dtype=_dtype(name)) for name in columns}
+        if len(parts) == 1:
+            return parts[0]
+        result = {name: np.concatenate([part[name] for part in parts]) for name in columns}
+        times = result['time']
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            # Segments flushed out of time order overlap
+            order = np.argsort(times, kind='stable')
+            result = {name: values[order] for name, values in result.items()}
+        return result
+
+    def resample(self, symbol: str, start_ms: int, end_ms: int, interval_ms: int,
+                 kind: str = 'trades') -> Dict[str, np.ndarray]:
+        """OHLCV bars of `interval_ms` from trades (price/size) or bars; empty intervals are omitted"""
+        if kind == 'trades':
+            data = self.window('trades', symbol, start_ms, end_ms)
+            first = high = low = last = data['price']
+            volume = data['size']
+        else:
+            data = self.window('bars', symbol, start_ms, end_ms)
+            first, high, low, last, volume = (data[c] for c in ('open', 'high', 'low', 'close', 'volume'))
+        times = data['time']
+        if len(times) == 0:
+            return {name: np.empty(0, dtype=_dtype(name))
+                    for name in ('time', 'open', 'high', 'low', 'close', 'volume')}
+        bucket_times, starts, ends = _buckets(times, interval_ms)
+        return {
+            'time': bucket_times,
+            'open': np.asarray(first)[starts],
+            'high': np.maximum.reduceat(high, starts),
+            'low': np.minimum.reduceat(low, starts),
+            'close': np.asarray(last)[ends],
+            'volume': np.add.reduceat(volume, starts),
+        }
+
+    def resample_quotes(self, symbol: str, start_ms: int, end_ms: int, interval_ms: int) -> Dict[str, np.ndarray]:
+        """Last bid/ask per interval, plus quote counts"""
+        data = self.window('quotes', symbol, start_ms, end_ms, ['bid', 'ask'])
+        times = data['time']
+        if len(times) == 0:
+            return {name: np.empty(0, dtype=_dtype(name)) for name in ('time', 'bid', 'ask', 'quotes')}
+        bucket_times, starts, ends = _buckets(times, interval_ms)
+        return {
+            'time': bucket_times,
+            'bid': np.asarray(data['bid'])[ends],
+            'ask': np.asarray(data['ask'])[ends],
+            'quotes': ends - starts + 1,
+        }
+
+    def asof_join(self, symbol: str, start_ms: int, end_ms: int,
+                  tolerance_ms: int = 60000) -> Dict[str, np.ndarray]:
+        """Trades with the quote prevailing at each trade (last quote at or before it)
+
+        Trades with no quote within `tolerance_ms` get NULL_PRICE bid/ask and
+        a quote_time of -1.
+        """
+        trades = self.window('trades', symbol, start_ms, end_ms)
+        quotes = self.window('quotes', symbol, start_ms - tolerance_ms, end_ms, ['bid', 'ask'])
+        index = np.searchsorted(quotes['time'], trades['time'], side='right') - 1
+        valid = index >= 0
+        valid[valid] &= trades['time'][valid] - quotes['time'][index[valid]] <= tolerance_ms
+        matched = index[valid]
+        bid = np.full(len(index), NULL_PRICE, dtype=np.int64)
+        ask = np.full(len(index), NULL_PRICE, dtype=np.int64)
+        quote_time = np.full(len(index), -1, dtype=np.int64)
+        bid[valid] = quotes['bid'][matched]
+        ask[valid] = quotes['ask'][matched]
+        quote_time[valid] = quotes['time'][matched]
+        return {
+            'time': np.asarray(trades['time']),
+            'price': np.asarray(trades['price']),
+            'size': np.asarray(trades['size']),
+            'bid': bid,
+            'ask': ask,
+            'quote_time': quote_time,
+        }
+
+
+class TickRecorder:
+    """Records MarketState updates into a tick store
+
+    Quotes are recorded when bid or ask changes (with the merged sizes),
+    trades when a Level One update carries a trade time or last price, bars as they
+    arrive. Rows are buffered in typed arrays and written as one segment
+    per kind every `flush_seconds` or `flush_rows`, sorted off the loop.
+    """
+
+    def __init__(self, state, root: str, flush_seconds: float = 60.0, flush_rows: int = 500000):
+        self.state = state
+        self.root = root
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self.buffers = {kind: self._new_buffer(kind) for kind in KINDS}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_pending = False
+        self.rows = 0
+        self.segments = 0
+
+    @staticmethod
+    def _new_buffer(kind: str) -> dict:
+        buffer = {column: array('q' if column in PRICE_COLUMNS else 'd') for column in KINDS[kind]}
+        buffer['time'] = array('q')
+        buffer['symbol'] = []
+        return buffer
+
+    def attach(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.state.add_recorder(self.record)
+
+    def record(self, kind: str, key: Optional[str], symbol: str, fields: Dict[str, object]):
+        """MarketState recorder"""
+        if kind == 'quote':
+            quote = self.state.quotes[symbol]
+            now = int(time.time() * 1000)
+            if 'bid' in fields or 'ask' in fields:
+                self._append('quotes', symbol, fields.get('quote_time') or quote.get('quote_time') or now,
+                             (quote.get('bid'), quote.get('ask'), quote.get('bid_size'), quote.get('ask_size')))
+            if 'trade_time' in fields or 'last' in fields:
+                self._append('trades', symbol, fields.get('trade_time') or quote.get('trade_time') or now,
+                             (quote.get('last'), quote.get('last_size')))
+        elif kind == 'bar':
+            bar_time = fields.get('time')
+            if bar_time is not None:
+                self._append('bars', symbol, bar_time, tuple(fields.get(c) for c in KINDS['bars']))
+
+    def _append(self, kind: str, symbol: str, time_ms, values: tuple):
+        buffer = self.buffers[kind]
+        buffer['symbol'].append(symbol)
+        buffer['time'].append(int(time_ms))
+        for column, value in zip(KINDS[kind], values):
+            if value is None:
+                value = NULL_PRICE if column in PRICE_COLUMNS else NAN
+            buffer[column].append(value)
+        self.rows += 1
+        if len(buffer['symbol']) >= self.flush_rows and self._task is not None and not self._flush_pending:
+            self._flush_pending = True
+            self._task.get_loop().create_task(self.flush())
+
+    def _swap(self) -> Dict[str, dict]:
+        full = {kind: buffer for kind, buffer in self.buffers.items() if buffer['symbol']}
+        for kind in full:
+            self.buffers[kind] = self._new_buffer(kind)
+        return full
+
+    def _write(self, full: Dict[str, dict]):
+        for kind, buffer in full.items():
+            columns = {column: np.frombuffer(buffer[column], dtype=_dtype(column)) for column in KINDS[kind]}
+            write_segment(self.root, kind, np.array(buffer['symbol']),
+                          np.frombuffer(buffer['time'], dtype=np.int64), columns)
+            self.segments += 1
+
+    async def flush(self):
+        """Swap the buffers on the loop and write them on a worker thread"""
+        full = self._swap()
+        self._flush_pending = False
+        if full:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, full)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error("Tick store flush failed: %s", e, extra=kv(root=self.root))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the timer and write what is buffered"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._write(self._swap())
+
+    def report(self) -> dict:
+        return {'rows': self.rows, 'segments': self.segments, 'root': self.root}
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Update Streams for Schwab Streaming Client
+Async iterators over normalized market state updates, as an alternative to
+registering callback handlers
+
+    async for update in client.updates(services=['LEVELONE_EQUITIES'], symbols=['AAPL']):
+        ...
+    async for batch in client.batches(max_items=500, max_wait=0.05):
+        ...
+
+Each iterator has its own bounded queue fed from the market state's
+recorder hook. The feed never waits for a consumer: when a queue is full
+its overflow policy applies (handler_executor's drop_newest, drop_oldest
+or conflate). Leaving the `async for`, cancelling the consuming task or
+ending the session unregisters the iterator.
+"""
+
+import asyncio
+import collections
+import time
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from asset_classes import ASSET_CLASSES
+from handler_executor import CONFLATE, DROP_NEWEST, DROP_OLDEST
+from stream_logging import get_logger, kv
+
+logger = get_logger('update_stream')
+
+# Service an update came from, by (kind, asset class or venue)
+LEVEL_ONE_SERVICES = {spec.name: spec.service for spec in ASSET_CLASSES.values()}
+
+
+def update_service(kind: str, key: Optional[str]) -> str:
+    if kind == 'quote':
+        return LEVEL_ONE_SERVICES.get(key, key)
+    if kind == 'book':
+        return f'{key}_BOOK'
+    return 'CHART_EQUITY'
+
+
+class Update:
+    """One normalized update as applied to the market state
+
+    kind      'quote', 'book' or 'bar'
+    service   stream service it came from (LEVELONE_EQUITIES, NYSE_BOOK, ...)
+    fields    changed quote fields, or the full top of book / bar
+    """
+
+    __slots__ = ('kind', 'service', 'symbol', 'fields', 'received')
+
+    def __init__(self, kind: str, service: str, symbol: str, fields: Dict[str, object], received: float):
+        self.kind = kind
+        self.service = service
+        self.symbol = symbol
+        self.fields = fields
+        self.received = received
+
+    def __repr__(self):
+        return f"Update({self.service}, {self.symbol}, {self.fields})"
+
+
+class UpdateQueue:
+    """Bounded queue of one iterator; filled synchronously, drained with `get`"""
+
+    def __init__(self, services: Optional[Set[str]], symbols: Optional[Set[str]],
+                 max_queue: int = 10000, overflow: str = CONFLATE):
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, CONFLATE):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.services = services
+        self.symbols = symbols
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.queue: Deque[Update] = collections.deque()
+        # (service, symbol) -> last queued update, for conflation; updates are
+        # shared between queues, so a conflated one is swapped in at delivery
+        self.queued: Dict[Tuple[str, str], Update] = {}
+        self.conflated_into: Dict[int, Update] = {}
+        self.closed = False
+        self._waiter: Optional[asyncio.Future] = None
+        # Queue length that wakes the waiting consumer (raised while a batch fills)
+        self._wake_at = 1
+
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+
+    def put(self, update: Update):
+        if self.services is not None and update.service not in self.services:
+            return
+        queue = self.queue
+        if len(queue) >= self.max_queue:
+            if self.overflow == CONFLATE:
+                queued = self.queued.get((update.service, update.symbol))
+                if queued is not None:
+                    # Newer fields win; quote deltas accumulate, books and bars replace
+                    pending = self.conflated_into.get(id(queued), queued)
+                    fields = {**pending.fields, **update.fields} if update.kind == 'quote' else update.fields
+                    self.conflated_into[id(queued)] = Update(
+                        update.kind, update.service, update.symbol, fields, update.received)
+                    self.conflated += 1
+                    return
+            if self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            self._forget(queue.popleft())
+            self.dropped += 1
+        queue.append(update)
+        if self.overflow == CONFLATE:
+            self.queued[(update.service, update.symbol)] = update
+        if len(queue) > self.max_depth:
+            self.max_depth = len(queue)
+        waiter = self._waiter
+        if waiter is not None and len(queue) >= self._wake_at and not waiter.done():
+            waiter.set_result(None)
+
+    def _forget(self, update: Update) -> Update:
+        """Unindex a dequeued update; returns what to deliver in its place"""
+        if self.overflow != CONFLATE:
+            return update
+        key = (update.service, update.symbol)
+        if self.queued.get(key) is update:
+            del self.queued[key]
+        if self.conflated_into:
+            return self.conflated_into.pop(id(update), update)
+        return update
+
+    async def _wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for an update; False on timeout"""
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            if timeout is None:
+                await self._waiter
+            else:
+                await asyncio.wait_for(self._waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiter = None
+
+    async def get(self) -> Optional[Update]:
+        """Next update, None once the queue is closed and drained"""
+        while not self.queue:
+            if self.closed:
+                return None
+            await self._wait()
+        update = self._forget(self.queue.popleft())
+        self.delivered += 1
+        return update
+
+    async def get_batch(self, max_items: int, max_wait: float) -> List[Update]:
+        """Up to `max_items` updates: waits for the first, then at most `max_wait` seconds for more
+
+        Returns an empty list once the queue is closed and drained.
+        """
+        while not self.queue:
+            if self.closed:
+                return []
+            await self._wait()
+        if len(self.queue) < max_items and max_wait > 0 and not self.closed:
+            # One wakeup when the batch is full or the wait is over, not one per update
+            self._wake_at = max_items
+            try:
+                await self._wait(max_wait)
+            finally:
+                self._wake_at = 1
+        queue = self.queue
+        forget = self._forget
+        batch = [forget(queue.popleft()) for _ in range(min(max_items, len(queue)))]
+        self.delivered += len(batch)
+        return batch
+
+    def close(self):
+        self.closed = True
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def report(self) -> dict:
+        return {'delivered': self.delivered, 'dropped': self.dropped, 'conflated': self.conflated,
+                'max_depth': self.max_depth, 'queued': len(self.queue)}
+
+
+class UpdateHub:
+    """Fans market state updates out to the open iterator queues
+
+    Queues filtered by symbol are indexed by symbol, so an update only
+    touches the queues that want it. The recorder is attached on the first
+    open queue.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.all_symbols: List[UpdateQueue] = []
+        self.by_symbol: Dict[str, List[UpdateQueue]] = {}
+        self._attached = False
+        self.closed = False
+
+    def record(self, kind: str, key: Optional[str], symbol: str, fields: Dict[str, object]):
+        """MarketState recorder"""
+        targets = self.by_symbol.get(symbol)
+        if not targets and not self.all_symbols:
+            return
+        update = Update(kind, update_service(kind, key), symbol, fields, time.time())
+        for queue in self.all_symbols:
+            queue.put(update)
+        if targets:
+            for queue in targets:
+                queue.put(update)
+
+    def open(self, services: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+             max_queue: int = 10000, overflow: str = CONFLATE) -> UpdateQueue:
+        if not self._attached:
+            self.state.add_recorder(self.record)
+            self._attached = True
+        queue = UpdateQueue(set(services) if services is not None else None,
+                            set(symbols) if symbols is not None else None, max_queue, overflow)
+        if self.closed:
+            queue.close()
+        elif queue.symbols is None:
+            self.all_symbols.append(queue)
+        else:
+            for symbol in queue.symbols:
+                self.by_symbol.setdefault(symbol, []).append(queue)
+        return queue
+
+    def remove(self, queue: UpdateQueue):
+        queue.close()
+        if queue.symbols is None:
+            if queue in self.all_symbols:
+                self.all_symbols.remove(queue)
+            return
+        for symbol in queue.symbols:
+            queues = self.by_symbol.get(symbol)
+            if queues and queue in queues:
+                queues.remove(queue)
+                if not queues:
+                    del self.by_symbol[symbol]
+
+    def close(self):
+        """End every iterator once it has drained its queue (end of session)"""
+        self.closed = True
+        for queue in self.all_symbols + [q for queues in self.by_symbol.values() for q in queues]:
+            queue.close()
+
+    async def updates(self, services: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+                      max_queue: int = 10000, overflow: str = CONFLATE) -> AsyncIterator[Update]:
+        queue = self.open(services, symbols, max_queue, overflow)
+        try:
+            while True:
+                update = await queue.get()
+                if update is None:
+                    return
+                yield update
+        finally:
+            self.remove(queue)
+            self._log_summary(queue)
+
+    async def batches(self, max_items: int = 1000, max_wait: float = 0.01,
+                      services: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+                      max_queue: int = 10000, overflow: str = CONFLATE) -> AsyncIterator[List[Update]]:
+        queue = self.open(services, symbols, max(max_queue, max_items), overflow)
+        try:
+            while True:
+                batch = await queue.get_batch(max_items, max_wait)
+                if not batch:
+                    return
+                yield batch
+        finally:
+            self.remove(queue)
+            self._log_summary(queue)
+
+    @staticmethod
+    def _log_summary(queue: UpdateQueue):
+        if queue.dropped or queue.conflated:
+            logger.info("Update iterator closed with overflow", extra=kv(**queue.report()))
+
+    def report(self) -> dict:
+        return {'iterators': len(self.all_symbols) + len({id(q) for qs in self.by_symbol.values() for q in qs})}